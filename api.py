@@ -0,0 +1,247 @@
+# api.py
+import datetime
+from collections import defaultdict, namedtuple
+from functools import wraps
+
+from flask import abort, jsonify, request, session
+
+from database import db
+from permisos import permisos
+
+# Relación que se puede incluir en un documento compuesto (?incluir=nivel,profesor.usuario).
+# Une la columna 'local' del recurso con la columna 'remota' del recurso 'tipo': a uno es
+# FK -> clave primaria; a muchos (muchos=True) es clave primaria -> FK del otro recurso.
+Relacion = namedtuple('Relacion', 'tipo local remota muchos', defaults=(False,))
+
+# Parámetros por consulta IN al cargar relaciones (SQLite admite como mínimo 999)
+_BLOQUE_IN = 500
+
+
+def _error(estado, mensaje, **extra):
+    """Corta la petición con una respuesta JSON {'error': ...} y el código indicado."""
+    respuesta = jsonify(error=mensaje, **extra)
+    respuesta.status_code = estado
+    abort(respuesta)
+
+
+def _valor(valor):
+    # Fechas en ISO 8601 (jsonify usaría el formato de fecha HTTP)
+    if isinstance(valor, (datetime.date, datetime.datetime)):
+        return valor.isoformat()
+    return valor
+
+
+def _lista_parametro(nombre):
+    """'a,b,,c' -> ['a', 'b', 'c']; None si el parámetro no está en la URL."""
+    texto = request.args.get(nombre)
+    if texto is None:
+        return None
+    return [parte.strip() for parte in texto.split(',') if parte.strip()]
+
+
+class Recurso:
+    """Un modelo publicado en la API: columnas públicas, relaciones incluibles y permisos necesarios."""
+
+    def __init__(self, tipo, modelo, campos, permiso, relaciones=None, protegidos=None, alcance=None):
+        self.tipo = tipo
+        self.modelo = modelo
+        self.clave = modelo.__mapper__.primary_key[0].key
+        self.campos = campos
+        self.permiso = permiso # Para pedirlo como recurso principal; incluido basta con ver la fila que lo enlaza
+        self.relaciones = relaciones or {}
+        self.protegidos = protegidos or {} # campo -> permiso necesario para verlo
+        self.alcance = alcance # función(consulta) -> consulta con solo las filas visibles para la sesión
+
+    def campos_visibles(self):
+        concedidos = permisos.de_rol(session.get('user_rol'))
+        return [campo for campo in self.campos
+                if campo not in self.protegidos or self.protegidos[campo] in concedidos]
+
+    def consulta(self, columnas):
+        consulta = db.select(*(getattr(self.modelo, columna) for columna in columnas))
+        return self.alcance(consulta) if self.alcance else consulta
+
+
+class ApiJson:
+    """
+    API JSON de solo lectura bajo /api/v1 para los recursos registrados con registrar():
+
+      GET /api/v1/<tipo>?despues=&por_pagina=&<filtro>=   página ordenada por clave (keyset)
+      GET /api/v1/<tipo>?ids=1,2,3                        varios por id con una sola consulta IN
+      GET /api/v1/<tipo>/<id>                             uno
+
+    En todas: ?campos=a,b (o campos[<tipo>]=a,b para los incluidos) selecciona solo esas
+    columnas en el SELECT, e ?incluir=nivel,profesor.usuario añade en 'incluidos' las filas
+    relacionadas, con una consulta IN por relación sea cual sea el número de filas.
+    """
+
+    def __init__(self):
+        self.recursos = {}
+        self.por_pagina = 50
+        self.max_por_pagina = 500
+        self.max_ids = 500
+
+    def init_app(self, app, prefijo='/api/v1'):
+        """Lee ELEMENTOS_POR_PAGINA, MAX_ELEMENTOS_POR_PAGINA y API_MAX_IDS y añade las rutas."""
+        self.por_pagina = app.config.get('ELEMENTOS_POR_PAGINA', self.por_pagina)
+        self.max_por_pagina = app.config.get('MAX_ELEMENTOS_POR_PAGINA', self.max_por_pagina)
+        self.max_ids = app.config.get('API_MAX_IDS', self.max_ids)
+        app.add_url_rule(f'{prefijo}/<tipo>', 'api_lista', self._con_sesion(self.lista))
+        app.add_url_rule(f'{prefijo}/<tipo>/<int:id_entidad>', 'api_detalle', self._con_sesion(self.detalle))
+
+    def registrar(self, tipo, modelo, campos, permiso, relaciones=None, protegidos=None, alcance=None):
+        """Publica 'modelo' como /api/v1/<tipo>. 'campos' debe incluir la clave primaria."""
+        for necesario in [permiso, *(protegidos or {}).values()]:
+            permisos.validar(necesario)
+        self.recursos[tipo] = Recurso(tipo, modelo, campos, permiso, relaciones, protegidos, alcance)
+
+    @staticmethod
+    def _con_sesion(vista):
+        # Como login_required, pero responde 401 en JSON en lugar de redirigir al login
+        @wraps(vista)
+        def envoltura(*args, **kwargs):
+            if 'user_id' not in session:
+                _error(401, 'Necesitas iniciar sesión.')
+            return vista(*args, **kwargs)
+        return envoltura
+
+    # --- Vistas ---
+
+    def lista(self, tipo):
+        recurso = self._recurso(tipo)
+        inclusiones = self._inclusiones(recurso)
+        columnas = self._columnas(recurso, inclusiones)
+        clave = getattr(recurso.modelo, recurso.clave)
+        cuerpo = {}
+
+        ids = _lista_parametro('ids')
+        if ids is not None:
+            try:
+                ids = list(dict.fromkeys(int(id_) for id_ in ids)) # Sin repetidos, en el orden pedido
+            except ValueError:
+                _error(400, 'ids debe ser una lista de números separados por comas.')
+            if not ids or len(ids) > self.max_ids:
+                _error(400, f'ids admite entre 1 y {self.max_ids} valores.')
+            por_id = {fila[recurso.clave]: fila
+                      for fila in self._filas(columnas, recurso.consulta(columnas).where(clave.in_(ids)))}
+            datos = [por_id[id_] for id_ in ids if id_ in por_id]
+            faltan = [id_ for id_ in ids if id_ not in por_id]
+            if faltan:
+                cuerpo['no_encontrados'] = faltan
+        else:
+            por_pagina = max(1, min(request.args.get('por_pagina', self.por_pagina, type=int), self.max_por_pagina))
+            try:
+                _, condiciones = recurso.modelo.condiciones_filtro(request.args.to_dict())
+            except ValueError:
+                _error(400, 'Filtro con un valor que no corresponde al tipo de la columna.')
+            consulta = recurso.consulta(columnas).where(*condiciones)
+            despues = request.args.get('despues', type=int)
+            if despues is not None:
+                consulta = consulta.where(clave > despues)
+            # Un elemento de más indica si hay otra página, sin COUNT(*)
+            datos = self._filas(columnas, consulta.order_by(clave).limit(por_pagina + 1))
+            if len(datos) > por_pagina:
+                datos = datos[:por_pagina]
+                cuerpo['siguiente'] = datos[-1][recurso.clave]
+
+        cuerpo['datos'] = datos
+        return self._documento(recurso, datos, inclusiones, cuerpo)
+
+    def detalle(self, tipo, id_entidad):
+        recurso = self._recurso(tipo)
+        inclusiones = self._inclusiones(recurso)
+        columnas = self._columnas(recurso, inclusiones)
+        clave = getattr(recurso.modelo, recurso.clave)
+        datos = self._filas(columnas, recurso.consulta(columnas).where(clave == id_entidad))
+        if not datos:
+            _error(404, f'No existe {tipo}/{id_entidad}.')
+        return self._documento(recurso, datos, inclusiones, {'datos': datos[0]})
+
+    # --- Lectura de parámetros ---
+
+    def _recurso(self, tipo):
+        recurso = self.recursos.get(tipo)
+        if recurso is None:
+            _error(404, f'Recurso desconocido: {tipo}.', recursos=sorted(self.recursos))
+        if not permisos.permite(session.get('user_rol'), recurso.permiso):
+            _error(403, f'No tienes permiso para consultar {tipo}.')
+        return recurso
+
+    def _inclusiones(self, recurso):
+        """?incluir=profesor.usuario,nivel -> {'profesor': {'usuario': {}}, 'nivel': {}}, validado."""
+        arbol = {}
+        for ruta in _lista_parametro('incluir') or ():
+            actual, nodo = recurso, arbol
+            for nombre in ruta.split('.'):
+                if nombre not in actual.relaciones:
+                    _error(400, f'{actual.tipo} no tiene la relación "{nombre}".',
+                           relaciones=sorted(actual.relaciones))
+                actual = self.recursos[actual.relaciones[nombre].tipo]
+                nodo = nodo.setdefault(nombre, {})
+        return arbol
+
+    def _columnas(self, recurso, inclusiones, remota=None):
+        """
+        Columnas del SELECT: las pedidas con campos[<tipo>] (o todas las visibles), la clave y
+        las necesarias para unir las relaciones incluidas.
+        """
+        visibles = recurso.campos_visibles()
+        pedidos = _lista_parametro(f'campos[{recurso.tipo}]')
+        if pedidos is None and not remota:
+            pedidos = _lista_parametro('campos') # ?campos= vale para el recurso principal
+        if pedidos is None:
+            columnas = list(visibles)
+        else:
+            desconocidos = [campo for campo in pedidos if campo not in visibles]
+            if desconocidos:
+                _error(400, f'Campos desconocidos en {recurso.tipo}: {", ".join(desconocidos)}.', campos=visibles)
+            columnas = [campo for campo in visibles if campo in pedidos or campo == recurso.clave]
+        necesarias = [recurso.relaciones[nombre].local for nombre in inclusiones] + ([remota] if remota else [])
+        return columnas + [columna for columna in dict.fromkeys(necesarias) if columna not in columnas]
+
+    @staticmethod
+    def _filas(columnas, consulta):
+        return [{columna: _valor(valor) for columna, valor in zip(columnas, fila)}
+                for fila in db.session.execute(consulta)]
+
+    # --- Documentos compuestos ---
+
+    def _documento(self, recurso, datos, inclusiones, cuerpo):
+        if inclusiones:
+            incluidos = {}
+            self._incluir(recurso, datos if isinstance(datos, list) else [datos], inclusiones, incluidos)
+            cuerpo['incluidos'] = {tipo: list(filas.values()) for tipo, filas in incluidos.items()}
+        return jsonify(cuerpo)
+
+    def _incluir(self, recurso, filas, inclusiones, incluidos):
+        """
+        Carga las relaciones de 'filas' con una consulta IN (por bloques) por relación y las
+        acumula en incluidos[tipo][id], sin repetir filas que lleguen por varios caminos.
+        """
+        for nombre, subinclusiones in inclusiones.items():
+            relacion = recurso.relaciones[nombre]
+            destino = self.recursos[relacion.tipo]
+            valores = sorted({fila[relacion.local] for fila in filas if fila[relacion.local] is not None})
+            columnas = self._columnas(destino, subinclusiones, remota=relacion.remota)
+            remota = getattr(destino.modelo, relacion.remota)
+            relacionadas = []
+            for inicio in range(0, len(valores), _BLOQUE_IN):
+                bloque = valores[inicio:inicio + _BLOQUE_IN]
+                relacionadas += self._filas(columnas, destino.consulta(columnas).where(remota.in_(bloque)))
+
+            if relacion.muchos:
+                # En cada fila, la lista de ids relacionados ('ejercicios': [4, 5, ...])
+                por_fila = defaultdict(list)
+                for relacionada in relacionadas:
+                    por_fila[relacionada[relacion.remota]].append(relacionada[destino.clave])
+                for fila in filas:
+                    fila[nombre] = por_fila.get(fila[relacion.local], [])
+
+            acumuladas = incluidos.setdefault(destino.tipo, {})
+            for relacionada in relacionadas:
+                acumuladas.setdefault(relacionada[destino.clave], {}).update(relacionada)
+            if subinclusiones:
+                self._incluir(destino, relacionadas, subinclusiones, incluidos)
+
+
+api_json = ApiJson()
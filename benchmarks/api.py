@@ -0,0 +1,106 @@
+# benchmarks/api.py
+"""
+Pantalla de lección del cliente móvil: raspando las páginas HTML frente a la API JSON.
+
+  HTML: ver_leccion_web/<id> + ejercicios_web?id_leccion=<id> + ver_ejercicio_web/<id> por ejercicio
+  API:  GET /api/v1/lecciones/<id>?incluir=ejercicios.opciones,profesor.usuario,nivel
+
+Para --lecciones lecciones al azar con ejercicios se miden peticiones, bytes transferidos
+(sin comprimir y con gzip/brotli), consultas SQL y tiempo por pantalla. Usa la base sembrada
+por benchmarks/rutas.py (la crea si no existe, con los mismos volúmenes por defecto).
+
+Uso:
+  python benchmarks/api.py --lecciones 200
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+import rutas # noqa: E402 (benchmarks/rutas.py: siembra y credenciales del administrador)
+
+
+def pantalla_html(id_leccion, ids_ejercicios):
+    urls = [f'/ver_leccion_web/{id_leccion}', f'/ejercicios_web?id_leccion={id_leccion}']
+    urls += [f'/ver_ejercicio_web/{id_ejercicio}' for id_ejercicio in ids_ejercicios]
+    return urls
+
+
+def pantalla_api(id_leccion, ids_ejercicios):
+    return [f'/api/v1/lecciones/{id_leccion}?incluir=ejercicios.opciones,profesor.usuario,nivel']
+
+
+def medir(cliente, consultas, urls, codificacion):
+    """Peticiones, bytes recibidos, consultas y segundos para cargar una pantalla."""
+    recibidos, total_consultas = 0, 0
+    inicio = time.perf_counter()
+    for url in urls:
+        consultas[0] = 0
+        respuesta = cliente.get(url, headers={'Accept-Encoding': codificacion} if codificacion else {})
+        assert respuesta.status_code == 200, (url, respuesta.status_code)
+        recibidos += len(respuesta.get_data())
+        total_consultas += consultas[0]
+    return len(urls), recibidos, total_consultas, time.perf_counter() - inicio
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--lecciones', type=int, default=100, help='Pantallas de lección a cargar')
+    parser.add_argument('--semilla', type=int, default=1)
+    parser.add_argument('--base', help='Archivo SQLite sembrado (por defecto, el de benchmarks/rutas.py)')
+    args = parser.parse_args()
+
+    volumenes = {'usuarios': 10000, 'profesores': 500, 'estudiantes': 5000, 'lecciones': 2000,
+                 'ejercicios': 20000, 'progreso': 500000}
+    ruta = args.base or os.path.join(
+        tempfile.gettempdir(), 'bench-' + '-'.join(str(v) for v in volumenes.values()) + f'-{args.semilla}.db')
+    os.environ.update({'DATABASE_URL': 'sqlite:///' + ruta, 'HASH_PROCESOS': '0'})
+    if not os.path.exists(ruta):
+        print(f'Sembrando {ruta} ...')
+        rutas.sembrar(ruta, volumenes, args.semilla)
+
+    from sqlalchemy import event
+    from database import db
+    from modelos import Ejercicio
+    from compresion import compresion
+
+    app = rutas.aplicacion()
+    aleatorio = random.Random(args.semilla)
+    consultas = [0]
+    with app.app_context():
+        event.listen(db.engine, 'before_cursor_execute', lambda *_: consultas.__setitem__(0, consultas[0] + 1))
+        con_ejercicios = db.session.scalars(db.select(Ejercicio.id_leccion).distinct()).all()
+        pantallas = []
+        for id_leccion in aleatorio.sample(con_ejercicios, min(args.lecciones, len(con_ejercicios))):
+            pantallas.append((id_leccion, db.session.scalars(
+                db.select(Ejercicio.id_ejercicio).where(Ejercicio.id_leccion == id_leccion)).all()))
+        db.session.remove()
+
+        cliente = app.test_client()
+        respuesta = cliente.post('/login', data={'email': rutas.EMAIL_ADMIN, 'password': rutas.PASSWORD_ADMIN})
+        assert respuesta.status_code == 302, 'No se pudo iniciar sesión como administrador'
+
+        mejor = compresion.codificaciones[0]
+        print(f'{len(pantallas)} pantallas de lección ({statistics.mean(len(ids) for _, ids in pantallas):.1f} '
+              f'ejercicios de media); compresión: {mejor}')
+        print(f'  {"":18} {"peticiones":>10} {"KB":>9} {f"KB ({mejor})":>10} {"consultas":>10} {"ms":>8}')
+        for nombre, urls_de in (('HTML (raspado)', pantalla_html), ('API JSON', pantalla_api)):
+            filas = []
+            for id_leccion, ids in pantallas:
+                urls = urls_de(id_leccion, ids)
+                peticiones, sin_comprimir, total_consultas, segundos = medir(cliente, consultas, urls, None)
+                comprimido = medir(cliente, consultas, urls, mejor)[1]
+                filas.append((peticiones, sin_comprimir, comprimido, total_consultas, segundos))
+            medias = [statistics.mean(columna) for columna in zip(*filas)]
+            print(f'  {nombre:18} {medias[0]:10.1f} {medias[1] / 1024:9.1f} {medias[2] / 1024:10.1f} '
+                  f'{medias[3]:10.1f} {medias[4] * 1000:8.2f}')
+
+
+if __name__ == '__main__':
+    main()
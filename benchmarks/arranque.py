@@ -0,0 +1,139 @@
+# benchmarks/arranque.py
+"""
+Tiempo de arranque de la aplicación y de los workers de gunicorn.
+
+En procesos nuevos (mediana de --repeticiones):
+  - import: importar el módulo app,
+  - aplicación: importar y construir la aplicación (create_app()),
+  - primera petición: GET /login con el cliente de pruebas (compila las plantillas),
+y los módulos cargados al terminar (y si entre ellos están reportlab o PIL).
+
+Con gunicorn (1 worker), con y sin --preload: tiempo hasta la primera respuesta y tiempo
+hasta que vuelve a responder tras matar el worker (lo que cuesta reciclar o reponer uno).
+
+--raiz mide otro checkout, p. ej. el commit anterior:
+  git worktree add /tmp/anterior HEAD~1
+  python benchmarks/arranque.py --raiz /tmp/anterior
+"""
+import argparse
+import json
+import os
+import signal
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Se ejecuta en un proceso nuevo en cada medición; vale también para el app.py anterior
+# a create_app(), que construía la aplicación al importarse
+MEDIR = '''
+import json, sys, time
+inicio = time.perf_counter()
+import app as modulo
+importado = time.perf_counter()
+aplicacion = modulo.create_app() if hasattr(modulo, 'create_app') else modulo.app
+creada = time.perf_counter()
+assert aplicacion.test_client().get('/login').status_code == 200
+respondida = time.perf_counter()
+print(json.dumps({
+    'import': (importado - inicio) * 1000,
+    'aplicacion': (creada - inicio) * 1000,
+    'primera_peticion': (respondida - creada) * 1000,
+    'modulos': len(sys.modules),
+    'pesados': sorted(nombre for nombre in ('reportlab', 'PIL') if nombre in sys.modules),
+}))
+'''
+
+
+def entorno_temporal():
+    directorio = tempfile.mkdtemp(prefix='arranque-')
+    return {**os.environ,
+            'DATABASE_URL': f'sqlite:///{os.path.join(directorio, "site.db")}',
+            'SESIONES_ARCHIVO': os.path.join(directorio, 'sesiones.db'),
+            'HASH_PROCESOS': '0'}
+
+
+def medir_proceso(raiz, entorno, repeticiones):
+    muestras = []
+    for _ in range(repeticiones):
+        salida = subprocess.run([sys.executable, '-c', MEDIR], cwd=raiz, env=entorno,
+                                capture_output=True, text=True, check=True).stdout
+        muestras.append(json.loads(salida.strip().splitlines()[-1]))
+    resumen = {clave: round(statistics.median(m[clave] for m in muestras), 1)
+               for clave in ('import', 'aplicacion', 'primera_peticion')}
+    resumen['modulos'] = muestras[-1]['modulos']
+    resumen['pesados'] = muestras[-1]['pesados']
+    return resumen
+
+
+# --- gunicorn ---
+
+def puerto_libre():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+def esperar_respuesta(url, limite=30):
+    """Segundos hasta que 'url' responde (sondeando cada 5 ms)."""
+    inicio = time.perf_counter()
+    while time.perf_counter() - inicio < limite:
+        try:
+            urllib.request.urlopen(url, timeout=1).close()
+            return time.perf_counter() - inicio
+        except OSError:
+            time.sleep(0.005)
+    raise RuntimeError(f'{url} no respondió en {limite} s')
+
+def hijos(pid):
+    with open(f'/proc/{pid}/task/{pid}/children') as archivo:
+        return [int(hijo) for hijo in archivo.read().split()]
+
+def medir_gunicorn(raiz, entorno, precargar, repeticiones):
+    objetivo = 'wsgi:app' if os.path.exists(os.path.join(raiz, 'wsgi.py')) else 'app:app'
+    puerto = puerto_libre()
+    url = f'http://127.0.0.1:{puerto}/login'
+    orden = [sys.executable, '-m', 'gunicorn', '-w', '1', '-b', f'127.0.0.1:{puerto}', '--log-level', 'critical']
+    proceso = subprocess.Popen(orden + (['--preload'] if precargar else []) + [objetivo], cwd=raiz, env=entorno)
+    try:
+        primera = esperar_respuesta(url)
+        reposiciones = []
+        for _ in range(repeticiones):
+            worker, = hijos(proceso.pid)
+            os.kill(worker, signal.SIGKILL)
+            while hijos(proceso.pid) in ([], [worker]):
+                time.sleep(0.001)
+            reposiciones.append(esperar_respuesta(url))
+        return round(primera * 1000), round(statistics.median(reposiciones) * 1000)
+    finally:
+        proceso.terminate()
+        proceso.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--raiz', default=RAIZ, help='Checkout a medir (por defecto, este)')
+    parser.add_argument('--repeticiones', type=int, default=7)
+    parser.add_argument('--sin-gunicorn', action='store_true')
+    args = parser.parse_args()
+    raiz = os.path.abspath(args.raiz)
+
+    resumen = medir_proceso(raiz, entorno_temporal(), args.repeticiones)
+    print(f'import app:          {resumen["import"]:>7.1f} ms')
+    print(f'aplicación lista:    {resumen["aplicacion"]:>7.1f} ms')
+    print(f'primera petición:    {resumen["primera_peticion"]:>7.1f} ms')
+    print(f'módulos cargados:    {resumen["modulos"]:>7} (pesados: {", ".join(resumen["pesados"]) or "ninguno"})')
+    if args.sin_gunicorn:
+        return
+    for precargar in (False, True):
+        primera, reposicion = medir_gunicorn(raiz, entorno_temporal(), precargar, args.repeticiones)
+        modo = 'con --preload' if precargar else 'sin --preload'
+        print(f'gunicorn {modo}: primera respuesta {primera} ms, worker repuesto {reposicion} ms')
+
+
+if __name__ == '__main__':
+    main()
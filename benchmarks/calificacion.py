@@ -0,0 +1,104 @@
+# benchmarks/calificacion.py
+"""
+Rendimiento de la calificación automática.
+
+1) Motor: califica respuestas contra ejercicios ya compilados (sin base de datos).
+2) Envíos por lección: varios hilos envían lotes de respuestas a /responder_leccion_web
+   con el cliente de pruebas de Flask sobre una base SQLite temporal.
+
+Uso: python benchmarks/calificacion.py --ejercicios 20 --envios 500 --hilos 4
+"""
+import argparse
+import datetime
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--ejercicios', type=int, default=20, help='Ejercicios por lección (respuestas por envío)')
+    parser.add_argument('--envios', type=int, default=500, help='Envíos de lección por hilo')
+    parser.add_argument('--hilos', type=int, default=4, help='Estudiantes enviando a la vez')
+    parser.add_argument('--motor', type=int, default=200000, help='Respuestas a calificar en la prueba del motor')
+    args = parser.parse_args()
+
+    import calificador
+    tipos = ('multiple_choice', 'fill_in_the_blank', 'short_answer')
+    compilados = [calificador.compilar(i, 1, tipos[i % 3], ['Apple', 'Banana', 'Cherry'], 'Banana') for i in range(100)]
+    respuestas = ['banana', ' Banana.', 'cherry', 'kiwi']
+    inicio = time.perf_counter()
+    for i in range(args.motor):
+        calificador.calificar(compilados[i % 100], respuestas[i % 4])
+    total = time.perf_counter() - inicio
+    print(f'motor: {args.motor} respuestas en {total:.2f}s -> {args.motor / total:,.0f} calificaciones/s')
+
+    from config import Config
+    Config.SQLALCHEMY_DATABASE_URI = 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'bench.db')
+    Config.HASH_PROCESOS = 0
+
+    from app import create_app
+    from database import db
+    from modelos import Usuario, Nivel, Estudiante, Profesor, Leccion, Ejercicio
+
+    app = create_app()
+
+    with app.app_context():
+        db.create_all()
+        nivel = Nivel(niveles='Bench')
+        profesor_usuario = Usuario(nombre='Profesor', email='profesor@bench.local', rol='profesor', contrasena_hash='-')
+        db.session.add_all([nivel, profesor_usuario])
+        db.session.flush()
+        profesor = Profesor(id_usuario=profesor_usuario.id_usuario, asignatura='Bench')
+        db.session.add(profesor)
+        db.session.flush()
+        leccion = Leccion(id_profesor=profesor.id_profesor, titulo='Bench', contenido='-', id_nivel=nivel.id_nivel)
+        db.session.add(leccion)
+        db.session.flush()
+        ejercicios = [Ejercicio(id_leccion=leccion.id_leccion, pregunta=f'P{i}', tipo=tipos[i % 3],
+                                respuesta='Banana') for i in range(args.ejercicios)]
+        for ejercicio in ejercicios:
+            if ejercicio.tipo == 'multiple_choice':
+                ejercicio.asignar_opciones(['Apple', 'Banana', 'Cherry'])
+        db.session.add_all(ejercicios)
+        for i in range(args.hilos):
+            usuario = Usuario(nombre=f'E{i}', email=f'e{i}@bench.local', rol='estudiante')
+            usuario.set_password('secreto')
+            db.session.add(usuario)
+            db.session.flush()
+            db.session.add(Estudiante(id_usuario=usuario.id_usuario, id_nivel=nivel.id_nivel,
+                                      fecha_nacimiento=datetime.date(2000, 1, 1)))
+        db.session.commit()
+        id_leccion = leccion.id_leccion
+        ids = [ejercicio.id_ejercicio for ejercicio in ejercicios]
+
+    errores = [0]
+
+    def estudiante(i):
+        cliente = app.test_client()
+        cliente.post('/login', data={'email': f'e{i}@bench.local', 'password': 'secreto'})
+        for _ in range(args.envios):
+            envio = {'respuestas': [{'id_ejercicio': id_ejercicio, 'respuesta': random.choice(respuestas)}
+                                    for id_ejercicio in ids]}
+            if cliente.post(f'/responder_leccion_web/{id_leccion}', json=envio).status_code != 200:
+                errores[0] += 1
+
+    hilos = [threading.Thread(target=estudiante, args=(i,)) for i in range(args.hilos)]
+    inicio = time.perf_counter()
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+    total = time.perf_counter() - inicio
+    respuestas_enviadas = args.hilos * args.envios * args.ejercicios
+    print(f'envíos: {args.hilos * args.envios} lotes de {args.ejercicios} en {total:.2f}s -> '
+          f'{respuestas_enviadas / total:,.0f} respuestas/s ({errores[0]} lotes con error)')
+
+
+if __name__ == '__main__':
+    main()
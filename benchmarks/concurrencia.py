@@ -0,0 +1,133 @@
+# benchmarks/concurrencia.py
+"""
+Escrituras concurrentes contra la base de datos, como varios workers de gunicorn.
+
+Cada proceso es un "worker" con su propio motor y pool: registra lotes de respuestas de
+su estudiante (registrar_intentos: INSERT del progreso + resúmenes, una transacción por
+lote) durante --segundos. Se informa de transacciones/s y de errores (p. ej. "database is locked").
+
+La configuración se pasa por variables de entorno, igual que en producción:
+  SQLite ajustado (WAL, synchronous=NORMAL, busy_timeout):
+      python benchmarks/concurrencia.py --procesos 8
+  SQLite sin ajustes (journal por defecto, synchronous=FULL, sin espera por bloqueo):
+      python benchmarks/concurrencia.py --procesos 8 --sin-ajustes
+  PostgreSQL local (p. ej. docker run -e POSTGRES_PASSWORD=pw -p 5432:5432 postgres):
+      python benchmarks/concurrencia.py --url postgresql://postgres:pw@localhost/postgres
+
+Con --url se crean las tablas y datos de prueba en esa base de datos: usa una base desechable.
+"""
+import argparse
+import datetime
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+
+def preparar(procesos, ejercicios):
+    """Crea las tablas, una lección con ejercicios y un estudiante por proceso."""
+    from app import create_app
+    from database import db
+    from modelos import Usuario, Nivel, Estudiante, Profesor, Leccion, Ejercicio
+
+    app = create_app()
+
+    with app.app_context():
+        db.create_all()
+        nivel = Nivel(niveles=f'Bench {time.time_ns()}')
+        profesor_usuario = Usuario(nombre='Profesor', email=f'profesor{time.time_ns()}@bench.local',
+                                   rol='profesor', contrasena_hash='-')
+        db.session.add_all([nivel, profesor_usuario])
+        db.session.flush()
+        profesor = Profesor(id_usuario=profesor_usuario.id_usuario, asignatura='Bench')
+        db.session.add(profesor)
+        db.session.flush()
+        leccion = Leccion(id_profesor=profesor.id_profesor, titulo='Bench', contenido='-', id_nivel=nivel.id_nivel)
+        db.session.add(leccion)
+        db.session.flush()
+        lista = [Ejercicio(id_leccion=leccion.id_leccion, pregunta=f'P{i}', tipo='short_answer', respuesta='Banana')
+                 for i in range(ejercicios)]
+        db.session.add_all(lista)
+        estudiantes = []
+        for i in range(procesos):
+            usuario = Usuario(nombre=f'E{i}', email=f'e{i}.{time.time_ns()}@bench.local', rol='estudiante',
+                              contrasena_hash='-')
+            db.session.add(usuario)
+            db.session.flush()
+            estudiante = Estudiante(id_usuario=usuario.id_usuario, id_nivel=nivel.id_nivel,
+                                    fecha_nacimiento=datetime.date(2000, 1, 1))
+            db.session.add(estudiante)
+            estudiantes.append(estudiante)
+        db.session.commit()
+        return [ejercicio.id_ejercicio for ejercicio in lista], [estudiante.id_estudiante for estudiante in estudiantes]
+
+
+def worker(id_estudiante, ids, segundos, salida, inicio_comun):
+    from sqlalchemy.exc import OperationalError
+    from app import create_app
+    from database import db
+    from progreso import ejercicios_compilados, registrar_intentos
+
+    app = create_app()
+
+    confirmadas, errores = 0, 0
+    with app.app_context():
+        compilados = ejercicios_compilados(ids)
+        intentos = [(compilados[id_ejercicio], 'banana') for id_ejercicio in ids]
+        inicio_comun.wait() # Todos empiezan a la vez, ya importados y conectados
+        fin = time.perf_counter() + segundos
+        while time.perf_counter() < fin:
+            try:
+                registrar_intentos(id_estudiante, intentos)
+                confirmadas += 1
+            except OperationalError:
+                db.session.rollback()
+                errores += 1
+    salida.put((confirmadas, errores))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url', help='DATABASE_URL a probar (por defecto, un SQLite temporal)')
+    parser.add_argument('--procesos', type=int, default=4, help='Workers escribiendo a la vez')
+    parser.add_argument('--segundos', type=float, default=5, help='Duración de la prueba')
+    parser.add_argument('--ejercicios', type=int, default=10, help='Respuestas por transacción')
+    parser.add_argument('--sin-ajustes', action='store_true', help='SQLite sin WAL ni busy_timeout, para comparar')
+    args = parser.parse_args()
+
+    # Los procesos hijos ('spawn') importan de nuevo config.py y leen estas variables
+    os.environ['DATABASE_URL'] = args.url or 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'bench.db')
+    os.environ['HASH_PROCESOS'] = '0'
+    if args.sin_ajustes:
+        os.environ.update(SQLITE_WAL='0', SQLITE_SYNCHRONOUS='FULL', SQLITE_BUSY_TIMEOUT='0')
+
+    ids, estudiantes = preparar(args.procesos, args.ejercicios)
+
+    contexto = multiprocessing.get_context('spawn')
+    salida = contexto.Queue()
+    inicio_comun = contexto.Barrier(args.procesos + 1)
+    procesos = [contexto.Process(target=worker, args=(id_estudiante, ids, args.segundos, salida, inicio_comun))
+                for id_estudiante in estudiantes]
+    for proceso in procesos:
+        proceso.start()
+    inicio_comun.wait()
+    inicio = time.perf_counter()
+    resultados = [salida.get() for _ in procesos]
+    total = time.perf_counter() - inicio
+    for proceso in procesos:
+        proceso.join()
+
+    confirmadas = sum(c for c, _ in resultados)
+    errores = sum(e for _, e in resultados)
+    motor = os.environ['DATABASE_URL'].split(':', 1)[0] + (' (sin ajustes)' if args.sin_ajustes else '')
+    print(f'{motor}: {args.procesos} procesos, {confirmadas} transacciones en {total:.2f}s -> '
+          f'{confirmadas / total:,.0f} transacciones/s, {confirmadas * args.ejercicios / total:,.0f} filas/s, '
+          f'{errores} errores')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,144 @@
+# benchmarks/login.py
+"""
+Rendimiento del login bajo carga concurrente.
+
+Crea una base SQLite temporal con unos cuantos usuarios y lanza logins simultáneos
+con el cliente de pruebas de Flask desde varios hilos. Informa de logins/s, latencias
+p50/p99 y cuántas peticiones se rechazaron con 503 por saturación del pool de hashing.
+
+Con --atacantes N repite la medida mientras N hilos envían contraseñas erróneas sin
+pausa desde unas pocas IPs (--ips-atacantes) a cuentas que existen (--victimas): con
+los límites del login (limites.py) casi todos se rechazan con 429 sin consultar la base
+de datos ni calcular un hash, y la latencia de los usuarios legítimos (cada uno con su
+IP) apenas cambia; con --sin-limites cada intento ocupa el pool de hashing. Se mide
+tras --calentamiento segundos de ataque, cuando los atacantes ya han agotado su cupo.
+
+Uso: python benchmarks/login.py --hilos 16 --logins 20 --procesos 4 --cola 8
+     python benchmarks/login.py --hilos 8 --atacantes 16 [--sin-limites] [--almacen sqlite]
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import random
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--hilos', type=int, default=16, help='Clientes concurrentes')
+    parser.add_argument('--logins', type=int, default=20, help='Logins por cliente')
+    parser.add_argument('--procesos', type=int, default=os.cpu_count(), help='HASH_PROCESOS (0 = en línea)')
+    parser.add_argument('--cola', type=int, default=8, help='HASH_COLA_MAX')
+    parser.add_argument('--atacantes', type=int, default=0, help='Hilos que envían contraseñas erróneas sin pausa')
+    parser.add_argument('--ips-atacantes', type=int, default=4, help='IPs distintas de los atacantes')
+    parser.add_argument('--victimas', type=int, default=200, help='Cuentas a las que se ataca')
+    parser.add_argument('--calentamiento', type=float, default=30,
+                        help='Segundos de ataque antes de medir (para que los atacantes agoten su cupo)')
+    parser.add_argument('--sin-limites', action='store_true', help='Desactiva los límites del login')
+    parser.add_argument('--almacen', choices=('memoria', 'sqlite'), default='memoria', help='LOGIN_LIMITES_ALMACEN')
+    args = parser.parse_args()
+
+    from config import Config
+    carpeta = tempfile.mkdtemp()
+    Config.SQLALCHEMY_DATABASE_URI = 'sqlite:///' + os.path.join(carpeta, 'bench.db')
+    Config.HASH_PROCESOS = args.procesos
+    Config.HASH_COLA_MAX = args.cola
+    Config.HASH_PLAZAS_ARCHIVO = os.path.join(carpeta, 'hashing.db')
+    Config.LOGIN_LIMITES_ACTIVOS = not args.sin_limites
+    Config.LOGIN_LIMITES_ALMACEN = args.almacen
+    Config.LOGIN_LIMITES_ARCHIVO = os.path.join(carpeta, 'limites.db')
+
+    from app import create_app
+    from database import db
+    from hashing import pool_hashing
+    from modelos import Usuario
+
+    app = create_app()
+
+    with app.app_context():
+        db.create_all()
+        for i in range(args.hilos):
+            usuario = Usuario(nombre=f'Usuario {i}', email=f'u{i}@bench.local', rol='estudiante')
+            usuario.set_password('secreto')
+            db.session.add(usuario)
+        # Mismo hash para todas las víctimas: calcular uno por cuenta alargaría la preparación
+        hash_victima = pool_hashing.generar('otro secreto')
+        for i in range(args.victimas):
+            db.session.add(Usuario(nombre=f'Víctima {i}', email=f'victima{i}@bench.local', rol='estudiante',
+                                   contrasena_hash=hash_victima))
+        db.session.commit()
+
+    def medir(fase, atacantes):
+        latencias, rechazos = [], {503: 0, 429: 0}
+        ataque = {'intentos': 0, 429: 0, 503: 0}
+        lock = threading.Lock()
+        parar = threading.Event()
+
+        def cliente(i):
+            # Cada usuario legítimo con su IP (una por fase, para no arrastrar intentos de la anterior)
+            c = app.test_client()
+            c.environ_base['REMOTE_ADDR'] = f'10.{fase}.{i // 250}.{i % 250 + 1}'
+            for _ in range(args.logins):
+                inicio = time.perf_counter()
+                respuesta = c.post('/login', data={'email': f'u{i}@bench.local', 'password': 'secreto'})
+                duracion = time.perf_counter() - inicio
+                with lock:
+                    if respuesta.status_code in rechazos:
+                        rechazos[respuesta.status_code] += 1
+                    else:
+                        latencias.append(duracion)
+
+        def atacante(i):
+            c = app.test_client()
+            c.environ_base['REMOTE_ADDR'] = f'203.0.113.{i % args.ips_atacantes + 1}'
+            rnd = random.Random(i)
+            while not parar.is_set():
+                respuesta = c.post('/login', data={'email': f'victima{rnd.randrange(args.victimas)}@bench.local',
+                                                   'password': 'adivina'})
+                with lock:
+                    ataque['intentos'] += 1
+                    if respuesta.status_code in (429, 503):
+                        ataque[respuesta.status_code] += 1
+
+        hilos_ataque = [threading.Thread(target=atacante, args=(i,)) for i in range(atacantes)]
+        for hilo in hilos_ataque:
+            hilo.start()
+        if atacantes:
+            time.sleep(args.calentamiento)
+            with lock:
+                ataque.update({'intentos': 0, 429: 0, 503: 0})
+        hilos = [threading.Thread(target=cliente, args=(i,)) for i in range(args.hilos)]
+        inicio = time.perf_counter()
+        for hilo in hilos:
+            hilo.start()
+        for hilo in hilos:
+            hilo.join()
+        total = time.perf_counter() - inicio
+        parar.set()
+        for hilo in hilos_ataque:
+            hilo.join()
+
+        latencias.sort()
+        print(f'-- {"con" if atacantes else "sin"} ataque ({atacantes} atacantes)')
+        print(f'logins correctos: {len(latencias)} en {total:.2f}s -> {len(latencias) / total:.1f} logins/s')
+        if latencias:
+            print(f'p50={statistics.median(latencias) * 1000:.0f}ms p99={latencias[int(len(latencias) * 0.99) - 1] * 1000:.0f}ms')
+        print(f'rechazados (503): {rechazos[503]}  (429): {rechazos[429]}')
+        if atacantes:
+            print(f'ataque: {ataque["intentos"]} intentos ({ataque["intentos"] / total:.0f}/s), '
+                  f'{ataque[429]} con 429, {ataque[503]} con 503')
+
+    limites = 'sin límites' if args.sin_limites else f'límites en {args.almacen}'
+    print(f'procesos={args.procesos} cola={args.cola} hilos={args.hilos} {limites}')
+    medir(1, 0)
+    if args.atacantes:
+        medir(2, args.atacantes)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,382 @@
+# benchmarks/rutas.py
+"""
+Prueba de carga de todas las rutas web (*_web, inicio y login).
+
+1) Siembra una base SQLite con los volúmenes indicados. Se guarda en el directorio
+   temporal con los volúmenes en el nombre y se reutiliza en las siguientes ejecuciones.
+2) Recorre cada ruta GET con el cliente de pruebas de Flask (ids aleatorios en las rutas
+   con <int:...>) y mide latencias p50/p99, consultas SQL por petición y RSS máximo.
+3) Con --gunicorn, repite las rutas contra un gunicorn local (varios workers y clientes HTTP
+   concurrentes) y mide latencias, peticiones/s y RSS máximo de los workers.
+
+Los resultados se guardan en JSON (por defecto benchmarks/resultados/<commit>.json); con
+--comparar se muestran las diferencias con otro JSON, p. ej. el del commit anterior.
+
+Uso:
+  python benchmarks/rutas.py --usuarios 100000 --estudiantes 50000 --lecciones 20000 \\
+      --ejercicios 200000 --progreso 5000000 --gunicorn
+  python benchmarks/rutas.py --comparar benchmarks/resultados/<commit_anterior>.json
+"""
+import argparse
+import datetime
+import functools
+import http.cookiejar
+import json
+import os
+import random
+import resource
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.parse
+import urllib.request
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+EMAIL_ADMIN, PASSWORD_ADMIN = 'admin@bench.local', 'secreto'
+NIVELES = ('Principiante', 'Elemental', 'Intermedio', 'Intermedio alto', 'Avanzado', 'Experto')
+TIPOS = ('multiple_choice', 'fill_in_the_blank', 'short_answer')
+
+
+# --- Aplicación ---
+
+@functools.cache
+def aplicacion():
+    """La aplicación de create_app(), construida una vez por proceso (tras fijar DATABASE_URL)."""
+    from app import create_app
+    return create_app()
+
+
+# --- Siembra de datos ---
+
+def sembrar(ruta, volumenes, semilla):
+    """
+    Crea el esquema con db.create_all() y lo llena con executemany por bloques directamente
+    sobre sqlite3 (sin ORM), con journal y synchronous desactivados mientras dura la carga.
+    """
+    import sqlite3
+    from database import db
+    from hashing import pool_hashing
+
+    app = aplicacion()
+
+    aleatorio = random.Random(semilla)
+    with app.app_context():
+        db.create_all()
+        hash_comun = pool_hashing.generar(PASSWORD_ADMIN) # Un único hash: sembrar no mide el hashing
+        db.engine.dispose()
+
+    conexion = sqlite3.connect(ruta)
+    conexion.execute('PRAGMA journal_mode = OFF')
+    conexion.execute('PRAGMA synchronous = OFF')
+    ahora = datetime.datetime(2025, 1, 1)
+
+    def insertar(sql, filas, bloque=50000):
+        lote = []
+        for fila in filas:
+            lote.append(fila)
+            if len(lote) == bloque:
+                conexion.executemany(sql, lote)
+                lote.clear()
+        if lote:
+            conexion.executemany(sql, lote)
+        conexion.commit()
+
+    insertar('INSERT INTO niveles (id_nivel, niveles) VALUES (?, ?)', enumerate(NIVELES, start=1))
+
+    # Usuarios: 1 admin, luego profesores, luego estudiantes y el resto sin perfil
+    profesores, estudiantes = volumenes['profesores'], volumenes['estudiantes']
+    def rol(i):
+        if i == 1:
+            return 'admin'
+        return 'profesor' if i <= 1 + profesores else 'estudiante'
+    fecha = ahora.strftime('%Y-%m-%d %H:%M:%S.%f')
+    insertar('INSERT INTO usuarios (id_usuario, nombre, email, contrasena_hash, rol, fecha_registro, activo) '
+             'VALUES (?, ?, ?, ?, ?, ?, 1)',
+             ((i, f'Usuario {i}', EMAIL_ADMIN if i == 1 else f'u{i}@bench.local', hash_comun, rol(i), fecha)
+              for i in range(1, volumenes['usuarios'] + 1)))
+    insertar('INSERT INTO profesores (id_profesor, id_usuario, asignatura, id_nivel) VALUES (?, ?, ?, ?)',
+             ((i, 1 + i, f'Asignatura {i % 50}', aleatorio.randint(1, len(NIVELES))) for i in range(1, profesores + 1)))
+    insertar('INSERT INTO estudiantes (id_estudiante, id_usuario, id_nivel, fecha_nacimiento) VALUES (?, ?, ?, ?)',
+             ((i, 1 + profesores + i, aleatorio.randint(1, len(NIVELES)), '2005-06-15') for i in range(1, estudiantes + 1)))
+    insertar('INSERT INTO lecciones (id_leccion, id_profesor, titulo, contenido, video, id_nivel) '
+             'VALUES (?, ?, ?, ?, NULL, ?)',
+             ((i, aleatorio.randint(1, profesores), f'Lección {i}', 'Contenido de la lección. ' * 20,
+               aleatorio.randint(1, len(NIVELES))) for i in range(1, volumenes['lecciones'] + 1)))
+    insertar('INSERT INTO ejercicios (id_ejercicio, id_leccion, pregunta, tipo, respuesta) VALUES (?, ?, ?, ?, ?)',
+             ((i, aleatorio.randint(1, volumenes['lecciones']), f'Pregunta {i}', TIPOS[i % 3], 'Banana')
+              for i in range(1, volumenes['ejercicios'] + 1)))
+    # Tres opciones por ejercicio de opción múltiple (TIPOS[0])
+    insertar('INSERT INTO opciones_ejercicio (id_ejercicio, orden, texto, correcta) VALUES (?, ?, ?, ?)',
+             ((i, orden, texto, texto == 'Banana') for i in range(3, volumenes['ejercicios'] + 1, 3)
+              for orden, texto in enumerate(('Apple', 'Banana', 'Cherry'))))
+    # Fechas crecientes: la clave única (estudiante, ejercicio, fecha) nunca se repite
+    insertar('INSERT INTO progreso_estudiantes (id_estudiante, id_ejercicio, fecha_completado, puntuacion, respuesta_estudiante) '
+             'VALUES (?, ?, ?, ?, ?)',
+             ((aleatorio.randint(1, estudiantes), aleatorio.randint(1, volumenes['ejercicios']),
+               (ahora + datetime.timedelta(seconds=i)).strftime('%Y-%m-%d %H:%M:%S.%f'),
+               aleatorio.choice((0, 100)), 'banana') for i in range(volumenes['progreso'])))
+    conexion.close()
+
+    resultado = app.test_cli_runner().invoke(args=['recalcular-resumenes'])
+    print(resultado.output.strip())
+
+
+# --- Rutas a medir ---
+
+def rutas_a_medir(app):
+    """Reglas GET de las rutas *_web y de inicio, en orden alfabético."""
+    return [regla for regla in sorted(app.url_map.iter_rules(), key=lambda r: r.rule)
+            if 'GET' in regla.methods and (regla.endpoint.endswith('_web') or regla.endpoint == 'principal.index')]
+
+def maximos_por_clave(db):
+    """id máximo de cada clave primaria (id_usuario, id_leccion...) para generar ids aleatorios."""
+    maximos = {}
+    with db.engine.connect() as conexion:
+        for tabla in db.metadata.sorted_tables:
+            clave = list(tabla.primary_key)
+            if len(clave) == 1:
+                maximos[clave[0].name] = conexion.scalar(db.select(db.func.max(clave[0]))) or 1
+    return maximos
+
+def url_de(regla, maximos, aleatorio):
+    url = regla.rule
+    for argumento in regla.arguments:
+        url = url.replace(f'<int:{argumento}>', str(aleatorio.randint(1, maximos.get(argumento, 1))))
+    return url
+
+def resumen(latencias):
+    """p50/p99 en milisegundos."""
+    if len(latencias) < 2:
+        latencias = latencias * 2
+    cuantiles = statistics.quantiles(latencias, n=100, method='inclusive')
+    return {'p50_ms': round(cuantiles[49] * 1000, 2), 'p99_ms': round(cuantiles[98] * 1000, 2)}
+
+def rss_maximo_mb():
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1) # ru_maxrss en KB (Linux)
+
+
+# --- Cliente de pruebas de Flask ---
+
+def medir_cliente(peticiones, semilla):
+    from sqlalchemy import event
+    from database import db
+
+    app = aplicacion()
+    aleatorio = random.Random(semilla)
+    resultados = {}
+    consultas = [0]
+
+    def contar(*_):
+        consultas[0] += 1
+
+    with app.app_context():
+        maximos = maximos_por_clave(db)
+        event.listen(db.engine, 'before_cursor_execute', contar)
+        try:
+            cliente = app.test_client()
+            latencias, por_peticion = [], []
+            for _ in range(peticiones):
+                consultas[0] = 0
+                inicio = time.perf_counter()
+                respuesta = cliente.post('/login', data={'email': EMAIL_ADMIN, 'password': PASSWORD_ADMIN})
+                latencias.append(time.perf_counter() - inicio)
+                por_peticion.append(consultas[0])
+            assert respuesta.status_code == 302, 'No se pudo iniciar sesión como administrador'
+            resultados['login'] = {**resumen(latencias), 'consultas': max(por_peticion), 'rss_mb': rss_maximo_mb()}
+            print(f'  {"login":32} p50 {resultados["login"]["p50_ms"]:8.2f} ms  '
+                  f'p99 {resultados["login"]["p99_ms"]:8.2f} ms  {max(por_peticion):3} consultas')
+
+            for regla in rutas_a_medir(app):
+                latencias, por_peticion, estados = [], [], set()
+                for _ in range(peticiones):
+                    url = url_de(regla, maximos, aleatorio)
+                    consultas[0] = 0
+                    inicio = time.perf_counter()
+                    respuesta = cliente.get(url)
+                    respuesta.close()
+                    latencias.append(time.perf_counter() - inicio)
+                    por_peticion.append(consultas[0])
+                    estados.add(respuesta.status_code)
+                resultados[regla.endpoint] = {**resumen(latencias), 'consultas': max(por_peticion),
+                                              'rss_mb': rss_maximo_mb(), 'estados': sorted(estados)}
+                print(f'  {regla.endpoint:32} p50 {resultados[regla.endpoint]["p50_ms"]:8.2f} ms  '
+                      f'p99 {resultados[regla.endpoint]["p99_ms"]:8.2f} ms  {max(por_peticion):3} consultas')
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', contar)
+    return resultados
+
+
+# --- gunicorn local ---
+
+def puerto_libre():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+def rss_workers_mb(pid_maestro):
+    """Máximo VmHWM (pico de RSS) entre los workers hijos del proceso maestro de gunicorn."""
+    pico = 0
+    for pid in filter(str.isdigit, os.listdir('/proc')):
+        try:
+            with open(f'/proc/{pid}/status') as estado:
+                campos = dict(linea.split(':', 1) for linea in estado if ':' in linea)
+        except OSError:
+            continue
+        if campos.get('PPid', '').strip() == str(pid_maestro):
+            pico = max(pico, int(campos.get('VmHWM', '0 kB').split()[0]))
+    return round(pico / 1024, 1)
+
+def medir_gunicorn(entorno, workers, hilos, peticiones, semilla):
+    puerto = puerto_libre()
+    base = f'http://127.0.0.1:{puerto}'
+    proceso = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '-w', str(workers), '-b', f'127.0.0.1:{puerto}', '--log-level', 'warning', 'wsgi:app'],
+        cwd=RAIZ, env=entorno)
+    try:
+        for _ in range(100):
+            try:
+                urllib.request.urlopen(base + '/login', timeout=1).close()
+                break
+            except OSError:
+                time.sleep(0.1)
+        else:
+            raise RuntimeError('gunicorn no arrancó')
+
+        from database import db
+        app = aplicacion()
+        with app.app_context():
+            maximos = maximos_por_clave(db)
+        reglas = rutas_a_medir(app)
+
+        resultados = {}
+        for nombre, urls in [('login', None)] + [(regla.endpoint, regla) for regla in reglas]:
+            latencias, errores = [], [0]
+            bloqueo = threading.Lock()
+
+            def cliente(indice):
+                aleatorio = random.Random(semilla + indice)
+                abridor = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()))
+                datos_login = urllib.parse.urlencode({'email': EMAIL_ADMIN, 'password': PASSWORD_ADMIN}).encode()
+                if urls is not None:
+                    abridor.open(base + '/login', datos_login).close()
+                for _ in range(peticiones):
+                    inicio = time.perf_counter()
+                    try:
+                        if urls is None:
+                            abridor.open(base + '/login', datos_login).read()
+                        else:
+                            abridor.open(base + url_de(urls, maximos, aleatorio)).read()
+                    except urllib.error.HTTPError as e:
+                        if e.code >= 500:
+                            errores[0] += 1
+                    with bloqueo:
+                        latencias.append(time.perf_counter() - inicio)
+
+            clientes = [threading.Thread(target=cliente, args=(i,)) for i in range(hilos)]
+            inicio = time.perf_counter()
+            for hilo in clientes:
+                hilo.start()
+            for hilo in clientes:
+                hilo.join()
+            total = time.perf_counter() - inicio
+            resultados[nombre] = {**resumen(latencias), 'peticiones_s': round(len(latencias) / total, 1),
+                                  'errores_5xx': errores[0], 'rss_workers_mb': rss_workers_mb(proceso.pid)}
+            print(f'  {nombre:32} p50 {resultados[nombre]["p50_ms"]:8.2f} ms  p99 {resultados[nombre]["p99_ms"]:8.2f} ms  '
+                  f'{resultados[nombre]["peticiones_s"]:8.1f} pet/s')
+        return resultados
+    finally:
+        proceso.terminate()
+        proceso.wait()
+
+
+# --- Comparación entre ejecuciones ---
+
+def comparar(actual, anterior):
+    print(f'\nComparación con {anterior.get("commit", "?")[:10]} (actual / anterior):')
+    for modo in ('cliente', 'gunicorn'):
+        for ruta, datos in actual.get(modo, {}).items():
+            previo = anterior.get(modo, {}).get(ruta)
+            if not previo:
+                continue
+            cambios = []
+            for clave in ('p50_ms', 'p99_ms', 'consultas'):
+                if clave in datos and previo.get(clave):
+                    cambios.append(f'{clave} x{datos[clave] / previo[clave]:.2f}')
+            if datos.get('consultas', 0) > previo.get('consultas', 0):
+                cambios.append('¡más consultas!')
+            print(f'  [{modo}] {ruta:32} ' + ', '.join(cambios))
+
+
+def commit_actual():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', 'HEAD'], cwd=RAIZ, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'desconocido'
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--usuarios', type=int, default=10000)
+    parser.add_argument('--profesores', type=int, default=500)
+    parser.add_argument('--estudiantes', type=int, default=5000)
+    parser.add_argument('--lecciones', type=int, default=2000)
+    parser.add_argument('--ejercicios', type=int, default=20000)
+    parser.add_argument('--progreso', type=int, default=500000)
+    parser.add_argument('--peticiones', type=int, default=50, help='Peticiones por ruta (por cliente HTTP con --gunicorn)')
+    parser.add_argument('--semilla', type=int, default=1)
+    parser.add_argument('--base', help='Archivo SQLite a usar (por defecto, uno por volúmenes en el directorio temporal)')
+    parser.add_argument('--gunicorn', action='store_true', help='Medir también contra un gunicorn local')
+    parser.add_argument('--workers', type=int, default=4, help='Workers de gunicorn')
+    parser.add_argument('--hilos', type=int, default=8, help='Clientes HTTP concurrentes contra gunicorn')
+    parser.add_argument('--salida', help='JSON de resultados (por defecto benchmarks/resultados/<commit>.json)')
+    parser.add_argument('--comparar', help='JSON de una ejecución anterior con el que comparar')
+    args = parser.parse_args()
+
+    volumenes = {nombre: getattr(args, nombre) for nombre in
+                 ('usuarios', 'profesores', 'estudiantes', 'lecciones', 'ejercicios', 'progreso')}
+    if volumenes['usuarios'] < 1 + volumenes['profesores'] + volumenes['estudiantes']:
+        parser.error('--usuarios debe ser al menos 1 + --profesores + --estudiantes')
+    ruta = args.base or os.path.join(
+        tempfile.gettempdir(), 'bench-' + '-'.join(str(v) for v in volumenes.values()) + f'-{args.semilla}.db')
+
+    # La configuración va por entorno para que los workers de gunicorn usen la misma base
+    entorno = {**os.environ, 'DATABASE_URL': 'sqlite:///' + ruta, 'HASH_PROCESOS': '0'}
+    os.environ.update(entorno)
+
+    sembrada = os.path.exists(ruta)
+    if not sembrada:
+        print(f'Sembrando {ruta} ...')
+        inicio = time.perf_counter()
+        sembrar(ruta, volumenes, args.semilla)
+        print(f'Siembra en {time.perf_counter() - inicio:.1f}s')
+
+    commit = commit_actual()
+    resultados = {'commit': commit, 'fecha': datetime.datetime.now().isoformat(timespec='seconds'),
+                  'volumenes': volumenes, 'peticiones': args.peticiones}
+    print('Cliente de pruebas de Flask:')
+    resultados['cliente'] = medir_cliente(args.peticiones, args.semilla)
+    resultados['rss_pico_mb'] = rss_maximo_mb()
+    if args.gunicorn:
+        print(f'gunicorn ({args.workers} workers, {args.hilos} clientes):')
+        resultados['gunicorn'] = medir_gunicorn(entorno, args.workers, args.hilos, args.peticiones, args.semilla)
+        resultados['gunicorn_config'] = {'workers': args.workers, 'hilos': args.hilos}
+
+    salida = args.salida or os.path.join(RAIZ, 'benchmarks', 'resultados', f'{commit[:10]}.json')
+    os.makedirs(os.path.dirname(salida), exist_ok=True)
+    with open(salida, 'w', encoding='utf-8') as archivo:
+        json.dump(resultados, archivo, indent=2, ensure_ascii=False)
+    print(f'Resultados en {salida}')
+
+    if args.comparar:
+        with open(args.comparar, encoding='utf-8') as archivo:
+            comparar(resultados, json.load(archivo))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,89 @@
+# benchmarks/sesiones.py
+"""
+Coste por petición de abrir la sesión, según el número de sesiones abiertas.
+
+Llena un almacén SQLite temporal con --sesiones sesiones y abre --peticiones sesiones al
+azar con open_session(), como haría cada petición:
+  - cookie firmada de Flask (referencia: verifica la firma y decodifica la cookie),
+  - servidor con la caché en memoria caliente (lectura de la generación + LRU),
+  - servidor sin caché (lectura de la fila de la sesión en el almacén).
+También muestra el tamaño de la cookie en cada caso.
+
+Uso: python benchmarks/sesiones.py --sesiones 1000 100000
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+class Peticion:
+    def __init__(self, cookie):
+        self.cookies = {'session': cookie}
+
+
+def medir(interfaz, app, cookies, peticiones, aleatorio):
+    """Microsegundos por open_session (mediana de 5 rondas)."""
+    rondas = []
+    for _ in range(5):
+        muestra = [Peticion(aleatorio.choice(cookies)) for _ in range(peticiones)]
+        inicio = time.perf_counter()
+        for peticion in muestra:
+            sesion = interfaz.open_session(app, peticion)
+        rondas.append((time.perf_counter() - inicio) / peticiones * 1e6)
+        assert sesion.get('user_id') is not None
+    return statistics.median(rondas)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sesiones', type=int, nargs='+', default=[1000, 100000])
+    parser.add_argument('--peticiones', type=int, default=5000)
+    parser.add_argument('--cache', type=int, default=10000, help='SESIONES_CACHE_MAX')
+    args = parser.parse_args()
+
+    from flask import Flask
+    from flask.sessions import SecureCookieSessionInterface
+    from sesiones import AlmacenSQLite, InterfazSesiones
+
+    app = Flask(__name__)
+    app.secret_key = 'benchmark'
+    datos = {'user_id': 1, 'user_email': 'estudiante@bench.local', 'user_rol': 'estudiante'}
+    firmada = SecureCookieSessionInterface()
+    cookie_flask = firmada.get_signing_serializer(app).dumps(datos)
+    aleatorio = random.Random(1)
+
+    print(f'{"sesiones":>10} {"cookie Flask":>14} {"servidor+LRU":>14} {"servidor sin LRU":>17}   (µs por petición)')
+    for total in args.sesiones:
+        almacen = AlmacenSQLite(os.path.join(tempfile.mkdtemp(), 'sesiones.db'))
+        interfaz = InterfazSesiones(almacen, args.cache)
+        caduca = time.time() + 3600
+        texto = interfaz.serializador.dumps(datos)
+        conexion = almacen._conexion()
+        conexion.execute('BEGIN')
+        conexion.executemany('INSERT INTO sesiones (id, id_usuario, version, datos, caduca) VALUES (?, ?, 1, ?, ?)',
+                             ((f'sesion{i}', i, texto, caduca) for i in range(total)))
+        conexion.execute('COMMIT')
+        firmador = interfaz._firmador(app)
+        # Sesiones "activas": las que caben en la caché; el resto del almacén no se toca
+        activas = [firmador.sign(f'sesion{i}.1').decode() for i in aleatorio.sample(range(total), min(total, args.cache))]
+
+        flask_us = medir(firmada, app, [cookie_flask], args.peticiones, aleatorio)
+        medir(interfaz, app, activas, len(activas), aleatorio) # Calienta la caché
+        lru_us = medir(interfaz, app, activas, args.peticiones, aleatorio)
+        interfaz.max_entradas = 0
+        interfaz.limpiar()
+        sin_lru_us = medir(interfaz, app, activas, args.peticiones, aleatorio)
+        print(f'{total:>10} {flask_us:>14.1f} {lru_us:>14.1f} {sin_lru_us:>17.1f}')
+
+    print(f'Tamaño de la cookie: Flask {len(cookie_flask)} bytes, servidor {len(activas[0])} bytes '
+          f'(la de Flask crece con los mensajes flash; la del servidor no)')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,269 @@
+# borrados.py
+import datetime
+from collections import Counter, namedtuple
+
+from flask import current_app
+from sqlalchemy import func, tuple_
+
+from database import db, upsert_sumando
+from cache import cache_referencia
+from modelos import (Usuario, Nivel, Estudiante, Profesor, Leccion, Ejercicio, OpcionEjercicio, ProgresoEstudiante, Repaso,
+                     ResumenEstudianteLeccion, ResumenNivel, PuntosClasificacion, ConteoClasificacion)
+from sesiones import sesiones
+from tareas import tareas, ErrorDefinitivo
+import clasificaciones
+
+# --- Borrado en cascada por lotes ---
+# El ORM borra un profesor cargando cada lección y cada ejercicio y emitiendo un DELETE por
+# objeto, y no sabe qué hacer con sus intentos (progreso_estudiantes no admite id_ejercicio
+# NULL, así que el borrado falla). Aquí cada entidad tiene un plan de pasos de abajo arriba
+# (intentos, opciones, ejercicios, lecciones...) y cada paso se repite en lotes, uno por
+# transacción:
+#   DELETE FROM tabla WHERE clave IN (SELECT clave FROM tabla WHERE condicion LIMIT lote)
+# Las claves no pasan por Python, la memoria no depende del tamaño del borrado, las escrituras
+# de la aplicación solo esperan a un lote, y si se interrumpe no quedan filas huérfanas:
+# repetirlo continúa donde quedó.
+
+# etiqueta: tabla (o tabla.columna si el paso pone la columna a NULL); valores: None = DELETE.
+# descontar(filas): recibe las columnas 'devolver' de las filas borradas (DELETE ... RETURNING)
+# y ajusta los resúmenes en la misma transacción. despues(): tras el commit de cada lote que
+# afecta a alguna fila, lo que harían los eventos del ORM de modelos.py (p. ej. revocar sesiones).
+Paso = namedtuple('Paso', 'etiqueta modelo condicion valores descontar devolver despues', defaults=(None, None, (), None))
+
+
+class InformeBorrado:
+    """Filas afectadas por paso (o que se verían afectadas, si es simulado) y lo que impide el borrado."""
+
+    def __init__(self, simulado):
+        self.simulado = simulado
+        self.filas = {} # etiqueta -> filas, en el orden de los pasos
+        self.impedimento = None
+
+    @property
+    def total(self):
+        return sum(self.filas.values())
+
+    def __str__(self):
+        return ', '.join(f'{etiqueta}: {filas}' for etiqueta, filas in self.filas.items())
+
+
+# --- Resúmenes de progreso ---
+# Se descuentan en la transacción de cada lote, como registrar_intentos los suma en la suya.
+
+def _niveles_de(ids_estudiantes):
+    return dict(db.session.execute(db.select(Estudiante.id_estudiante, Estudiante.id_nivel)
+                                   .where(Estudiante.id_estudiante.in_(ids_estudiantes))).all())
+
+def descontar_resumenes(filas):
+    """Resta de resumen_niveles las filas (id_estudiante, intentos, suma) borradas de resumen_estudiante_leccion."""
+    niveles = _niveles_de({id_estudiante for id_estudiante, _, _ in filas})
+    por_nivel = {}
+    for id_estudiante, intentos, suma in filas:
+        nivel = por_nivel.setdefault(niveles[id_estudiante], {
+            'id_nivel': niveles[id_estudiante], 'intentos': 0, 'suma_puntuacion': 0})
+        nivel['intentos'] -= intentos
+        nivel['suma_puntuacion'] -= suma
+    upsert_sumando(ResumenNivel, list(por_nivel.values()), ('intentos', 'suma_puntuacion'))
+
+def descontar_intentos(filas):
+    """
+    Resta de los resúmenes por lección y por nivel y de las clasificaciones los intentos
+    (id_estudiante, id_ejercicio, puntuacion) borrados.
+    """
+    progreso = ProgresoEstudiante
+    niveles = _niveles_de({fila[0] for fila in filas})
+    lecciones = dict(db.session.execute(db.select(Ejercicio.id_ejercicio, Ejercicio.id_leccion)
+                                        .where(Ejercicio.id_ejercicio.in_({fila[1] for fila in filas}))).all())
+    # Un ejercicio deja de contar como realizado cuando se borra el último intento del estudiante
+    pares = {(id_estudiante, id_ejercicio) for id_estudiante, id_ejercicio, _ in filas}
+    quedan = {tuple(fila) for fila in db.session.execute(
+        db.select(progreso.id_estudiante, progreso.id_ejercicio).distinct()
+        .where(tuple_(progreso.id_estudiante, progreso.id_ejercicio).in_(pares)))}
+
+    por_leccion, por_nivel, puntos = {}, {}, Counter()
+    for id_estudiante, id_ejercicio, puntuacion in filas:
+        resumen = por_leccion.setdefault((id_estudiante, lecciones[id_ejercicio]), {
+            'id_estudiante': id_estudiante, 'id_leccion': lecciones[id_ejercicio],
+            'intentos': 0, 'suma_puntuacion': 0, 'ejercicios_realizados': 0})
+        resumen['intentos'] -= 1
+        resumen['suma_puntuacion'] -= puntuacion or 0
+        nivel = por_nivel.setdefault(niveles[id_estudiante], {
+            'id_nivel': niveles[id_estudiante], 'intentos': 0, 'suma_puntuacion': 0})
+        nivel['intentos'] -= 1
+        nivel['suma_puntuacion'] -= puntuacion or 0
+        puntos[(id_estudiante, lecciones[id_ejercicio])] -= puntuacion or 0
+    for id_estudiante, id_ejercicio in pares - quedan:
+        por_leccion[(id_estudiante, lecciones[id_ejercicio])]['ejercicios_realizados'] -= 1
+    upsert_sumando(ResumenEstudianteLeccion, list(por_leccion.values()),
+                   ('intentos', 'suma_puntuacion', 'ejercicios_realizados'))
+    upsert_sumando(ResumenNivel, list(por_nivel.values()), ('intentos', 'suma_puntuacion'))
+    clasificaciones.sumar(clasificaciones.por_leccion(puntos))
+    # Sin intentos, la lección desaparece del progreso del estudiante (como si nunca la hubiera hecho)
+    db.session.execute(db.delete(ResumenEstudianteLeccion).where(
+        tuple_(ResumenEstudianteLeccion.id_estudiante, ResumenEstudianteLeccion.id_leccion).in_(por_leccion),
+        ResumenEstudianteLeccion.intentos <= 0).execution_options(synchronize_session=False))
+
+def descontar_clasificaciones(filas):
+    """Resta de las clasificaciones de nivel las filas (id_leccion, id_estudiante, puntos) borradas de las de sus lecciones."""
+    clasificaciones.sumar(clasificaciones.por_leccion(
+        {(id_estudiante, id_leccion): -puntos for id_leccion, id_estudiante, puntos in filas}, ambitos=('nivel',)))
+
+
+# --- Planes por entidad ---
+
+def _pasos_lecciones(lecciones):
+    """Pasos para borrar las lecciones de la subconsulta 'lecciones' con sus ejercicios e intentos."""
+    ejercicios = db.select(Ejercicio.id_ejercicio).where(Ejercicio.id_leccion.in_(lecciones))
+    resumen, puntos, conteos = ResumenEstudianteLeccion, PuntosClasificacion, ConteoClasificacion
+    return [
+        # Las clasificaciones de esas lecciones desaparecen; sus puntos se descuentan de las de los niveles
+        Paso('clasificacion_puntos', puntos, (puntos.ambito == 'leccion') & puntos.id_ambito.in_(lecciones),
+             descontar=descontar_clasificaciones, devolver=(puntos.id_ambito, puntos.id_estudiante, puntos.puntos)),
+        Paso('clasificacion_conteos', conteos, (conteos.ambito == 'leccion') & conteos.id_ambito.in_(lecciones)),
+        # Se borran enteros los resúmenes de esas lecciones, así que los intentos no se descuentan uno a uno
+        Paso('resumen_estudiante_leccion', resumen, resumen.id_leccion.in_(lecciones), descontar=descontar_resumenes,
+             devolver=(resumen.id_estudiante, resumen.intentos, resumen.suma_puntuacion)),
+        Paso('progreso_estudiantes', ProgresoEstudiante, ProgresoEstudiante.id_ejercicio.in_(ejercicios)),
+        Paso('repasos', Repaso, Repaso.id_ejercicio.in_(ejercicios)),
+        Paso('opciones_ejercicio', OpcionEjercicio, OpcionEjercicio.id_ejercicio.in_(ejercicios)),
+        Paso('ejercicios', Ejercicio, Ejercicio.id_leccion.in_(lecciones)),
+        Paso('lecciones', Leccion, Leccion.id_leccion.in_(lecciones)),
+    ]
+
+def plan_profesor(id_profesor):
+    lecciones = db.select(Leccion.id_leccion).where(Leccion.id_profesor == id_profesor)
+    return None, _pasos_lecciones(lecciones) + [Paso('profesores', Profesor, Profesor.id_profesor == id_profesor)]
+
+def _pasos_estudiante(id_estudiante):
+    resumen, puntos = ResumenEstudianteLeccion, PuntosClasificacion
+    return [
+        # Deja de contar en los puestos de los demás
+        Paso('clasificacion_puntos', puntos, puntos.id_estudiante == id_estudiante, descontar=clasificaciones.retirar,
+             devolver=(puntos.ambito, puntos.id_ambito, puntos.puntos)),
+        # Como en _pasos_lecciones: con los resúmenes enteros se descuenta de resumen_niveles
+        Paso('resumen_estudiante_leccion', resumen, resumen.id_estudiante == id_estudiante,
+             descontar=descontar_resumenes, devolver=(resumen.id_estudiante, resumen.intentos, resumen.suma_puntuacion)),
+        Paso('progreso_estudiantes', ProgresoEstudiante, ProgresoEstudiante.id_estudiante == id_estudiante),
+        Paso('repasos', Repaso, Repaso.id_estudiante == id_estudiante),
+        Paso('estudiantes', Estudiante, Estudiante.id_estudiante == id_estudiante),
+    ]
+
+def plan_estudiante(id_estudiante):
+    return None, _pasos_estudiante(id_estudiante)
+
+def plan_usuario(id_usuario):
+    # Con su perfil de profesor o de estudiante (el ORM los borraría en cascada objeto a objeto)
+    pasos = []
+    id_profesor = db.session.scalar(db.select(Profesor.id_profesor).where(Profesor.id_usuario == id_usuario))
+    if id_profesor is not None:
+        pasos += plan_profesor(id_profesor)[1]
+    id_estudiante = db.session.scalar(db.select(Estudiante.id_estudiante).where(Estudiante.id_usuario == id_usuario))
+    if id_estudiante is not None:
+        pasos += _pasos_estudiante(id_estudiante)
+    # Sus sesiones abiertas dejan de valer en cuanto desaparece la fila
+    return None, pasos + [Paso('usuarios', Usuario, Usuario.id_usuario == id_usuario,
+                               despues=lambda: sesiones.revocar_usuario(id_usuario))]
+
+def plan_leccion(id_leccion):
+    return None, _pasos_lecciones(db.select(Leccion.id_leccion).where(Leccion.id_leccion == id_leccion))
+
+def plan_ejercicio(id_ejercicio):
+    progreso = ProgresoEstudiante
+    return None, [
+        Paso('progreso_estudiantes', progreso, progreso.id_ejercicio == id_ejercicio, descontar=descontar_intentos,
+             devolver=(progreso.id_estudiante, progreso.id_ejercicio, progreso.puntuacion)),
+        Paso('repasos', Repaso, Repaso.id_ejercicio == id_ejercicio),
+        Paso('opciones_ejercicio', OpcionEjercicio, OpcionEjercicio.id_ejercicio == id_ejercicio),
+        Paso('ejercicios', Ejercicio, Ejercicio.id_ejercicio == id_ejercicio),
+    ]
+
+def plan_nivel(id_nivel):
+    # Los estudiantes tienen que tener nivel: no se borran con él, hay que cambiarlos de nivel antes
+    estudiantes = db.session.scalar(db.select(func.count()).where(Estudiante.id_nivel == id_nivel))
+    impedimento = (f'El nivel tiene {estudiantes} estudiante(s): cámbialos de nivel antes de eliminarlo.'
+                   if estudiantes else None)
+    return impedimento, [
+        # updated_at cambia porque el detalle de la lección (ETag y caché de fragmentos) muestra el nivel
+        Paso('lecciones.id_nivel', Leccion, Leccion.id_nivel == id_nivel,
+             valores={'id_nivel': None, 'updated_at': datetime.datetime.now()}),
+        Paso('profesores.id_nivel', Profesor, Profesor.id_nivel == id_nivel, valores={'id_nivel': None}),
+        Paso('resumen_niveles', ResumenNivel, ResumenNivel.id_nivel == id_nivel),
+        Paso('clasificacion_puntos', PuntosClasificacion,
+             (PuntosClasificacion.ambito == 'nivel') & (PuntosClasificacion.id_ambito == id_nivel)),
+        Paso('clasificacion_conteos', ConteoClasificacion,
+             (ConteoClasificacion.ambito == 'nivel') & (ConteoClasificacion.id_ambito == id_nivel)),
+        Paso('niveles', Nivel, Nivel.id_nivel == id_nivel),
+    ]
+
+RESUMENES = (ResumenEstudianteLeccion.__tablename__, ResumenNivel.__tablename__)
+
+PLANES = {
+    'usuario': plan_usuario,
+    'estudiante': plan_estudiante,
+    'profesor': plan_profesor,
+    'leccion': plan_leccion,
+    'ejercicio': plan_ejercicio,
+    'nivel': plan_nivel,
+}
+
+
+# --- Ejecución ---
+
+def borrar(entidad, id_entidad, simular=False, tamano_lote=5000):
+    """
+    Borra la entidad (una clave de PLANES: 'usuario', 'profesor', 'leccion'...) con todo lo que depende de
+    ella y devuelve un InformeBorrado. Con simular=True solo cuenta las filas afectadas. Si hay
+    impedimento (p. ej. un nivel con estudiantes) no borra nada.
+    """
+    impedimento, pasos = PLANES[entidad](id_entidad)
+    informe = InformeBorrado(simular)
+    informe.impedimento = impedimento
+    if simular or impedimento:
+        for paso in pasos:
+            informe.filas[paso.etiqueta] = db.session.scalar(db.select(func.count()).select_from(paso.modelo)
+                                                             .where(paso.condicion))
+        return informe
+
+    for paso in pasos:
+        informe.filas[paso.etiqueta] = 0
+        clave = paso.modelo.__mapper__.primary_key
+        lote = db.select(*clave).where(paso.condicion).limit(tamano_lote)
+        en_lote = clave[0].in_(lote) if len(clave) == 1 else tuple_(*clave).in_(lote)
+        if paso.valores is None:
+            sentencia = db.delete(paso.modelo).where(en_lote)
+        else:
+            sentencia = db.update(paso.modelo).where(en_lote).values(**paso.valores)
+        if paso.descontar:
+            sentencia = sentencia.returning(*paso.devolver)
+        sentencia = sentencia.execution_options(synchronize_session=False)
+
+        while True:
+            resultado = db.session.execute(sentencia)
+            if paso.descontar:
+                filas = [tuple(fila) for fila in resultado]
+                if filas:
+                    paso.descontar(filas)
+                afectadas = len(filas)
+            else:
+                afectadas = resultado.rowcount
+            db.session.commit()
+            if not afectadas:
+                break
+            # Las sentencias sin objetos del ORM no pasan por los eventos de modelos.py
+            cache_referencia.invalidar(paso.modelo.__tablename__, *(RESUMENES if paso.descontar else ()))
+            if paso.despues:
+                paso.despues()
+            informe.filas[paso.etiqueta] += afectadas
+    return informe
+
+
+@tareas.tarea('borrar')
+def borrar_en_segundo_plano(entidad, id_entidad):
+    """
+    Tarea de la cola: borrar() con BORRADO_LOTE. Devuelve las filas por paso. Si se interrumpe,
+    el reintento continúa por donde quedó.
+    """
+    informe = borrar(entidad, id_entidad, tamano_lote=current_app.config['BORRADO_LOTE'])
+    if informe.impedimento: # p. ej. alguien ha puesto estudiantes en el nivel desde que se encoló
+        raise ErrorDefinitivo(informe.impedimento)
+    return informe.filas
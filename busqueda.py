@@ -0,0 +1,179 @@
+# busqueda.py
+import re
+from collections import namedtuple
+
+from markupsafe import Markup, escape
+from sqlalchemy import event, text
+
+from database import db
+
+# Resultado de una búsqueda; 'fragmento' es HTML seguro con los términos encontrados en <mark>
+Resultado = namedtuple('Resultado', 'tipo id titulo fragmento')
+
+
+class IndiceTexto:
+    """
+    Índice de texto completo sobre columnas de una tabla.
+
+    En SQLite es una tabla virtual FTS5 de contenido externo (no duplica el texto) que
+    mantienen al día triggers sobre la tabla original, así que también ve los INSERT de
+    Core del importador. El tokenizador unicode61 sin diacríticos sirve para español e
+    inglés ('leccion' encuentra 'lección'). En PostgreSQL se usa un índice GIN sobre
+    to_tsvector(), que no necesita triggers.
+    """
+
+    def __init__(self, tipo, tabla, clave, columnas, pesos):
+        self.tipo = tipo
+        self.tabla = tabla
+        self.clave = clave
+        self.columnas = columnas
+        self.pesos = pesos # Uno por columna: en el ranking pesa más una coincidencia en el título
+        self.nombre = f'busqueda_{tabla}'
+
+    # --- Creación ---
+
+    def sentencias_sqlite(self):
+        columnas = ', '.join(self.columnas)
+        nuevas = ', '.join(f'new.{columna}' for columna in self.columnas)
+        viejas = ', '.join(f'old.{columna}' for columna in self.columnas)
+        borrar = (f"INSERT INTO {self.nombre}({self.nombre}, rowid, {columnas}) "
+                  f"VALUES ('delete', old.{self.clave}, {viejas});")
+        insertar = f'INSERT INTO {self.nombre}(rowid, {columnas}) VALUES (new.{self.clave}, {nuevas});'
+        return [
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {self.nombre} USING fts5({columnas}, content='{self.tabla}', "
+            f"content_rowid='{self.clave}', tokenize='unicode61 remove_diacritics 2', prefix='2 3')",
+            f'CREATE TRIGGER IF NOT EXISTS {self.nombre}_ai AFTER INSERT ON {self.tabla} BEGIN {insertar} END',
+            f'CREATE TRIGGER IF NOT EXISTS {self.nombre}_ad AFTER DELETE ON {self.tabla} BEGIN {borrar} END',
+            f'CREATE TRIGGER IF NOT EXISTS {self.nombre}_au AFTER UPDATE OF {columnas} ON {self.tabla} '
+            f'BEGIN {borrar} {insertar} END',
+        ]
+
+    def _documento_pg(self, configuracion):
+        texto = " || ' ' || ".join(f"coalesce({columna}, '')" for columna in self.columnas)
+        return f"to_tsvector('{configuracion}'::regconfig, {texto})"
+
+    def sentencias_postgresql(self, configuracion):
+        return [f'CREATE INDEX IF NOT EXISTS ix_{self.nombre} ON {self.tabla} '
+                f'USING GIN ({self._documento_pg(configuracion)})']
+
+    def crear(self, conexion, configuracion):
+        """Crea el índice si no existe; en SQLite indexa además las filas que ya hubiera."""
+        if conexion.dialect.name == 'sqlite':
+            nuevo = conexion.exec_driver_sql(
+                "SELECT 1 FROM sqlite_master WHERE name = ?", (self.nombre,)).first() is None
+            for sentencia in self.sentencias_sqlite():
+                conexion.exec_driver_sql(sentencia)
+            if nuevo:
+                self.reconstruir(conexion)
+        elif conexion.dialect.name == 'postgresql':
+            for sentencia in self.sentencias_postgresql(configuracion):
+                conexion.exec_driver_sql(sentencia)
+
+    def borrar(self, conexion):
+        # En PostgreSQL el índice GIN desaparece con la tabla
+        if conexion.dialect.name == 'sqlite':
+            conexion.exec_driver_sql(f'DROP TABLE IF EXISTS {self.nombre}')
+
+    def reconstruir(self, conexion):
+        """Vuelve a indexar todas las filas (tras crear el índice sobre datos ya existentes)."""
+        if conexion.dialect.name == 'sqlite':
+            conexion.exec_driver_sql(f"INSERT INTO {self.nombre}({self.nombre}) VALUES ('rebuild')")
+        elif conexion.dialect.name == 'postgresql':
+            conexion.exec_driver_sql(f'REINDEX INDEX ix_{self.nombre}')
+
+    # --- Consulta ---
+
+    def buscar(self, conexion, terminos, limite, candidatos, configuracion):
+        titulo = self.columnas[0]
+        if conexion.dialect.name == 'postgresql':
+            consulta = " & ".join(f"{termino}:*" if prefijo else termino for termino, prefijo in terminos)
+            documento = self._documento_pg(configuracion)
+            pesado = ' || '.join(
+                f"setweight(to_tsvector('{configuracion}'::regconfig, coalesce({columna}, '')), '{letra}')"
+                for columna, letra in zip(self.columnas, 'ABCD'))
+            sql = (f"SELECT {self.clave}, {titulo}, ts_headline('{configuracion}'::regconfig, "
+                   f"coalesce({self.columnas[-1]}, ''), q, 'StartSel=\x02, StopSel=\x03, MaxWords=20, MinWords=8') "
+                   f"FROM {self.tabla}, to_tsquery('{configuracion}'::regconfig, :consulta) AS q "
+                   f"WHERE {documento} @@ q ORDER BY ts_rank({pesado}, q) DESC LIMIT :limite")
+        else:
+            consulta = ' '.join('"{}"{}'.format(termino, '*' if prefijo else '') for termino, prefijo in terminos)
+            pesos = ', '.join(str(peso) for peso in self.pesos)
+            # bm25() (menor = más relevante) cuesta ~1 µs por coincidencia: un término que aparece en
+            # millones de filas se ordena solo entre las 'candidatos' coincidencias más recientes, que
+            # FTS5 acota por rowid. snippet() es de la última columna (contenido o respuesta).
+            sql = (f"SELECT t.{self.clave}, t.{titulo}, "
+                   f"snippet({self.nombre}, {len(self.columnas) - 1}, char(2), char(3), '…', 16) "
+                   f"FROM {self.nombre} JOIN {self.tabla} AS t ON t.{self.clave} = {self.nombre}.rowid "
+                   f"WHERE {self.nombre} MATCH :consulta AND {self.nombre}.rowid >= ("
+                   f"SELECT coalesce(min(rowid), 0) FROM (SELECT rowid FROM {self.nombre} "
+                   f"WHERE {self.nombre} MATCH :consulta ORDER BY rowid DESC LIMIT :candidatos)) "
+                   f"ORDER BY bm25({self.nombre}, {pesos}) LIMIT :limite")
+        filas = conexion.execute(text(sql), {'consulta': consulta, 'limite': limite, 'candidatos': candidatos})
+        return [Resultado(self.tipo, id_, titulo, _resaltar(fragmento)) for id_, titulo, fragmento in filas]
+
+
+INDICES = (
+    IndiceTexto('leccion', 'lecciones', 'id_leccion', ('titulo', 'contenido'), (10.0, 1.0)),
+    IndiceTexto('ejercicio', 'ejercicios', 'id_ejercicio', ('pregunta', 'respuesta'), (5.0, 1.0)),
+)
+
+_TERMINO = re.compile(r'\w+\*?')
+
+
+def _resaltar(fragmento):
+    """Escapa el fragmento y cambia las marcas \\x02...\\x03 por <mark>...</mark>."""
+    if not fragmento:
+        return Markup('')
+    return Markup(str(escape(fragmento)).replace('\x02', '<mark>').replace('\x03', '</mark>'))
+
+
+def terminos_de(texto):
+    """
+    Palabras de la búsqueda como (término, es_prefijo). Se ignoran los demás operadores del
+    usuario; 'gram*' busca por prefijo. Todas las palabras deben aparecer (AND).
+    """
+    return [(palabra.rstrip('*').lower(), palabra.endswith('*'))
+            for palabra in _TERMINO.findall(texto or '') if palabra.rstrip('*')]
+
+
+class Busqueda:
+    """Búsqueda de texto completo en lecciones y ejercicios, con el índice creado junto a las tablas."""
+
+    def __init__(self):
+        self.configuracion = 'simple'
+        self.candidatos = 5000
+
+    def init_app(self, app):
+        """Lee BUSQUEDA_CONFIGURACION_PG (configuración de texto de PostgreSQL) y BUSQUEDA_MAX_CANDIDATOS."""
+        self.configuracion = app.config.get('BUSQUEDA_CONFIGURACION_PG', self.configuracion)
+        self.candidatos = app.config.get('BUSQUEDA_MAX_CANDIDATOS', self.candidatos)
+        # db.create_all() crea también los índices de búsqueda y db.drop_all() los borra
+        if not event.contains(db.metadata, 'after_create', self._al_crear_tablas):
+            event.listen(db.metadata, 'after_create', self._al_crear_tablas)
+            event.listen(db.metadata, 'before_drop', self._al_borrar_tablas)
+
+    def _al_crear_tablas(self, metadata, conexion, **kwargs):
+        self.crear_indices(conexion)
+
+    def _al_borrar_tablas(self, metadata, conexion, **kwargs):
+        for indice in INDICES:
+            indice.borrar(conexion)
+
+    def crear_indices(self, conexion, reconstruir=False):
+        """Crea los índices que falten; con reconstruir=True vuelve a indexar todas las filas."""
+        for indice in INDICES:
+            indice.crear(conexion, self.configuracion)
+            if reconstruir:
+                indice.reconstruir(conexion)
+
+    def buscar(self, texto, tipos=None, limite=20):
+        """Diccionario tipo ('leccion', 'ejercicio') -> lista de Resultado, de más a menos relevante."""
+        terminos = terminos_de(texto)
+        if not terminos:
+            return {}
+        conexion = db.session.connection()
+        return {indice.tipo: indice.buscar(conexion, terminos, limite, self.candidatos, self.configuracion)
+                for indice in INDICES if tipos is None or indice.tipo in tipos}
+
+
+busqueda = Busqueda()
@@ -0,0 +1,144 @@
+# cache.py
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+class CacheReferencia:
+    """
+    Caché en memoria (TTL + LRU) para datos de referencia que casi no cambian,
+    como las listas de opciones de los <select> de los formularios.
+
+    Cada entrada se asocia a las tablas de las que depende; al confirmar cambios en
+    una de esas tablas se invalida. Las versiones de cada tabla se guardan en un SQLite
+    local (CACHE_REFERENCIA_ARCHIVO, por defecto instance/cache.db) compartido por los
+    workers de gunicorn, para que la invalidación de un worker se vea en todos los demás.
+    Con CACHE_REFERENCIA_ARCHIVO='' las versiones son del proceso: solo vale con uno, y
+    usar la caché en un proceso hijo (fork) lanza RuntimeError.
+    """
+
+    # Versiones por tabla del proceso, compartidas por todas las cachés: invalidar una tabla
+    # en cualquiera de ellas deja obsoletas las entradas que dependen de ella en todas
+    _versiones_locales = {}
+    _lock_versiones = threading.Lock()
+
+    def __init__(self, ttl=300, max_entradas=256, archivo=None):
+        self.ttl = ttl
+        self.max_entradas = max_entradas
+        self.archivo = archivo
+        self._entradas = OrderedDict() # clave -> (caduca_en, versiones, valor)
+        self._lock = threading.Lock()
+        self._local = threading.local() # Una conexión SQLite por hilo
+        self._pid = os.getpid()
+        self._pid_local = None # Proceso al que pertenecen las versiones locales (sin archivo)
+
+    def init_app(self, app, prefijo='CACHE_REFERENCIA'):
+        """Lee la configuración de la aplicación Flask (<prefijo>_TTL y <prefijo>_MAX)."""
+        self.ttl = app.config.get(f'{prefijo}_TTL', self.ttl)
+        self.max_entradas = app.config.get(f'{prefijo}_MAX', self.max_entradas)
+        # El almacén de versiones compartido es el mismo para todas las cachés
+        archivo = app.config.get('CACHE_REFERENCIA_ARCHIVO')
+        if archivo is None:
+            archivo = os.path.join(app.instance_path, 'cache.db')
+            os.makedirs(app.instance_path, exist_ok=True)
+        self.archivo = archivo
+        self._pid_local = None if archivo else os.getpid()
+        if self.archivo:
+            with self._conexion() as conexion:
+                conexion.execute('CREATE TABLE IF NOT EXISTS versiones (tabla TEXT PRIMARY KEY, version INTEGER NOT NULL)')
+        self.limpiar()
+
+    # --- Versiones por tabla (locales o compartidas entre procesos) ---
+
+    def _conexion(self):
+        # Tras un fork (gunicorn --preload) no se usan las conexiones del proceso padre
+        if self._pid != os.getpid():
+            self._local, self._pid = threading.local(), os.getpid()
+        conexion = getattr(self._local, 'conexion', None)
+        if conexion is None:
+            conexion = sqlite3.connect(self.archivo, timeout=5, isolation_level=None)
+            conexion.execute('PRAGMA journal_mode=WAL')
+            self._local.conexion = conexion
+        return conexion
+
+    def versiones(self, tablas):
+        """Versión actual de cada tabla: cambia cada vez que se invalida la tabla."""
+        return self._versiones(tuple(tablas))
+
+    @property
+    def compartida(self):
+        """True si las versiones se comparten entre procesos (CACHE_REFERENCIA_ARCHIVO)."""
+        return bool(self.archivo)
+
+    def _versiones(self, tablas):
+        if not self.archivo:
+            if self._pid_local not in (None, os.getpid()):
+                # Un worker no vería las invalidaciones de los demás: respuestas obsoletas sin aviso
+                raise RuntimeError('La caché se usa en varios procesos con CACHE_REFERENCIA_ARCHIVO vacío; '
+                                   'configura un archivo compartido.')
+            return tuple(self._versiones_locales.get(tabla, 0) for tabla in tablas)
+        marcadores = ','.join('?' * len(tablas))
+        filas = dict(self._conexion().execute(
+            f'SELECT tabla, version FROM versiones WHERE tabla IN ({marcadores})', tablas))
+        return tuple(filas.get(tabla, 0) for tabla in tablas)
+
+    # --- API pública ---
+
+    def obtener(self, clave, cargar, tablas):
+        """Devuelve el valor cacheado de 'clave' o lo calcula con cargar() si no está o caducó."""
+        return self.obtener_varios([clave], lambda faltan: {clave: cargar()}, tablas)[clave]
+
+    def obtener_varios(self, claves, cargar, tablas):
+        """
+        Como obtener() para varias claves a la vez: cargar(claves_que_faltan) recibe solo las
+        que no están en caché y devuelve un diccionario clave -> valor (p. ej. con un único IN).
+        """
+        tablas = tuple(tablas)
+        versiones = self._versiones(tablas)
+        ahora = time.monotonic()
+        encontrados, faltan = {}, []
+        with self._lock:
+            for clave in claves:
+                entrada = self._entradas.get(clave)
+                if entrada and entrada[0] > ahora and entrada[1] == versiones:
+                    self._entradas.move_to_end(clave)
+                    encontrados[clave] = entrada[2]
+                else:
+                    faltan.append(clave)
+        if not faltan:
+            return encontrados
+
+        cargados = cargar(faltan)
+        with self._lock:
+            for clave, valor in cargados.items():
+                self._entradas[clave] = (ahora + self.ttl, versiones, valor)
+                self._entradas.move_to_end(clave)
+            while len(self._entradas) > self.max_entradas:
+                self._entradas.popitem(last=False) # Expulsa la menos usada recientemente
+        encontrados.update(cargados)
+        return encontrados
+
+    def invalidar(self, *tablas):
+        """Marca como obsoletas todas las entradas que dependen de alguna de estas tablas."""
+        if not tablas:
+            return
+        with self._lock_versiones:
+            for tabla in tablas:
+                self._versiones_locales[tabla] = self._versiones_locales.get(tabla, 0) + 1
+        if self.archivo:
+            self._conexion().executemany(
+                'INSERT INTO versiones (tabla, version) VALUES (?, 1) '
+                'ON CONFLICT(tabla) DO UPDATE SET version = version + 1',
+                [(tabla,) for tabla in tablas])
+
+    def limpiar(self):
+        """Vacía la caché del proceso actual."""
+        with self._lock:
+            self._entradas.clear()
+
+
+cache_referencia = CacheReferencia()
+cache_ejercicios = CacheReferencia(ttl=3600, max_entradas=10000) # Ejercicios compilados para calificar
+cache_fragmentos = CacheReferencia(ttl=3600, max_entradas=2000) # HTML de las páginas de detalle
@@ -0,0 +1,50 @@
+# calificador.py
+import re
+import unicodedata
+from collections import namedtuple
+
+PUNTUACION_MAXIMA = 100
+
+# Ejercicio ya preparado para calificar: respuesta normalizada y, en multiple_choice,
+# el conjunto de opciones válidas. Se construye una vez y se guarda en caché.
+EjercicioCompilado = namedtuple('EjercicioCompilado', 'id_ejercicio id_leccion tipo respuesta opciones')
+
+_ESPACIOS = re.compile(r'\s+')
+_PUNTUACION_EXTREMOS = '.,;:!?¡¿"\''
+
+
+def normalizar(texto):
+    """Minúsculas, sin tildes, sin signos al principio/final y con los espacios colapsados."""
+    if texto is None:
+        return ''
+    texto = unicodedata.normalize('NFKD', str(texto).casefold())
+    texto = ''.join(caracter for caracter in texto if not unicodedata.combining(caracter))
+    return _ESPACIOS.sub(' ', texto).strip().strip(_PUNTUACION_EXTREMOS).strip()
+
+
+def separar_opciones(texto):
+    """
+    Opciones de un texto: una por línea. Un texto de una sola línea se trata como el formato
+    antiguo, separado por comas (columna ejercicios.opciones e importaciones anteriores).
+    """
+    if not texto:
+        return []
+    partes = texto.splitlines() if '\n' in texto.strip() else texto.split(',')
+    return [parte.strip() for parte in partes if parte.strip()]
+
+
+def compilar(id_ejercicio, id_leccion, tipo, opciones, respuesta):
+    """Prepara un ejercicio (tipo, textos de sus opciones en orden y respuesta) para calificarlo."""
+    opciones_normalizadas = None
+    if tipo == 'multiple_choice' and opciones:
+        opciones_normalizadas = frozenset(filter(None, (normalizar(opcion) for opcion in opciones)))
+    return EjercicioCompilado(id_ejercicio, id_leccion, tipo, normalizar(respuesta), opciones_normalizadas)
+
+
+def calificar(compilado, respuesta_estudiante):
+    """Devuelve la puntuación (0 o PUNTUACION_MAXIMA) de una respuesta para un ejercicio compilado."""
+    respuesta = normalizar(respuesta_estudiante)
+    # En opción múltiple, una respuesta que no es ninguna de las opciones nunca es correcta
+    if compilado.opciones is not None and respuesta not in compilado.opciones:
+        return 0
+    return PUNTUACION_MAXIMA if respuesta == compilado.respuesta else 0
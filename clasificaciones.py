@@ -0,0 +1,282 @@
+# clasificaciones.py
+from collections import Counter, namedtuple
+
+from sqlalchemy import and_, bindparam, func, or_, text
+
+from database import db, upsert_sumando
+from migraciones import Migracion, migraciones
+from modelos import Usuario, Estudiante, Leccion, ProgresoEstudiante, PuntosClasificacion, ConteoClasificacion
+from tareas import tareas, registro as registro_tareas
+
+# --- Clasificaciones por nivel y por lección ---
+# Cada estudiante tiene en clasificacion_puntos sus puntos acumulados (suma de puntuaciones) en
+# cada lección y en cada nivel (el de la lección del ejercicio). Los primeros de una
+# clasificación son un tramo del índice ix_clasificacion_orden. Para el puesto hay que contar
+# cuántos tienen más puntos, y eso no lo resuelve un índice sin recorrer todos los de delante:
+# clasificacion_conteos guarda, por clasificación, cuántos estudiantes hay en cada tramo de
+# puntos de cada escala (puntos >> 4, >> 8, ...; 16 tramos hijos por tramo). Los que tienen
+# más puntos son, en cada escala, los de los tramos hermanos mayores: como mucho ESCALAS
+# lecturas de la clave primaria, sea cual sea el tamaño de la clasificación.
+
+AMBITOS = ('nivel', 'leccion')
+BITS = 4 # 16 tramos por escala
+ESCALAS = 8 # Hasta 16**8 puntos (más que un Integer)
+
+Puesto = namedtuple('Puesto', 'puesto id_estudiante nombre puntos')
+
+
+def _mover(conteos, ambito, id_ambito, antes, despues):
+    """Ajusta en 'conteos' los tramos de un estudiante que pasa de 'antes' a 'despues' puntos."""
+    antes, despues = max(antes, 0), max(despues, 0)
+    for escala in range(ESCALAS):
+        tramo_antes, tramo_despues = antes >> (BITS * escala), despues >> (BITS * escala)
+        if tramo_antes == tramo_despues: # En las escalas de arriba tampoco cambia
+            break
+        if tramo_antes:
+            conteos[(ambito, id_ambito, escala, tramo_antes)] -= 1
+        if tramo_despues:
+            conteos[(ambito, id_ambito, escala, tramo_despues)] += 1
+
+def _guardar_conteos(conteos, conexion=None):
+    # Ordenados, para que dos transacciones no se bloqueen cruzadas en PostgreSQL
+    filas = [{'ambito': ambito, 'id_ambito': id_ambito, 'escala': escala, 'tramo': tramo, 'estudiantes': cambio}
+             for (ambito, id_ambito, escala, tramo), cambio in sorted(conteos.items()) if cambio]
+    if filas:
+        upsert_sumando(ConteoClasificacion, filas, ('estudiantes',), conexion)
+    # Los tramos que se quedan vacíos se borran, para que la tabla no crezca con ceros
+    vaciados = [{'b_' + clave: valor for clave, valor in fila.items() if clave != 'estudiantes'}
+                for fila in filas if fila['estudiantes'] < 0]
+    if vaciados:
+        tabla = ConteoClasificacion.__table__
+        (conexion or db.session).execute(tabla.delete().where(
+            tabla.c.ambito == bindparam('b_ambito'), tabla.c.id_ambito == bindparam('b_id_ambito'),
+            tabla.c.escala == bindparam('b_escala'), tabla.c.tramo == bindparam('b_tramo'),
+            tabla.c.estudiantes <= 0), vaciados)
+
+
+# --- Actualización incremental (en la transacción que registra o borra intentos) ---
+
+def sumar(puntos, conexion=None):
+    """
+    Suma {(ambito, id_ambito, id_estudiante): puntos} a las clasificaciones con INSERT ... ON
+    CONFLICT DO UPDATE ... RETURNING, que da los puntos nuevos sin leer antes la fila (los
+    anteriores son los nuevos menos lo sumado), y ajusta los conteos de tramos. Sumas de
+    transacciones distintas se componen en cualquier orden.
+    """
+    filas = [{'ambito': ambito, 'id_ambito': id_ambito, 'id_estudiante': id_estudiante, 'puntos': suma}
+             for (ambito, id_ambito, id_estudiante), suma in sorted(puntos.items())]
+    conteos = Counter()
+    for ambito, id_ambito, id_estudiante, total in upsert_sumando(
+            PuntosClasificacion, filas, ('puntos',), conexion, devolver=('ambito', 'id_ambito', 'id_estudiante', 'puntos')):
+        _mover(conteos, ambito, id_ambito, total - puntos[(ambito, id_ambito, id_estudiante)], total)
+    _guardar_conteos(conteos, conexion)
+
+def por_leccion(puntos, ambitos=AMBITOS):
+    """{(id_estudiante, id_leccion): puntos} -> lo que sumar() suma en las clasificaciones de esas lecciones y de sus niveles."""
+    niveles = dict(db.session.execute(db.select(Leccion.id_leccion, Leccion.id_nivel)
+                                      .where(Leccion.id_leccion.in_({id_leccion for _, id_leccion in puntos}))).all())
+    sumas = Counter()
+    for (id_estudiante, id_leccion), suma in puntos.items():
+        if 'leccion' in ambitos:
+            sumas[('leccion', id_leccion, id_estudiante)] += suma
+        if 'nivel' in ambitos and niveles.get(id_leccion) is not None:
+            sumas[('nivel', niveles[id_leccion], id_estudiante)] += suma
+    return sumas
+
+def actualizar_clasificaciones(id_estudiante, intentos, filas):
+    """Suma las filas de progreso recién insertadas (registrar_intentos) a las clasificaciones del estudiante."""
+    puntos = Counter()
+    for (compilado, _), fila in zip(intentos, filas):
+        puntos[(id_estudiante, compilado.id_leccion)] += fila['puntuacion'] or 0
+    sumar(por_leccion(puntos))
+
+def cambiar_nivel_leccion(id_leccion, anterior, nuevo):
+    """Pasa los puntos de la lección de la clasificación del nivel 'anterior' a la de 'nuevo' (None = sin nivel)."""
+    puntos = db.session.execute(db.select(PuntosClasificacion.id_estudiante, PuntosClasificacion.puntos).where(
+        PuntosClasificacion.ambito == 'leccion', PuntosClasificacion.id_ambito == id_leccion)).all()
+    sumas = Counter()
+    for id_estudiante, suma in puntos:
+        if anterior is not None:
+            sumas[('nivel', anterior, id_estudiante)] -= suma
+        if nuevo is not None:
+            sumas[('nivel', nuevo, id_estudiante)] += suma
+    sumar(sumas)
+
+def cambiar_leccion_ejercicio(id_ejercicio, anterior, nueva):
+    """
+    Pasa los puntos del ejercicio de la clasificación de la lección 'anterior' a la de 'nueva' (y
+    de nivel, si las lecciones son de niveles distintos), con sus conteos de tramos.
+    """
+    progreso = ProgresoEstudiante
+    puntos = Counter()
+    for id_estudiante, suma in db.session.execute(
+            db.select(progreso.id_estudiante, func.coalesce(func.sum(progreso.puntuacion), 0))
+            .where(progreso.id_ejercicio == id_ejercicio).group_by(progreso.id_estudiante)):
+        puntos[(id_estudiante, anterior)] -= suma
+        puntos[(id_estudiante, nueva)] += suma
+    # En el nivel se anulan si las dos lecciones son del mismo
+    sumar({clave: suma for clave, suma in por_leccion(puntos).items() if suma})
+
+def retirar(filas):
+    """Quita de los conteos las filas (ambito, id_ambito, puntos) borradas de clasificacion_puntos (p. ej. al borrar un estudiante)."""
+    conteos = Counter()
+    for ambito, id_ambito, puntos in filas:
+        _mover(conteos, ambito, id_ambito, puntos, 0)
+    _guardar_conteos(conteos)
+
+
+# --- Consultas ---
+
+def _por_delante(ambito, id_ambito, puntos):
+    """Estudiantes de la clasificación con más de 'puntos': un tramo de la clave primaria de conteos por escala."""
+    conteo = ConteoClasificacion
+    tramos = []
+    for escala in range(ESCALAS):
+        tramo = puntos >> (BITS * escala)
+        ultimo = tramo | ((1 << BITS) - 1) # Último hermano del tramo
+        if tramo < ultimo:
+            tramos.append(and_(conteo.ambito == ambito, conteo.id_ambito == id_ambito, conteo.escala == escala,
+                               conteo.tramo.between(tramo + 1, ultimo)))
+    return db.session.scalar(db.select(func.coalesce(func.sum(conteo.estudiantes), 0)).where(or_(*tramos)))
+
+def _empatados(ambito, id_ambito, valores):
+    """{puntos: estudiantes con exactamente esos puntos} (los tramos de la escala 0), para valores > 0."""
+    conteo = ConteoClasificacion
+    return dict(db.session.execute(db.select(conteo.tramo, conteo.estudiantes).where(
+        conteo.ambito == ambito, conteo.id_ambito == id_ambito, conteo.escala == 0,
+        conteo.tramo.in_([valor for valor in valores if valor > 0]))).all())
+
+def _puestos(ambito, id_ambito, filas, primero):
+    """
+    Puestos de filas (id_estudiante, puntos) consecutivas de la clasificación, sabiendo el puesto
+    de la primera. Los empatados comparten puesto y el siguiente salta (1, 2, 2, 4).
+    """
+    if not filas:
+        return []
+    empatados = _empatados(ambito, id_ambito, {puntos for _, puntos in filas})
+    nombres = dict(db.session.execute(
+        db.select(Estudiante.id_estudiante, Usuario.nombre).join(Usuario, Usuario.id_usuario == Estudiante.id_usuario)
+        .where(Estudiante.id_estudiante.in_([id_estudiante for id_estudiante, _ in filas]))).all())
+    puestos, puesto, anteriores = [], primero, None
+    for id_estudiante, puntos in filas:
+        if anteriores is not None and puntos != anteriores:
+            puesto += empatados.get(anteriores, 0)
+        puestos.append(Puesto(puesto, id_estudiante, nombres.get(id_estudiante), puntos))
+        anteriores = puntos
+    return puestos
+
+def _filas(ambito, id_ambito, condiciones, orden, cantidad):
+    puntos = PuntosClasificacion
+    if cantidad <= 0:
+        return []
+    return db.session.execute(
+        db.select(puntos.id_estudiante, puntos.puntos)
+        .where(puntos.ambito == ambito, puntos.id_ambito == id_ambito, *condiciones)
+        .order_by(*orden).limit(cantidad)).all()
+
+def primeros(ambito, id_ambito, cantidad):
+    """Los 'cantidad' primeros de la clasificación, como Puesto: un tramo de ix_clasificacion_orden."""
+    puntos = PuntosClasificacion
+    filas = _filas(ambito, id_ambito, (), (puntos.puntos.desc(), puntos.id_estudiante), cantidad)
+    return _puestos(ambito, id_ambito, filas, 1)
+
+def alrededor(ambito, id_ambito, id_estudiante, vecinos):
+    """
+    El puesto del estudiante con 'vecinos' estudiantes por delante y por detrás, como lista de
+    Puesto en orden; vacía si el estudiante no tiene puntos en la clasificación.
+    """
+    puntos = PuntosClasificacion
+    suyos = db.session.scalar(db.select(puntos.puntos).where(
+        puntos.ambito == ambito, puntos.id_ambito == id_ambito, puntos.id_estudiante == id_estudiante))
+    if suyos is None:
+        return []
+    # Cada lado en dos tramos del índice: los empatados con él y, si faltan, los de más (o menos) puntos
+    delante = _filas(ambito, id_ambito, (puntos.puntos == suyos, puntos.id_estudiante < id_estudiante),
+                     (puntos.id_estudiante.desc(),), vecinos)
+    delante += _filas(ambito, id_ambito, (puntos.puntos > suyos,), (puntos.puntos, puntos.id_estudiante.desc()),
+                      vecinos - len(delante))
+    detras = _filas(ambito, id_ambito, (puntos.puntos == suyos, puntos.id_estudiante > id_estudiante),
+                    (puntos.id_estudiante,), vecinos)
+    detras += _filas(ambito, id_ambito, (puntos.puntos < suyos,), (puntos.puntos.desc(), puntos.id_estudiante),
+                     vecinos - len(detras))
+    filas = delante[::-1] + [(id_estudiante, suyos)] + detras
+    return _puestos(ambito, id_ambito, filas, _por_delante(ambito, id_ambito, filas[0][1]) + 1)
+
+
+# --- Reconstrucción desde progreso_estudiantes ---
+# Una pasada por tramos de estudiantes (los puntos) y otra por tramos de clasificaciones (los
+# conteos, desde los puntos). Los puntos se comparan con los guardados y solo se escribe la
+# diferencia, sumándola como registrar_intentos: un intento registrado mientras tanto se suma
+# igual, y si no hay nada que corregir el tramo no escribe.
+
+# Una sola sentencia, para que los intentos y los puntos guardados sean de la misma instantánea
+PUNTOS_DEL_TRAMO = text(
+    "SELECT 'progreso', p.id_estudiante, e.id_leccion, l.id_nivel, coalesce(sum(p.puntuacion), 0) "
+    'FROM progreso_estudiantes p JOIN ejercicios e ON e.id_ejercicio = p.id_ejercicio '
+    'JOIN lecciones l ON l.id_leccion = e.id_leccion '
+    'WHERE p.id_estudiante > :desde AND p.id_estudiante <= :hasta GROUP BY p.id_estudiante, e.id_leccion, l.id_nivel '
+    'UNION ALL SELECT ambito, id_estudiante, id_ambito, NULL, puntos FROM clasificacion_puntos '
+    'WHERE id_estudiante > :desde AND id_estudiante <= :hasta')
+
+def rellenar_puntos(conexion, desde, hasta):
+    calculados, guardados = Counter(), {}
+    for origen, id_estudiante, id_ambito, id_nivel, puntos in conexion.execute(PUNTOS_DEL_TRAMO, {'desde': desde, 'hasta': hasta}):
+        if origen != 'progreso':
+            guardados[(origen, id_ambito, id_estudiante)] = puntos
+            continue
+        calculados[('leccion', id_ambito, id_estudiante)] += puntos
+        if id_nivel is not None:
+            calculados[('nivel', id_nivel, id_estudiante)] += puntos
+    sumar({clave: puntos - guardados.get(clave, 0) for clave, puntos in calculados.items()
+           if guardados.get(clave) != puntos}, conexion)
+
+    # Las filas sin ningún intento detrás se borran (si nadie las ha cambiado desde la lectura)
+    tabla, conteos = PuntosClasificacion.__table__, Counter()
+    for (ambito, id_ambito, id_estudiante), puntos in guardados.items():
+        if (ambito, id_ambito, id_estudiante) not in calculados and conexion.execute(tabla.delete().where(
+                tabla.c.ambito == ambito, tabla.c.id_ambito == id_ambito, tabla.c.id_estudiante == id_estudiante,
+                tabla.c.puntos == puntos)).rowcount:
+            _mover(conteos, ambito, id_ambito, puntos, 0)
+    _guardar_conteos(conteos, conexion)
+    return len(calculados)
+
+def rellenar_conteos(conexion, desde, hasta, ambito):
+    # Se cuentan de nuevo desde cero: empieza borrando, así que lee los puntos con el bloqueo de
+    # escritura ya tomado y ninguna suma se cuela entre la lectura y la escritura
+    tabla, puntos = ConteoClasificacion.__table__, PuntosClasificacion.__table__
+    conexion.execute(tabla.delete().where(tabla.c.ambito == ambito, tabla.c.id_ambito > desde, tabla.c.id_ambito <= hasta))
+    conteos = Counter()
+    for id_ambito, total in conexion.execute(db.select(puntos.c.id_ambito, puntos.c.puntos).where(
+            puntos.c.ambito == ambito, puntos.c.id_ambito > desde, puntos.c.id_ambito <= hasta)):
+        _mover(conteos, ambito, id_ambito, 0, total)
+    if conteos:
+        conexion.execute(tabla.insert(), [{'ambito': ambito, 'id_ambito': id_ambito, 'escala': escala, 'tramo': tramo,
+                                           'estudiantes': estudiantes}
+                                          for (ambito, id_ambito, escala, tramo), estudiantes in conteos.items()])
+    return len(conteos)
+
+def rellenar(m):
+    """Rellena las dos tablas con los rellenos por tramos de la Migracion 'm' (revisión o recalcular())."""
+    # Tramos con unas m.lote filas leídas cada uno, como en revisiones/0006_resumenes.py
+    por_estudiante = m.contar('progreso_estudiantes') // max(m.contar('estudiantes'), 1)
+    m.rellenar('puntos', 'estudiantes', 'id_estudiante', rellenar_puntos, lote=max(m.lote // max(por_estudiante, 1), 1))
+    por_clasificacion = m.contar('clasificacion_puntos') // max(m.contar('lecciones'), 1)
+    m.rellenar('conteos_nivel', 'niveles', 'id_nivel', rellenar_conteos, lote=1, ambito='nivel')
+    m.rellenar('conteos_leccion', 'lecciones', 'id_leccion', rellenar_conteos,
+               lote=max(m.lote // max(por_clasificacion, 1), 1), ambito='leccion')
+
+def recalcular(motor, lote, pausa, informar):
+    """
+    Reconstruye las clasificaciones desde progreso_estudiantes sin bloquear las escrituras más
+    que un tramo. Si se interrumpe, la siguiente vez continúa (el avance queda en migraciones_rellenos).
+    """
+    m = Migracion(motor, 'recalcular-clasificaciones', lote, pausa, informar)
+    terminados = {nombre: terminado for nombre, _, _, terminado in migraciones.rellenos(motor)}
+    if terminados.get(f'{m.revision}:conteos_leccion'): # La anterior terminó: se empieza de nuevo
+        migraciones.olvidar_rellenos(motor, m.revision)
+    rellenar(m)
+
+@tareas.tarea('recalcular_clasificaciones')
+def recalcular_en_segundo_plano(lote=None, pausa=None):
+    """Tarea de la cola: recalcular() (por defecto, con el lote y la pausa de 'flask migrar')."""
+    recalcular(db.engine, lote or migraciones.lote, migraciones.pausa if pausa is None else pausa, registro_tareas.info)
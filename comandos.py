@@ -0,0 +1,285 @@
+# comandos.py
+import click
+from flask import current_app
+from flask.cli import AppGroup
+from sqlalchemy import event
+
+from database import db
+from cache import cache_referencia
+from busqueda import busqueda
+from sesiones import sesiones
+from migraciones import migraciones, descripcion
+from tareas import tareas
+from modelos import Usuario, Nivel
+import importador
+import borrados
+import clasificaciones
+import progreso
+
+# --- Comandos de consola (flask <comando>) ---
+# Se declaran en un AppGroup (que les da el contexto de aplicación) y create_app() los añade
+# uno a uno a app.cli, así que se usan sin prefijo: flask migrar, flask sembrar...
+comandos = AppGroup('comandos')
+
+# (nombre, email, rol, contraseña) de 'flask sembrar'
+USUARIOS_DE_PRUEBA = (
+    ('Admin General', 'admin@example.com', 'admin', 'admin123'),
+    ('Profesor Juan', 'juan@example.com', 'profesor', 'juan123'),
+    ('Estudiante Ana', 'ana@example.com', 'estudiante', 'ana123'),
+    ('Estudiante Pedro', 'pedro@example.com', 'estudiante', 'pedro123'),
+    ('Profesor Maria', 'maria@example.com', 'profesor', 'maria123'),
+)
+
+
+def init_app(app):
+    """Añade los comandos a 'flask' para la aplicación."""
+    for nombre, comando in comandos.commands.items():
+        app.cli.add_command(comando, nombre)
+
+
+@comandos.command('importar')
+@click.argument('entidad', type=click.Choice(sorted(importador.ENTIDADES)))
+@click.argument('archivo', type=click.Path(exists=True, dir_okay=False))
+@click.option('--lote', default=1000, show_default=True, help='Filas por transacción.')
+@click.option('--errores', 'archivo_errores', type=click.Path(dir_okay=False), help='Guarda el informe de errores en un CSV.')
+def importar_comando(entidad, archivo, lote, archivo_errores):
+    """Importa ENTIDAD (usuarios, estudiantes, ejercicios) desde ARCHIVO .csv, .json o .jsonl."""
+    with open(archivo, 'rb') as binario:
+        informe = importador.importar(importador.leer_filas(binario, archivo), entidad, tamano_lote=lote)
+
+    if archivo_errores:
+        with open(archivo_errores, 'w', newline='', encoding='utf-8') as salida:
+            informe.escribir_errores(salida)
+    else:
+        for numero, mensaje in informe.errores:
+            click.echo(f'Fila {numero}: {mensaje}')
+    click.echo(f'{informe.leidas} filas leídas, {informe.insertadas} insertadas, {len(informe.errores)} con errores.')
+
+
+# Las reconstrucciones completas van por detrás del trabajo que alguien espera (informes, borrados)
+PRIORIDAD_RECALCULAR = -10
+
+
+def encolar_recalculo(tipo, argumentos=None):
+    id_tarea, nueva = tareas.encolar(tipo, argumentos, prioridad=PRIORIDAD_RECALCULAR, clave=tipo)
+    click.echo(f'Tarea {id_tarea} encolada.' if nueva else f'Ya había una tarea {tipo} en la cola: {id_tarea}.')
+
+
+@comandos.command('recalcular-resumenes')
+@click.option('--en-segundo-plano', is_flag=True, help='Lo encola para \'flask trabajar\' en lugar de hacerlo ahora.')
+def recalcular_resumenes(en_segundo_plano):
+    """Reconstruye resumen_estudiante_leccion y resumen_niveles desde progreso_estudiantes."""
+    if en_segundo_plano:
+        return encolar_recalculo('recalcular_resumenes')
+    cuantos = progreso.recalcular_resumenes()
+    click.echo(f'{cuantos["resumen_estudiante_leccion"]} resúmenes por lección y '
+               f'{cuantos["resumen_niveles"]} por nivel recalculados.')
+
+
+@comandos.command('recalcular-clasificaciones')
+@click.option('--lote', type=int, help='Filas por transacción (por defecto, MIGRACIONES_LOTE).')
+@click.option('--pausa-ms', type=int, help='Espera entre transacciones (por defecto, MIGRACIONES_PAUSA_MS).')
+@click.option('--en-segundo-plano', is_flag=True, help='Lo encola para \'flask trabajar\' en lugar de hacerlo ahora.')
+def recalcular_clasificaciones(lote, pausa_ms, en_segundo_plano):
+    """Reconstruye las clasificaciones por nivel y por lección desde progreso_estudiantes, por tramos."""
+    pausa = None if pausa_ms is None else pausa_ms / 1000
+    if en_segundo_plano:
+        return encolar_recalculo('recalcular_clasificaciones', {'lote': lote, 'pausa': pausa})
+    try:
+        clasificaciones.recalcular(db.engine, lote or migraciones.lote,
+                                   migraciones.pausa if pausa is None else pausa, click.echo)
+    except KeyboardInterrupt:
+        raise click.ClickException('Interrumpido: \'flask recalcular-clasificaciones\' continúa por el último tramo.')
+    click.echo('Clasificaciones recalculadas.')
+
+
+@comandos.command('migrar')
+@click.option('--hasta', help='Aplica las revisiones pendientes solo hasta esta (incluida).')
+@click.option('--lote', type=int, help='Filas por transacción en los rellenos (por defecto, MIGRACIONES_LOTE).')
+@click.option('--pausa-ms', type=int, help='Espera entre transacciones de los rellenos (por defecto, MIGRACIONES_PAUSA_MS).')
+def migrar(hasta, lote, pausa_ms):
+    """Aplica las revisiones pendientes del esquema (revisiones/); si se interrumpe, continúa donde quedó."""
+    pausa = None if pausa_ms is None else pausa_ms / 1000
+    try:
+        aplicadas = migraciones.migrar(db.engine, hasta=hasta, lote=lote, pausa=pausa, informar=click.echo)
+    except KeyboardInterrupt:
+        raise click.ClickException('Interrumpido: \'flask migrar\' continúa por el último tramo guardado.')
+    click.echo(f'{len(aplicadas)} revisiones aplicadas.' if aplicadas else 'El esquema ya estaba al día.')
+
+# Nombre anterior de 'flask migrar'
+comandos.add_command(migrar, 'actualizar-esquema')
+
+
+@comandos.command('migraciones')
+def estado_migraciones():
+    """Lista las revisiones del esquema, aplicadas y pendientes, y los rellenos en curso."""
+    aplicadas = migraciones.aplicadas(db.engine)
+    for revision, modulo in migraciones.revisiones():
+        estado = aplicadas[revision] if revision in aplicadas else 'pendiente'
+        click.echo(f'{revision:<28} {str(estado)[:19]:<19}  {descripcion(modulo)}')
+    for nombre, ultimo, filas, terminado in migraciones.rellenos(db.engine):
+        if not terminado:
+            click.echo(f'Relleno {nombre} a medias: {filas} filas, hasta la clave {ultimo}.')
+
+
+@comandos.command('borrar')
+@click.argument('entidad', type=click.Choice(sorted(borrados.PLANES)))
+@click.argument('id_entidad', type=int)
+@click.option('--lote', type=int, help='Filas por transacción (por defecto, BORRADO_LOTE).')
+@click.option('--simular', is_flag=True, help='Solo muestra las filas que se borrarían.')
+@click.option('--si', 'confirmado', is_flag=True, help='No pide confirmación.')
+def borrar(entidad, id_entidad, lote, simular, confirmado):
+    """Borra ENTIDAD (usuario, estudiante, profesor, leccion, ejercicio, nivel) con sus dependientes, por lotes."""
+    informe = borrados.borrar(entidad, id_entidad, simular=True)
+    if not informe.total: # El último paso es la propia entidad
+        raise click.ClickException(f'No existe {entidad} con id {id_entidad}.')
+    for etiqueta, filas in informe.filas.items():
+        click.echo(f'{etiqueta:<28} {filas:>10}')
+    if informe.impedimento:
+        raise click.ClickException(informe.impedimento)
+    if simular:
+        return
+    if not confirmado:
+        click.confirm(f'¿Borrar {informe.total} filas?', abort=True)
+    informe = borrados.borrar(entidad, id_entidad, tamano_lote=lote or current_app.config['BORRADO_LOTE'])
+    click.echo(f'{informe.total} filas borradas o actualizadas ({informe}).')
+
+
+@comandos.command('trabajar')
+@click.option('--procesos', default=1, show_default=True, help='Procesos que ejecutan tareas a la vez.')
+def trabajar(procesos):
+    """Ejecuta las tareas en segundo plano de la cola (tareas.py) hasta Ctrl+C o SIGTERM."""
+    click.echo(f'Atendiendo la cola {tareas.archivo} con {procesos} proceso(s).')
+    tareas.trabajar(current_app._get_current_object(), procesos)
+
+
+@comandos.command('tareas')
+@click.option('--estado', type=click.Choice(['pendiente', 'en_curso', 'hecha', 'fallida']))
+@click.option('--cantidad', default=20, show_default=True)
+def listar_tareas(estado, cantidad):
+    """Lista las últimas tareas de la cola."""
+    for tarea in tareas.ultimas(cantidad, estado):
+        datos = tareas.como_dict(tarea)
+        click.echo(f'{tarea.id:>6} {tarea.tipo:<28} {tarea.estado:<10} {tarea.intentos}/{tarea.max_intentos} '
+                   f'{datos["creada"]}  {tarea.error or ""}')
+
+
+@comandos.command('reintentar-tarea')
+@click.argument('id_tarea', type=int)
+def reintentar_tarea(id_tarea):
+    """Vuelve a poner en la cola una tarea fallida."""
+    if not tareas.reintentar(id_tarea):
+        raise click.ClickException(f'La tarea {id_tarea} no existe, no está fallida o ya hay otra igual en la cola.')
+    click.echo(f'Tarea {id_tarea} de nuevo en la cola.')
+
+
+@comandos.command('limpiar-tareas')
+@click.option('--dias', type=int, help='Antigüedad mínima (por defecto, TAREAS_DIAS).')
+def limpiar_tareas(dias):
+    """Borra las tareas terminadas hace más de --dias días y sus archivos (para ejecutar desde cron)."""
+    dias = current_app.config['TAREAS_DIAS'] if dias is None else dias
+    click.echo(f'{tareas.limpiar_terminadas(dias * 86400)} tareas terminadas borradas.')
+
+
+@comandos.command('sembrar')
+def sembrar():
+    """Crea niveles y usuarios de prueba si la base de datos no tiene ninguno (solo para desarrollo)."""
+    if not Nivel.query.first():
+        db.session.add_all([Nivel(niveles=nombre) for nombre in ('Principiante', 'Intermedio', 'Avanzado')])
+        db.session.commit()
+        click.echo('Datos de niveles de prueba creados.')
+
+    if not Usuario.query.first():
+        for nombre, email, rol, password in USUARIOS_DE_PRUEBA:
+            usuario = Usuario(nombre=nombre, email=email, rol=rol)
+            usuario.set_password(password)
+            db.session.add(usuario)
+        db.session.commit()
+        click.echo(f'{len(USUARIOS_DE_PRUEBA)} usuarios de prueba creados.')
+    else:
+        click.echo('Ya hay usuarios: no se crean los de prueba.')
+
+
+@comandos.command('reindexar-busqueda')
+def reindexar_busqueda():
+    """Crea los índices de texto completo que falten y vuelve a indexar lecciones y ejercicios."""
+    with db.engine.begin() as conexion:
+        busqueda.crear_indices(conexion, reconstruir=True)
+    click.echo('Índices de búsqueda reconstruidos.')
+
+
+@comandos.command('limpiar-sesiones')
+def limpiar_sesiones():
+    """Borra del almacén de sesiones las que ya caducaron (para ejecutar desde cron)."""
+    click.echo(f'{sesiones.limpiar_caducadas()} sesiones caducadas borradas.')
+
+
+@comandos.command('cerrar-sesiones')
+@click.argument('email')
+def cerrar_sesiones(email):
+    """Cierra todas las sesiones abiertas del usuario con ese email."""
+    usuario = Usuario.query.filter_by(email=email).first()
+    if usuario is None:
+        raise click.ClickException(f'No existe ningún usuario con el email {email}.')
+    click.echo(f'{sesiones.revocar_usuario(usuario.id_usuario)} sesiones cerradas.')
+
+
+@comandos.command('analizar-indices')
+@click.option('--crear-indices', is_flag=True, help='Crea en la base de datos los índices declarados en los modelos que falten.')
+def analizar_indices(crear_indices):
+    """
+    Ejecuta EXPLAIN QUERY PLAN sobre las consultas de cada ruta GET y marca los recorridos
+    completos de tabla (SCAN sin índice). Sale con código 1 si encuentra alguno, para usarlo en CI.
+    """
+    if db.engine.dialect.name != 'sqlite':
+        raise click.ClickException('El analizador usa EXPLAIN QUERY PLAN y solo funciona con SQLite.')
+
+    if crear_indices:
+        for tabla in db.metadata.sorted_tables:
+            for indice in tabla.indexes:
+                indice.create(db.engine, checkfirst=True)
+        click.echo('Índices de los modelos creados (los que faltaban).')
+
+    consultas = []
+    def capturar(conn, cursor, sentencia, parametros, contexto, executemany):
+        if sentencia.lstrip().upper().startswith('SELECT'):
+            consultas.append((sentencia, parametros))
+    event.listen(db.engine, 'before_cursor_execute', capturar)
+
+    cliente = current_app.test_client()
+    with cliente.session_transaction() as sesion:
+        sesion['user_id'] = 0
+        sesion['user_email'] = 'analizar-indices'
+        sesion['user_rol'] = 'admin'
+
+    problemas = 0
+    try:
+        for regla in sorted(current_app.url_map.iter_rules(), key=lambda r: r.rule):
+            if 'GET' not in regla.methods or regla.endpoint in ('static', 'principal.logout'):
+                continue
+            # Los parámetros <int:...> se rellenan con 1; un 404 también ejecuta la consulta de búsqueda
+            url = regla.rule
+            for argumento in regla.arguments:
+                url = url.replace(f'<int:{argumento}>', '1')
+            consultas.clear()
+            cache_referencia.limpiar()
+            cliente.get(url)
+            for sentencia, parametros in consultas:
+                with db.engine.connect() as conexion:
+                    plan = conexion.exec_driver_sql('EXPLAIN QUERY PLAN ' + sentencia, parametros).fetchall()
+                for fila in plan:
+                    detalle = fila[-1]
+                    # Un SCAN sin WHERE es una lectura completa a propósito (p. ej. opciones cacheadas);
+                    # se marcan los filtros y ordenaciones que un índice podría resolver
+                    recorrido = (detalle.startswith('SCAN') and 'INDEX' not in detalle
+                                 and 'CONSTANT ROW' not in detalle and 'WHERE' in sentencia.upper().split())
+                    if recorrido or 'TEMP B-TREE FOR ORDER BY' in detalle:
+                        problemas += 1
+                        click.echo(f'[{regla.endpoint}] {detalle}\n    {" ".join(sentencia.split())}')
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', capturar)
+
+    if problemas:
+        click.echo(f'{problemas} recorrido(s) completo(s) de tabla encontrados.')
+        raise SystemExit(1)
+    click.echo('Sin recorridos completos de tabla.')
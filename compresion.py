@@ -0,0 +1,68 @@
+# compresion.py
+import gzip
+
+from flask import request
+
+from metricas import instrumentacion
+
+try:
+    import brotli
+except ImportError: # Opcional: sin el paquete Brotli se comprime solo con gzip
+    brotli = None
+
+
+class Compresion:
+    """
+    Comprime con brotli o gzip (según Accept-Encoding) las respuestas de texto: HTML, JSON de
+    la API, CSV... Las respuestas en streaming (exportaciones) y los archivos no se tocan.
+    Un ETag fuerte pasa a débil, como hacen los proxies: la misma versión en otra codificación.
+    """
+
+    TIPOS = ('text/html', 'text/plain', 'text/css', 'text/csv', 'application/json',
+             'application/javascript', 'image/svg+xml')
+
+    def __init__(self):
+        self.activa = True
+        self.minimo = 500
+        self.nivel_gzip = 6
+        self.nivel_brotli = 5
+
+    def init_app(self, app):
+        """Lee COMPRESION_ACTIVA, COMPRESION_MIN_BYTES y los niveles de gzip y brotli."""
+        self.activa = app.config.get('COMPRESION_ACTIVA', self.activa)
+        self.minimo = app.config.get('COMPRESION_MIN_BYTES', self.minimo)
+        self.nivel_gzip = app.config.get('COMPRESION_NIVEL_GZIP', self.nivel_gzip)
+        self.nivel_brotli = app.config.get('COMPRESION_NIVEL_BROTLI', self.nivel_brotli)
+        if self.activa:
+            app.after_request(self._comprimir)
+
+    @property
+    def codificaciones(self):
+        # Por orden de preferencia ante la misma calidad en Accept-Encoding
+        return ('br', 'gzip') if brotli is not None else ('gzip',)
+
+    def comprimir(self, datos, codificacion):
+        if codificacion == 'br':
+            return brotli.compress(datos, quality=self.nivel_brotli)
+        return gzip.compress(datos, compresslevel=self.nivel_gzip, mtime=0)
+
+    def _comprimir(self, respuesta):
+        if (respuesta.direct_passthrough or respuesta.is_streamed or respuesta.mimetype not in self.TIPOS
+                or respuesta.status_code < 200 or respuesta.status_code in (204, 206, 304)
+                or 'Content-Encoding' in respuesta.headers):
+            return respuesta
+        respuesta.vary.add('Accept-Encoding')
+        codificacion = request.accept_encodings.best_match(self.codificaciones)
+        if codificacion is None or respuesta.content_length is None or respuesta.content_length < self.minimo:
+            return respuesta
+
+        with instrumentacion.medir('compresion'):
+            respuesta.set_data(self.comprimir(respuesta.get_data(), codificacion))
+        respuesta.headers['Content-Encoding'] = codificacion
+        etag, debil = respuesta.get_etag()
+        if etag and not debil:
+            respuesta.set_etag(etag, weak=True)
+        return respuesta
+
+
+compresion = Compresion()
@@ -1,4 +1,114 @@
 # database.py
+import functools
+import os
+import weakref
+
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import event, text
+
+db = SQLAlchemy()
+
+# Motores de las aplicaciones creadas con init_db(), para olvidar sus conexiones tras un fork
+_motores = weakref.WeakSet()
+
+
+def _descartar_conexiones_heredadas():
+    # Un worker de gunicorn --preload hereda el pool del maestro: close=False lo sustituye por
+    # uno vacío sin cerrar las conexiones heredadas, que siguen siendo del proceso padre
+    for motor in list(_motores):
+        motor.dispose(close=False)
+
+
+os.register_at_fork(after_in_child=_descartar_conexiones_heredadas)
+
+
+def _es_sqlite_en_memoria(uri):
+    return uri in ('sqlite://', 'sqlite:///:memory:') or 'mode=memory' in uri
+
+
+def opciones_motor(config):
+    """
+    SQLALCHEMY_ENGINE_OPTIONS adecuadas al motor de SQLALCHEMY_DATABASE_URI: pool de
+    conexiones con pre-ping y reciclado en PostgreSQL; pool y espera por bloqueo en SQLite.
+    """
+    uri = config['SQLALCHEMY_DATABASE_URI']
+    pool = {
+        'pool_size': config['DB_POOL_SIZE'],
+        'max_overflow': config['DB_MAX_OVERFLOW'],
+        'pool_timeout': config['DB_POOL_TIMEOUT'],
+    }
+    if uri.startswith('sqlite'):
+        if _es_sqlite_en_memoria(uri):
+            return {} # SQLAlchemy usa un pool propio para SQLite en memoria
+        # timeout del driver = espera máxima (en segundos) cuando otro proceso tiene el bloqueo de escritura
+        return {**pool, 'connect_args': {'timeout': config['SQLITE_BUSY_TIMEOUT'] / 1000}}
+    # pre-ping: descarta conexiones cortadas por el servidor; recycle: renueva las antiguas
+    return {**pool, 'pool_pre_ping': True, 'pool_recycle': config['DB_POOL_RECYCLE']}
+
+
+def _pragmas_sqlite(config):
+    """Función para el evento 'connect' que aplica los PRAGMA de SQLite a cada conexión nueva."""
+    pragmas = [
+        f"PRAGMA busy_timeout = {int(config['SQLITE_BUSY_TIMEOUT'])}",
+        f"PRAGMA synchronous = {config['SQLITE_SYNCHRONOUS']}",
+        f"PRAGMA mmap_size = {int(config['SQLITE_MMAP_SIZE'])}",
+    ]
+    if config['SQLITE_WAL']:
+        # WAL: los lectores no bloquean al escritor ni el escritor a los lectores
+        pragmas.insert(0, 'PRAGMA journal_mode = WAL')
+
+    def al_conectar(conexion_dbapi, registro_conexion):
+        cursor = conexion_dbapi.cursor()
+        for pragma in pragmas:
+            cursor.execute(pragma)
+        cursor.close()
+
+    return al_conectar
+
+
+def init_db(app):
+    """Ajusta el motor según la configuración e inicializa 'db' con la aplicación Flask."""
+    # Las opciones explícitas de SQLALCHEMY_ENGINE_OPTIONS tienen prioridad sobre las calculadas
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {**opciones_motor(app.config),
+                                               **app.config.get('SQLALCHEMY_ENGINE_OPTIONS', {})}
+    db.init_app(app)
+    with app.app_context():
+        for motor in db.engines.values():
+            _motores.add(motor)
+            if motor.dialect.name == 'sqlite':
+                event.listen(motor, 'connect', _pragmas_sqlite(app.config))
+
+
+def insert_dialecto(tabla):
+    """INSERT del dialecto del motor (SQLite o PostgreSQL), que admite ON CONFLICT (on_conflict_do_update)."""
+    if db.engine.dialect.name == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    return insert(tabla)
+
+@functools.lru_cache(maxsize=None)
+def _sql_upsert_sumando(tabla, columnas, devolver):
+    # En texto, y una vez por tabla: el INSERT de los dialectos (on_conflict_do_update) no tiene
+    # clave de caché en SQLAlchemy y se compilaría de nuevo en cada intento registrado.
+    # La sintaxis es la misma en SQLite y en PostgreSQL.
+    clave = [columna.name for columna in tabla.primary_key]
+    nombres = clave + list(columnas)
+    sql = (f'INSERT INTO {tabla.name} ({", ".join(nombres)}) VALUES ({", ".join(":" + nombre for nombre in nombres)}) '
+           f'ON CONFLICT ({", ".join(clave)}) DO UPDATE SET '
+           + ', '.join(f'{columna} = {tabla.name}.{columna} + excluded.{columna}' for columna in columnas))
+    if devolver:
+        sql += f' RETURNING {", ".join(devolver)}'
+    return text(sql)
 
-db = SQLAlchemy()
\ No newline at end of file
+def upsert_sumando(modelo, filas, columnas, conexion=None, devolver=()):
+    """
+    INSERT ... ON CONFLICT (clave primaria) DO UPDATE SET columna = columna + excluded.columna,
+    en la sesión o en 'conexion'. Con 'devolver' (nombres de columnas) devuelve esas columnas
+    de cada fila tal como quedan, con un RETURNING por fila.
+    """
+    sentencia = _sql_upsert_sumando(modelo.__table__, tuple(columnas), tuple(devolver))
+    ejecutar = (conexion or db.session).execute
+    if devolver:
+        return [ejecutar(sentencia, fila).one() for fila in filas]
+    ejecutar(sentencia, filas)
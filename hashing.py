@@ -0,0 +1,184 @@
+# hashing.py
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as TiempoAgotado
+
+from werkzeug.security import generate_password_hash, check_password_hash
+
+
+class HashSaturado(Exception):
+    """Se lanza cuando el pool de hashing tiene la cola llena o no responde a tiempo (back-pressure)."""
+
+
+class PlazasSQLite:
+    """
+    Plazas de hash compartidas por los workers de la máquina en un SQLite local (WAL): una fila
+    por hash en curso. Cada fila caduca a los pocos segundos, así que las de un worker que muere
+    a mitad de un hash no ocupan la plaza para siempre.
+    """
+
+    def __init__(self, archivo):
+        self.archivo = archivo
+        self._local = threading.local() # Una conexión por hilo
+        self._pid = os.getpid()
+        self._conexion().execute('CREATE TABLE IF NOT EXISTS plazas (id INTEGER PRIMARY KEY, caduca REAL NOT NULL)')
+
+    def _conexion(self):
+        # Tras un fork (gunicorn --preload) no se usan las conexiones del proceso padre
+        if self._pid != os.getpid():
+            self._local, self._pid = threading.local(), os.getpid()
+        conexion = getattr(self._local, 'conexion', None)
+        if conexion is None:
+            conexion = sqlite3.connect(self.archivo, timeout=5, isolation_level=None)
+            conexion.execute('PRAGMA journal_mode=WAL')
+            conexion.execute('PRAGMA synchronous=NORMAL')
+            self._local.conexion = conexion
+        return conexion
+
+    def tomar(self, maximo, duracion):
+        """Id de la plaza tomada durante 'duracion' segundos como mucho, o None si ya hay 'maximo'."""
+        conexion = self._conexion()
+        ahora = time.time()
+        with conexion:
+            conexion.execute('BEGIN IMMEDIATE')
+            conexion.execute('DELETE FROM plazas WHERE caduca < ?', (ahora,))
+            if conexion.execute('SELECT COUNT(*) FROM plazas').fetchone()[0] >= maximo:
+                return None
+            return conexion.execute('INSERT INTO plazas (caduca) VALUES (?)', (ahora + duracion,)).lastrowid
+
+    def soltar(self, id_plaza):
+        self._conexion().execute('DELETE FROM plazas WHERE id = ?', (id_plaza,))
+
+
+def _generar_trozo(passwords, metodo):
+    return [generate_password_hash(password, metodo) for password in passwords]
+
+
+class PoolHashing:
+    """
+    Ejecuta el hash de contraseñas (scrypt/pbkdf2, ~100 ms de CPU) en un pool acotado de
+    procesos, para que un pico de logins no acapare la CPU de los workers web.
+
+    Como máximo se admiten 'procesos + cola' hashes en curso; si se supera, o si el hash no
+    termina en 'timeout' segundos, se lanza HashSaturado en lugar de encolar sin límite. Con
+    'archivo' el límite es de toda la máquina (plazas en PlazasSQLite, compartidas por los
+    workers de gunicorn, que con workers síncronos solo llevan una petición cada uno); sin él,
+    de cada proceso. Con procesos=0 el hash se hace en línea, sin límite.
+    """
+
+    def __init__(self, procesos=0, cola=0, metodo='scrypt:32768:8:1', timeout=10, archivo=None):
+        self.configurar(procesos, cola, metodo, timeout, archivo)
+
+    def configurar(self, procesos, cola, metodo, timeout, archivo=None):
+        self.procesos = procesos
+        self.cola = cola
+        self.metodo = metodo
+        self._prefijo = None
+        self.timeout = timeout
+        self._semaforo = threading.BoundedSemaphore(max(procesos + cola, 1))
+        self._plazas = PlazasSQLite(archivo) if archivo and procesos else None
+        self._pool = None
+        self._pid = None
+
+    def init_app(self, app):
+        """Lee la configuración de la aplicación Flask (HASH_PLAZAS_ARCHIVO: por defecto instance/hashing.db)."""
+        archivo = app.config.get('HASH_PLAZAS_ARCHIVO') or os.path.join(app.instance_path, 'hashing.db')
+        os.makedirs(os.path.dirname(os.path.abspath(archivo)), exist_ok=True)
+        self.configurar(
+            app.config.get('HASH_PROCESOS', self.procesos),
+            app.config.get('HASH_COLA_MAX', self.cola),
+            app.config.get('HASH_METODO', self.metodo),
+            app.config.get('HASH_TIMEOUT', self.timeout),
+            archivo,
+        )
+        self._prefijo = self._prefijo_de(self.metodo)
+
+    @staticmethod
+    def _prefijo_de(metodo):
+        # Werkzeug completa el método ('pbkdf2' -> 'pbkdf2:sha256:1000000'): se compara con lo que escribe
+        return generate_password_hash('', metodo).split('$', 1)[0]
+
+    def _ejecutor(self):
+        # El pool se crea al primer uso y de nuevo tras un fork (gunicorn --preload),
+        # porque los procesos hijos de un pool no se heredan
+        if self._pool is None or self._pid != os.getpid():
+            self._pool = ProcessPoolExecutor(max_workers=self.procesos)
+            self._pid = os.getpid()
+        return self._pool
+
+    def _tomar_plaza(self):
+        """Función que suelta la plaza tomada; HashSaturado si no queda ninguna."""
+        if self._plazas is None:
+            if not self._semaforo.acquire(blocking=False):
+                raise HashSaturado('Demasiados hashes de contraseña en curso.')
+            return self._semaforo.release
+        # La fila caduca algo después del timeout: el hash puede seguir en el pool tras rendirse
+        id_plaza = self._plazas.tomar(self.procesos + self.cola, self.timeout * 2)
+        if id_plaza is None:
+            raise HashSaturado('Demasiados hashes de contraseña en curso.')
+        return lambda: self._plazas.soltar(id_plaza)
+
+    def _ejecutar(self, funcion, *args):
+        if not self.procesos:
+            return funcion(*args)
+        soltar = self._tomar_plaza()
+        try:
+            futuro = self._ejecutor().submit(funcion, *args)
+        except Exception:
+            soltar()
+            raise
+        futuro.add_done_callback(lambda _: soltar())
+        try:
+            return futuro.result(timeout=self.timeout)
+        except TiempoAgotado:
+            futuro.cancel() # Si aún esperaba en la cola del pool, ya no se ejecuta
+            raise HashSaturado('El hash de la contraseña no terminó a tiempo.') from None
+
+    def generar(self, password):
+        """Devuelve el hash de 'password' con el método configurado."""
+        return self._ejecutar(generate_password_hash, password, self.metodo)
+
+    # Contraseñas por envío al pool en generar_varios: un trozo dura poco más que un hash de login
+    TROZO = 8
+
+    def generar_varios(self, passwords, pausa=0.05):
+        """
+        Hashes de muchas contraseñas (importaciones), en el orden recibido. Ocupa a la vez como
+        mucho una plaza por proceso del pool y, si no queda ninguna, espera en lugar de lanzar
+        HashSaturado: los logins siguen teniendo las plazas de la cola.
+        """
+        if not self.procesos:
+            return _generar_trozo(passwords, self.metodo)
+        futuros = []
+        for inicio in range(0, len(passwords), self.TROZO):
+            while len([f for f in futuros if not f.done()]) >= self.procesos:
+                time.sleep(pausa)
+            while True:
+                try:
+                    soltar = self._tomar_plaza()
+                    break
+                except HashSaturado:
+                    time.sleep(pausa)
+            try:
+                futuro = self._ejecutor().submit(_generar_trozo, passwords[inicio:inicio + self.TROZO], self.metodo)
+            except Exception:
+                soltar()
+                raise
+            futuro.add_done_callback(lambda _, soltar=soltar: soltar())
+            futuros.append(futuro)
+        return [hash_ for futuro in futuros for hash_ in futuro.result()]
+
+    def verificar(self, hash_guardado, password):
+        """Comprueba 'password' contra 'hash_guardado'."""
+        return self._ejecutar(check_password_hash, hash_guardado, password)
+
+    def necesita_rehash(self, hash_guardado):
+        """True si el hash se generó con un método o parámetros distintos a los configurados."""
+        if self._prefijo is None:
+            self._prefijo = self._prefijo_de(self.metodo)
+        return hash_guardado.split('$', 1)[0] != self._prefijo
+
+
+pool_hashing = PoolHashing()
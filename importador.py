@@ -0,0 +1,267 @@
+# importador.py
+import csv
+import datetime
+import io
+import json
+import os
+from itertools import islice
+
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+
+from database import db
+from cache import cache_referencia
+from hashing import pool_hashing
+import calificador
+
+
+# --- Lectura incremental de archivos ---
+
+def leer_csv(texto):
+    """Genera un diccionario por fila de un CSV con cabecera."""
+    yield from csv.DictReader(texto)
+
+def leer_json(texto, tamano_bloque=64 * 1024):
+    """
+    Genera los objetos de un JSON Lines (uno por línea) o de un array JSON '[{...}, {...}]'
+    leyendo por bloques, sin cargar el archivo entero en memoria.
+    """
+    decodificador = json.JSONDecoder()
+    buffer, fin = '', False
+    dentro_de_array = None
+    while True:
+        if not fin and len(buffer) < tamano_bloque:
+            bloque = texto.read(tamano_bloque)
+            fin = not bloque
+            buffer += bloque
+        buffer = buffer.lstrip().lstrip(',').lstrip()
+        if not buffer:
+            if fin:
+                return
+            continue
+        if dentro_de_array is None:
+            dentro_de_array = buffer.startswith('[')
+            buffer = buffer[1:] if dentro_de_array else buffer
+            continue
+        if dentro_de_array and buffer.startswith(']'):
+            return
+        try:
+            objeto, posicion = decodificador.raw_decode(buffer)
+        except json.JSONDecodeError:
+            if fin:
+                raise
+            bloque = texto.read(tamano_bloque) # El objeto está partido entre dos bloques
+            fin = not bloque
+            buffer += bloque
+            continue
+        buffer = buffer[posicion:]
+        yield objeto
+
+LECTORES = {'.csv': leer_csv, '.json': leer_json, '.jsonl': leer_json, '.ndjson': leer_json}
+
+def leer_filas(archivo, nombre):
+    """Elige el lector según la extensión (.csv, .json, .jsonl/.ndjson) de un archivo binario."""
+    extension = os.path.splitext(nombre)[1].lower()
+    if extension not in LECTORES:
+        raise ValueError(f'Formato no soportado: {extension or nombre} (usa .csv, .json o .jsonl)')
+    return LECTORES[extension](io.TextIOWrapper(archivo, encoding='utf-8-sig', newline=''))
+
+
+# --- Entidades importables ---
+# Cada una valida un lote de filas con pocas consultas (un IN por lote) y devuelve
+# (registros_para_insertar, errores). Trabajan sobre las tablas de db.metadata con SQLAlchemy Core.
+# Si además escriben en otras tablas, definen insertar(conexion, registros) en lugar del INSERT común.
+
+def _texto(fila, campo):
+    valor = fila.get(campo)
+    return str(valor).strip() if valor is not None else ''
+
+def _faltan(fila, campos):
+    return [campo for campo in campos if not _texto(fila, campo)]
+
+
+class ImportacionUsuarios:
+    tabla = 'usuarios'
+    obligatorios = ('nombre', 'email', 'password', 'rol')
+    roles = ('admin', 'profesor', 'estudiante')
+
+    def preparar(self, lote, conexion, hashear):
+        usuarios = db.metadata.tables['usuarios']
+        emails = {_texto(fila, 'email') for _, fila in lote}
+        existentes = set(conexion.scalars(select(usuarios.c.email).where(usuarios.c.email.in_(emails))))
+        validas, errores, vistos = [], [], set()
+        for numero, fila in lote:
+            email = _texto(fila, 'email')
+            if faltan := _faltan(fila, self.obligatorios):
+                errores.append((numero, f'Faltan campos: {", ".join(faltan)}'))
+            elif _texto(fila, 'rol') not in self.roles:
+                errores.append((numero, f'Rol no válido: {_texto(fila, "rol")}'))
+            elif email in existentes or email in vistos:
+                errores.append((numero, f'Ya existe un usuario con el email {email}'))
+            else:
+                vistos.add(email)
+                validas.append((numero, fila, email))
+
+        hashes = hashear([_texto(fila, 'password') for _, fila, _ in validas])
+        ahora = datetime.datetime.now()
+        registros = [
+            {'nombre': _texto(fila, 'nombre'), 'email': email, 'contrasena_hash': hash_,
+             'rol': _texto(fila, 'rol'), 'fecha_registro': ahora, 'activo': True}
+            for (_, fila, email), hash_ in zip(validas, hashes)
+        ]
+        return registros, errores
+
+
+class ImportacionEstudiantes:
+    """Filas con email (de un usuario con rol 'estudiante' ya existente), nivel y fecha_nacimiento (AAAA-MM-DD)."""
+    tabla = 'estudiantes'
+    obligatorios = ('email', 'nivel', 'fecha_nacimiento')
+
+    def preparar(self, lote, conexion, hashear):
+        usuarios = db.metadata.tables['usuarios']
+        estudiantes = db.metadata.tables['estudiantes']
+        niveles = db.metadata.tables['niveles']
+        emails = {_texto(fila, 'email') for _, fila in lote}
+        por_email = {email: (id_usuario, rol) for email, id_usuario, rol in conexion.execute(
+            select(usuarios.c.email, usuarios.c.id_usuario, usuarios.c.rol).where(usuarios.c.email.in_(emails)))}
+        ya_estudiantes = set(conexion.scalars(select(estudiantes.c.id_usuario).where(
+            estudiantes.c.id_usuario.in_([id_usuario for id_usuario, _ in por_email.values()]))))
+        por_nivel = {nombre.lower(): id_nivel for id_nivel, nombre in conexion.execute(select(niveles.c.id_nivel, niveles.c.niveles))}
+
+        registros, errores, vistos = [], [], set()
+        for numero, fila in lote:
+            email = _texto(fila, 'email')
+            usuario = por_email.get(email)
+            if faltan := _faltan(fila, self.obligatorios):
+                errores.append((numero, f'Faltan campos: {", ".join(faltan)}'))
+                continue
+            if usuario is None:
+                errores.append((numero, f'No existe un usuario con el email {email}'))
+                continue
+            if usuario[1] != 'estudiante':
+                errores.append((numero, f'El usuario {email} no tiene el rol "estudiante"'))
+                continue
+            if usuario[0] in ya_estudiantes or usuario[0] in vistos:
+                errores.append((numero, f'El usuario {email} ya está registrado como estudiante'))
+                continue
+            id_nivel = por_nivel.get(_texto(fila, 'nivel').lower())
+            if id_nivel is None:
+                errores.append((numero, f'Nivel desconocido: {_texto(fila, "nivel")}'))
+                continue
+            try:
+                fecha = datetime.datetime.strptime(_texto(fila, 'fecha_nacimiento'), '%Y-%m-%d').date()
+            except ValueError:
+                errores.append((numero, 'Formato de fecha de nacimiento inválido.'))
+                continue
+            vistos.add(usuario[0])
+            registros.append({'id_usuario': usuario[0], 'id_nivel': id_nivel, 'fecha_nacimiento': fecha})
+        return registros, errores
+
+
+class ImportacionEjercicios:
+    tabla = 'ejercicios'
+    obligatorios = ('id_leccion', 'pregunta', 'tipo', 'respuesta')
+    tipos = ('multiple_choice', 'fill_in_the_blank', 'short_answer')
+
+    def preparar(self, lote, conexion, hashear):
+        lecciones = db.metadata.tables['lecciones']
+        ids = {_texto(fila, 'id_leccion') for _, fila in lote}
+        ids = {int(valor) for valor in ids if valor.isdigit()}
+        existentes = set(conexion.scalars(select(lecciones.c.id_leccion).where(lecciones.c.id_leccion.in_(ids))))
+
+        registros, errores = [], []
+        for numero, fila in lote:
+            id_leccion = _texto(fila, 'id_leccion')
+            if faltan := _faltan(fila, self.obligatorios):
+                errores.append((numero, f'Faltan campos: {", ".join(faltan)}'))
+            elif not id_leccion.isdigit() or int(id_leccion) not in existentes:
+                errores.append((numero, f'No existe la lección {id_leccion}'))
+            elif _texto(fila, 'tipo') not in self.tipos:
+                errores.append((numero, f'Tipo no válido: {_texto(fila, "tipo")}'))
+            else:
+                registros.append({
+                    'id_leccion': int(id_leccion), 'pregunta': _texto(fila, 'pregunta'), 'tipo': _texto(fila, 'tipo'),
+                    'respuesta': _texto(fila, 'respuesta'), 'opciones': self._opciones(fila),
+                })
+        return registros, errores
+
+    @staticmethod
+    def _opciones(fila):
+        # En JSON, una lista; en CSV, una por línea dentro de la celda (o separadas por comas)
+        valor = fila.get('opciones')
+        if isinstance(valor, list):
+            return [str(opcion).strip() for opcion in valor if str(opcion).strip()]
+        return calificador.separar_opciones(_texto(fila, 'opciones'))
+
+    def insertar(self, conexion, registros):
+        """Inserta los ejercicios y, con los ids que devuelve el INSERT (RETURNING), sus opciones."""
+        ejercicios = db.metadata.tables[self.tabla]
+        opciones = [registro.pop('opciones') for registro in registros]
+        ids = conexion.scalars(ejercicios.insert().returning(ejercicios.c.id_ejercicio, sort_by_parameter_order=True),
+                               registros).all()
+        filas = []
+        for id_ejercicio, registro, textos in zip(ids, registros, opciones):
+            respuesta = calificador.normalizar(registro['respuesta'])
+            filas += [{'id_ejercicio': id_ejercicio, 'orden': orden, 'texto': texto,
+                       'correcta': calificador.normalizar(texto) == respuesta} for orden, texto in enumerate(textos)]
+        if filas:
+            conexion.execute(db.metadata.tables['opciones_ejercicio'].insert(), filas)
+
+
+ENTIDADES = {
+    'usuarios': ImportacionUsuarios(),
+    'estudiantes': ImportacionEstudiantes(),
+    'ejercicios': ImportacionEjercicios(),
+}
+
+
+# --- Motor de importación ---
+
+class InformeImportacion:
+    """Resultado de una importación: filas insertadas y errores por número de fila."""
+
+    def __init__(self):
+        self.insertadas = 0
+        self.errores = [] # (numero_de_fila, mensaje)
+
+    @property
+    def leidas(self):
+        return self.insertadas + len(self.errores)
+
+    def escribir_errores(self, salida):
+        """Escribe los errores como CSV (fila, error) en el archivo de texto 'salida'."""
+        escritor = csv.writer(salida)
+        escritor.writerow(['fila', 'error'])
+        escritor.writerows(self.errores)
+
+
+def importar(filas, entidad, tamano_lote=1000):
+    """
+    Importa 'filas' (un iterable de diccionarios) en lotes: un IN por lote para las
+    comprobaciones de unicidad, hashes en el pool de hashing.py (HASH_PROCESOS) y un INSERT
+    executemany por lote, cada lote en su propia transacción. Los errores de una fila no
+    detienen el resto.
+    """
+    especificacion = ENTIDADES[entidad]
+    tabla = db.metadata.tables[especificacion.tabla]
+    informe = InformeImportacion()
+    filas = enumerate(filas, start=1)
+
+    while lote := list(islice(filas, tamano_lote)):
+        try:
+            with db.engine.begin() as conexion:
+                registros, errores = especificacion.preparar(lote, conexion, pool_hashing.generar_varios)
+                if registros and hasattr(especificacion, 'insertar'):
+                    especificacion.insertar(conexion, registros)
+                elif registros:
+                    conexion.execute(tabla.insert(), registros)
+        except IntegrityError as e:
+            # Conflicto con datos escritos mientras tanto: se descarta solo este lote
+            informe.errores.extend((numero, f'Lote rechazado por la base de datos: {e.orig}') for numero, _ in lote)
+            continue
+        informe.insertadas += len(registros)
+        informe.errores.extend(errores)
+
+    # Los INSERT de Core no pasan por la sesión: se invalida la caché de opciones a mano
+    cache_referencia.invalidar(especificacion.tabla)
+    return informe
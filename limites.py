@@ -0,0 +1,215 @@
+# limites.py
+import hashlib
+import math
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+# --- Contadores de ventana deslizante ---
+# Por clave se guardan solo tres enteros: el número de la ventana fija actual (tiempo // ventana)
+# y los intentos de esa ventana y de la anterior. La ventana deslizante se estima suponiendo los
+# de la anterior repartidos por igual: anterior * (1 - fracción transcurrida) + actual.
+
+def _deslizar(fila, indice):
+    """(anterior, actual) en la ventana 'indice' a partir de la fila guardada (ventana, anterior, actual)."""
+    if fila is None:
+        return 0, 0
+    guardada, anterior, actual = fila
+    if guardada == indice:
+        return anterior, actual
+    if guardada == indice - 1:
+        return actual, 0
+    return 0, 0
+
+def _espera(anterior, actual, fraccion, limite, ventana):
+    """Segundos hasta que, sin más intentos, la estimación baje del límite."""
+    if actual >= limite:
+        # En la ventana siguiente 'actual' pasa a ser la anterior y pesa cada vez menos
+        return ((1 - fraccion) + (1 - limite / actual)) * ventana
+    return max(1 - (limite - actual) / anterior - fraccion, 0) * ventana
+
+
+class ContadoresMemoria:
+    """Contadores del proceso en una LRU acotada (las claves más antiguas se olvidan)."""
+
+    def __init__(self, max_claves=100000):
+        self.max_claves = max_claves
+        self._filas = OrderedDict() # clave -> (ventana, anterior, actual)
+        self._lock = threading.Lock()
+
+    def actualizar(self, clave, funcion, caduca=None):
+        """
+        funcion(fila) -> (resultado, fila nueva o None para dejarla igual), de forma atómica.
+        'caduca' (epoch desde el que la fila ya no cuenta) solo lo usa el almacén SQLite.
+        """
+        with self._lock:
+            resultado, nueva = funcion(self._filas.get(clave))
+            if nueva is not None:
+                self._filas[clave] = nueva
+                self._filas.move_to_end(clave)
+                while len(self._filas) > self.max_claves:
+                    self._filas.popitem(last=False)
+            return resultado
+
+    def borrar(self, clave):
+        with self._lock:
+            self._filas.pop(clave, None)
+
+
+class ContadoresSQLite:
+    """Contadores en un archivo SQLite local (WAL), compartidos por los workers de la máquina."""
+
+    # Cada cuántas escrituras del proceso se borran las filas de ventanas ya pasadas
+    LIMPIEZA = 1000
+
+    def __init__(self, archivo):
+        self.archivo = archivo
+        self._local = threading.local() # Una conexión por hilo
+        self._pid = os.getpid()
+        self._escrituras = 0
+        conexion = self._conexion()
+        conexion.execute('CREATE TABLE IF NOT EXISTS limites (clave BLOB PRIMARY KEY, ventana INTEGER NOT NULL, '
+                         'anterior INTEGER NOT NULL, actual INTEGER NOT NULL, caduca REAL NOT NULL) WITHOUT ROWID')
+        conexion.execute('CREATE INDEX IF NOT EXISTS ix_limites_caduca ON limites (caduca)')
+
+    def _conexion(self):
+        # Tras un fork (gunicorn --preload) no se usan las conexiones del proceso padre
+        if self._pid != os.getpid():
+            self._local, self._pid = threading.local(), os.getpid()
+        conexion = getattr(self._local, 'conexion', None)
+        if conexion is None:
+            conexion = sqlite3.connect(self.archivo, timeout=5, isolation_level=None)
+            conexion.execute('PRAGMA journal_mode=WAL')
+            conexion.execute('PRAGMA synchronous=NORMAL')
+            self._local.conexion = conexion
+        return conexion
+
+    def actualizar(self, clave, funcion, caduca):
+        conexion = self._conexion()
+        with conexion:
+            conexion.execute('BEGIN IMMEDIATE')
+            fila = conexion.execute('SELECT ventana, anterior, actual FROM limites WHERE clave = ?', (clave,)).fetchone()
+            resultado, nueva = funcion(fila)
+            if nueva is not None:
+                conexion.execute('INSERT INTO limites (clave, ventana, anterior, actual, caduca) VALUES (?, ?, ?, ?, ?) '
+                                 'ON CONFLICT(clave) DO UPDATE SET ventana = excluded.ventana, anterior = excluded.anterior, '
+                                 'actual = excluded.actual, caduca = excluded.caduca', (clave, *nueva, caduca))
+                self._escrituras += 1
+                if self._escrituras % self.LIMPIEZA == 0:
+                    conexion.execute('DELETE FROM limites WHERE caduca < ?', (time.time(),))
+        return resultado
+
+    def borrar(self, clave):
+        self._conexion().execute('DELETE FROM limites WHERE clave = ?', (clave,))
+
+
+# --- Límites del login ---
+
+class LimitesLogin:
+    """
+    Limita los intentos de login por IP (todos, porque cada uno cuesta un hash) y los fallidos
+    por email, con contadores de ventana deslizante. Se comprueba antes de consultar la base de
+    datos o calcular un hash, así que una avalancha de intentos se rechaza casi sin coste: cada
+    proceso recuerda además hasta cuándo está bloqueada una clave y no vuelve a mirar el almacén.
+
+    Las claves son un resumen de 12 bytes de 'ip:...' o 'email:...': el tamaño no depende de lo
+    que envíe el cliente. Almacén 'memoria': cada worker cuenta por su cuenta (con N workers,
+    hasta N veces el límite); 'sqlite': un archivo local compartido por todos.
+    """
+
+    def __init__(self):
+        self.activos = True
+        self.contadores = ContadoresMemoria()
+        self.limite_ip, self.ventana_ip = 30, 60
+        self.limite_email, self.ventana_email = 5, 300
+        self._bloqueadas = OrderedDict() # clave -> bloqueada hasta (epoch), en este proceso
+        self._max_bloqueadas = 100000
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        """
+        Lee LOGIN_LIMITES_ACTIVOS, LOGIN_LIMITES_ALMACEN ('memoria' o 'sqlite'), LOGIN_LIMITES_ARCHIVO
+        (por defecto instance/limites.db), LOGIN_LIMITES_MAX y los límites y ventanas por IP y por email.
+        """
+        self.activos = app.config.get('LOGIN_LIMITES_ACTIVOS', True)
+        self.limite_ip = app.config.get('LOGIN_LIMITE_IP', self.limite_ip)
+        self.ventana_ip = app.config.get('LOGIN_VENTANA_IP', self.ventana_ip)
+        self.limite_email = app.config.get('LOGIN_LIMITE_EMAIL', self.limite_email)
+        self.ventana_email = app.config.get('LOGIN_VENTANA_EMAIL', self.ventana_email)
+        maximo = app.config.get('LOGIN_LIMITES_MAX', 100000)
+        tipo = app.config.get('LOGIN_LIMITES_ALMACEN', 'memoria')
+        if tipo == 'memoria':
+            self.contadores = ContadoresMemoria(maximo)
+        elif tipo == 'sqlite':
+            archivo = app.config.get('LOGIN_LIMITES_ARCHIVO') or os.path.join(app.instance_path, 'limites.db')
+            os.makedirs(os.path.dirname(os.path.abspath(archivo)), exist_ok=True)
+            self.contadores = ContadoresSQLite(archivo)
+        else:
+            raise ValueError(f'LOGIN_LIMITES_ALMACEN desconocido: {tipo}')
+        self._max_bloqueadas = maximo
+        with self._lock:
+            self._bloqueadas.clear()
+
+    @staticmethod
+    def _clave(tipo, valor):
+        return hashlib.blake2b(f'{tipo}:{valor}'.encode(errors='surrogatepass'), digest_size=12).digest()
+
+    @staticmethod
+    def _email(email):
+        return (email or '').strip().lower()
+
+    def _admitir(self, clave, limite, ventana, sumar):
+        """0 si la clave está por debajo del límite (y, con sumar, cuenta este intento); si no, segundos de espera."""
+        ahora = time.time()
+        with self._lock:
+            hasta = self._bloqueadas.get(clave)
+            if hasta is not None and hasta > ahora:
+                return hasta - ahora
+        indice = int(ahora // ventana)
+        fraccion = ahora / ventana - indice
+
+        def decidir(fila):
+            anterior, actual = _deslizar(fila, indice)
+            if anterior * (1 - fraccion) + actual >= limite:
+                return _espera(anterior, actual, fraccion, limite, ventana), None
+            return 0, ((indice, anterior, actual + 1) if sumar else None)
+
+        espera = self.contadores.actualizar(clave, decidir, caduca=(indice + 2) * ventana)
+        if espera:
+            with self._lock:
+                self._bloqueadas[clave] = ahora + espera
+                self._bloqueadas.move_to_end(clave)
+                while len(self._bloqueadas) > self._max_bloqueadas:
+                    self._bloqueadas.popitem(last=False)
+        return espera
+
+    def comprobar(self, ip, email):
+        """
+        Antes de buscar al usuario: 0 si se admite el intento (y lo cuenta para la IP) o los
+        segundos que hay que esperar. Primero el email, que no suma nada si está bloqueado.
+        """
+        if not self.activos:
+            return 0
+        espera = self._admitir(self._clave('email', self._email(email)), self.limite_email, self.ventana_email, False)
+        return espera or self._admitir(self._clave('ip', ip), self.limite_ip, self.ventana_ip, True)
+
+    def fallido(self, email):
+        """Cuenta un login fallido para el email."""
+        if self.activos:
+            self._admitir(self._clave('email', self._email(email)), math.inf, self.ventana_email, True)
+
+    def correcto(self, email):
+        """Un login correcto olvida los fallos anteriores del email."""
+        if self.activos:
+            self.contadores.borrar(self._clave('email', self._email(email)))
+
+    @staticmethod
+    def reintentar_en(espera):
+        """Valor de la cabecera Retry-After (segundos enteros, al menos 1)."""
+        return str(max(math.ceil(espera), 1))
+
+
+limites_login = LimitesLogin()
@@ -0,0 +1,236 @@
+# metricas.py
+import bisect
+import logging
+import threading
+import time
+from contextlib import contextmanager
+
+from flask import Response, abort, g, has_app_context, request, template_rendered, before_render_template
+from sqlalchemy import event
+
+from database import db
+
+registro = logging.getLogger('metricas')
+
+
+class MedicionPeticion:
+    """Lo medido durante una petición: consultas, tiempo de base de datos, plantillas y otros tramos."""
+
+    __slots__ = ('inicio', 'consultas', 'tiempo_db', 'consulta_lenta', 'tiempo_consulta_lenta', 'tiempos', 'inicio_plantilla')
+
+    def __init__(self):
+        self.inicio = time.perf_counter()
+        self.consultas = 0
+        self.tiempo_db = 0.0
+        self.consulta_lenta = None
+        self.tiempo_consulta_lenta = 0.0
+        self.tiempos = {} # nombre del tramo ('plantilla', 'hash'...) -> segundos
+        self.inicio_plantilla = None
+
+    def sumar(self, nombre, segundos):
+        self.tiempos[nombre] = self.tiempos.get(nombre, 0.0) + segundos
+
+
+class Histograma:
+    """Histograma acumulado al estilo Prometheus (cubos 'le', suma y número de observaciones)."""
+
+    __slots__ = ('cubos', 'cuentas', 'suma', 'total')
+
+    def __init__(self, cubos):
+        self.cubos = cubos
+        self.cuentas = [0] * len(cubos)
+        self.suma = 0.0
+        self.total = 0
+
+    def observar(self, valor):
+        indice = bisect.bisect_left(self.cubos, valor)
+        if indice < len(self.cubos):
+            self.cuentas[indice] += 1
+        self.suma += valor
+        self.total += 1
+
+    def lineas(self, nombre, etiquetas):
+        acumulado = 0
+        for limite, cuenta in zip(self.cubos, self.cuentas):
+            acumulado += cuenta
+            yield f'{nombre}_bucket{{{etiquetas},le="{limite:g}"}} {acumulado}'
+        yield f'{nombre}_bucket{{{etiquetas},le="+Inf"}} {self.total}'
+        yield f'{nombre}_sum{{{etiquetas}}} {self.suma:.6f}'
+        yield f'{nombre}_count{{{etiquetas}}} {self.total}'
+
+
+class Instrumentacion:
+    """
+    Mide cada petición con eventos del motor de SQLAlchemy y señales de Flask, y lo publica:
+      - cabecera Server-Timing (db, plantilla, hash, total) en cada respuesta,
+      - /metrics en formato Prometheus con histogramas por ruta (endpoint de Flask),
+      - log 'metricas' con las peticiones que superan METRICAS_LENTO_MS.
+
+    El coste por petición es de unas pocas llamadas a perf_counter y sumas en memoria. Las
+    métricas son por proceso: con varios workers de gunicorn, cada uno publica las suyas.
+    """
+
+    # Límites de los histogramas de duración, en segundos
+    CUBOS_SEGUNDOS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+    CUBOS_CONSULTAS = (0, 1, 2, 5, 10, 20, 50, 100)
+
+    def __init__(self):
+        self.activa = True
+        self.server_timing = True
+        self.lento = 0.5
+        self.token = None
+        self._lock = threading.Lock()
+        self._por_ruta = {} # endpoint -> (duración, tiempo de db, consultas)
+        self._respuestas = {} # (endpoint, estado) -> número de respuestas
+
+    def init_app(self, app):
+        """Lee la configuración (METRICAS_*) y engancha los eventos a la aplicación y a sus motores."""
+        self.activa = app.config.get('METRICAS_ACTIVAS', self.activa)
+        self.server_timing = app.config.get('METRICAS_SERVER_TIMING', self.server_timing)
+        self.lento = app.config.get('METRICAS_LENTO_MS', self.lento * 1000) / 1000
+        self.token = app.config.get('METRICAS_TOKEN', self.token)
+        if not self.activa:
+            return
+
+        app.before_request(self._empezar)
+        app.after_request(self._terminar)
+        app.teardown_request(self._terminar_sin_respuesta)
+        before_render_template.connect(self._antes_de_plantilla, app)
+        template_rendered.connect(self._despues_de_plantilla, app)
+        app.add_url_rule('/metrics', 'metricas', self.exponer)
+        with app.app_context():
+            for motor in db.engines.values():
+                event.listen(motor, 'before_cursor_execute', self._antes_de_consulta)
+                event.listen(motor, 'after_cursor_execute', self._despues_de_consulta)
+
+    # --- Medición ---
+
+    @staticmethod
+    def _actual():
+        return g.get('metricas') if has_app_context() else None
+
+    @contextmanager
+    def medir(self, nombre):
+        """Suma la duración del bloque al tramo 'nombre' de la petición en curso (si la hay)."""
+        medicion = self._actual()
+        if medicion is None:
+            yield
+            return
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            medicion.sumar(nombre, time.perf_counter() - inicio)
+
+    def _empezar(self):
+        g.metricas = MedicionPeticion()
+
+    def _antes_de_consulta(self, conexion, cursor, sentencia, parametros, contexto, executemany):
+        if self._actual() is not None:
+            contexto._inicio_metricas = time.perf_counter()
+
+    def _despues_de_consulta(self, conexion, cursor, sentencia, parametros, contexto, executemany):
+        medicion = self._actual()
+        inicio = getattr(contexto, '_inicio_metricas', None)
+        if medicion is None or inicio is None:
+            return
+        duracion = time.perf_counter() - inicio
+        medicion.consultas += 1
+        medicion.tiempo_db += duracion
+        if duracion > medicion.tiempo_consulta_lenta:
+            medicion.tiempo_consulta_lenta = duracion
+            medicion.consulta_lenta = sentencia
+
+    def _antes_de_plantilla(self, app, template, context, **extra):
+        medicion = self._actual()
+        if medicion is not None:
+            medicion.inicio_plantilla = time.perf_counter()
+
+    def _despues_de_plantilla(self, app, template, context, **extra):
+        medicion = self._actual()
+        if medicion is not None and medicion.inicio_plantilla is not None:
+            medicion.sumar('plantilla', time.perf_counter() - medicion.inicio_plantilla)
+            medicion.inicio_plantilla = None
+
+    def _terminar(self, respuesta):
+        medicion = g.pop('metricas', None)
+        if medicion is None:
+            return respuesta
+        total = time.perf_counter() - medicion.inicio
+
+        if self.server_timing:
+            partes = [f'db;dur={medicion.tiempo_db * 1000:.1f};desc="{medicion.consultas} consultas"']
+            partes += [f'{nombre};dur={segundos * 1000:.1f}' for nombre, segundos in medicion.tiempos.items()]
+            partes.append(f'total;dur={total * 1000:.1f}')
+            respuesta.headers['Server-Timing'] = ', '.join(partes)
+
+        self._registrar(medicion, total, respuesta.status_code)
+        return respuesta
+
+    def _terminar_sin_respuesta(self, error=None):
+        # Si _terminar no llegó a ejecutarse (una excepción que se propaga o que salta en otro
+        # after_request), la petición cuenta igual, como un 500
+        medicion = g.pop('metricas', None)
+        if medicion is not None:
+            self._registrar(medicion, time.perf_counter() - medicion.inicio, 500)
+
+    def _registrar(self, medicion, total, estado):
+        ruta = request.endpoint or 'sin_ruta'
+        with self._lock:
+            histogramas = self._por_ruta.get(ruta)
+            if histogramas is None:
+                histogramas = self._por_ruta[ruta] = (Histograma(self.CUBOS_SEGUNDOS), Histograma(self.CUBOS_SEGUNDOS),
+                                                      Histograma(self.CUBOS_CONSULTAS))
+            histogramas[0].observar(total)
+            histogramas[1].observar(medicion.tiempo_db)
+            histogramas[2].observar(medicion.consultas)
+            clave = (ruta, estado)
+            self._respuestas[clave] = self._respuestas.get(clave, 0) + 1
+
+        if total >= self.lento:
+            otros = ' '.join(f'{nombre}={segundos * 1000:.1f}ms' for nombre, segundos in medicion.tiempos.items())
+            lenta = ' '.join((medicion.consulta_lenta or '').split())[:300]
+            registro.warning('Petición lenta %s %s (%s) -> %s en %.1fms: %d consultas, db=%.1fms %s; '
+                             'consulta más lenta %.1fms: %s',
+                             request.method, request.path, ruta, estado, total * 1000,
+                             medicion.consultas, medicion.tiempo_db * 1000, otros,
+                             medicion.tiempo_consulta_lenta * 1000, lenta)
+
+    # --- Exposición ---
+
+    @staticmethod
+    def _desde_esta_maquina():
+        # Con un proxy delante remote_addr es el del proxy: lo que llega reenviado no cuenta como local
+        return (request.remote_addr in ('127.0.0.1', '::1')
+                and 'X-Forwarded-For' not in request.headers and 'Forwarded' not in request.headers)
+
+    def exponer(self):
+        """Vista de /metrics en formato de texto de Prometheus (con token o, sin él, solo desde esta máquina)."""
+        if self.token:
+            if request.headers.get('Authorization') != f'Bearer {self.token}':
+                abort(403)
+        elif not self._desde_esta_maquina():
+            abort(403)
+        lineas = []
+        with self._lock:
+            por_ruta = sorted(self._por_ruta.items())
+            respuestas = sorted(self._respuestas.items())
+            for indice, (nombre, ayuda) in enumerate((
+                    ('peticiones_duracion_segundos', 'Duración de las peticiones por ruta.'),
+                    ('peticiones_db_segundos', 'Tiempo en la base de datos por petición y ruta.'),
+                    ('peticiones_consultas', 'Consultas SQL por petición y ruta.'))):
+                lineas += [f'# HELP {nombre} {ayuda}', f'# TYPE {nombre} histogram']
+                for ruta, histogramas in por_ruta:
+                    lineas.extend(histogramas[indice].lineas(nombre, f'ruta="{ruta}"'))
+        lineas += ['# HELP peticiones_total Respuestas por ruta y código de estado.', '# TYPE peticiones_total counter']
+        lineas += [f'peticiones_total{{ruta="{ruta}",estado="{estado}"}} {cuenta}' for (ruta, estado), cuenta in respuestas]
+        return Response('\n'.join(lineas) + '\n', mimetype='text/plain; version=0.0.4')
+
+    def limpiar(self):
+        """Vacía los histogramas acumulados."""
+        with self._lock:
+            self._por_ruta.clear()
+            self._respuestas.clear()
+
+
+instrumentacion = Instrumentacion()
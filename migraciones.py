@@ -0,0 +1,238 @@
+# migraciones.py
+import datetime
+import importlib
+import os
+import time
+
+from sqlalchemy import inspect, text
+
+# Revisiones: revisiones/NNNN_descripcion.py, aplicadas en orden de nombre. Cada una define
+# aplicar(migracion) y debe poder repetirse (comprueba antes de crear o añadir), porque una
+# revisión interrumpida se vuelve a ejecutar entera y la primera vez hay que adoptar bases
+# de datos creadas con db.create_all() o con versiones anteriores de los modelos.
+DIRECTORIO = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'revisiones')
+
+_TABLAS = (
+    'CREATE TABLE IF NOT EXISTS migraciones (revision VARCHAR(200) PRIMARY KEY, aplicada TIMESTAMP NOT NULL)',
+    'CREATE TABLE IF NOT EXISTS migraciones_rellenos (nombre VARCHAR(200) PRIMARY KEY, ultimo BIGINT NOT NULL, '
+    'filas BIGINT NOT NULL, terminado BOOLEAN NOT NULL)',
+)
+
+
+def descripcion(modulo):
+    """Primera línea del docstring de una revisión."""
+    return (modulo.__doc__ or '').strip().split('\n')[0]
+
+
+class Migracion:
+    """
+    Lo que recibe aplicar() de una revisión: consultas sobre el esquema y operaciones que no
+    bloquean la base de datos más que lo imprescindible. Cada operación va en su propia
+    transacción corta; los rellenos de datos, por tramos de clave primaria (ver rellenar()).
+    """
+
+    def __init__(self, motor, revision, lote, pausa, informar):
+        self.motor = motor
+        self.revision = revision
+        self.lote = lote
+        self.pausa = pausa
+        self.informar = informar
+
+    @property
+    def dialecto(self):
+        return self.motor.dialect.name
+
+    # --- Estado del esquema ---
+
+    def existe_tabla(self, tabla):
+        return inspect(self.motor).has_table(tabla)
+
+    def columnas(self, tabla):
+        return {columna['name'] for columna in inspect(self.motor).get_columns(tabla)}
+
+    def indices(self, tabla):
+        return {indice['name'] for indice in inspect(self.motor).get_indexes(tabla)}
+
+    def claves_foraneas(self, tabla):
+        return inspect(self.motor).get_foreign_keys(tabla)
+
+    def contar(self, tabla):
+        with self.motor.connect() as conexion:
+            return conexion.execute(text(f'SELECT count(*) FROM {tabla}')).scalar()
+
+    def vacia(self, tabla):
+        with self.motor.connect() as conexion:
+            return conexion.execute(text(f'SELECT 1 FROM {tabla} LIMIT 1')).first() is None
+
+    # --- Cambios de esquema ---
+
+    def ejecutar(self, sentencia, **parametros):
+        """Ejecuta SQL (o una función(conexion)) en una transacción propia."""
+        with self.motor.begin() as conexion:
+            if callable(sentencia):
+                return sentencia(conexion)
+            return conexion.execute(text(sentencia), parametros)
+
+    def anadir_columna(self, tabla, columna):
+        """
+        ALTER TABLE ... ADD COLUMN de una sqlalchemy.Column, si no existe. Una columna que
+        admite NULL y sin valor por defecto solo cambia el catálogo (SQLite y PostgreSQL),
+        sin reescribir la tabla: los valores se rellenan después con rellenar().
+        """
+        if columna.name in self.columnas(tabla):
+            return False
+        tipo = columna.type.compile(dialect=self.motor.dialect)
+        self.ejecutar(f'ALTER TABLE {tabla} ADD COLUMN {columna.name} {tipo}')
+        self.informar(f'  columna {tabla}.{columna.name} añadida')
+        return True
+
+    def crear_indice(self, nombre, tabla, columnas, unico=False):
+        """
+        Crea el índice si no existe. En PostgreSQL con CREATE INDEX CONCURRENTLY, que no
+        bloquea las escrituras (fuera de transacción). SQLite no tiene equivalente: bloquea
+        las escrituras mientras lo construye (segundos por millón de filas).
+        """
+        if nombre in self.indices(tabla):
+            return False
+        unicidad = 'UNIQUE ' if unico else ''
+        inicio = time.perf_counter()
+        if self.dialecto == 'postgresql':
+            with self.motor.connect().execution_options(isolation_level='AUTOCOMMIT') as conexion:
+                # Un CONCURRENTLY interrumpido deja un índice inválido que IF NOT EXISTS no repara
+                conexion.execute(text(f'DROP INDEX CONCURRENTLY IF EXISTS {nombre}'))
+                conexion.execute(text(f'CREATE {unicidad}INDEX CONCURRENTLY {nombre} ON {tabla} ({", ".join(columnas)})'))
+        else:
+            self.ejecutar(f'CREATE {unicidad}INDEX IF NOT EXISTS {nombre} ON {tabla} ({", ".join(columnas)})')
+        self.informar(f'  índice {nombre} creado en {time.perf_counter() - inicio:.1f} s')
+        return True
+
+    # --- Rellenos de datos ---
+
+    def rellenar(self, nombre, tabla, clave, sentencias, lote=None, **parametros):
+        """
+        Ejecuta 'sentencias' (SQL con :desde y :hasta, o una lista) sobre tramos consecutivos
+        de 'lote' claves de 'tabla' (por defecto, el de la migración): desde < clave <= hasta.
+        Una sentencia también puede ser una función(conexion, desde, hasta, **parametros) que
+        devuelve las filas modificadas, para transformaciones que no se pueden hacer en SQL.
+        Cada tramo es una transacción que guarda también hasta dónde se llegó en
+        migraciones_rellenos, así que si se interrumpe continúa por el siguiente tramo. Entre tramos espera 'pausa' segundos para que las
+        escrituras de la aplicación no esperen al relleno. Devuelve las filas modificadas.
+        """
+        if isinstance(sentencias, str) or callable(sentencias):
+            sentencias = [sentencias]
+        lote = lote or self.lote
+        progreso = self.estado_relleno(nombre)
+        nombre = f'{self.revision}:{nombre}'
+        if progreso is None:
+            with self.motor.connect() as conexion:
+                minimo = conexion.execute(text(f'SELECT min({clave}) FROM {tabla}')).scalar()
+            progreso = ((minimo or 0) - 1, 0, False)
+        desde, filas, terminado = progreso
+        if terminado:
+            return filas
+
+        siguiente = text(f'SELECT {clave} FROM {tabla} WHERE {clave} > :desde ORDER BY {clave} LIMIT 1 OFFSET :salto')
+        ultimo = text(f'SELECT max({clave}) FROM {tabla} WHERE {clave} > :desde')
+        avisado = time.monotonic()
+        while True:
+            with self.motor.begin() as conexion:
+                hasta = conexion.execute(siguiente, {'desde': desde, 'salto': lote - 1}).scalar()
+                if hasta is None: # Último tramo, más corto que el lote
+                    hasta = conexion.execute(ultimo, {'desde': desde}).scalar()
+                if hasta is not None:
+                    for sentencia in sentencias:
+                        if callable(sentencia):
+                            filas += sentencia(conexion, desde, hasta, **parametros)
+                        else:
+                            filas += max(conexion.execute(text(sentencia), {**parametros, 'desde': desde, 'hasta': hasta}).rowcount, 0)
+                    desde = hasta
+                self._guardar_progreso(conexion, nombre, desde, filas, terminado=hasta is None)
+            if hasta is None:
+                break
+            if time.monotonic() - avisado > 2:
+                self.informar(f'  {nombre}: {filas} filas, {clave} <= {hasta}')
+                avisado = time.monotonic()
+            time.sleep(self.pausa)
+        self.informar(f'  {nombre}: {filas} filas')
+        return filas
+
+    def estado_relleno(self, nombre):
+        """(ultimo, filas, terminado) del relleno 'nombre' de esta revisión, o None si no empezó."""
+        with self.motor.connect() as conexion:
+            return conexion.execute(text('SELECT ultimo, filas, terminado FROM migraciones_rellenos '
+                                         'WHERE nombre = :nombre'), {'nombre': f'{self.revision}:{nombre}'}).first()
+
+    def _guardar_progreso(self, conexion, nombre, ultimo, filas, terminado):
+        valores = {'nombre': nombre, 'ultimo': ultimo, 'filas': filas, 'terminado': terminado}
+        if conexion.execute(text('UPDATE migraciones_rellenos SET ultimo = :ultimo, filas = :filas, '
+                                 'terminado = :terminado WHERE nombre = :nombre'), valores).rowcount == 0:
+            conexion.execute(text('INSERT INTO migraciones_rellenos (nombre, ultimo, filas, terminado) '
+                                  'VALUES (:nombre, :ultimo, :filas, :terminado)'), valores)
+
+
+class Migraciones:
+    """Revisiones versionadas del esquema (revisiones/) y su registro en la tabla 'migraciones'."""
+
+    def __init__(self, directorio=DIRECTORIO):
+        self.directorio = directorio
+        self.lote = 5000
+        self.pausa = 0.05
+
+    def init_app(self, app):
+        """Lee MIGRACIONES_LOTE y MIGRACIONES_PAUSA_MS."""
+        self.lote = app.config.get('MIGRACIONES_LOTE', self.lote)
+        self.pausa = app.config.get('MIGRACIONES_PAUSA_MS', self.pausa * 1000) / 1000
+
+    def revisiones(self):
+        """[(revision, modulo)] en orden de aplicación."""
+        nombres = sorted(archivo[:-3] for archivo in os.listdir(self.directorio)
+                         if archivo.endswith('.py') and archivo[:4].isdigit())
+        return [(nombre, importlib.import_module(f'revisiones.{nombre}')) for nombre in nombres]
+
+    def _crear_tablas(self, motor):
+        with motor.begin() as conexion:
+            for sentencia in _TABLAS:
+                conexion.execute(text(sentencia))
+
+    def aplicadas(self, motor):
+        """{revision: fecha} de las revisiones ya aplicadas."""
+        self._crear_tablas(motor)
+        with motor.connect() as conexion:
+            return dict(conexion.execute(text('SELECT revision, aplicada FROM migraciones')).all())
+
+    def rellenos(self, motor):
+        """[(nombre, ultimo, filas, terminado)] de los rellenos empezados."""
+        self._crear_tablas(motor)
+        with motor.connect() as conexion:
+            return conexion.execute(text('SELECT nombre, ultimo, filas, terminado FROM migraciones_rellenos '
+                                         'ORDER BY nombre')).all()
+
+    def olvidar_rellenos(self, motor, revision):
+        """Borra el avance guardado de los rellenos de 'revision', para que empiecen de nuevo."""
+        self._crear_tablas(motor)
+        with motor.begin() as conexion:
+            conexion.execute(text('DELETE FROM migraciones_rellenos WHERE nombre LIKE :prefijo'),
+                             {'prefijo': f'{revision}:%'})
+
+    def pendientes(self, motor):
+        aplicadas = self.aplicadas(motor)
+        return [(revision, modulo) for revision, modulo in self.revisiones() if revision not in aplicadas]
+
+    def migrar(self, motor, hasta=None, lote=None, pausa=None, informar=print):
+        """Aplica en orden las revisiones pendientes (hasta 'hasta', incluida). Devuelve las aplicadas."""
+        hechas = []
+        for revision, modulo in self.pendientes(motor):
+            if hasta is not None and revision > hasta:
+                break
+            informar(f'{revision}: {descripcion(modulo)}')
+            migracion = Migracion(motor, revision, lote or self.lote,
+                                  self.pausa if pausa is None else pausa, informar)
+            modulo.aplicar(migracion)
+            with motor.begin() as conexion:
+                conexion.execute(text('INSERT INTO migraciones (revision, aplicada) VALUES (:revision, :aplicada)'),
+                                 {'revision': revision, 'aplicada': datetime.datetime.now()})
+            hechas.append(revision)
+        return hechas
+
+
+migraciones = Migraciones()
@@ -0,0 +1,451 @@
+# modelos.py
+import datetime
+
+from sqlalchemy import event
+
+from database import db
+from cache import cache_referencia
+from hashing import pool_hashing
+from metricas import instrumentacion
+from sesiones import sesiones
+import calificador
+
+# --- Definición de Modelos (Clases que representan las tablas) ---
+
+class Pagina:
+    """Resultado de una consulta paginada por clave primaria (keyset)."""
+
+    def __init__(self, elementos, clave, por_pagina, filtros, hay_anterior, hay_siguiente):
+        self.elementos = elementos
+        self.por_pagina = por_pagina
+        self.filtros = filtros # Solo los filtros con valor, para conservarlos en los enlaces
+        # Los cursores son la clave primaria del primer/último elemento mostrado
+        self.anterior = getattr(elementos[0], clave) if elementos and hay_anterior else None
+        self.siguiente = getattr(elementos[-1], clave) if elementos and hay_siguiente else None
+
+
+# Base class for common methods (optional, but good practice)
+class BaseModel(db.Model):
+    __abstract__ = True # Indica que esta clase es abstracta y no se mapeará a una tabla
+
+    def save(self):
+        """Guarda la instancia actual en la base de datos."""
+        db.session.add(self)
+        db.session.commit()
+        # print(f"Guardado: {self.__class__.__name__} con ID {getattr(self, self.__mapper__.primary_key[0].name)}")
+
+    def delete(self):
+        """Elimina la instancia actual de la base de datos."""
+        db.session.delete(self)
+        db.session.commit()
+        # print(f"Eliminado: {self.__class__.__name__} con ID {getattr(self, self.__mapper__.primary_key[0].name)}")
+
+    # Perfiles de carga anticipada por vista: nombre -> rutas de relaciones ('profesor.usuario').
+    # Así cada página de lista hace un número fijo de consultas, sin N+1 al recorrer relaciones.
+    __cargas__ = {}
+
+    @classmethod
+    def opciones_carga(cls, load):
+        """Traduce un perfil de __cargas__ a opciones joinedload/selectinload."""
+        opciones = []
+        for ruta in cls.__cargas__[load]:
+            modelo, opcion = cls, None
+            for nombre in ruta.split('.'):
+                atributo = getattr(modelo, nombre)
+                # Relaciones a uno van en el mismo JOIN; colecciones en un SELECT ... IN aparte
+                cargador = db.selectinload if atributo.property.uselist else db.joinedload
+                opcion = cargador(atributo) if opcion is None else getattr(opcion, cargador.__name__)(atributo)
+                modelo = atributo.property.mapper.class_
+            opciones.append(opcion)
+        return opciones
+
+    @classmethod
+    def get_all(cls, load=None):
+        """Obtiene todas las instancias de esta clase (con el perfil de carga 'load', si se indica)."""
+        query = cls.query
+        if load:
+            query = query.options(*cls.opciones_carga(load))
+        return query.all()
+
+    # Columnas por las que se puede filtrar una lista desde la URL (?rol=..., ?id_nivel=...)
+    __filtros__ = ()
+
+    @classmethod
+    def condiciones_filtro(cls, filtros):
+        """
+        Deja en 'filtros' solo los de __filtros__ con valor y devuelve (filtros, condiciones WHERE).
+        Lanza ValueError si un valor no corresponde al tipo de su columna.
+        """
+        filtros = {nombre: valor for nombre, valor in (filtros or {}).items()
+                   if nombre in cls.__filtros__ and valor not in (None, '')}
+        condiciones = []
+        for nombre, valor in filtros.items():
+            columna = getattr(cls, nombre)
+            # Los valores llegan como texto desde la URL; se convierten al tipo de la columna
+            if columna.type.python_type is bool:
+                valor = valor.lower() in ('1', 'true', 'si', 'sí')
+            else:
+                valor = columna.type.python_type(valor) # ValueError si no es válido
+            condiciones.append(columna == valor)
+        return filtros, condiciones
+
+    @classmethod
+    def paginar(cls, despues=None, antes=None, por_pagina=50, filtros=None, load=None):
+        """
+        Devuelve una Pagina ordenada por clave primaria usando WHERE pk > cursor LIMIT n,
+        así el coste de cada página no depende del tamaño de la tabla (a diferencia de OFFSET).
+        """
+        pk = cls.__mapper__.primary_key[0]
+        query = cls.query
+        if load:
+            query = query.options(*cls.opciones_carga(load))
+        filtros, condiciones = cls.condiciones_filtro(filtros)
+        query = query.filter(*condiciones)
+
+        # Se pide un elemento de más para saber si existe otra página sin hacer COUNT(*)
+        if antes is not None:
+            elementos = query.filter(pk < antes).order_by(pk.desc()).limit(por_pagina + 1).all()
+            hay_anterior = len(elementos) > por_pagina
+            elementos = elementos[:por_pagina][::-1]
+            return Pagina(elementos, pk.key, por_pagina, filtros, hay_anterior, True)
+
+        if despues is not None:
+            query = query.filter(pk > despues)
+        elementos = query.order_by(pk).limit(por_pagina + 1).all()
+        hay_siguiente = len(elementos) > por_pagina
+        return Pagina(elementos[:por_pagina], pk.key, por_pagina, filtros, despues is not None, hay_siguiente)
+
+    @classmethod
+    def get_by_id(cls, id):
+        """Obtiene una instancia por su ID."""
+        return cls.query.get(id)
+
+
+class Usuario(BaseModel):
+    __tablename__ = 'usuarios'
+    __filtros__ = ('rol', 'activo')
+    # Índice compuesto: filtrar por rol y paginar por id (formularios de estudiante/profesor y lista de usuarios)
+    __table_args__ = (db.Index('ix_usuarios_rol_id', 'rol', 'id_usuario'),)
+    id_usuario = db.Column(db.Integer, primary_key=True)
+    nombre = db.Column(db.String(100), nullable=False)
+    email = db.Column(db.String(120), unique=True, nullable=False)
+    # CAMBIADO: 'password' a 'contrasena_hash' y con un largo mayor para el hash
+    contrasena_hash = db.Column(db.String(255), nullable=False) 
+    rol = db.Column(db.String(50), nullable=False) # 'admin', 'profesor', 'estudiante' 
+    
+    # NUEVOS: fecha_registro y activo (si no los tenías)
+    fecha_registro = db.Column(db.DateTime, default=datetime.datetime.now)
+    activo = db.Column(db.Boolean, default=True)
+
+    # Relaciones (con ondelete/cascade para mejor manejo de eliminación)
+    # un usuario puede ser un estudiante o un profesor (o ambos, pero con roles distintos)
+    estudiante_rel = db.relationship('Estudiante', backref='usuario', uselist=False, lazy=True, cascade="all, delete-orphan")
+    profesor_rel = db.relationship('Profesor', backref='usuario', uselist=False, lazy=True, cascade="all, delete-orphan")
+
+    # --- NUEVOS MÉTODOS PARA CONTRASEÑAS ---
+    # El hash se calcula en el pool acotado de hashing.py; puede lanzar HashSaturado
+    def set_password(self, password):
+        """Hashea la contraseña y la guarda en contrasena_hash."""
+        with instrumentacion.medir('hash'):
+            self.contrasena_hash = pool_hashing.generar(password)
+
+    def check_password(self, password):
+        """Verifica si la contraseña dada coincide con el hash guardado."""
+        with instrumentacion.medir('hash'):
+            return pool_hashing.verificar(self.contrasena_hash, password)
+
+    def rehash_si_necesario(self, password):
+        """Tras un login correcto, regenera el hash si cambió HASH_METODO. Devuelve True si lo cambió."""
+        if pool_hashing.necesita_rehash(self.contrasena_hash):
+            self.set_password(password)
+            return True
+        return False
+    # -------------------------------------
+
+    def __repr__(self):
+        return f'<Usuario {self.nombre} ({self.rol})>'
+
+
+class Nivel(BaseModel):
+    __tablename__ = 'niveles'
+    id_nivel = db.Column(db.Integer, primary_key=True)
+    niveles = db.Column(db.String(80), unique=True, nullable=False)
+
+    # Relaciones
+    estudiantes = db.relationship('Estudiante', backref='nivel_obj', lazy=True)
+    profesores = db.relationship('Profesor', backref='nivel_obj', lazy=True)
+    lecciones = db.relationship('Leccion', backref='nivel_obj', lazy=True) # Si las lecciones tienen un nivel específico
+
+    def __repr__(self):
+        return f'<Nivel {self.niveles}>'
+
+
+class Estudiante(BaseModel):
+    __tablename__ = 'estudiantes'
+    __cargas__ = {'lista': ('usuario', 'nivel_obj')}
+    __filtros__ = ('id_nivel',)
+    __table_args__ = (db.Index('ix_estudiantes_nivel_id', 'id_nivel', 'id_estudiante'),)
+    id_estudiante = db.Column(db.Integer, primary_key=True)
+    id_usuario = db.Column(db.Integer, db.ForeignKey('usuarios.id_usuario'), unique=True, nullable=False)
+    id_nivel = db.Column(db.Integer, db.ForeignKey('niveles.id_nivel'), nullable=False)
+    fecha_nacimiento = db.Column(db.Date, nullable=False)
+
+    def __repr__(self):
+        return f'<Estudiante {self.usuario.nombre}>'
+
+
+class Profesor(BaseModel):
+    __tablename__ = 'profesores'
+    __cargas__ = {'lista': ('usuario', 'nivel_obj')}
+    __filtros__ = ('id_nivel',)
+    __table_args__ = (db.Index('ix_profesores_nivel_id', 'id_nivel', 'id_profesor'),)
+    id_profesor = db.Column(db.Integer, primary_key=True)
+    # MODIFICADO: Si el usuario asociado se elimina, el profesor también se elimina.
+    id_usuario = db.Column(db.Integer, db.ForeignKey('usuarios.id_usuario', ondelete='CASCADE'), unique=True, nullable=False)
+    asignatura = db.Column(db.String(100), nullable=False) # Ej: 'Gramática Inglesa', 'Conversación'
+    id_nivel = db.Column(db.Integer, db.ForeignKey('niveles.id_nivel'), nullable=True) # Opcional: si el profesor se especializa en un nivel (Aquí no se necesita ondelete si el Nivel no lo tiene)
+
+    # MODIFICADO: Si se elimina un Profesor, todas sus Lecciones asociadas también se ELIMINAN.
+    lecciones = db.relationship('Leccion', backref='profesor', lazy=True, cascade="all, delete-orphan")
+
+    def __repr__(self):
+        return f'<Profesor {self.usuario.nombre} - {self.asignatura}>'
+
+
+class Leccion(BaseModel):
+    __tablename__ = 'lecciones'
+    __cargas__ = {'lista': ('profesor.usuario', 'nivel_obj'), 'detalle': ('profesor.usuario', 'nivel_obj')}
+    __filtros__ = ('id_profesor', 'id_nivel')
+    __table_args__ = (
+        db.Index('ix_lecciones_profesor_id', 'id_profesor', 'id_leccion'),
+        db.Index('ix_lecciones_nivel_id', 'id_nivel', 'id_leccion'),
+    )
+    id_leccion = db.Column(db.Integer, primary_key=True)
+    # MODIFICADO: CLAVE PARA TU ERROR. Si el Profesor se elimina, esta Lección también se ELIMINA.
+    id_profesor = db.Column(db.Integer, db.ForeignKey('profesores.id_profesor', ondelete='CASCADE'), nullable=False)
+    titulo = db.Column(db.String(200), nullable=False)
+    contenido = db.Column(db.Text, nullable=False)
+    video = db.Column(db.String(255), nullable=True) # URL de video
+    
+    # MODIFICADO: Si el Nivel se elimina, el id_nivel en esta Lección se pone a NULL.
+    id_nivel = db.Column(db.Integer, db.ForeignKey('niveles.id_nivel', ondelete='SET NULL'), nullable=True) 
+    # Versión para ETag y caché de fragmentos: cambia en cada UPDATE hecho con el ORM
+    updated_at = db.Column(db.DateTime, default=datetime.datetime.now, onupdate=datetime.datetime.now)
+
+    # MODIFICADO: Si se elimina una Lección, todos sus Ejercicios asociados también se ELIMINAN.
+    ejercicios = db.relationship('Ejercicio', backref='leccion', lazy=True, cascade="all, delete-orphan")
+
+    def __repr__(self):
+        return f'<Leccion {self.titulo}>'
+
+
+class Ejercicio(BaseModel):
+    __tablename__ = 'ejercicios'
+    # Las opciones se cargan con un SELECT ... IN por página, no una consulta por ejercicio
+    __cargas__ = {'lista': ('leccion', 'opciones'), 'detalle': ('leccion', 'opciones')}
+    __filtros__ = ('id_leccion', 'tipo')
+    __table_args__ = (
+        db.Index('ix_ejercicios_leccion_id', 'id_leccion', 'id_ejercicio'),
+        db.Index('ix_ejercicios_tipo_id', 'tipo', 'id_ejercicio'),
+    )
+    id_ejercicio = db.Column(db.Integer, primary_key=True)
+    # MODIFICADO: Si la Lección se elimina, este Ejercicio también se ELIMINA.
+    id_leccion = db.Column(db.Integer, db.ForeignKey('lecciones.id_leccion', ondelete='CASCADE'), nullable=False)
+    pregunta = db.Column(db.Text, nullable=False)
+    tipo = db.Column(db.String(50), nullable=False) # Ej: 'multiple_choice', 'fill_in_the_blank', 'short_answer'
+    respuesta = db.Column(db.Text, nullable=False)
+    # Versión para ETag y caché de fragmentos: cambia en cada UPDATE hecho con el ORM
+    updated_at = db.Column(db.DateTime, default=datetime.datetime.now, onupdate=datetime.datetime.now)
+
+    # Opciones de multiple_choice en su orden (antes, texto separado por comas en ejercicios.opciones).
+    # Ordenar también por id_ejercicio deja que el SELECT ... IN de selectinload recorra
+    # ux_opciones_ejercicio_orden sin ordenar en un B-tree temporal
+    opciones = db.relationship('OpcionEjercicio', order_by='(OpcionEjercicio.id_ejercicio, OpcionEjercicio.orden)', lazy=True,
+                               cascade="all, delete-orphan")
+
+    def asignar_opciones(self, textos):
+        """
+        Sustituye las opciones por 'textos' (en orden) y marca como correcta la que coincide con
+        la respuesta. Reutiliza las filas por posición, así (id_ejercicio, orden) nunca se repite.
+        """
+        respuesta = calificador.normalizar(self.respuesta)
+        nuevas = [(texto, calificador.normalizar(texto) == respuesta) for texto in textos]
+        if [(opcion.texto, opcion.correcta) for opcion in self.opciones] == nuevas:
+            return
+        for orden, (texto, correcta) in enumerate(nuevas):
+            if orden < len(self.opciones):
+                self.opciones[orden].texto, self.opciones[orden].correcta = texto, correcta
+            else:
+                self.opciones.append(OpcionEjercicio(orden=orden, texto=texto, correcta=correcta))
+        del self.opciones[len(nuevas):]
+        # Cambiar solo las opciones también es una nueva versión del ejercicio (ETag, fragmentos)
+        self.updated_at = datetime.datetime.now()
+
+    def __repr__(self):
+        return f'<Ejercicio {self.id_ejercicio} - {self.pregunta[:30]}...>'
+
+
+class OpcionEjercicio(BaseModel):
+    __tablename__ = 'opciones_ejercicio'
+    # Busca las opciones de un ejercicio ya ordenadas y evita dos opciones en la misma posición
+    __table_args__ = (db.Index('ux_opciones_ejercicio_orden', 'id_ejercicio', 'orden', unique=True),)
+    id_opcion = db.Column(db.Integer, primary_key=True)
+    id_ejercicio = db.Column(db.Integer, db.ForeignKey('ejercicios.id_ejercicio', ondelete='CASCADE'), nullable=False)
+    orden = db.Column(db.Integer, nullable=False)
+    texto = db.Column(db.Text, nullable=False)
+    correcta = db.Column(db.Boolean, nullable=False, default=False)
+
+    def __repr__(self):
+        return f'<Opcion {self.orden} de Ejercicio {self.id_ejercicio}>'
+
+
+class ProgresoEstudiante(BaseModel):
+    __tablename__ = 'progreso_estudiantes'
+    __filtros__ = ('id_estudiante', 'id_ejercicio')
+    __table_args__ = (
+        # Un mismo intento no puede registrarse dos veces; también sirve para buscar por estudiante
+        db.Index('ux_progreso_estudiante_ejercicio_fecha', 'id_estudiante', 'id_ejercicio', 'fecha_completado', unique=True),
+        db.Index('ix_progreso_ejercicio', 'id_ejercicio'),
+    )
+    id_progreso = db.Column(db.Integer, primary_key=True)
+    id_estudiante = db.Column(db.Integer, db.ForeignKey('estudiantes.id_estudiante'), nullable=False)
+    id_ejercicio = db.Column(db.Integer, db.ForeignKey('ejercicios.id_ejercicio'), nullable=False)
+    fecha_completado = db.Column(db.DateTime, default=datetime.datetime.now)
+    puntuacion = db.Column(db.Integer, nullable=True)
+    respuesta_estudiante = db.Column(db.Text, nullable=True)
+
+    # Relaciones
+    estudiante = db.relationship('Estudiante', backref='progresos', lazy=True)
+    ejercicio = db.relationship('Ejercicio', backref='progresos', lazy=True)
+
+    def __repr__(self):
+        return f'<Progreso: Estudiante {self.id_estudiante} - Ejercicio {self.id_ejercicio}>'
+
+
+# --- Repetición espaciada ---
+# Estado de cada ejercicio que un estudiante ha intentado y fecha del próximo repaso; se
+# actualiza al registrar intentos (repasos.py). Es la cola de repasos del estudiante.
+
+class Repaso(BaseModel):
+    __tablename__ = 'repasos'
+    __table_args__ = (
+        # Los siguientes repasos de un estudiante son un tramo de este índice, ya ordenado (y
+        # sin leer la tabla: id_ejercicio va en el índice)
+        db.Index('ix_repasos_estudiante_proximo', 'id_estudiante', 'proximo', 'id_ejercicio'),
+        db.Index('ix_repasos_ejercicio', 'id_ejercicio'), # Borrado por lotes de ejercicios (borrados.py)
+    )
+    id_estudiante = db.Column(db.Integer, db.ForeignKey('estudiantes.id_estudiante', ondelete='CASCADE'), primary_key=True)
+    id_ejercicio = db.Column(db.Integer, db.ForeignKey('ejercicios.id_ejercicio', ondelete='CASCADE'), primary_key=True)
+    proximo = db.Column(db.DateTime, nullable=False)
+    intervalo = db.Column(db.Float, nullable=False, default=0) # Días hasta el próximo repaso tras un acierto
+    facilidad = db.Column(db.Float, nullable=False, default=2.5) # Factor por el que crece el intervalo
+    repeticiones = db.Column(db.Integer, nullable=False, default=0) # Aciertos seguidos
+    ultimo_intento = db.Column(db.DateTime, nullable=False)
+
+    def __repr__(self):
+        return f'<Repaso: Estudiante {self.id_estudiante} - Ejercicio {self.id_ejercicio}>'
+
+
+# --- Resúmenes precalculados del progreso ---
+# Se actualizan de forma incremental al registrar intentos (registrar_intentos) y se pueden
+# reconstruir con 'flask recalcular-resumenes'. Evitan GROUP BY sobre progreso_estudiantes.
+
+class ResumenEstudianteLeccion(BaseModel):
+    __tablename__ = 'resumen_estudiante_leccion'
+    # La clave primaria empieza por estudiante; este índice sirve para borrar los de una lección (borrados.py)
+    __table_args__ = (db.Index('ix_resumen_leccion', 'id_leccion'),)
+    id_estudiante = db.Column(db.Integer, db.ForeignKey('estudiantes.id_estudiante', ondelete='CASCADE'), primary_key=True)
+    id_leccion = db.Column(db.Integer, db.ForeignKey('lecciones.id_leccion', ondelete='CASCADE'), primary_key=True)
+    intentos = db.Column(db.Integer, nullable=False, default=0)
+    suma_puntuacion = db.Column(db.Integer, nullable=False, default=0)
+    ejercicios_realizados = db.Column(db.Integer, nullable=False, default=0) # Ejercicios distintos con algún intento
+
+    def __repr__(self):
+        return f'<Resumen: Estudiante {self.id_estudiante} - Leccion {self.id_leccion}>'
+
+
+class ResumenNivel(BaseModel):
+    __tablename__ = 'resumen_niveles'
+    id_nivel = db.Column(db.Integer, db.ForeignKey('niveles.id_nivel', ondelete='CASCADE'), primary_key=True)
+    intentos = db.Column(db.Integer, nullable=False, default=0)
+    suma_puntuacion = db.Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f'<Resumen: Nivel {self.id_nivel}>'
+
+
+# --- Clasificaciones por nivel y por lección ---
+# Puntos acumulados de cada estudiante en cada clasificación y, por clasificación, cuántos
+# estudiantes hay en cada tramo de puntos (clasificaciones.py). Se actualizan al registrar
+# intentos y se reconstruyen con 'flask recalcular-clasificaciones'.
+
+class PuntosClasificacion(BaseModel):
+    __tablename__ = 'clasificacion_puntos'
+    __table_args__ = (db.Index('ix_clasificacion_puntos_estudiante', 'id_estudiante'),) # Estudiantes borrados
+    ambito = db.Column(db.String(10), primary_key=True) # 'nivel' o 'leccion' (nivel de la lección del ejercicio)
+    id_ambito = db.Column(db.Integer, primary_key=True)
+    id_estudiante = db.Column(db.Integer, db.ForeignKey('estudiantes.id_estudiante', ondelete='CASCADE'), primary_key=True)
+    puntos = db.Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f'<Puntos: {self.ambito} {self.id_ambito} - Estudiante {self.id_estudiante}>'
+
+# Una clasificación es un tramo de este índice, ya en orden (más puntos primero; a igualdad, por id)
+db.Index('ix_clasificacion_orden', PuntosClasificacion.ambito, PuntosClasificacion.id_ambito,
+         PuntosClasificacion.puntos.desc(), PuntosClasificacion.id_estudiante)
+
+
+class ConteoClasificacion(BaseModel):
+    __tablename__ = 'clasificacion_conteos'
+    # Estudiantes de la clasificación con puntos >> (4 * escala) == tramo (los de tramo 0 no se guardan)
+    ambito = db.Column(db.String(10), primary_key=True)
+    id_ambito = db.Column(db.Integer, primary_key=True)
+    escala = db.Column(db.Integer, primary_key=True)
+    tramo = db.Column(db.Integer, primary_key=True)
+    estudiantes = db.Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f'<Conteo: {self.ambito} {self.id_ambito} - {self.escala}/{self.tramo}>'
+
+
+# --- Invalidación de la caché de referencia ---
+# Cualquier commit (BaseModel.save()/delete() o db.session.commit() directo en las rutas)
+# invalida las entradas que dependen de las tablas modificadas.
+
+@event.listens_for(db.session, 'after_flush')
+def registrar_tablas_modificadas(sesion, contexto):
+    tablas = sesion.info.setdefault('tablas_modificadas', set())
+    for objeto in list(sesion.new) + list(sesion.dirty) + list(sesion.deleted):
+        tablas.add(objeto.__tablename__)
+
+@event.listens_for(db.session, 'after_commit')
+def invalidar_cache_referencia(sesion):
+    cache_referencia.invalidar(*sesion.info.pop('tablas_modificadas', ()))
+
+@event.listens_for(db.session, 'after_rollback')
+def descartar_tablas_modificadas(sesion):
+    sesion.info.pop('tablas_modificadas', None)
+
+
+# --- Revocación de sesiones ---
+# Desactivar, borrar o cambiar el rol de un usuario cierra en el acto sus sesiones abiertas
+# (en todos los workers), así que login_required no necesita consultar la base de datos.
+
+@event.listens_for(db.session, 'after_flush')
+def registrar_usuarios_a_revocar(sesion, contexto):
+    revocar = sesion.info.setdefault('usuarios_a_revocar', set())
+    for objeto in sesion.dirty:
+        if isinstance(objeto, Usuario):
+            estado = db.inspect(objeto)
+            if estado.attrs.activo.history.has_changes() or estado.attrs.rol.history.has_changes():
+                revocar.add(objeto.id_usuario)
+    revocar.update(objeto.id_usuario for objeto in sesion.deleted if isinstance(objeto, Usuario))
+
+@event.listens_for(db.session, 'after_commit')
+def revocar_sesiones(sesion):
+    for id_usuario in sesion.info.pop('usuarios_a_revocar', ()):
+        sesiones.revocar_usuario(id_usuario)
+
+@event.listens_for(db.session, 'after_rollback')
+def descartar_usuarios_a_revocar(sesion):
+    sesion.info.pop('usuarios_a_revocar', None)
@@ -0,0 +1,79 @@
+# permisos.py
+from flask import session
+
+# Catálogo de permisos: nombre -> qué permite
+PERMISOS = {
+    'niveles.ver': 'Ver la lista y el detalle de los niveles',
+    'niveles.editar': 'Crear, editar y eliminar niveles',
+    'usuarios.ver': 'Ver la lista y el detalle de los usuarios',
+    'usuarios.editar': 'Crear, editar y eliminar usuarios',
+    'estudiantes.ver': 'Ver la lista, el detalle y el progreso de los estudiantes',
+    'estudiantes.editar': 'Crear, editar y eliminar estudiantes',
+    'profesores.ver': 'Ver la lista y el detalle de los profesores',
+    'profesores.editar': 'Crear, editar y eliminar profesores',
+    'lecciones.ver': 'Ver las lecciones',
+    'lecciones.editar': 'Crear, editar y eliminar lecciones',
+    'ejercicios.ver': 'Ver los ejercicios',
+    'ejercicios.editar': 'Crear, editar y eliminar ejercicios',
+    'ejercicios.ver_respuesta': 'Ver la respuesta correcta de los ejercicios',
+    'ejercicios.responder': 'Responder ejercicios como estudiante',
+    'ejercicios.responder_por_otro': 'Registrar respuestas en nombre de un estudiante (id_estudiante)',
+    'progreso.ver': 'Consultar progreso (los estudiantes, solo el suyo)',
+    'informes.exportar': 'Descargar informes CSV/PDF de progreso y estudiantes',
+    'importar': 'Importar datos desde CSV/JSON',
+    'tareas.ver': 'Ver todas las tareas en segundo plano (cada usuario ve siempre las suyas)',
+}
+
+# Permisos de cada rol ('*' = todos). Se puede sustituir con PERMISOS en la configuración.
+MATRIZ = {
+    'admin': ('*',),
+    'profesor': ('estudiantes.ver', 'estudiantes.editar', 'lecciones.ver', 'lecciones.editar',
+                 'ejercicios.ver', 'ejercicios.editar', 'ejercicios.ver_respuesta', 'progreso.ver',
+                 'informes.exportar'),
+    'estudiante': ('lecciones.ver', 'ejercicios.ver', 'ejercicios.responder', 'progreso.ver'),
+}
+
+_NINGUNO = frozenset()
+
+
+class MatrizPermisos:
+    """
+    Matriz rol -> permisos compilada una vez al arrancar en un frozenset por rol: comprobar un
+    permiso es una búsqueda en un conjunto, y las plantillas reciben ese mismo conjunto como
+    'puede' ({% if 'lecciones.editar' in puede %}) en lugar de comparar el rol en cada fila.
+    """
+
+    def __init__(self, matriz=MATRIZ):
+        self.compilar(matriz)
+
+    def init_app(self, app):
+        """Compila PERMISOS de la configuración (si lo hay) y expone 'puede' a las plantillas."""
+        self.compilar(app.config.get('PERMISOS', self.matriz))
+        app.context_processor(lambda: {'puede': self.de_rol(session.get('user_rol'))})
+
+    def compilar(self, matriz):
+        por_rol = {}
+        for rol, concedidos in matriz.items():
+            desconocidos = set(concedidos) - set(PERMISOS) - {'*'}
+            if desconocidos:
+                raise ValueError(f'Permisos desconocidos para el rol {rol}: {", ".join(sorted(desconocidos))}')
+            por_rol[rol] = frozenset(PERMISOS) if '*' in concedidos else frozenset(concedidos)
+        self.matriz = matriz
+        self._por_rol = por_rol
+
+    @staticmethod
+    def validar(permiso):
+        """Lanza ValueError si el permiso no está en el catálogo (p. ej. una errata en un decorador)."""
+        if permiso not in PERMISOS:
+            raise ValueError(f'Permiso desconocido: {permiso}')
+        return permiso
+
+    def de_rol(self, rol):
+        """Conjunto de permisos del rol (vacío si el rol no existe o no hay sesión)."""
+        return self._por_rol.get(rol, _NINGUNO)
+
+    def permite(self, rol, permiso):
+        return permiso in self._por_rol.get(rol, _NINGUNO)
+
+
+permisos = MatrizPermisos()
@@ -0,0 +1,207 @@
+# progreso.py
+import datetime
+from collections import defaultdict, namedtuple
+
+from sqlalchemy import func
+
+from database import db, upsert_sumando
+from cache import cache_ejercicios
+from modelos import (Nivel, Estudiante, Leccion, Ejercicio, OpcionEjercicio, ProgresoEstudiante, ResumenEstudianteLeccion,
+                     ResumenNivel)
+from repasos import actualizar_repasos
+from clasificaciones import actualizar_clasificaciones
+from tareas import tareas
+import calificador
+
+# --- Calificación automática y registro de intentos ---
+
+def ejercicios_compilados(ids):
+    """Devuelve {id_ejercicio: EjercicioCompilado}; los que no están en caché se cargan con un solo IN."""
+    def cargar(faltan):
+        filas = db.session.execute(
+            db.select(Ejercicio.id_ejercicio, Ejercicio.id_leccion, Ejercicio.tipo, Ejercicio.respuesta)
+            .where(Ejercicio.id_ejercicio.in_(faltan))).all()
+        # Las opciones de todos los de opción múltiple con un IN más, ya en su orden
+        opciones = defaultdict(list)
+        con_opciones = [fila.id_ejercicio for fila in filas if fila.tipo == 'multiple_choice']
+        if con_opciones:
+            for id_ejercicio, texto in db.session.execute(
+                    db.select(OpcionEjercicio.id_ejercicio, OpcionEjercicio.texto)
+                    .where(OpcionEjercicio.id_ejercicio.in_(con_opciones))
+                    .order_by(OpcionEjercicio.id_ejercicio, OpcionEjercicio.orden)):
+                opciones[id_ejercicio].append(texto)
+        return {fila.id_ejercicio: calificador.compilar(fila.id_ejercicio, fila.id_leccion, fila.tipo,
+                                                        opciones.get(fila.id_ejercicio), fila.respuesta)
+                for fila in filas}
+    return cache_ejercicios.obtener_varios(list(ids), cargar, tablas=('ejercicios', 'opciones_ejercicio'))
+
+def registrar_intentos(id_estudiante, intentos):
+    """
+    Califica una lista de (EjercicioCompilado, respuesta) y guarda todos los intentos con
+    un único INSERT executemany en la misma transacción, junto con los resúmenes, la cola de
+    repasos y las clasificaciones del estudiante. Devuelve la lista de resultados.
+    """
+    ahora = datetime.datetime.now()
+    filas = [{
+        'id_estudiante': id_estudiante,
+        'id_ejercicio': compilado.id_ejercicio,
+        'fecha_completado': ahora,
+        'puntuacion': calificador.calificar(compilado, respuesta),
+        'respuesta_estudiante': respuesta,
+    } for compilado, respuesta in intentos]
+    db.session.execute(db.insert(ProgresoEstudiante), filas)
+    actualizar_resumenes(id_estudiante, intentos, filas)
+    actualizar_repasos(id_estudiante, filas)
+    actualizar_clasificaciones(id_estudiante, intentos, filas)
+    db.session.commit()
+    return [{'id_ejercicio': fila['id_ejercicio'], 'puntuacion': fila['puntuacion'],
+             'correcta': fila['puntuacion'] == calificador.PUNTUACION_MAXIMA} for fila in filas]
+
+def actualizar_resumenes(id_estudiante, intentos, filas):
+    """
+    Suma los intentos recién insertados (filas de progreso de registrar_intentos) a los resúmenes
+    del estudiante por lección y de su nivel, en la misma transacción que el INSERT.
+    """
+    ids = {compilado.id_ejercicio for compilado, _ in intentos}
+    # Ejercicios que ya tenían un intento anterior (índice único id_estudiante, id_ejercicio, fecha)
+    fecha = filas[0]['fecha_completado']
+    previos = set(db.session.scalars(
+        db.select(ProgresoEstudiante.id_ejercicio).distinct()
+        .where(ProgresoEstudiante.id_estudiante == id_estudiante, ProgresoEstudiante.id_ejercicio.in_(ids),
+               ProgresoEstudiante.fecha_completado < fecha)))
+
+    por_leccion = {}
+    for (compilado, _), fila in zip(intentos, filas):
+        resumen = por_leccion.setdefault(compilado.id_leccion, {
+            'id_estudiante': id_estudiante, 'id_leccion': compilado.id_leccion,
+            'intentos': 0, 'suma_puntuacion': 0, 'ejercicios_realizados': 0})
+        resumen['intentos'] += 1
+        resumen['suma_puntuacion'] += fila['puntuacion']
+        if compilado.id_ejercicio not in previos:
+            resumen['ejercicios_realizados'] += 1
+    upsert_sumando(ResumenEstudianteLeccion, list(por_leccion.values()),
+                   ('intentos', 'suma_puntuacion', 'ejercicios_realizados'))
+
+    id_nivel = db.session.scalar(db.select(Estudiante.id_nivel).where(Estudiante.id_estudiante == id_estudiante))
+    upsert_sumando(ResumenNivel, [{'id_nivel': id_nivel, 'intentos': len(filas),
+                                   'suma_puntuacion': sum(fila['puntuacion'] for fila in filas)}],
+                   ('intentos', 'suma_puntuacion'))
+
+def cambiar_nivel_estudiante(id_estudiante, anterior, nuevo):
+    """
+    Pasa los intentos del estudiante del resumen del nivel 'anterior' al de 'nuevo', en la
+    transacción que le cambia el nivel: recalcular_resumenes los cuenta en su nivel actual.
+    """
+    if anterior == nuevo:
+        return
+    resumen = ResumenEstudianteLeccion
+    intentos, suma = db.session.execute(
+        db.select(func.coalesce(func.sum(resumen.intentos), 0), func.coalesce(func.sum(resumen.suma_puntuacion), 0))
+        .where(resumen.id_estudiante == id_estudiante)).one()
+    if not intentos:
+        return
+    # Ordenados, para que dos transacciones no se bloqueen cruzadas en PostgreSQL
+    upsert_sumando(ResumenNivel, sorted([{'id_nivel': anterior, 'intentos': -intentos, 'suma_puntuacion': -suma},
+                                         {'id_nivel': nuevo, 'intentos': intentos, 'suma_puntuacion': suma}],
+                                        key=lambda fila: fila['id_nivel']),
+                   ('intentos', 'suma_puntuacion'))
+
+def cambiar_leccion_ejercicio(id_ejercicio, anterior, nueva):
+    """
+    Pasa los intentos del ejercicio del resumen de cada estudiante en la lección 'anterior' al
+    de 'nueva', en la transacción que lo cambia de lección: recalcular_resumenes los cuenta en
+    su lección actual. El nivel no cambia (resumen_niveles va por el nivel del estudiante).
+    """
+    if anterior == nueva:
+        return
+    progreso = ProgresoEstudiante
+    filas = []
+    for id_estudiante, intentos, suma in db.session.execute(
+            db.select(progreso.id_estudiante, func.count(), func.coalesce(func.sum(progreso.puntuacion), 0))
+            .where(progreso.id_ejercicio == id_ejercicio).group_by(progreso.id_estudiante)):
+        for id_leccion, signo in ((anterior, -1), (nueva, 1)):
+            filas.append({'id_estudiante': id_estudiante, 'id_leccion': id_leccion, 'intentos': signo * intentos,
+                          'suma_puntuacion': signo * suma, 'ejercicios_realizados': signo})
+    if not filas:
+        return
+    resumen = ResumenEstudianteLeccion
+    # Ordenados, para que dos transacciones no se bloqueen cruzadas en PostgreSQL
+    upsert_sumando(resumen, sorted(filas, key=lambda fila: (fila['id_estudiante'], fila['id_leccion'])),
+                   ('intentos', 'suma_puntuacion', 'ejercicios_realizados'))
+    # Sin intentos, la lección anterior desaparece del progreso del estudiante (como en borrados.descontar_intentos)
+    db.session.execute(db.delete(resumen).where(resumen.id_leccion == anterior, resumen.intentos <= 0)
+                       .execution_options(synchronize_session=False))
+
+@tareas.tarea('recalcular_resumenes')
+def recalcular_resumenes():
+    """Reconstruye resumen_estudiante_leccion y resumen_niveles desde progreso_estudiantes. Devuelve cuántos quedan."""
+    progreso = ProgresoEstudiante
+    por_leccion = (
+        db.select(progreso.id_estudiante, Ejercicio.id_leccion, func.count(),
+                  func.coalesce(func.sum(progreso.puntuacion), 0), func.count(progreso.id_ejercicio.distinct()))
+        .join(Ejercicio, Ejercicio.id_ejercicio == progreso.id_ejercicio)
+        .group_by(progreso.id_estudiante, Ejercicio.id_leccion))
+    por_nivel = (
+        db.select(Estudiante.id_nivel, func.count(), func.coalesce(func.sum(progreso.puntuacion), 0))
+        .join(Estudiante, Estudiante.id_estudiante == progreso.id_estudiante)
+        .group_by(Estudiante.id_nivel))
+
+    # Todo en una transacción: los lectores ven los resúmenes anteriores hasta el commit
+    db.session.execute(db.delete(ResumenEstudianteLeccion))
+    db.session.execute(db.delete(ResumenNivel))
+    db.session.execute(db.insert(ResumenEstudianteLeccion).from_select(
+        ['id_estudiante', 'id_leccion', 'intentos', 'suma_puntuacion', 'ejercicios_realizados'], por_leccion))
+    db.session.execute(db.insert(ResumenNivel).from_select(['id_nivel', 'intentos', 'suma_puntuacion'], por_nivel))
+    db.session.commit()
+    return {'resumen_estudiante_leccion': ResumenEstudianteLeccion.query.count(),
+            'resumen_niveles': ResumenNivel.query.count()}
+
+# Estadísticas leídas de los resúmenes: el coste no depende del tamaño del historial
+
+TotalesEstudiante = namedtuple('TotalesEstudiante', 'intentos promedio realizados total_ejercicios porcentaje')
+PromedioNivel = namedtuple('PromedioNivel', 'nivel intentos promedio')
+ProgresoLeccion = namedtuple('ProgresoLeccion', 'id_leccion titulo intentos promedio realizados total_ejercicios porcentaje')
+
+def _promedio(suma, intentos):
+    return round(suma / intentos, 1) if intentos else None
+
+def _porcentaje(realizados, total):
+    return round(100 * realizados / total) if total else 0
+
+def totales_estudiante(estudiante):
+    """Intentos, puntuación media y ejercicios realizados del estudiante sobre los de su nivel."""
+    intentos, suma, realizados = db.session.execute(
+        db.select(func.coalesce(func.sum(ResumenEstudianteLeccion.intentos), 0),
+                  func.coalesce(func.sum(ResumenEstudianteLeccion.suma_puntuacion), 0),
+                  func.coalesce(func.sum(ResumenEstudianteLeccion.ejercicios_realizados), 0))
+        .where(ResumenEstudianteLeccion.id_estudiante == estudiante.id_estudiante)).one()
+    total = db.session.scalar(
+        db.select(func.count(Ejercicio.id_ejercicio)).join(Leccion, Ejercicio.id_leccion == Leccion.id_leccion)
+        .where(Leccion.id_nivel == estudiante.id_nivel))
+    return TotalesEstudiante(intentos, _promedio(suma, intentos), realizados, total, _porcentaje(realizados, total))
+
+def progreso_por_leccion(estudiante):
+    """Una fila por lección del nivel del estudiante (o con intentos suyos), en una sola consulta."""
+    total_ejercicios = (db.select(func.count(Ejercicio.id_ejercicio))
+                        .where(Ejercicio.id_leccion == Leccion.id_leccion).scalar_subquery())
+    resumen = ResumenEstudianteLeccion
+    filas = db.session.execute(
+        db.select(Leccion.id_leccion, Leccion.titulo, resumen.intentos, resumen.suma_puntuacion,
+                  resumen.ejercicios_realizados, total_ejercicios)
+        .outerjoin(resumen, (resumen.id_leccion == Leccion.id_leccion)
+                   & (resumen.id_estudiante == estudiante.id_estudiante))
+        .where(Leccion.id_leccion.in_(
+            db.select(Leccion.id_leccion).where(Leccion.id_nivel == estudiante.id_nivel)
+            .union(db.select(resumen.id_leccion).where(resumen.id_estudiante == estudiante.id_estudiante))))
+        .order_by(Leccion.id_leccion))
+    return [ProgresoLeccion(id_leccion, titulo, intentos or 0, _promedio(suma, intentos),
+                            realizados or 0, total, _porcentaje(realizados or 0, total))
+            for id_leccion, titulo, intentos, suma, realizados, total in filas]
+
+def promedios_niveles():
+    """Intentos y puntuación media por nivel, desde resumen_niveles."""
+    filas = db.session.execute(
+        db.select(Nivel.niveles, ResumenNivel.intentos, ResumenNivel.suma_puntuacion)
+        .join(ResumenNivel, ResumenNivel.id_nivel == Nivel.id_nivel)
+        .order_by(Nivel.id_nivel))
+    return [PromedioNivel(nivel, intentos, _promedio(suma, intentos)) for nivel, intentos, suma in filas]
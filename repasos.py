@@ -0,0 +1,121 @@
+# repasos.py
+import datetime
+from collections import namedtuple
+from itertools import groupby
+
+from database import db, insert_dialecto
+from modelos import Leccion, Ejercicio, Repaso
+
+# --- Programación de repasos (repetición espaciada, variante de SM-2) ---
+# Tras un acierto el ejercicio vuelve al cabo de 1 día, luego de 6, y después el intervalo se
+# multiplica por la 'facilidad' del ejercicio para ese estudiante, que sube con cada acierto.
+# Tras un fallo vuelve en unos minutos, empieza de nuevo y la facilidad baja.
+
+APROBADO = 60 # Puntuación mínima (de calificador.PUNTUACION_MAXIMA) que cuenta como acierto
+FACILIDAD_INICIAL = 2.5
+FACILIDAD_MINIMA = 1.3
+FACILIDAD_MAXIMA = 3.0
+PRIMEROS_INTERVALOS = (1, 6) # Días tras el primer y el segundo acierto seguidos
+TRAS_FALLO = datetime.timedelta(minutes=10)
+
+Estado = namedtuple('Estado', 'repeticiones intervalo facilidad')
+ESTADO_INICIAL = Estado(0, 0.0, FACILIDAD_INICIAL)
+
+
+def programar(estado, puntuacion, fecha):
+    """Devuelve (Estado, fecha del próximo repaso) tras un intento con 'puntuacion' en 'fecha'."""
+    if (puntuacion or 0) >= APROBADO:
+        repeticiones = estado.repeticiones + 1
+        if repeticiones <= len(PRIMEROS_INTERVALOS):
+            intervalo = float(PRIMEROS_INTERVALOS[repeticiones - 1])
+        else:
+            intervalo = round(estado.intervalo * estado.facilidad, 2)
+        facilidad = min(round(estado.facilidad + 0.1, 2), FACILIDAD_MAXIMA)
+        return Estado(repeticiones, intervalo, facilidad), fecha + datetime.timedelta(days=intervalo)
+    return Estado(0, 0.0, max(round(estado.facilidad - 0.2, 2), FACILIDAD_MINIMA)), fecha + TRAS_FALLO
+
+def _fila(id_estudiante, id_ejercicio, estado, proximo, fecha):
+    return {'id_estudiante': id_estudiante, 'id_ejercicio': id_ejercicio, 'proximo': proximo,
+            'intervalo': estado.intervalo, 'facilidad': estado.facilidad, 'repeticiones': estado.repeticiones,
+            'ultimo_intento': fecha}
+
+def desde_historial(intentos):
+    """
+    Filas de 'repasos' a partir de intentos (id_estudiante, id_ejercicio, fecha_completado,
+    puntuacion) ordenados por estudiante, ejercicio y fecha: repite la programación intento a intento.
+    """
+    for (id_estudiante, id_ejercicio), del_par in groupby(intentos, key=lambda intento: intento[:2]):
+        estado = ESTADO_INICIAL
+        for _, _, fecha, puntuacion in del_par:
+            estado, proximo = programar(estado, puntuacion, fecha)
+        yield _fila(id_estudiante, id_ejercicio, estado, proximo, fecha)
+
+def actualizar_repasos(id_estudiante, filas):
+    """
+    Reprograma los ejercicios de las filas de progreso recién insertadas (registrar_intentos), en
+    la misma transacción: una lectura por clave primaria y un INSERT ... ON CONFLICT DO UPDATE.
+    """
+    estados = {id_ejercicio: Estado(repeticiones, intervalo, facilidad)
+               for id_ejercicio, repeticiones, intervalo, facilidad in db.session.execute(
+                   db.select(Repaso.id_ejercicio, Repaso.repeticiones, Repaso.intervalo, Repaso.facilidad)
+                   .where(Repaso.id_estudiante == id_estudiante,
+                          Repaso.id_ejercicio.in_({fila['id_ejercicio'] for fila in filas})))}
+    nuevas = {}
+    for fila in sorted(filas, key=lambda fila: fila['fecha_completado']):
+        id_ejercicio, fecha = fila['id_ejercicio'], fila['fecha_completado']
+        estado, proximo = programar(estados.get(id_ejercicio, ESTADO_INICIAL), fila['puntuacion'], fecha)
+        estados[id_ejercicio] = estado
+        nuevas[id_ejercicio] = _fila(id_estudiante, id_ejercicio, estado, proximo, fecha)
+
+    sentencia = insert_dialecto(Repaso.__table__)
+    sentencia = sentencia.on_conflict_do_update(
+        index_elements=['id_estudiante', 'id_ejercicio'],
+        set_={columna: sentencia.excluded[columna]
+              for columna in ('proximo', 'intervalo', 'facilidad', 'repeticiones', 'ultimo_intento')})
+    db.session.execute(sentencia, list(nuevas.values()))
+
+
+# --- Siguientes ejercicios de un estudiante ---
+
+# motivo: 'repaso' (vencido), 'nuevo' (sin intentos) o 'adelantado' (repaso aún no vencido)
+Siguiente = namedtuple('Siguiente', 'ejercicio motivo proximo')
+
+def _repasos(estudiante, condicion, cantidad):
+    # Tramo de ix_repasos_estudiante_proximo en orden; el nivel se comprueba por clave primaria
+    return db.session.execute(
+        db.select(Repaso.id_ejercicio, Repaso.proximo)
+        .join(Ejercicio, Ejercicio.id_ejercicio == Repaso.id_ejercicio)
+        .join(Leccion, Leccion.id_leccion == Ejercicio.id_leccion)
+        .where(Repaso.id_estudiante == estudiante.id_estudiante, condicion, Leccion.id_nivel == estudiante.id_nivel)
+        .order_by(Repaso.proximo).limit(cantidad)).all()
+
+def _nuevos(estudiante, cantidad):
+    # Ejercicios del nivel en el orden de las lecciones, saltando los que ya están en su cola
+    intentado = (db.select(Repaso.id_ejercicio)
+                 .where(Repaso.id_estudiante == estudiante.id_estudiante, Repaso.id_ejercicio == Ejercicio.id_ejercicio))
+    return db.session.scalars(
+        db.select(Ejercicio.id_ejercicio).join(Leccion, Leccion.id_leccion == Ejercicio.id_leccion)
+        .where(Leccion.id_nivel == estudiante.id_nivel, ~intentado.exists())
+        .order_by(Leccion.id_leccion, Ejercicio.id_ejercicio).limit(cantidad)).all()
+
+def siguientes(estudiante, cantidad, ahora=None):
+    """
+    Los próximos 'cantidad' ejercicios del nivel del estudiante: primero los repasos vencidos
+    (los más atrasados antes), después ejercicios que nunca ha intentado y, si aún faltan, los
+    próximos repasos por vencer. Son lecturas de tramos de índice con LIMIT: el coste no
+    depende del número de intentos del estudiante.
+    """
+    ahora = ahora or datetime.datetime.now()
+    elegidos = [(id_ejercicio, 'repaso', proximo)
+                for id_ejercicio, proximo in _repasos(estudiante, Repaso.proximo <= ahora, cantidad)]
+    if len(elegidos) < cantidad:
+        elegidos += [(id_ejercicio, 'nuevo', None) for id_ejercicio in _nuevos(estudiante, cantidad - len(elegidos))]
+    if len(elegidos) < cantidad:
+        elegidos += [(id_ejercicio, 'adelantado', proximo)
+                     for id_ejercicio, proximo in _repasos(estudiante, Repaso.proximo > ahora, cantidad - len(elegidos))]
+    if not elegidos:
+        return []
+    ejercicios = {ejercicio.id_ejercicio: ejercicio for ejercicio in db.session.scalars(
+        db.select(Ejercicio).where(Ejercicio.id_ejercicio.in_([elegido[0] for elegido in elegidos]))
+        .options(*Ejercicio.opciones_carga('detalle')))}
+    return [Siguiente(ejercicios[id_ejercicio], motivo, proximo) for id_ejercicio, motivo, proximo in elegidos]
@@ -0,0 +1,127 @@
+# reportes.py
+import csv
+import datetime
+import io
+import zlib
+
+
+def generar_csv(cabecera, filas, filas_por_bloque=1000):
+    """
+    Genera el CSV por bloques de 'filas_por_bloque' filas, para enviarlo con una
+    respuesta en streaming sin tener el archivo completo en memoria.
+    """
+    buffer = io.StringIO()
+    escritor = csv.writer(buffer)
+    escritor.writerow(cabecera)
+    for numero, fila in enumerate(filas, start=1):
+        escritor.writerow(fila)
+        if numero % filas_por_bloque == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+def _formatear(valor):
+    if valor is None:
+        return ''
+    if isinstance(valor, datetime.datetime):
+        return valor.strftime('%d/%m/%Y %H:%M')
+    if isinstance(valor, datetime.date):
+        return valor.strftime('%d/%m/%Y')
+    return str(valor)
+
+
+def _texto_pdf(texto):
+    """Codifica un texto como cadena literal de PDF (WinAnsi, con paréntesis escapados)."""
+    texto = texto.replace('\\', '\\\\').replace('(', '\\(').replace(')', '\\)')
+    return b'(' + texto.encode('cp1252', errors='replace') + b')'
+
+
+def generar_pdf(titulo, cabecera, anchos, filas):
+    """
+    Genera un PDF con una tabla y lo devuelve página a página como bloques de bytes.
+
+    Cada página se escribe (comprimida) en cuanto se llena y no se guarda, así que la
+    memoria no depende del número de filas: solo se recuerdan los desplazamientos de
+    los objetos para la tabla xref final. 'anchos' son las proporciones de cada columna.
+    """
+    # reportlab solo se importa al generar un PDF; se usa para medir el texto en Helvetica
+    from reportlab.pdfbase.pdfmetrics import stringWidth
+
+    ancho_pagina, alto_pagina = 842, 595 # A4 apaisado, en puntos
+    margen, alto_linea, tamano = 36, 14, 8
+    total = sum(anchos)
+    columnas = [(ancho_pagina - 2 * margen) * ancho / total for ancho in anchos]
+
+    def recortar(texto, ancho, fuente='Helvetica'):
+        medida = stringWidth(texto, fuente, tamano)
+        if medida > ancho - 4: # Primer corte proporcional, luego se ajusta carácter a carácter
+            texto = texto[:int(len(texto) * (ancho - 4) / medida) + 1]
+        while texto and stringWidth(texto, fuente, tamano) > ancho - 4:
+            texto = texto[:-2] + '…' if len(texto) > 2 else ''
+        return texto
+
+    def celda(x, y, texto, fuente=b'/F1'):
+        return b'BT %s %d Tf %.2f %.2f Td %s Tj ET\n' % (fuente, tamano, x, y, _texto_pdf(texto))
+
+    def encabezado(numero_pagina):
+        y = alto_pagina - margen
+        partes = [b'BT /F2 12 Tf %d %d Td %s Tj ET\n' % (margen, y, _texto_pdf(titulo)),
+                  celda(ancho_pagina - margen - 50, y, f'Página {numero_pagina}')]
+        y -= 2 * alto_linea
+        x = margen
+        for texto, ancho in zip(cabecera, columnas):
+            partes.append(celda(x, y, recortar(texto, ancho, 'Helvetica-Bold'), b'/F2'))
+            x += ancho
+        partes.append(b'%d %.2f m %d %.2f l S\n' % (margen, y - 4, ancho_pagina - margen, y - 4))
+        return partes, y - alto_linea
+
+    desplazamientos = {} # número de objeto -> posición en bytes
+    escrito = 0
+    paginas = []
+
+    def objeto(numero, contenido):
+        nonlocal escrito
+        desplazamientos[numero] = escrito
+        datos = b'%d 0 obj\n%s\nendobj\n' % (numero, contenido)
+        escrito += len(datos)
+        return datos
+
+    def cerrar_pagina(partes):
+        # Objeto de contenido (comprimido) y objeto de página; 1-4 están reservados
+        numero = 5 + 2 * len(paginas)
+        flujo = zlib.compress(b''.join(partes))
+        datos = objeto(numero, b'<< /Length %d /Filter /FlateDecode >>\nstream\n%s\nendstream' % (len(flujo), flujo))
+        datos += objeto(numero + 1, b'<< /Type /Page /Parent 2 0 R /MediaBox [0 0 %d %d] '
+                                    b'/Resources << /Font << /F1 3 0 R /F2 4 0 R >> >> /Contents %d 0 R >>'
+                                    % (ancho_pagina, alto_pagina, numero))
+        paginas.append(numero + 1)
+        return datos
+
+    cabecera_pdf = b'%PDF-1.4\n%\xe2\xe3\xcf\xd3\n'
+    escrito = len(cabecera_pdf)
+    yield cabecera_pdf
+    yield objeto(1, b'<< /Type /Catalog /Pages 2 0 R >>')
+    yield objeto(3, b'<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>')
+    yield objeto(4, b'<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica-Bold /Encoding /WinAnsiEncoding >>')
+
+    partes, y = encabezado(1)
+    for fila in filas:
+        if y < margen:
+            yield cerrar_pagina(partes)
+            partes, y = encabezado(len(paginas) + 1)
+        x = margen
+        for valor, ancho in zip(fila, columnas):
+            partes.append(celda(x, y, recortar(_formatear(valor), ancho)))
+            x += ancho
+        y -= alto_linea
+    yield cerrar_pagina(partes)
+
+    kids = b' '.join(b'%d 0 R' % numero for numero in paginas)
+    yield objeto(2, b'<< /Type /Pages /Kids [%s] /Count %d >>' % (kids, len(paginas)))
+    total_objetos = 5 + 2 * len(paginas)
+    xref = [b'xref\n0 %d\n0000000000 65535 f \n' % total_objetos]
+    xref += [b'%010d 00000 n \n' % desplazamientos[numero] for numero in range(1, total_objetos)]
+    yield b''.join(xref)
+    yield b'trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n' % (total_objetos, escrito)
@@ -0,0 +1,9 @@
+# revisiones/0001_esquema_base.py
+"""Tablas que falten, con sus índices y los de búsqueda de texto completo."""
+from database import db
+
+
+def aplicar(m):
+    # Solo crea lo que no existe (checkfirst): en una base de datos nueva es todo el esquema
+    # de los modelos y las revisiones siguientes no encuentran nada que cambiar
+    m.ejecutar(lambda conexion: db.metadata.create_all(conexion, checkfirst=True))
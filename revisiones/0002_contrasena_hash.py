@@ -0,0 +1,13 @@
+# revisiones/0002_contrasena_hash.py
+"""usuarios.password pasa a llamarse contrasena_hash, con 255 caracteres para el hash."""
+
+
+def aplicar(m):
+    columnas = m.columnas('usuarios')
+    if 'password' in columnas and 'contrasena_hash' not in columnas:
+        # Cambio de catálogo en SQLite (>= 3.25) y PostgreSQL: no reescribe la tabla
+        m.ejecutar('ALTER TABLE usuarios RENAME COLUMN password TO contrasena_hash')
+        m.informar('  usuarios.password renombrada a contrasena_hash')
+    if m.dialecto == 'postgresql':
+        # Ampliar un VARCHAR no reescribe la tabla en PostgreSQL (SQLite no limita el largo)
+        m.ejecutar('ALTER TABLE usuarios ALTER COLUMN contrasena_hash TYPE VARCHAR(255)')
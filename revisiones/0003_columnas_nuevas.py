@@ -0,0 +1,24 @@
+# revisiones/0003_columnas_nuevas.py
+"""usuarios.fecha_registro y activo, lecciones y ejercicios.updated_at, con sus valores."""
+import datetime
+
+from sqlalchemy import Boolean, Column, DateTime
+
+
+def aplicar(m):
+    # Se añaden admitiendo NULL (sin reescribir la tabla) y se rellenan por tramos
+    m.anadir_columna('usuarios', Column('fecha_registro', DateTime))
+    m.anadir_columna('usuarios', Column('activo', Boolean))
+    m.anadir_columna('lecciones', Column('updated_at', DateTime))
+    m.anadir_columna('ejercicios', Column('updated_at', DateTime))
+
+    # Un usuario sin 'activo' era un usuario activo (el valor por defecto del modelo)
+    m.rellenar('usuarios.activo', 'usuarios', 'id_usuario',
+               'UPDATE usuarios SET activo = :si WHERE id_usuario > :desde AND id_usuario <= :hasta '
+               'AND activo IS NULL', si=True)
+    # updated_at es la versión de las ETag y la caché de fragmentos: cualquier valor vale
+    ahora = datetime.datetime.now()
+    for tabla, clave in (('lecciones', 'id_leccion'), ('ejercicios', 'id_ejercicio')):
+        m.rellenar(f'{tabla}.updated_at', tabla, clave,
+                   f'UPDATE {tabla} SET updated_at = :ahora WHERE {clave} > :desde AND {clave} <= :hasta '
+                   'AND updated_at IS NULL', ahora=ahora)
@@ -0,0 +1,22 @@
+# revisiones/0004_indices.py
+"""Índices de las listas paginadas, de los filtros y de progreso_estudiantes."""
+
+# (nombre, tabla, columnas, único), los mismos que __table_args__ en modelos.py
+INDICES = (
+    ('ix_usuarios_rol_id', 'usuarios', ('rol', 'id_usuario'), False),
+    ('ix_estudiantes_nivel_id', 'estudiantes', ('id_nivel', 'id_estudiante'), False),
+    ('ix_profesores_nivel_id', 'profesores', ('id_nivel', 'id_profesor'), False),
+    ('ix_lecciones_profesor_id', 'lecciones', ('id_profesor', 'id_leccion'), False),
+    ('ix_lecciones_nivel_id', 'lecciones', ('id_nivel', 'id_leccion'), False),
+    ('ix_ejercicios_leccion_id', 'ejercicios', ('id_leccion', 'id_ejercicio'), False),
+    ('ix_ejercicios_tipo_id', 'ejercicios', ('tipo', 'id_ejercicio'), False),
+    ('ux_progreso_estudiante_ejercicio_fecha', 'progreso_estudiantes',
+     ('id_estudiante', 'id_ejercicio', 'fecha_completado'), True),
+    ('ix_progreso_ejercicio', 'progreso_estudiantes', ('id_ejercicio',), False),
+)
+
+
+def aplicar(m):
+    # En PostgreSQL, CREATE INDEX CONCURRENTLY: la aplicación sigue escribiendo mientras tanto
+    for nombre, tabla, columnas, unico in INDICES:
+        m.crear_indice(nombre, tabla, columnas, unico)
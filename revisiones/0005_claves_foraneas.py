@@ -0,0 +1,31 @@
+# revisiones/0005_claves_foraneas.py
+"""ON DELETE de las claves foráneas de profesores, lecciones y ejercicios."""
+
+# (tabla, columna, tabla referida, columna referida, ON DELETE), como en modelos.py
+CLAVES = (
+    ('profesores', 'id_usuario', 'usuarios', 'id_usuario', 'CASCADE'),
+    ('lecciones', 'id_profesor', 'profesores', 'id_profesor', 'CASCADE'),
+    ('lecciones', 'id_nivel', 'niveles', 'id_nivel', 'SET NULL'),
+    ('ejercicios', 'id_leccion', 'lecciones', 'id_leccion', 'CASCADE'),
+)
+
+
+def aplicar(m):
+    for tabla, columna, referida, columna_referida, al_borrar in CLAVES:
+        for clave in m.claves_foraneas(tabla):
+            if clave['constrained_columns'] != [columna]:
+                continue
+            if (clave['options'].get('ondelete') or '').upper() == al_borrar:
+                break
+            if m.dialecto != 'postgresql':
+                # SQLite solo cambia una clave foránea reconstruyendo la tabla entera, y no las aplica
+                # (database.py no activa PRAGMA foreign_keys): los borrados en cascada los hace el ORM
+                m.informar(f'  {tabla}.{columna} sin ON DELETE {al_borrar}: en SQLite requiere reconstruir la tabla')
+                break
+            # NOT VALID no recorre la tabla (bloqueo breve); VALIDATE la recorre sin bloquear escrituras
+            nombre = clave['name']
+            m.ejecutar(f'ALTER TABLE {tabla} DROP CONSTRAINT {nombre}, ADD CONSTRAINT {nombre} '
+                       f'FOREIGN KEY ({columna}) REFERENCES {referida} ({columna_referida}) '
+                       f'ON DELETE {al_borrar} NOT VALID')
+            m.ejecutar(f'ALTER TABLE {tabla} VALIDATE CONSTRAINT {nombre}')
+            m.informar(f'  {tabla}.{columna}: ON DELETE {al_borrar}')
@@ -0,0 +1,6 @@
+# revisiones/0007_indice_resumen_leccion.py
+"""Índice de resumen_estudiante_leccion por lección, para el borrado por lotes de lecciones."""
+
+
+def aplicar(m):
+    m.crear_indice('ix_resumen_leccion', 'resumen_estudiante_leccion', ('id_leccion',))
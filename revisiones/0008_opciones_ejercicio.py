@@ -0,0 +1,36 @@
+# revisiones/0008_opciones_ejercicio.py
+"""Opciones de los ejercicios en opciones_ejercicio (antes, texto separado por comas en ejercicios.opciones)."""
+from sqlalchemy import text
+
+import calificador
+from modelos import OpcionEjercicio
+
+# Solo los ejercicios que aún no tienen filas en opciones_ejercicio: repetir un tramo no
+# duplica nada y no pisa las opciones que la aplicación nueva ya haya guardado
+PENDIENTES = text(
+    'SELECT e.id_ejercicio, e.opciones, e.respuesta FROM ejercicios e '
+    'WHERE e.id_ejercicio > :desde AND e.id_ejercicio <= :hasta AND e.opciones IS NOT NULL '
+    'AND NOT EXISTS (SELECT 1 FROM opciones_ejercicio o WHERE o.id_ejercicio = e.id_ejercicio)')
+
+
+def convertir(conexion, desde, hasta):
+    # La opción correcta se marca con la misma normalización que usa el calificador, que SQL no tiene
+    filas = []
+    for id_ejercicio, opciones, respuesta in conexion.execute(PENDIENTES, {'desde': desde, 'hasta': hasta}):
+        respuesta = calificador.normalizar(respuesta)
+        filas += [{'id_ejercicio': id_ejercicio, 'orden': orden, 'texto': texto,
+                   'correcta': calificador.normalizar(texto) == respuesta}
+                  for orden, texto in enumerate(calificador.separar_opciones(opciones))]
+    if filas:
+        conexion.execute(OpcionEjercicio.__table__.insert(), filas)
+    return len(filas)
+
+
+def aplicar(m):
+    m.ejecutar(lambda conexion: OpcionEjercicio.__table__.create(conexion, checkfirst=True))
+    # Una base de datos creada con los modelos nuevos ya no tiene la columna antigua
+    if 'opciones' not in m.columnas('ejercicios'):
+        return
+    m.rellenar('opciones', 'ejercicios', 'id_ejercicio', convertir)
+    # ejercicios.opciones se queda (los modelos ya no la usan) para poder volver a la versión
+    # anterior de la aplicación; borrarla en SQLite reescribe la tabla entera
@@ -0,0 +1,33 @@
+# revisiones/0009_repasos.py
+"""Cola de repasos por estudiante (repasos), programada a partir de progreso_estudiantes."""
+from database import db
+from modelos import ProgresoEstudiante, Repaso
+import repasos
+
+progreso = ProgresoEstudiante.__table__
+
+
+def rellenar_repasos(conexion, desde, hasta):
+    # Cada tramo de estudiantes se reprograma entero desde su historial: repetirlo da lo mismo.
+    # El índice único (id_estudiante, id_ejercicio, fecha_completado) ya da el orden que hace falta.
+    # Primero se lee y se calcula: la transacción solo bloquea las escrituras desde el DELETE
+    intentos = conexion.execute(
+        db.select(progreso.c.id_estudiante, progreso.c.id_ejercicio, progreso.c.fecha_completado, progreso.c.puntuacion)
+        .where(progreso.c.id_estudiante > desde, progreso.c.id_estudiante <= hasta)
+        .order_by(progreso.c.id_estudiante, progreso.c.id_ejercicio, progreso.c.fecha_completado))
+    filas = list(repasos.desde_historial(intentos))
+    conexion.execute(db.delete(Repaso.__table__).where(Repaso.id_estudiante > desde, Repaso.id_estudiante <= hasta))
+    if filas:
+        conexion.execute(Repaso.__table__.insert(), filas)
+    return len(filas)
+
+
+def aplicar(m):
+    m.ejecutar(lambda conexion: Repaso.__table__.create(conexion, checkfirst=True))
+    # Si la aplicación ya la mantiene (tabla creada antes que los intentos) no hay nada que hacer
+    if not m.vacia('repasos') and m.estado_relleno('repasos') is None:
+        m.informar('  la cola de repasos ya tiene datos')
+        return
+    # Tramos de estudiantes con unas 'lote' filas de progreso_estudiantes cada uno, como en 0006
+    por_estudiante = m.contar('progreso_estudiantes') // max(m.contar('estudiantes'), 1)
+    m.rellenar('repasos', 'estudiantes', 'id_estudiante', rellenar_repasos, lote=max(m.lote // max(por_estudiante, 1), 1))
@@ -0,0 +1,14 @@
+# revisiones/0010_clasificaciones.py
+"""Clasificaciones por nivel y por lección (clasificacion_puntos y clasificacion_conteos)."""
+from modelos import PuntosClasificacion, ConteoClasificacion
+import clasificaciones
+
+
+def aplicar(m):
+    m.ejecutar(lambda conexion: PuntosClasificacion.__table__.create(conexion, checkfirst=True))
+    m.ejecutar(lambda conexion: ConteoClasificacion.__table__.create(conexion, checkfirst=True))
+    # Si la aplicación ya las mantiene (tablas creadas antes que los intentos) no hay nada que hacer
+    if not m.vacia('clasificacion_puntos') and m.estado_relleno('puntos') is None:
+        m.informar('  las clasificaciones ya tienen datos')
+        return
+    clasificaciones.rellenar(m)
@@ -0,0 +1,4 @@
+# revisiones/__init__.py
+# Revisiones del esquema que aplica 'flask migrar' (migraciones.py), en orden de nombre de
+# archivo: NNNN_descripcion.py, con la descripción en la primera línea del docstring y una
+# función aplicar(migracion) que se puede repetir sin efectos (comprueba antes de cambiar).
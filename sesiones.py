@@ -0,0 +1,372 @@
+# sesiones.py
+import copy
+import json
+import os
+import secrets
+import sqlite3
+import threading
+import time
+from collections import OrderedDict, namedtuple
+
+from flask.json.tag import TaggedJSONSerializer
+from flask.sessions import SessionInterface, SessionMixin
+from itsdangerous import BadSignature, Signer
+from werkzeug.datastructures import CallbackDict
+
+# Sesión guardada: datos, versión (sube en cada escritura) y caducidad (epoch en segundos).
+# Los almacenes guardan los datos como texto, serializados como los de la cookie de Flask.
+Registro = namedtuple('Registro', 'datos version caduca')
+
+
+class SesionServidor(CallbackDict, SessionMixin):
+    """Datos de la sesión guardados en el servidor; la cookie solo lleva 'id.versión' firmado."""
+
+    def __init__(self, datos=None, sid=None, version=0, generacion=0):
+        def al_cambiar(sesion):
+            sesion.accessed = True
+            sesion.modified = True
+        super().__init__(datos, al_cambiar)
+        self.sid = sid
+        self.version = version
+        self.generacion = generacion # Generación del almacén al abrirla (para la caché en memoria)
+        # Si se abrió con un usuario: al borrarla hay que invalidar las copias de los demás procesos
+        self.autenticada = bool(datos) and 'user_id' in datos
+        self.new = sid is None
+        self.modified = False
+        self.accessed = False
+        self.descartado = None # id anterior a regenerar(), que se borra al guardar
+
+    # Como SecureCookieSession: leer la sesión añade 'Vary: Cookie' a la respuesta
+    def __getitem__(self, clave):
+        self.accessed = True
+        return super().__getitem__(clave)
+
+    def get(self, clave, defecto=None):
+        self.accessed = True
+        return super().get(clave, defecto)
+
+    def setdefault(self, clave, defecto=None):
+        self.accessed = True
+        return super().setdefault(clave, defecto)
+
+    def regenerar(self):
+        """Cambia el id de la sesión conservando sus datos (al iniciar o cerrar sesión)."""
+        if self.sid is not None and self.descartado is None:
+            self.descartado = self.sid
+        self.sid = None
+        self.version = 0
+        self.modified = True
+
+
+# --- Almacenes ---
+# Todos cumplen el mismo contrato. 'generacion' es un contador global que sube cada vez que
+# se borra una sesión con usuario o se revocan las de un usuario: las cachés en memoria de
+# todos los procesos lo comparan en cada petición (una lectura de tamaño fijo) y descartan lo
+# que tengan si ha cambiado. Borrar una sesión anónima (el id anterior al login) no lo sube:
+# lo que otro proceso tenga de ella no da acceso a nada, y vaciar todas las cachés en cada
+# login las dejaría casi siempre vacías.
+
+class AlmacenSQLite:
+    """Sesiones en un archivo SQLite local (WAL), compartido por los workers de la máquina."""
+
+    def __init__(self, archivo):
+        self.archivo = archivo
+        self._local = threading.local() # Una conexión por hilo
+        self._pid = os.getpid()
+        conexion = self._conexion()
+        conexion.execute('CREATE TABLE IF NOT EXISTS sesiones (id TEXT PRIMARY KEY, id_usuario INTEGER, '
+                         'version INTEGER NOT NULL, datos TEXT NOT NULL, caduca REAL NOT NULL)')
+        conexion.execute('CREATE INDEX IF NOT EXISTS ix_sesiones_usuario ON sesiones (id_usuario)')
+        conexion.execute('CREATE INDEX IF NOT EXISTS ix_sesiones_caduca ON sesiones (caduca)')
+        conexion.execute('CREATE TABLE IF NOT EXISTS generacion (id INTEGER PRIMARY KEY CHECK (id = 1), '
+                         'valor INTEGER NOT NULL)')
+
+    def _conexion(self):
+        # Tras un fork (gunicorn --preload) no se usan las conexiones del proceso padre
+        if self._pid != os.getpid():
+            self._local, self._pid = threading.local(), os.getpid()
+        conexion = getattr(self._local, 'conexion', None)
+        if conexion is None:
+            conexion = sqlite3.connect(self.archivo, timeout=5, isolation_level=None)
+            conexion.execute('PRAGMA journal_mode=WAL')
+            conexion.execute('PRAGMA synchronous=NORMAL')
+            self._local.conexion = conexion
+        return conexion
+
+    def _avanzar_generacion(self, conexion):
+        conexion.execute('INSERT INTO generacion (id, valor) VALUES (1, 1) '
+                         'ON CONFLICT(id) DO UPDATE SET valor = valor + 1')
+
+    def generacion(self):
+        fila = self._conexion().execute('SELECT valor FROM generacion WHERE id = 1').fetchone()
+        return fila[0] if fila else 0
+
+    def leer(self, sid):
+        fila = self._conexion().execute(
+            'SELECT datos, version, caduca FROM sesiones WHERE id = ? AND caduca > ?', (sid, time.time())).fetchone()
+        return Registro(*fila) if fila else None
+
+    def crear(self, sid, datos, id_usuario, caduca):
+        self._conexion().execute('INSERT INTO sesiones (id, id_usuario, version, datos, caduca) VALUES (?, ?, 1, ?, ?)',
+                                 (sid, id_usuario, datos, caduca))
+
+    def actualizar(self, sid, datos, id_usuario, version, caduca):
+        """Guarda la nueva versión; False si la sesión ya no existe (revocada o caducada)."""
+        cursor = self._conexion().execute(
+            'UPDATE sesiones SET id_usuario = ?, version = ?, datos = ?, caduca = ? WHERE id = ? AND caduca > ?',
+            (id_usuario, version, datos, caduca, sid, time.time()))
+        return cursor.rowcount == 1
+
+    def borrar(self, sid, invalidar=True):
+        conexion = self._conexion()
+        if not invalidar:
+            conexion.execute('DELETE FROM sesiones WHERE id = ?', (sid,))
+            return
+        with conexion:
+            conexion.execute('BEGIN IMMEDIATE')
+            conexion.execute('DELETE FROM sesiones WHERE id = ?', (sid,))
+            self._avanzar_generacion(conexion)
+
+    def revocar_usuario(self, id_usuario):
+        conexion = self._conexion()
+        with conexion:
+            conexion.execute('BEGIN IMMEDIATE')
+            borradas = conexion.execute('DELETE FROM sesiones WHERE id_usuario = ?', (id_usuario,)).rowcount
+            self._avanzar_generacion(conexion)
+        return borradas
+
+    def limpiar_caducadas(self):
+        return self._conexion().execute('DELETE FROM sesiones WHERE caduca <= ?', (time.time(),)).rowcount
+
+
+class AlmacenRedis:
+    """
+    Sesiones en Redis o un servidor compatible (Valkey, KeyDB...), para workers en varias
+    máquinas. Requiere el paquete 'redis'; las sesiones caducan solas con EXPIREAT.
+    """
+
+    def __init__(self, url, prefijo='sesiones:'):
+        import redis # Opcional: solo se importa si se elige este almacén
+        self.redis = redis.Redis.from_url(url)
+        self.prefijo = prefijo
+        self._conflicto = redis.WatchError
+
+    def _clave(self, sid):
+        return f'{self.prefijo}s:{sid}'
+
+    def _clave_usuario(self, id_usuario):
+        return f'{self.prefijo}u:{id_usuario}'
+
+    def generacion(self):
+        return int(self.redis.get(f'{self.prefijo}generacion') or 0)
+
+    def leer(self, sid):
+        valor = self.redis.get(self._clave(sid))
+        if valor is None:
+            return None
+        registro = json.loads(valor)
+        return Registro(registro['datos'], registro['version'], registro['caduca'])
+
+    def _guardar(self, tuberia, sid, datos, id_usuario, version, caduca):
+        valor = json.dumps({'datos': datos, 'version': version, 'caduca': caduca, 'id_usuario': id_usuario})
+        tuberia.set(self._clave(sid), valor, exat=int(caduca) + 1)
+        if id_usuario is not None:
+            tuberia.sadd(self._clave_usuario(id_usuario), sid)
+            tuberia.expireat(self._clave_usuario(id_usuario), int(caduca) + 1)
+
+    def crear(self, sid, datos, id_usuario, caduca):
+        tuberia = self.redis.pipeline()
+        self._guardar(tuberia, sid, datos, id_usuario, 1, caduca)
+        tuberia.execute()
+
+    def actualizar(self, sid, datos, id_usuario, version, caduca):
+        # WATCH: si otro proceso la revoca entre la comprobación y la escritura, no se recrea
+        with self.redis.pipeline() as tuberia:
+            try:
+                tuberia.watch(self._clave(sid))
+                if not tuberia.exists(self._clave(sid)):
+                    return False
+                tuberia.multi()
+                self._guardar(tuberia, sid, datos, id_usuario, version, caduca)
+                tuberia.execute()
+                return True
+            except self._conflicto:
+                return False
+
+    def borrar(self, sid, invalidar=True):
+        tuberia = self.redis.pipeline()
+        tuberia.delete(self._clave(sid))
+        if invalidar:
+            tuberia.incr(f'{self.prefijo}generacion')
+        tuberia.execute()
+
+    def revocar_usuario(self, id_usuario):
+        sids = self.redis.smembers(self._clave_usuario(id_usuario))
+        tuberia = self.redis.pipeline()
+        for sid in sids:
+            tuberia.delete(self._clave(sid.decode()))
+        tuberia.delete(self._clave_usuario(id_usuario))
+        tuberia.incr(f'{self.prefijo}generacion')
+        tuberia.execute()
+        return len(sids)
+
+    def limpiar_caducadas(self):
+        return 0 # Redis borra las claves caducadas por sí mismo
+
+
+# --- Interfaz de sesiones de Flask ---
+
+class InterfazSesiones(SessionInterface):
+    """
+    Sustituye a la cookie firmada de Flask. Cada petición lee la generación del almacén y,
+    si no ha cambiado y la versión de la cookie coincide, toma la sesión de una LRU en memoria
+    (id -> datos del usuario): el coste no depende del número de sesiones abiertas.
+    """
+
+    def __init__(self, almacen, max_entradas=10000):
+        self.almacen = almacen
+        self.max_entradas = max_entradas
+        self.serializador = TaggedJSONSerializer() # Admite tuplas, fechas, Markup... como la cookie
+        self._cache = OrderedDict() # id -> (Registro con los datos ya deserializados, generación)
+        self._lock = threading.Lock()
+
+    def _firmador(self, app):
+        return Signer(app.secret_key, salt='sesion-servidor')
+
+    def open_session(self, app, request):
+        valor = request.cookies.get(self.get_cookie_name(app))
+        generacion = self.almacen.generacion()
+        if not valor or not app.secret_key:
+            return SesionServidor(generacion=generacion)
+        try:
+            sid, version = self._firmador(app).unsign(valor).decode().rsplit('.', 1)
+            version = int(version)
+        except (BadSignature, ValueError):
+            return SesionServidor(generacion=generacion)
+        registro = self._leer(sid, version, generacion)
+        if registro is None: # Caducada, revocada o cerrada: se empieza una nueva
+            return SesionServidor(generacion=generacion)
+        return SesionServidor(registro.datos, sid, registro.version, generacion)
+
+    def _leer(self, sid, version, generacion):
+        with self._lock:
+            entrada = self._cache.get(sid)
+            if (entrada is not None and entrada[1] == generacion and entrada[0].version == version
+                    and entrada[0].caduca > time.time()):
+                self._cache.move_to_end(sid)
+                registro = entrada[0]
+                return registro._replace(datos=copy.deepcopy(registro.datos)) # flash() modifica la lista
+        registro = self.almacen.leer(sid)
+        if registro is None:
+            self._olvidar(sid)
+            return None
+        registro = registro._replace(datos=self.serializador.loads(registro.datos))
+        self._recordar(sid, registro, generacion)
+        return registro
+
+    def _recordar(self, sid, registro, generacion):
+        with self._lock:
+            self._cache[sid] = (registro._replace(datos=copy.deepcopy(registro.datos)), generacion)
+            self._cache.move_to_end(sid)
+            while len(self._cache) > self.max_entradas:
+                self._cache.popitem(last=False)
+
+    def _olvidar(self, sid):
+        with self._lock:
+            self._cache.pop(sid, None)
+
+    def save_session(self, app, sesion, respuesta):
+        nombre = self.get_cookie_name(app)
+        dominio = self.get_cookie_domain(app)
+        ruta = self.get_cookie_path(app)
+        if sesion.accessed:
+            respuesta.vary.add('Cookie')
+
+        if sesion.descartado is not None:
+            self.almacen.borrar(sesion.descartado, invalidar=sesion.autenticada)
+            self._olvidar(sesion.descartado)
+
+        if not sesion:
+            if sesion.modified and (sesion.sid is not None or sesion.descartado is not None):
+                if sesion.sid is not None:
+                    self.almacen.borrar(sesion.sid, invalidar=sesion.autenticada)
+                    self._olvidar(sesion.sid)
+                respuesta.delete_cookie(nombre, domain=dominio, path=ruta, secure=self.get_cookie_secure(app),
+                                        partitioned=self.get_cookie_partitioned(app),
+                                        httponly=self.get_cookie_httponly(app))
+            return
+        if not sesion.modified:
+            return
+
+        datos = dict(sesion)
+        texto = self.serializador.dumps(datos)
+        id_usuario = datos.get('user_id')
+        caduca = time.time() + app.permanent_session_lifetime.total_seconds()
+        if sesion.sid is None:
+            sid, version = secrets.token_urlsafe(32), 1
+            self.almacen.crear(sid, texto, id_usuario, caduca)
+        else:
+            sid, version = sesion.sid, sesion.version + 1
+            if not self.almacen.actualizar(sid, texto, id_usuario, version, caduca):
+                # Revocada durante la petición: no se resucita y el navegador pierde la cookie
+                self._olvidar(sid)
+                respuesta.delete_cookie(nombre, domain=dominio, path=ruta)
+                return
+        self._recordar(sid, Registro(datos, version, caduca), sesion.generacion)
+
+        respuesta.set_cookie(
+            nombre, self._firmador(app).sign(f'{sid}.{version}').decode(),
+            expires=self.get_expiration_time(app, sesion), httponly=self.get_cookie_httponly(app),
+            domain=dominio, path=ruta, secure=self.get_cookie_secure(app),
+            partitioned=self.get_cookie_partitioned(app), samesite=self.get_cookie_samesite(app))
+
+    def limpiar(self):
+        """Vacía la caché en memoria del proceso actual."""
+        with self._lock:
+            self._cache.clear()
+
+
+class Sesiones:
+    """Sesiones en el servidor con revocación inmediata (ver InterfazSesiones)."""
+
+    def __init__(self):
+        self.almacen = None
+        self.interfaz = None
+
+    def init_app(self, app):
+        """
+        Lee SESIONES_ALMACEN ('sqlite', 'redis' o 'cookie'), SESIONES_ARCHIVO, SESIONES_REDIS_URL
+        y SESIONES_CACHE_MAX. Con 'cookie' se queda la sesión firmada de Flask, sin revocación.
+        """
+        tipo = app.config.get('SESIONES_ALMACEN', 'sqlite')
+        # La instancia es global: no se queda con el almacén de una app anterior (p. ej. en los tests)
+        self.almacen = None
+        self.interfaz = None
+        if tipo == 'cookie':
+            return
+        if tipo == 'redis':
+            self.almacen = AlmacenRedis(app.config['SESIONES_REDIS_URL'])
+        elif tipo == 'sqlite':
+            archivo = app.config.get('SESIONES_ARCHIVO') or os.path.join(app.instance_path, 'sesiones.db')
+            os.makedirs(os.path.dirname(os.path.abspath(archivo)), exist_ok=True)
+            self.almacen = AlmacenSQLite(archivo)
+        else:
+            raise ValueError(f'SESIONES_ALMACEN desconocido: {tipo}')
+        self.interfaz = InterfazSesiones(self.almacen, app.config.get('SESIONES_CACHE_MAX', 10000))
+        app.session_interface = self.interfaz
+
+    @staticmethod
+    def regenerar(sesion):
+        """Nuevo id para la sesión (si es del servidor), para que un id conocido de antes no sirva."""
+        if isinstance(sesion, SesionServidor):
+            sesion.regenerar()
+
+    def revocar_usuario(self, id_usuario):
+        """Cierra en el acto todas las sesiones del usuario, en todos los procesos. Devuelve cuántas."""
+        return self.almacen.revocar_usuario(id_usuario) if self.almacen else 0
+
+    def limpiar_caducadas(self):
+        return self.almacen.limpiar_caducadas() if self.almacen else 0
+
+
+sesiones = Sesiones()
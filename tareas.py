@@ -0,0 +1,309 @@
+# tareas.py
+import datetime
+import json
+import logging
+import multiprocessing
+import os
+import random
+import signal
+import sqlite3
+import threading
+import time
+import traceback
+from collections import namedtuple
+
+from database import db
+
+registro = logging.getLogger('tareas')
+
+PENDIENTE, EN_CURSO, HECHA, FALLIDA = 'pendiente', 'en_curso', 'hecha', 'fallida'
+
+# Tarea guardada. 'argumentos' y 'resultado' van en JSON y las fechas en epoch (segundos).
+# 'disponible': momento desde el que se puede tomar; en curso, cuándo vence el plazo del trabajador.
+Tarea = namedtuple('Tarea', 'id tipo argumentos prioridad estado intentos max_intentos clave id_usuario '
+                            'creada disponible empezada terminada error resultado')
+_COLUMNAS = ', '.join(Tarea._fields)
+_ACTIVAS = f"estado IN ('{PENDIENTE}', '{EN_CURSO}')"
+
+
+class ErrorDefinitivo(Exception):
+    """Error de una tarea que no se arregla reintentando (p. ej. un borrado con impedimento)."""
+
+
+class ColaTareas:
+    """
+    Cola de tareas persistente en un archivo SQLite local (WAL), sin broker aparte: las vistas
+    encolan el trabajo lento con encolar() y 'flask trabajar' lo ejecuta en N procesos, fuera
+    de las peticiones.
+
+    - prioridad: se toma la pendiente de mayor prioridad y, a igualdad, la más antigua;
+    - clave: mientras haya una tarea pendiente o en curso con la misma clave, encolar()
+      devuelve esa en lugar de crear otra (p. ej. dos clics en 'Eliminar');
+    - reintentos: si la función lanza una excepción, la tarea vuelve a la cola tras
+      TAREAS_ESPERA_REINTENTO * 2^(intento - 1) segundos, hasta max_intentos;
+    - plazo: el trabajador lo renueva mientras ejecuta; si muere, la tarea se vuelve a tomar
+      cuando vence. Por eso las tareas deben poder repetirse sin daño (las de borrados.py y
+      clasificaciones.py continúan donde quedaron).
+
+    La web y los trabajadores comparten el archivo, así que tienen que estar en la misma máquina.
+    """
+
+    def __init__(self):
+        self._funciones = {} # tipo -> función(**argumentos)
+        self.archivo = None
+        self.directorio = None
+        self.max_intentos = 5
+        self.espera_reintento = 10
+        self.espera_max = 3600
+        self.plazo = 300
+        self.intervalo = 0.5
+        self._local = threading.local() # Una conexión por hilo
+        self._pid = os.getpid()
+
+    def init_app(self, app):
+        """
+        Lee TAREAS_ARCHIVO (por defecto instance/tareas.db), TAREAS_DIRECTORIO (archivos que
+        generan las tareas; por defecto instance/tareas), TAREAS_MAX_INTENTOS,
+        TAREAS_ESPERA_REINTENTO, TAREAS_ESPERA_MAX, TAREAS_PLAZO y TAREAS_INTERVALO_MS.
+        """
+        self.archivo = app.config.get('TAREAS_ARCHIVO') or os.path.join(app.instance_path, 'tareas.db')
+        self.directorio = app.config.get('TAREAS_DIRECTORIO') or os.path.join(app.instance_path, 'tareas')
+        self.max_intentos = app.config.get('TAREAS_MAX_INTENTOS', self.max_intentos)
+        self.espera_reintento = app.config.get('TAREAS_ESPERA_REINTENTO', self.espera_reintento)
+        self.espera_max = app.config.get('TAREAS_ESPERA_MAX', self.espera_max)
+        self.plazo = app.config.get('TAREAS_PLAZO', self.plazo)
+        self.intervalo = app.config.get('TAREAS_INTERVALO_MS', self.intervalo * 1000) / 1000
+        os.makedirs(os.path.dirname(os.path.abspath(self.archivo)), exist_ok=True)
+        self._local = threading.local()
+        conexion = self._conexion()
+        conexion.execute('CREATE TABLE IF NOT EXISTS tareas (id INTEGER PRIMARY KEY, tipo TEXT NOT NULL, '
+                         'argumentos TEXT NOT NULL, prioridad INTEGER NOT NULL, estado TEXT NOT NULL, '
+                         'intentos INTEGER NOT NULL, max_intentos INTEGER NOT NULL, clave TEXT, id_usuario INTEGER, '
+                         'creada REAL NOT NULL, disponible REAL NOT NULL, empezada REAL, terminada REAL, '
+                         'error TEXT, resultado TEXT)')
+        # Cola: las activas en el orden en que se toman, con 'disponible' para no leer la tabla
+        conexion.execute(f'CREATE INDEX IF NOT EXISTS ix_tareas_cola ON tareas (prioridad DESC, id, disponible) '
+                         f'WHERE {_ACTIVAS}')
+        # Deduplicación: una sola activa por clave, aunque dos procesos encolen a la vez
+        conexion.execute(f'CREATE UNIQUE INDEX IF NOT EXISTS ux_tareas_clave ON tareas (clave) WHERE {_ACTIVAS}')
+        conexion.execute('CREATE INDEX IF NOT EXISTS ix_tareas_terminada ON tareas (terminada)')
+
+    def _conexion(self):
+        # Tras un fork (gunicorn --preload, 'flask trabajar') no se usan las conexiones del proceso padre
+        if self._pid != os.getpid():
+            self._local, self._pid = threading.local(), os.getpid()
+        conexion = getattr(self._local, 'conexion', None)
+        if conexion is None:
+            conexion = sqlite3.connect(self.archivo, timeout=5, isolation_level=None)
+            conexion.execute('PRAGMA journal_mode=WAL')
+            conexion.execute('PRAGMA synchronous=NORMAL')
+            self._local.conexion = conexion
+        return conexion
+
+    # --- Registro y encolado ---
+
+    def tarea(self, tipo):
+        """Decorador: registra la función como tarea 'tipo'. Recibe los argumentos por nombre (JSON)."""
+        def registrar(funcion):
+            self._funciones[tipo] = funcion
+            return funcion
+        return registrar
+
+    def encolar(self, tipo, argumentos=None, prioridad=0, clave=None, id_usuario=None, max_intentos=None):
+        """
+        Encola la tarea y devuelve (id, nueva). Si ya hay una activa con la misma 'clave',
+        devuelve su id y nueva=False. Mayor 'prioridad' = antes.
+        """
+        if tipo not in self._funciones:
+            raise ValueError(f'Tipo de tarea desconocido: {tipo}')
+        texto = json.dumps(argumentos or {}, sort_keys=True)
+        conexion = self._conexion()
+        with conexion:
+            conexion.execute('BEGIN IMMEDIATE')
+            if clave is not None:
+                fila = conexion.execute(f'SELECT id FROM tareas WHERE clave = ? AND {_ACTIVAS}', (clave,)).fetchone()
+                if fila:
+                    return fila[0], False
+            ahora = time.time()
+            cursor = conexion.execute(
+                'INSERT INTO tareas (tipo, argumentos, prioridad, estado, intentos, max_intentos, clave, id_usuario, '
+                'creada, disponible) VALUES (?, ?, ?, ?, 0, ?, ?, ?, ?, ?)',
+                (tipo, texto, prioridad, PENDIENTE, max_intentos or self.max_intentos, clave, id_usuario, ahora, ahora))
+        return cursor.lastrowid, True
+
+    # --- Consultas ---
+
+    def consultar(self, id_tarea):
+        fila = self._conexion().execute(f'SELECT {_COLUMNAS} FROM tareas WHERE id = ?', (id_tarea,)).fetchone()
+        return Tarea(*fila) if fila else None
+
+    def ultimas(self, cantidad=50, estado=None):
+        """Las 'cantidad' tareas más recientes (de un estado, si se indica)."""
+        condicion, parametros = ('WHERE estado = ?', (estado, cantidad)) if estado else ('', (cantidad,))
+        return [Tarea(*fila) for fila in self._conexion().execute(
+            f'SELECT {_COLUMNAS} FROM tareas {condicion} ORDER BY id DESC LIMIT ?', parametros)]
+
+    @staticmethod
+    def como_dict(tarea):
+        """Estado público de la tarea para JSON: fechas en ISO 8601 y resultado ya decodificado."""
+        def fecha(epoch):
+            return datetime.datetime.fromtimestamp(epoch).isoformat(timespec='seconds') if epoch else None
+        return {
+            'id': tarea.id, 'tipo': tarea.tipo, 'estado': tarea.estado, 'intentos': tarea.intentos,
+            'max_intentos': tarea.max_intentos, 'creada': fecha(tarea.creada), 'empezada': fecha(tarea.empezada),
+            'terminada': fecha(tarea.terminada), 'error': tarea.error,
+            'resultado': json.loads(tarea.resultado) if tarea.resultado else None,
+            # Pendiente de un reintento: cuándo se volverá a intentar
+            'reintento': fecha(tarea.disponible) if tarea.estado == PENDIENTE and tarea.intentos else None,
+        }
+
+    def reintentar(self, id_tarea):
+        """
+        Vuelve a poner en la cola una tarea fallida, con los intentos a cero. False si no estaba
+        fallida o si ya hay otra activa con su clave.
+        """
+        try:
+            return self._conexion().execute(
+                'UPDATE tareas SET estado = ?, intentos = 0, disponible = ?, terminada = NULL, error = NULL '
+                'WHERE id = ? AND estado = ?', (PENDIENTE, time.time(), id_tarea, FALLIDA)).rowcount == 1
+        except sqlite3.IntegrityError: # ux_tareas_clave
+            return False
+
+    def limpiar_terminadas(self, antiguedad):
+        """Borra las tareas hechas o fallidas hace más de 'antiguedad' segundos y sus archivos. Devuelve cuántas."""
+        conexion = self._conexion()
+        limite = time.time() - antiguedad
+        borradas = 0
+        for id_tarea, resultado in conexion.execute(
+                'SELECT id, resultado FROM tareas WHERE terminada < ?', (limite,)).fetchall():
+            datos = json.loads(resultado) if resultado else None
+            archivo = datos.get('archivo') if isinstance(datos, dict) else None
+            if archivo:
+                try:
+                    os.remove(self.ruta_archivo(archivo))
+                except FileNotFoundError:
+                    pass
+            borradas += conexion.execute('DELETE FROM tareas WHERE id = ?', (id_tarea,)).rowcount
+        return borradas
+
+    def ruta_archivo(self, nombre):
+        """Ruta en TAREAS_DIRECTORIO de un archivo generado por una tarea."""
+        return os.path.join(self.directorio, os.path.basename(nombre))
+
+    # --- Ejecución ---
+
+    def tomar(self):
+        """
+        Marca como en curso la siguiente tarea disponible y la devuelve (o None si no hay).
+        BEGIN IMMEDIATE: dos trabajadores nunca toman la misma.
+        """
+        conexion = self._conexion()
+        while True:
+            ahora = time.time()
+            with conexion:
+                conexion.execute('BEGIN IMMEDIATE')
+                fila = conexion.execute(f'SELECT {_COLUMNAS} FROM tareas WHERE {_ACTIVAS} AND disponible <= ? '
+                                        'ORDER BY prioridad DESC, id LIMIT 1', (ahora,)).fetchone()
+                if fila is None:
+                    return None
+                tarea = Tarea(*fila)
+                if tarea.estado == EN_CURSO and tarea.intentos >= tarea.max_intentos:
+                    # Venció el plazo del último intento: el trabajador murió con ella
+                    conexion.execute('UPDATE tareas SET estado = ?, terminada = ?, error = ? WHERE id = ?',
+                                     (FALLIDA, ahora, 'El trabajador no terminó la tarea.', tarea.id))
+                    continue
+                tarea = tarea._replace(estado=EN_CURSO, intentos=tarea.intentos + 1, empezada=ahora,
+                                       disponible=ahora + self.plazo)
+                conexion.execute('UPDATE tareas SET estado = ?, intentos = ?, empezada = ?, disponible = ? WHERE id = ?',
+                                 (tarea.estado, tarea.intentos, tarea.empezada, tarea.disponible, tarea.id))
+                return tarea
+
+    def _cerrar(self, tarea, **valores):
+        # Solo si sigue siendo este intento: si venció el plazo, otro trabajador ya la ha tomado
+        columnas = ', '.join(f'{columna} = ?' for columna in valores)
+        self._conexion().execute(f'UPDATE tareas SET {columnas} WHERE id = ? AND intentos = ? AND estado = ?',
+                                 (*valores.values(), tarea.id, tarea.intentos, EN_CURSO))
+
+    def _renovar_plazo(self, tarea, terminada):
+        while not terminada.wait(self.plazo / 3):
+            self._cerrar(tarea, disponible=time.time() + self.plazo)
+
+    def ejecutar(self, app, tarea):
+        """Ejecuta una tarea ya tomada en un contexto de aplicación propio y guarda su resultado o su error."""
+        terminada = threading.Event()
+        latido = threading.Thread(target=self._renovar_plazo, args=(tarea, terminada), daemon=True)
+        latido.start()
+        inicio = time.perf_counter()
+        try:
+            funcion = self._funciones.get(tarea.tipo)
+            if funcion is None:
+                raise ErrorDefinitivo(f'Tipo de tarea desconocido: {tarea.tipo}')
+            with app.app_context():
+                resultado = funcion(**json.loads(tarea.argumentos))
+        except Exception as error:
+            if isinstance(error, ErrorDefinitivo): # Su mensaje ya es para el usuario
+                texto = str(error)
+            else:
+                texto = traceback.format_exception_only(type(error), error)[-1].strip()
+            definitivo = isinstance(error, ErrorDefinitivo) or tarea.intentos >= tarea.max_intentos
+            if definitivo:
+                registro.exception('Tarea %s (%s) fallida en el intento %d', tarea.id, tarea.tipo, tarea.intentos)
+                self._cerrar(tarea, estado=FALLIDA, terminada=time.time(), error=texto)
+            else:
+                # Espera exponencial con algo de azar, para que los fallos simultáneos no se repitan juntos
+                espera = min(self.espera_reintento * 2 ** (tarea.intentos - 1), self.espera_max)
+                espera *= random.uniform(1, 1.25)
+                registro.warning('Tarea %s (%s) falló (%s); reintento en %.0f s', tarea.id, tarea.tipo, texto, espera)
+                self._cerrar(tarea, estado=PENDIENTE, disponible=time.time() + espera, error=texto)
+        else:
+            self._cerrar(tarea, estado=HECHA, terminada=time.time(), error=None,
+                         resultado=json.dumps(resultado, default=str))
+            registro.info('Tarea %s (%s) hecha en %.1f s', tarea.id, tarea.tipo, time.perf_counter() - inicio)
+        finally:
+            terminada.set()
+
+    def _bucle(self, app, parar):
+        # Las conexiones del pool heredadas del proceso padre no se comparten entre procesos
+        with app.app_context():
+            db.engine.dispose(close=False)
+        while not parar.is_set():
+            tarea = self.tomar()
+            if tarea is None:
+                parar.wait(self.intervalo)
+            else:
+                self.ejecutar(app, tarea)
+
+    def _proceso(self, app):
+        # SIGINT/SIGTERM: termina la tarea en curso y sale
+        parar = threading.Event()
+        for senal in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(senal, lambda *_: parar.set())
+        self._bucle(app, parar)
+
+    def trabajar(self, app, procesos=1):
+        """
+        Atiende la cola con 'procesos' procesos (fork del actual, como gunicorn --preload) hasta
+        recibir SIGINT o SIGTERM; cada uno termina antes la tarea que esté ejecutando.
+        """
+        if procesos <= 1:
+            self._proceso(app)
+            return
+        contexto = multiprocessing.get_context('fork')
+        hijos = [contexto.Process(target=self._proceso, args=(app,), name=f'trabajador-{numero}')
+                 for numero in range(procesos)]
+        for hijo in hijos:
+            hijo.start()
+        # SIGTERM al proceso principal (systemd, supervisor...) se reenvía a los trabajadores
+        signal.signal(signal.SIGTERM, lambda *_: [hijo.terminate() for hijo in hijos])
+        try:
+            for hijo in hijos:
+                hijo.join()
+        except KeyboardInterrupt:
+            # Ctrl+C también llega a los hijos (mismo grupo de procesos); SIGTERM por si vino de fuera
+            for hijo in hijos:
+                hijo.terminate()
+            for hijo in hijos:
+                hijo.join()
+
+
+tareas = ColaTareas()
@@ -0,0 +1,187 @@
+# tests/test_borrados.py
+"""
+Borrados en cascada por lotes (borrados.py) desde las vistas eliminar_*_web: la simulación
+cuenta lo mismo que se borra de verdad y cada sentencia respeta el tamaño del lote.
+
+  python -m unittest discover tests
+"""
+import contextlib
+import datetime
+import math
+import os
+import re
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import event
+
+from app import create_app
+from database import db
+import borrados
+import modelos as M
+import progreso
+
+
+class BorradoUsuarios(unittest.TestCase):
+
+    def setUp(self):
+        self.carpeta = tempfile.mkdtemp()
+        ruta = lambda nombre: os.path.join(self.carpeta, nombre)
+        self.app = create_app(TESTING=True, SQLALCHEMY_DATABASE_URI='sqlite:///' + ruta('site.db'),
+                              SESIONES_ALMACEN='sqlite', SESIONES_ARCHIVO=ruta('sesiones.db'),
+                              HASH_PROCESOS=0, HASH_METODO='pbkdf2:sha256:1000', TAREAS_ARCHIVO=ruta('tareas.db'),
+                              TAREAS_DIRECTORIO=ruta('tareas'), CACHE_REFERENCIA_ARCHIVO=ruta('cache.db'))
+        with self.app.app_context():
+            db.create_all()
+            nivel = M.Nivel(niveles='A1')
+            db.session.add(nivel)
+            for nombre, rol in (('admin', 'admin'), ('profe', 'profesor'), ('alumna', 'estudiante')):
+                usuario = M.Usuario(nombre=nombre, email=f'{nombre}@test', rol=rol)
+                usuario.set_password('pw')
+                db.session.add(usuario)
+            db.session.flush()
+            profesor = M.Profesor(id_usuario=self._id('profe'), asignatura='g', id_nivel=nivel.id_nivel)
+            db.session.add(profesor)
+            db.session.add(M.Estudiante(id_usuario=self._id('alumna'), id_nivel=nivel.id_nivel,
+                                        fecha_nacimiento=datetime.date(2000, 1, 1)))
+            db.session.flush()
+            db.session.add(M.Leccion(id_profesor=profesor.id_profesor, titulo='l', contenido='c', id_nivel=nivel.id_nivel))
+            db.session.commit()
+
+    def tearDown(self):
+        with self.app.app_context():
+            db.engine.dispose()
+        shutil.rmtree(self.carpeta, ignore_errors=True)
+
+    @staticmethod
+    def _id(nombre):
+        return db.session.scalar(db.select(M.Usuario.id_usuario).where(M.Usuario.nombre == nombre))
+
+    def _entrar(self, nombre):
+        cliente = self.app.test_client()
+        respuesta = cliente.post('/login', data={'email': f'{nombre}@test', 'password': 'pw'})
+        self.assertEqual(respuesta.status_code, 302)
+        return cliente
+
+    def test_borrar_usuario_cierra_sus_sesiones(self):
+        admin = self._entrar('admin')
+        for nombre in ('profe', 'alumna'):
+            with self.subTest(usuario=nombre):
+                cliente = self._entrar(nombre)
+                self.assertEqual(cliente.get('/lecciones_web').status_code, 200)
+                with self.app.app_context():
+                    id_usuario = self._id(nombre)
+                respuesta = admin.post(f'/eliminar_usuario_web/{id_usuario}', data={'confirmar': '1'})
+                self.assertEqual(respuesta.status_code, 302)
+                with self.app.app_context():
+                    self.assertIsNone(db.session.get(M.Usuario, id_usuario))
+                respuesta = cliente.get('/lecciones_web')
+                self.assertEqual(respuesta.status_code, 302)
+                self.assertIn('/login', respuesta.headers['Location'])
+        self.assertEqual(admin.get('/lecciones_web').status_code, 200)
+
+
+class BorradoPorLotes(unittest.TestCase):
+    lote = 2
+
+    def setUp(self):
+        self.carpeta = tempfile.mkdtemp()
+        ruta = lambda nombre: os.path.join(self.carpeta, nombre)
+        self.app = create_app(TESTING=True, SQLALCHEMY_DATABASE_URI='sqlite:///' + ruta('site.db'),
+                              SESIONES_ALMACEN='cookie', HASH_PROCESOS=0, TAREAS_ARCHIVO=ruta('tareas.db'),
+                              TAREAS_DIRECTORIO=ruta('tareas'), CACHE_REFERENCIA_ARCHIVO=ruta('cache.db'))
+
+    def tearDown(self):
+        with self.app.app_context():
+            db.engine.dispose()
+        shutil.rmtree(self.carpeta, ignore_errors=True)
+
+    def _sembrar(self):
+        """Dos niveles, un profesor con una lección en cada uno y tres estudiantes que lo responden todo dos veces."""
+        db.drop_all()
+        db.create_all()
+        niveles = [M.Nivel(niveles='A1'), M.Nivel(niveles='A2')]
+        profesor_usuario = M.Usuario(nombre='profe', email='profe@test', rol='profesor', contrasena_hash='-')
+        db.session.add_all(niveles + [profesor_usuario])
+        db.session.flush()
+        profesor = M.Profesor(id_usuario=profesor_usuario.id_usuario, asignatura='g', id_nivel=niveles[1].id_nivel)
+        db.session.add(profesor)
+        db.session.flush()
+        lecciones = [M.Leccion(id_profesor=profesor.id_profesor, titulo=f'l{i}', contenido='c', id_nivel=nivel.id_nivel)
+                     for i, nivel in enumerate(niveles)]
+        db.session.add_all(lecciones)
+        db.session.flush()
+        ejercicios = [M.Ejercicio(id_leccion=leccion.id_leccion, pregunta=f'q{i}', tipo='short_answer', respuesta='si')
+                      for leccion in lecciones for i in range(3)]
+        db.session.add_all(ejercicios)
+        db.session.flush()
+        db.session.add_all(M.OpcionEjercicio(id_ejercicio=ejercicio.id_ejercicio, orden=orden, texto=str(orden))
+                           for ejercicio in ejercicios for orden in range(3))
+        estudiantes = []
+        for i in range(3):
+            usuario = M.Usuario(nombre=f'e{i}', email=f'e{i}@test', rol='estudiante', contrasena_hash='-')
+            db.session.add(usuario)
+            db.session.flush()
+            estudiante = M.Estudiante(id_usuario=usuario.id_usuario, id_nivel=niveles[0].id_nivel,
+                                      fecha_nacimiento=datetime.date(2000, 1, 1))
+            db.session.add(estudiante)
+            db.session.flush()
+            estudiantes.append(estudiante)
+        db.session.commit()
+        compilados = progreso.ejercicios_compilados([ejercicio.id_ejercicio for ejercicio in ejercicios])
+        for i, estudiante in enumerate(estudiantes):
+            for vuelta in range(2):
+                progreso.registrar_intentos(estudiante.id_estudiante, [
+                    (compilado, 'si' if (i + vuelta + j) % 2 else 'no') for j, compilado in enumerate(compilados.values())])
+        return {
+            'ejercicio': ejercicios[0].id_ejercicio,
+            'leccion': lecciones[0].id_leccion,
+            'estudiante': estudiantes[0].id_estudiante,
+            'profesor': profesor.id_profesor,
+            'usuario': profesor_usuario.id_usuario,
+            'nivel': niveles[1].id_nivel, # Sin estudiantes, con una lección, el profesor y su clasificación
+        }
+
+    @contextlib.contextmanager
+    def _sentencias_por_lote(self):
+        """Tabla -> filas afectadas por cada DELETE/UPDATE de un lote (None si lleva RETURNING)."""
+        sentencias = {}
+        def registrar(conexion, cursor, sentencia, parametros, contexto, varias):
+            encontrada = re.match(r'\s*(?:DELETE FROM|UPDATE) (\w+) .*LIMIT', sentencia, re.S)
+            if encontrada:
+                self.assertEqual(tuple(parametros[-2:]), (self.lote, 0)) # SQLite: ... LIMIT ? OFFSET ?)
+                sentencias.setdefault(encontrada.group(1), []).append(
+                    None if 'RETURNING' in sentencia else cursor.rowcount)
+        event.listen(db.engine, 'after_cursor_execute', registrar)
+        try:
+            yield sentencias
+        finally:
+            event.remove(db.engine, 'after_cursor_execute', registrar)
+
+    def test_simulacion_y_lotes(self):
+        for entidad in borrados.PLANES:
+            with self.subTest(entidad=entidad), self.app.app_context():
+                id_entidad = self._sembrar()[entidad]
+                simulado = borrados.borrar(entidad, id_entidad, simular=True)
+                self.assertIsNone(simulado.impedimento)
+                self.assertTrue(simulado.total)
+                _, pasos = borrados.PLANES[entidad](id_entidad)
+                tablas = {paso.etiqueta: paso.modelo.__tablename__ for paso in pasos}
+
+                with self._sentencias_por_lote() as sentencias:
+                    informe = borrados.borrar(entidad, id_entidad, tamano_lote=self.lote)
+                self.assertEqual(informe.filas, simulado.filas)
+                self.assertEqual(borrados.borrar(entidad, id_entidad, simular=True).total, 0)
+                for etiqueta, filas in informe.filas.items():
+                    lotes = sentencias[tablas[etiqueta]]
+                    # Lotes llenos, el resto y uno vacío que termina el paso
+                    self.assertEqual(len(lotes), math.ceil(filas / self.lote) + 1, etiqueta)
+                    self.assertTrue(all(afectadas <= self.lote for afectadas in lotes if afectadas is not None), etiqueta)
+
+
+if __name__ == '__main__':
+    unittest.main()
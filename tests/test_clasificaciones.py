@@ -0,0 +1,154 @@
+# tests/test_clasificaciones.py
+"""
+Clasificaciones por nivel y por lección (clasificaciones.py): los puntos y los conteos de
+tramos que se mantienen de forma incremental tienen que coincidir con una reconstrucción, y el
+puesto que sale de los tramos con el de un COUNT(*) exacto.
+
+  python -m unittest discover tests
+"""
+import datetime
+import os
+import random
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app
+from database import db
+import borrados
+import clasificaciones
+import modelos as M
+import progreso
+
+
+class Clasificaciones(unittest.TestCase):
+    estudiantes = 6
+
+    def setUp(self):
+        self.carpeta = tempfile.mkdtemp()
+        ruta = lambda nombre: os.path.join(self.carpeta, nombre)
+        self.app = create_app(TESTING=True, SQLALCHEMY_DATABASE_URI='sqlite:///' + ruta('site.db'),
+                              SESIONES_ALMACEN='cookie', HASH_PROCESOS=0, TAREAS_ARCHIVO=ruta('tareas.db'),
+                              TAREAS_DIRECTORIO=ruta('tareas'), CACHE_REFERENCIA_ARCHIVO=ruta('cache.db'))
+        with self.app.app_context():
+            db.create_all()
+            niveles = [M.Nivel(niveles='A1'), M.Nivel(niveles='A2')]
+            admin = M.Usuario(nombre='admin', email='admin@test', rol='admin', contrasena_hash='-')
+            profesor_usuario = M.Usuario(nombre='profe', email='profe@test', rol='profesor', contrasena_hash='-')
+            db.session.add_all(niveles + [admin, profesor_usuario])
+            db.session.flush()
+            profesor = M.Profesor(id_usuario=profesor_usuario.id_usuario, asignatura='g')
+            db.session.add(profesor)
+            db.session.flush()
+            lecciones = [M.Leccion(id_profesor=profesor.id_profesor, titulo=f'l{i}', contenido='c', id_nivel=nivel.id_nivel)
+                         for i, nivel in enumerate(niveles)]
+            db.session.add_all(lecciones)
+            db.session.flush()
+            ejercicios = [M.Ejercicio(id_leccion=lecciones[i % 2].id_leccion, pregunta=f'q{i}', tipo='short_answer',
+                                      respuesta='si') for i in range(4)]
+            db.session.add_all(ejercicios)
+            self.id_estudiantes = []
+            for i in range(self.estudiantes):
+                usuario = M.Usuario(nombre=f'e{i}', email=f'e{i}@test', rol='estudiante', contrasena_hash='-')
+                db.session.add(usuario)
+                db.session.flush()
+                estudiante = M.Estudiante(id_usuario=usuario.id_usuario, id_nivel=niveles[0].id_nivel,
+                                          fecha_nacimiento=datetime.date(2000, 1, 1))
+                db.session.add(estudiante)
+                db.session.flush()
+                self.id_estudiantes.append(estudiante.id_estudiante)
+            db.session.commit()
+            self.id_admin = admin.id_usuario
+            self.id_niveles = [nivel.id_nivel for nivel in niveles]
+            self.id_lecciones = [leccion.id_leccion for leccion in lecciones]
+            self.id_ejercicios = [ejercicio.id_ejercicio for ejercicio in ejercicios]
+
+    def tearDown(self):
+        with self.app.app_context():
+            db.engine.dispose()
+        shutil.rmtree(self.carpeta, ignore_errors=True)
+
+    def _responder(self, id_estudiante, respuestas):
+        """respuestas: [(id_ejercicio, respuesta)], registradas en una transacción."""
+        with self.app.app_context():
+            compilados = progreso.ejercicios_compilados([id_ejercicio for id_ejercicio, _ in respuestas])
+            progreso.registrar_intentos(id_estudiante, [(compilados[id_ejercicio], respuesta)
+                                                        for id_ejercicio, respuesta in respuestas])
+
+    @staticmethod
+    def _estado():
+        # Las filas a cero (p. ej. tras quitar los únicos puntos de un estudiante) no cuentan en ningún puesto
+        puntos = {(fila.ambito, fila.id_ambito, fila.id_estudiante): fila.puntos
+                  for fila in M.PuntosClasificacion.query if fila.puntos}
+        conteos = {(fila.ambito, fila.id_ambito, fila.escala, fila.tramo): fila.estudiantes
+                   for fila in M.ConteoClasificacion.query}
+        return puntos, conteos
+
+    def _comprobar_con_reconstruccion(self):
+        with self.app.app_context():
+            incremental = self._estado()
+            clasificaciones.recalcular(db.engine, 100, 0, lambda *args: None)
+            self.assertEqual(incremental, self._estado())
+
+    def test_cambiar_ejercicio_de_leccion(self):
+        primero, segundo = self.id_ejercicios[:2] # De la primera y la segunda lección (niveles distintos)
+        for i, id_estudiante in enumerate(self.id_estudiantes):
+            self._responder(id_estudiante, [(segundo, 'si' if i % 2 else 'no')])
+            for _ in range(i % 3):
+                self._responder(id_estudiante, [(primero, 'si')])
+        cliente = self.app.test_client()
+        with cliente.session_transaction() as sesion:
+            sesion.update(user_id=self.id_admin, user_email='admin@test', user_rol='admin')
+        respuesta = cliente.post(f'/editar_ejercicio_web/{primero}', data={
+            'id_leccion': self.id_lecciones[1], 'pregunta': 'q0', 'tipo': 'short_answer', 'respuesta': 'si'})
+        self.assertEqual(respuesta.status_code, 302)
+        with self.app.app_context():
+            puntos, _ = self._estado()
+        self.assertFalse([clave for clave in puntos if clave[:2] == ('leccion', self.id_lecciones[0])])
+        self.assertFalse([clave for clave in puntos if clave[:2] == ('nivel', self.id_niveles[0])])
+        self._comprobar_con_reconstruccion()
+
+    def _comprobar_puestos(self):
+        """Cada puesto de primeros() y alrededor() es 1 + los estudiantes con más puntos, contados uno a uno."""
+        puntos = M.PuntosClasificacion
+        with self.app.app_context():
+            ambitos = [('nivel', id_nivel) for id_nivel in self.id_niveles]
+            ambitos += [('leccion', id_leccion) for id_leccion in self.id_lecciones]
+            for ambito, id_ambito in ambitos:
+                filas = db.session.execute(db.select(puntos.id_estudiante, puntos.puntos).where(
+                    puntos.ambito == ambito, puntos.id_ambito == id_ambito)).all()
+                exacto = {id_estudiante: 1 + db.session.scalar(db.select(db.func.count()).where(
+                    puntos.ambito == ambito, puntos.id_ambito == id_ambito, puntos.puntos > suyos))
+                          for id_estudiante, suyos in filas}
+                with self.subTest(ambito=ambito, id_ambito=id_ambito):
+                    todos = clasificaciones.primeros(ambito, id_ambito, len(filas))
+                    self.assertEqual({puesto.id_estudiante: puesto.puesto for puesto in todos}, exacto)
+                    for id_estudiante in exacto:
+                        for puesto in clasificaciones.alrededor(ambito, id_ambito, id_estudiante, 2):
+                            self.assertEqual(puesto.puesto, exacto[puesto.id_estudiante])
+
+    def test_puestos_como_count(self):
+        azar = random.Random(23)
+        # Varias rondas con aciertos al azar: puntos repartidos por varios tramos y algunos empates
+        for _ in range(4):
+            for id_estudiante in self.id_estudiantes:
+                respuestas = [(id_ejercicio, azar.choice(('si', 'si', 'no'))) for id_ejercicio in self.id_ejercicios
+                              if azar.random() < 0.7]
+                if respuestas:
+                    self._responder(id_estudiante, respuestas)
+            self._comprobar_puestos()
+        # Tras borrar un ejercicio (descuenta puntos) y un estudiante (sale de la clasificación)
+        with self.app.app_context():
+            borrados.borrar('ejercicio', self.id_ejercicios[0])
+        self._comprobar_puestos()
+        with self.app.app_context():
+            borrados.borrar('estudiante', self.id_estudiantes[0])
+        self._comprobar_puestos()
+        self._comprobar_con_reconstruccion()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,97 @@
+# tests/test_consultas_listas.py
+"""
+Número de sentencias SQL de cada página de lista: con los perfiles de carga de BaseModel
+(__cargas__) no debe depender de cuántas filas se muestran (sin N+1).
+
+  python -m unittest discover tests
+"""
+import datetime
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+from sqlalchemy import event
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app
+from database import db
+import modelos as M
+
+LISTAS = ('/usuarios_web', '/estudiantes_web', '/profesores_web', '/lecciones_web', '/ejercicios_web')
+
+
+class ConsultasPorPagina(unittest.TestCase):
+
+    def setUp(self):
+        self.carpeta = tempfile.mkdtemp()
+        ruta = lambda nombre: os.path.join(self.carpeta, nombre)
+        self.app = create_app(TESTING=True, SQLALCHEMY_DATABASE_URI='sqlite:///' + ruta('site.db'),
+                              SESIONES_ALMACEN='cookie', HASH_PROCESOS=0, TAREAS_ARCHIVO=ruta('tareas.db'),
+                              TAREAS_DIRECTORIO=ruta('tareas'), CACHE_REFERENCIA_ARCHIVO=ruta('cache.db'))
+        self.sentencias = 0
+        with self.app.app_context():
+            db.create_all()
+            self.nivel = M.Nivel(niveles='A1')
+            db.session.add(self.nivel)
+            admin = M.Usuario(nombre='admin', email='admin@test', rol='admin', contrasena_hash='-')
+            db.session.add(admin)
+            db.session.commit()
+            self.id_nivel, self.id_admin = self.nivel.id_nivel, admin.id_usuario
+            event.listen(db.engine, 'before_cursor_execute', self._contar)
+        self.filas = 0
+
+    def tearDown(self):
+        with self.app.app_context():
+            event.remove(db.engine, 'before_cursor_execute', self._contar)
+            db.engine.dispose()
+        shutil.rmtree(self.carpeta, ignore_errors=True)
+
+    def _contar(self, *args):
+        self.sentencias += 1
+
+    def _sembrar(self, hasta):
+        """Añade estudiantes, profesores, lecciones y ejercicios hasta tener 'hasta' de cada uno."""
+        with self.app.app_context():
+            for i in range(self.filas, hasta):
+                usuario = M.Usuario(nombre=f'e{i}', email=f'e{i}@test', rol='estudiante', contrasena_hash='-')
+                profesor_usuario = M.Usuario(nombre=f'p{i}', email=f'p{i}@test', rol='profesor', contrasena_hash='-')
+                db.session.add_all([usuario, profesor_usuario])
+                db.session.flush()
+                db.session.add(M.Estudiante(id_usuario=usuario.id_usuario, id_nivel=self.id_nivel,
+                                            fecha_nacimiento=datetime.date(2000, 1, 1)))
+                profesor = M.Profesor(id_usuario=profesor_usuario.id_usuario, asignatura='g', id_nivel=self.id_nivel)
+                db.session.add(profesor)
+                db.session.flush()
+                leccion = M.Leccion(id_profesor=profesor.id_profesor, titulo=f'l{i}', contenido='c', id_nivel=self.id_nivel)
+                db.session.add(leccion)
+                db.session.flush()
+                ejercicio = M.Ejercicio(id_leccion=leccion.id_leccion, pregunta=f'q{i}', tipo='multiple_choice', respuesta='a')
+                ejercicio.asignar_opciones(['a', 'b', 'c'])
+                db.session.add(ejercicio)
+            db.session.commit()
+        self.filas = hasta
+
+    def _sentencias_de(self, ruta):
+        cliente = self.app.test_client()
+        with cliente.session_transaction() as sesion:
+            sesion.update(user_id=self.id_admin, user_email='admin@test', user_rol='admin')
+        self.assertEqual(cliente.get(ruta).status_code, 200) # Calienta las cachés de referencia
+        self.sentencias = 0
+        respuesta = cliente.get(ruta)
+        self.assertEqual(respuesta.status_code, 200)
+        return self.sentencias
+
+    def test_sentencias_constantes(self):
+        self._sembrar(1)
+        con_una = {ruta: self._sentencias_de(ruta) for ruta in LISTAS}
+        self._sembrar(30)
+        for ruta in LISTAS:
+            with self.subTest(ruta=ruta):
+                self.assertEqual(self._sentencias_de(ruta), con_una[ruta])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,31 @@
+# tests/test_hashing.py
+"""
+Hash de contraseñas (hashing.py): un método configurado en forma corta no hace rehashear en
+cada login los hashes que ya se generaron con él.
+
+  python -m unittest discover tests
+"""
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from werkzeug.security import generate_password_hash
+
+from hashing import PoolHashing
+
+
+class NecesitaRehash(unittest.TestCase):
+
+    def test_metodo_en_forma_corta(self):
+        for metodo, otro in (('pbkdf2', 'pbkdf2:sha256:1000'), ('pbkdf2:sha256:1000', 'pbkdf2:sha256:2000'),
+                             ('scrypt:16384:8:1', 'pbkdf2:sha256:1000')):
+            with self.subTest(metodo=metodo):
+                pool = PoolHashing(metodo=metodo)
+                self.assertFalse(pool.necesita_rehash(pool.generar('pw')))
+                self.assertTrue(pool.necesita_rehash(generate_password_hash('pw', otro)))
+
+
+if __name__ == '__main__':
+    unittest.main()
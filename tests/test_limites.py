@@ -0,0 +1,100 @@
+# tests/test_limites.py
+"""
+Límites de intentos de login (limites.py): dentro de la ventana, el intento N+1 desde una misma
+IP, o el N+1 tras N fallos de un mismo email, se rechaza con 429 antes de calcular ningún hash.
+
+  python -m unittest discover tests
+"""
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app
+from database import db
+import modelos as M
+
+# Ventanas tan largas que el test no cruza de una ventana fija a la siguiente
+VENTANA = 10 ** 9
+LIMITE = 3
+
+
+class LimitesLogin(unittest.TestCase):
+
+    def setUp(self):
+        self.carpeta = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.carpeta, ignore_errors=True)
+
+    def _app(self, almacen, limite_ip, limite_email):
+        ruta = lambda nombre: os.path.join(self.carpeta, almacen, nombre)
+        os.makedirs(ruta(''), exist_ok=True)
+        app = create_app(TESTING=True, SQLALCHEMY_DATABASE_URI='sqlite:///' + ruta('site.db'),
+                         SESIONES_ALMACEN='cookie', HASH_PROCESOS=0, HASH_METODO='pbkdf2:sha256:1000',
+                         TAREAS_ARCHIVO=ruta('tareas.db'), TAREAS_DIRECTORIO=ruta('tareas'),
+                         CACHE_REFERENCIA_ARCHIVO=ruta('cache.db'), LOGIN_LIMITES_ACTIVOS=True,
+                         LOGIN_LIMITES_ALMACEN=almacen, LOGIN_LIMITES_ARCHIVO=ruta('limites.db'),
+                         LOGIN_LIMITE_IP=limite_ip, LOGIN_VENTANA_IP=VENTANA,
+                         LOGIN_LIMITE_EMAIL=limite_email, LOGIN_VENTANA_EMAIL=VENTANA)
+        with app.app_context():
+            db.create_all()
+            usuario = M.Usuario(nombre='ana', email='ana@test', rol='profesor')
+            usuario.set_password('pw')
+            db.session.add(usuario)
+            db.session.commit()
+        self.addCleanup(self._cerrar, app)
+        return app
+
+    @staticmethod
+    def _cerrar(app):
+        with app.app_context():
+            db.engine.dispose()
+
+    @staticmethod
+    def _login(app, email, password='mal', ip='10.0.0.1'):
+        return app.test_client().post('/login', data={'email': email, 'password': password},
+                                      environ_base={'REMOTE_ADDR': ip})
+
+    def _rechazado(self, respuesta):
+        self.assertEqual(respuesta.status_code, 429)
+        self.assertGreaterEqual(int(respuesta.headers['Retry-After']), 1)
+
+    def test_por_ip(self):
+        for almacen in ('memoria', 'sqlite'):
+            with self.subTest(almacen=almacen):
+                app = self._app(almacen, limite_ip=LIMITE, limite_email=100)
+                # Emails distintos cada vez: solo cuenta la IP
+                for i in range(LIMITE):
+                    self.assertEqual(self._login(app, f'otro{i}@test').status_code, 200)
+                self._rechazado(self._login(app, 'otro@test'))
+                # También con la contraseña correcta: todos los intentos de la IP cuentan
+                self._rechazado(self._login(app, 'ana@test', 'pw'))
+                self.assertEqual(self._login(app, 'ana@test', 'pw', ip='10.0.0.2').status_code, 302)
+
+    def test_por_email(self):
+        for almacen in ('memoria', 'sqlite'):
+            with self.subTest(almacen=almacen):
+                app = self._app(almacen, limite_ip=100, limite_email=LIMITE)
+                # Desde IPs distintas cada vez: solo cuentan los fallos del email (en cualquier forma)
+                for i in range(LIMITE):
+                    email = ' ANA@test' if i % 2 else 'ana@test'
+                    self.assertEqual(self._login(app, email, ip=f'10.0.1.{i}').status_code, 200)
+                self._rechazado(self._login(app, 'ana@test', 'pw', ip='10.0.2.1'))
+                self.assertEqual(self._login(app, 'otro@test', ip='10.0.2.1').status_code, 200)
+
+    def test_login_correcto_olvida_los_fallos(self):
+        app = self._app('memoria', limite_ip=100, limite_email=LIMITE)
+        for _ in range(LIMITE - 1):
+            self._login(app, 'ana@test')
+        self.assertEqual(self._login(app, 'ana@test', 'pw').status_code, 302)
+        for _ in range(LIMITE):
+            self.assertEqual(self._login(app, 'ana@test').status_code, 200)
+        self._rechazado(self._login(app, 'ana@test'))
+
+
+if __name__ == '__main__':
+    unittest.main()
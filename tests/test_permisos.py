@@ -0,0 +1,147 @@
+# tests/test_permisos.py
+"""
+Permisos por rol (permisos.py y requires_permission): un rol sin el permiso recibe 403 antes de
+que la vista toque nada, sin sesión se vuelve al login, y PERMISOS en la configuración sustituye
+la matriz.
+
+  python -m unittest discover tests
+"""
+import datetime
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app
+from database import db
+import modelos as M
+from permisos import MATRIZ, MatrizPermisos, permisos
+from vistas.comun import requires_permission
+
+# (método, ruta, permiso); {nivel}, {leccion}... se rellenan con los ids sembrados
+RUTAS = (
+    ('GET', '/usuarios_web', 'usuarios.ver'),
+    ('POST', '/eliminar_usuario_web/{usuario}', 'usuarios.editar'),
+    ('GET', '/niveles_web', 'niveles.ver'),
+    ('POST', '/eliminar_nivel_web/{nivel}', 'niveles.editar'),
+    ('GET', '/profesores_web', 'profesores.ver'),
+    ('GET', '/estudiantes_web', 'estudiantes.ver'),
+    ('POST', '/eliminar_estudiante_web/{estudiante}', 'estudiantes.editar'),
+    ('GET', '/lecciones_web', 'lecciones.ver'),
+    ('POST', '/eliminar_leccion_web/{leccion}', 'lecciones.editar'),
+    ('GET', '/ejercicios_web', 'ejercicios.ver'),
+    ('POST', '/responder_ejercicio_web/{ejercicio}', 'ejercicios.responder'),
+    ('POST', '/responder_leccion_web/{leccion}', 'ejercicios.responder'),
+    ('GET', '/clasificacion_nivel_web/{nivel}', 'progreso.ver'),
+    ('GET', '/exportar_estudiantes_csv', 'informes.exportar'),
+    ('GET', '/importar_web', 'importar'),
+    ('GET', '/tareas_web', 'tareas.ver'),
+)
+
+
+class PermisosPorRol(unittest.TestCase):
+
+    def setUp(self):
+        self.carpeta = tempfile.mkdtemp()
+        ruta = lambda nombre: os.path.join(self.carpeta, nombre)
+        self.ajustes = dict(TESTING=True, SQLALCHEMY_DATABASE_URI='sqlite:///' + ruta('site.db'),
+                            SESIONES_ALMACEN='cookie', HASH_PROCESOS=0, TAREAS_ARCHIVO=ruta('tareas.db'),
+                            TAREAS_DIRECTORIO=ruta('tareas'), CACHE_REFERENCIA_ARCHIVO=ruta('cache.db'))
+        self.app = create_app(**self.ajustes)
+        with self.app.app_context():
+            db.create_all()
+            nivel = M.Nivel(niveles='A1')
+            usuarios = {rol: M.Usuario(nombre=rol, email=f'{rol}@test', rol=rol, contrasena_hash='-')
+                        for rol in MATRIZ}
+            db.session.add_all([nivel, *usuarios.values()])
+            db.session.flush()
+            profesor = M.Profesor(id_usuario=usuarios['profesor'].id_usuario, asignatura='g', id_nivel=nivel.id_nivel)
+            estudiante = M.Estudiante(id_usuario=usuarios['estudiante'].id_usuario, id_nivel=nivel.id_nivel,
+                                      fecha_nacimiento=datetime.date(2000, 1, 1))
+            db.session.add_all([profesor, estudiante])
+            db.session.flush()
+            leccion = M.Leccion(id_profesor=profesor.id_profesor, titulo='l', contenido='c', id_nivel=nivel.id_nivel)
+            db.session.add(leccion)
+            db.session.flush()
+            ejercicio = M.Ejercicio(id_leccion=leccion.id_leccion, pregunta='q', tipo='short_answer', respuesta='si')
+            db.session.add(ejercicio)
+            db.session.commit()
+            self.id_usuarios = {rol: usuario.id_usuario for rol, usuario in usuarios.items()}
+            self.ids = dict(usuario=self.id_usuarios['estudiante'], nivel=nivel.id_nivel,
+                            estudiante=estudiante.id_estudiante, leccion=leccion.id_leccion,
+                            ejercicio=ejercicio.id_ejercicio)
+
+    def tearDown(self):
+        with self.app.app_context():
+            db.engine.dispose()
+        shutil.rmtree(self.carpeta, ignore_errors=True)
+
+    def _cliente(self, app, rol):
+        cliente = app.test_client()
+        with cliente.session_transaction() as sesion:
+            sesion.update(user_id=self.id_usuarios[rol], user_email=f'{rol}@test', user_rol=rol)
+        return cliente
+
+    def _filas(self):
+        with self.app.app_context():
+            return [db.session.query(modelo).count() for modelo in
+                    (M.Usuario, M.Nivel, M.Estudiante, M.Leccion, M.ProgresoEstudiante)]
+
+    def test_sin_permiso_403(self):
+        antes = self._filas()
+        for rol in MATRIZ:
+            cliente = self._cliente(self.app, rol)
+            for metodo, ruta, permiso in RUTAS:
+                if permisos.permite(rol, permiso):
+                    continue
+                with self.subTest(rol=rol, ruta=ruta):
+                    respuesta = cliente.open(ruta.format(**self.ids), method=metodo,
+                                             data={'confirmar': '1', 'respuesta': 'si'})
+                    self.assertEqual(respuesta.status_code, 403)
+        # Ningún POST rechazado llegó a borrar ni a registrar nada
+        self.assertEqual(self._filas(), antes)
+
+    def test_con_permiso_entra(self):
+        for rol in MATRIZ:
+            cliente = self._cliente(self.app, rol)
+            for metodo, ruta, permiso in RUTAS:
+                if metodo == 'GET' and permisos.permite(rol, permiso):
+                    with self.subTest(rol=rol, ruta=ruta):
+                        self.assertEqual(cliente.get(ruta.format(**self.ids)).status_code, 200)
+
+    def test_sin_sesion_al_login(self):
+        cliente = self.app.test_client()
+        for metodo, ruta, _ in RUTAS:
+            with self.subTest(ruta=ruta):
+                respuesta = cliente.open(ruta.format(**self.ids), method=metodo)
+                self.assertEqual(respuesta.status_code, 302)
+                self.assertIn('/login', respuesta.headers['Location'])
+
+    def test_rol_desconocido_403(self):
+        cliente = self.app.test_client()
+        with cliente.session_transaction() as sesion:
+            sesion.update(user_id=self.id_usuarios['admin'], user_email='x@test', user_rol='invitado')
+        self.assertEqual(cliente.get('/lecciones_web').status_code, 403)
+
+    def test_matriz_desde_la_configuracion(self):
+        matriz = dict(MATRIZ, profesor=('lecciones.ver', 'niveles.ver'))
+        app = create_app(PERMISOS=matriz, **self.ajustes)
+        try:
+            cliente = self._cliente(app, 'profesor')
+            self.assertEqual(cliente.get('/niveles_web').status_code, 200)
+            self.assertEqual(cliente.get('/estudiantes_web').status_code, 403)
+        finally:
+            permisos.compilar(MATRIZ) # La instancia es global: los demás tests usan la matriz por defecto
+
+    def test_permiso_desconocido(self):
+        with self.assertRaises(ValueError):
+            requires_permission('lecciones.borrar')
+        with self.assertRaises(ValueError):
+            MatrizPermisos({'profesor': ('lecciones.borrar',)})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,216 @@
+# tests/test_progreso.py
+"""
+Calificación y registro de las respuestas de los estudiantes (calificador.py, progreso.py y las
+vistas responder_*_web), y resúmenes de progreso: lo que se suma de forma incremental tiene que
+coincidir con una reconstrucción desde progreso_estudiantes.
+
+  python -m unittest discover tests
+"""
+import datetime
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app
+from database import db
+import calificador
+import clasificaciones
+import modelos as M
+import progreso
+
+
+class ResumenesProgreso(unittest.TestCase):
+
+    def setUp(self):
+        self.carpeta = tempfile.mkdtemp()
+        ruta = lambda nombre: os.path.join(self.carpeta, nombre)
+        self.app = create_app(TESTING=True, SQLALCHEMY_DATABASE_URI='sqlite:///' + ruta('site.db'),
+                              SESIONES_ALMACEN='cookie', HASH_PROCESOS=0, TAREAS_ARCHIVO=ruta('tareas.db'),
+                              TAREAS_DIRECTORIO=ruta('tareas'), CACHE_REFERENCIA_ARCHIVO=ruta('cache.db'))
+        with self.app.app_context():
+            db.create_all()
+            niveles = [M.Nivel(niveles='A1'), M.Nivel(niveles='A2')]
+            admin = M.Usuario(nombre='admin', email='admin@test', rol='admin', contrasena_hash='-')
+            profesor_usuario = M.Usuario(nombre='profe', email='profe@test', rol='profesor', contrasena_hash='-')
+            db.session.add_all(niveles + [admin, profesor_usuario])
+            db.session.flush()
+            profesor = M.Profesor(id_usuario=profesor_usuario.id_usuario, asignatura='g')
+            db.session.add(profesor)
+            db.session.flush()
+            lecciones = [M.Leccion(id_profesor=profesor.id_profesor, titulo=f'l{i}', contenido='c', id_nivel=nivel.id_nivel)
+                         for i, nivel in enumerate(niveles)]
+            db.session.add_all(lecciones)
+            db.session.flush()
+            ejercicios = [M.Ejercicio(id_leccion=lecciones[0].id_leccion, pregunta=f'q{i}', tipo='short_answer', respuesta='si')
+                          for i in range(3)]
+            db.session.add_all(ejercicios)
+            self.id_estudiantes = []
+            for i in range(2):
+                usuario = M.Usuario(nombre=f'e{i}', email=f'e{i}@test', rol='estudiante', contrasena_hash='-')
+                db.session.add(usuario)
+                db.session.flush()
+                estudiante = M.Estudiante(id_usuario=usuario.id_usuario, id_nivel=niveles[0].id_nivel,
+                                          fecha_nacimiento=datetime.date(2000, 1, 1))
+                db.session.add(estudiante)
+                db.session.flush()
+                self.id_estudiantes.append(estudiante.id_estudiante)
+            db.session.commit()
+            self.id_admin = admin.id_usuario
+            self.id_lecciones = [leccion.id_leccion for leccion in lecciones]
+            self.id_ejercicios = [ejercicio.id_ejercicio for ejercicio in ejercicios]
+
+    def tearDown(self):
+        with self.app.app_context():
+            db.engine.dispose()
+        shutil.rmtree(self.carpeta, ignore_errors=True)
+
+    def _cliente(self, id_usuario, rol):
+        cliente = self.app.test_client()
+        with cliente.session_transaction() as sesion:
+            sesion.update(user_id=id_usuario, user_email=f'{id_usuario}@test', user_rol=rol)
+        return cliente
+
+    def _responder(self, id_estudiante, respuestas):
+        """respuestas: [(id_ejercicio, respuesta)], registradas en una transacción."""
+        with self.app.app_context():
+            compilados = progreso.ejercicios_compilados([id_ejercicio for id_ejercicio, _ in respuestas])
+            return progreso.registrar_intentos(id_estudiante, [(compilados[id_ejercicio], respuesta)
+                                                               for id_ejercicio, respuesta in respuestas])
+
+    @staticmethod
+    def _resumenes():
+        resumen = M.ResumenEstudianteLeccion
+        # Un nivel que se queda sin intentos (p. ej. al cambiar de nivel a su único estudiante) vale cero filas
+        return ({(fila.id_estudiante, fila.id_leccion): (fila.intentos, fila.suma_puntuacion, fila.ejercicios_realizados)
+                 for fila in resumen.query},
+                {fila.id_nivel: (fila.intentos, fila.suma_puntuacion) for fila in M.ResumenNivel.query if fila.intentos})
+
+    def _comprobar_con_reconstruccion(self):
+        with self.app.app_context():
+            incrementales = self._resumenes()
+            progreso.recalcular_resumenes()
+            self.assertEqual(incrementales, self._resumenes())
+
+    def test_cambiar_ejercicio_de_leccion(self):
+        primero, segundo, tercero = self.id_ejercicios
+        self._responder(self.id_estudiantes[0], [(primero, 'si'), (segundo, 'no')])
+        self._responder(self.id_estudiantes[0], [(primero, 'no')])
+        self._responder(self.id_estudiantes[1], [(primero, 'si')])
+        respuesta = self._cliente(self.id_admin, 'admin').post(f'/editar_ejercicio_web/{primero}', data={
+            'id_leccion': self.id_lecciones[1], 'pregunta': 'q0', 'tipo': 'short_answer', 'respuesta': 'si'})
+        self.assertEqual(respuesta.status_code, 302)
+        self._comprobar_con_reconstruccion()
+        with self.app.app_context():
+            por_leccion, _ = self._resumenes()
+        # El segundo estudiante solo había hecho ese ejercicio: ya no tiene nada en la primera lección
+        self.assertNotIn((self.id_estudiantes[1], self.id_lecciones[0]), por_leccion)
+        self.assertEqual(por_leccion[(self.id_estudiantes[0], self.id_lecciones[1])], (2, 100, 1))
+
+    def test_calificar(self):
+        corta = calificador.compilar(1, 1, 'short_answer', None, 'Él está')
+        for respuesta, puntuacion in ((' el  ESTA. ', 100), ('¡Él está!', 100), ('el esta bien', 0), (None, 0)):
+            with self.subTest(respuesta=respuesta):
+                self.assertEqual(calificador.calificar(corta, respuesta), puntuacion)
+        # En opción múltiple solo puntúa una de las opciones; la respuesta guardada sola no basta
+        multiple = calificador.compilar(2, 1, 'multiple_choice', ['Rojo', 'Azul'], 'azul')
+        self.assertEqual(calificador.calificar(multiple, 'AZUL'), 100)
+        self.assertEqual(calificador.calificar(multiple, 'rojo'), 0)
+        huerfana = calificador.compilar(3, 1, 'multiple_choice', ['Rojo', 'Verde'], 'azul')
+        self.assertEqual(calificador.calificar(huerfana, 'azul'), 0)
+
+    def test_responder(self):
+        primero, segundo, tercero = self.id_ejercicios
+        id_estudiante = self.id_estudiantes[0]
+        with self.app.app_context():
+            id_usuario = db.session.get(M.Estudiante, id_estudiante).id_usuario
+        cliente = self._cliente(id_usuario, 'estudiante')
+
+        # Un ejercicio suelto, desde el formulario: bien (con otra forma de escribirlo) y mal
+        for id_ejercicio, texto, aviso in ((primero, ' Sí! ', '¡Respuesta correcta!'),
+                                           (segundo, 'no', 'Respuesta incorrecta')):
+            respuesta = cliente.post(f'/responder_ejercicio_web/{id_ejercicio}', data={'respuesta': texto},
+                                     follow_redirects=True)
+            self.assertIn(aviso, respuesta.get_data(as_text=True))
+
+        # Varios de la lección en JSON, todos en una transacción
+        leccion = f'/responder_leccion_web/{self.id_lecciones[0]}'
+        respuesta = cliente.post(leccion, json={'respuestas': [
+            {'id_ejercicio': primero, 'respuesta': 'si'}, {'id_ejercicio': tercero, 'respuesta': 'sí, creo'}]})
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual((respuesta.json['correctas'], respuesta.json['puntuacion_total']), (1, 100))
+        self.assertEqual([(r['id_ejercicio'], r['correcta']) for r in respuesta.json['resultados']],
+                         [(primero, True), (tercero, False)])
+
+        # Un envío con un ejercicio repetido se rechaza entero, sin guardar nada
+        respuesta = cliente.post(leccion, json={'respuestas': [
+            {'id_ejercicio': segundo, 'respuesta': 'si'}, {'id_ejercicio': segundo, 'respuesta': 'no'}]})
+        self.assertEqual(respuesta.status_code, 400)
+        self.assertIn('repetidos', respuesta.json['error'])
+
+        with self.app.app_context():
+            intentos = [(fila.id_ejercicio, fila.puntuacion, fila.respuesta_estudiante) for fila in
+                        M.ProgresoEstudiante.query.filter_by(id_estudiante=id_estudiante)
+                        .order_by(M.ProgresoEstudiante.id_progreso)]
+            self.assertEqual(intentos, [(primero, 100, ' Sí! '), (segundo, 0, 'no'), (primero, 100, 'si'),
+                                        (tercero, 0, 'sí, creo')])
+            por_leccion, por_nivel = self._resumenes()
+            self.assertEqual(por_leccion, {(id_estudiante, self.id_lecciones[0]): (4, 200, 3)})
+            id_nivel = db.session.get(M.Estudiante, id_estudiante).id_nivel
+            self.assertEqual(por_nivel, {id_nivel: (4, 200)})
+            # Sus puntos en la clasificación de la lección y en la de su nivel
+            for ambito, id_ambito in (('leccion', self.id_lecciones[0]), ('nivel', id_nivel)):
+                self.assertEqual(clasificaciones.primeros(ambito, id_ambito, 5),
+                                 [clasificaciones.Puesto(1, id_estudiante, 'e0', 200)])
+        self._comprobar_con_reconstruccion()
+
+    def test_responder_por_otro(self):
+        admin = self._cliente(self.id_admin, 'admin')
+        leccion = f'/responder_leccion_web/{self.id_lecciones[0]}'
+        envio = {'respuestas': [{'id_ejercicio': self.id_ejercicios[0], 'respuesta': 'si'}]}
+        # Sin decir de qué estudiante no hay a quién apuntárselo
+        self.assertEqual(admin.post(leccion, json=envio).status_code, 403)
+        respuesta = admin.post(leccion, json=dict(envio, id_estudiante=self.id_estudiantes[1]))
+        self.assertEqual(respuesta.status_code, 200)
+        with self.app.app_context():
+            self.assertEqual([fila.id_estudiante for fila in M.ProgresoEstudiante.query], [self.id_estudiantes[1]])
+        self._comprobar_con_reconstruccion()
+
+    def _editar_estudiante(self, id_nivel, fecha='2001-02-03'):
+        with self.app.app_context():
+            estudiante = db.session.get(M.Estudiante, self.id_estudiantes[0])
+            id_usuario = estudiante.id_usuario
+        return self._cliente(self.id_admin, 'admin').post(f'/editar_estudiante_web/{self.id_estudiantes[0]}', data={
+            'id_usuario': id_usuario, 'id_nivel': id_nivel, 'fecha_nacimiento': fecha}, follow_redirects=True)
+
+    def test_cambiar_estudiante_de_nivel(self):
+        self._responder(self.id_estudiantes[0], [(self.id_ejercicios[0], 'si'), (self.id_ejercicios[1], 'no')])
+        with self.app.app_context():
+            id_nivel_nuevo = M.Nivel.query.filter_by(niveles='A2').one().id_nivel
+        self.assertIn('Estudiante actualizado', self._editar_estudiante(id_nivel_nuevo).get_data(as_text=True))
+        with self.app.app_context():
+            _, por_nivel = self._resumenes()
+        self.assertEqual(por_nivel[id_nivel_nuevo], (2, 100))
+        self._comprobar_con_reconstruccion()
+
+    def test_editar_estudiante_con_datos_invalidos_no_cambia_nada(self):
+        self._responder(self.id_estudiantes[0], [(self.id_ejercicios[0], 'si')])
+        with self.app.app_context():
+            antes = self._resumenes(), db.session.get(M.Estudiante, self.id_estudiantes[0]).id_nivel
+            id_nivel_nuevo = M.Nivel.query.filter_by(niveles='A2').one().id_nivel
+        for id_nivel, fecha, mensaje in (('x', '2001-02-03', 'Selecciona un nivel válido'),
+                                         (9999, '2001-02-03', 'Selecciona un nivel válido'),
+                                         (id_nivel_nuevo, '03/02/2001', 'Formato de fecha de nacimiento inválido')):
+            with self.subTest(id_nivel=id_nivel, fecha=fecha):
+                self.assertIn(mensaje, self._editar_estudiante(id_nivel, fecha).get_data(as_text=True))
+                with self.app.app_context():
+                    estudiante = db.session.get(M.Estudiante, self.id_estudiantes[0])
+                    self.assertEqual((self._resumenes(), estudiante.id_nivel), antes)
+                    self.assertEqual(estudiante.fecha_nacimiento, datetime.date(2000, 1, 1))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,124 @@
+# tests/test_sesiones.py
+"""
+Sesiones guardadas en el servidor (sesiones.py): cerrar sesión, desactivar un usuario o
+cambiarle el rol invalida su sesión en el acto, y la instancia global no arrastra el almacén de
+otra app.
+
+  python -m unittest discover tests
+"""
+import datetime
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app
+from database import db
+import modelos as M
+from sesiones import sesiones
+
+
+class AlmacenSesiones(unittest.TestCase):
+
+    def setUp(self):
+        self.carpeta = tempfile.mkdtemp()
+        self.ruta = lambda nombre: os.path.join(self.carpeta, nombre)
+
+    def tearDown(self):
+        shutil.rmtree(self.carpeta, ignore_errors=True)
+
+    def _app(self, **ajustes):
+        ruta = self.ruta
+        app = create_app(TESTING=True, SQLALCHEMY_DATABASE_URI='sqlite:///' + ruta('site.db'), HASH_PROCESOS=0,
+                         TAREAS_ARCHIVO=ruta('tareas.db'), TAREAS_DIRECTORIO=ruta('tareas'),
+                         CACHE_REFERENCIA_ARCHIVO=ruta('cache.db'), **ajustes)
+        self.addCleanup(self._cerrar, app)
+        return app
+
+    @staticmethod
+    def _cerrar(app):
+        with app.app_context():
+            db.engine.dispose()
+
+    def test_cookie_despues_de_servidor_no_conserva_el_almacen(self):
+        self._app(SESIONES_ALMACEN='sqlite', SESIONES_ARCHIVO=self.ruta('sesiones.db'))
+        self.assertIsNotNone(sesiones.almacen)
+        self._app(SESIONES_ALMACEN='cookie')
+        self.assertIsNone(sesiones.almacen)
+        self.assertIsNone(sesiones.interfaz)
+        self.assertEqual(sesiones.revocar_usuario(1), 0)
+
+
+class RevocacionSesiones(unittest.TestCase):
+
+    def setUp(self):
+        self.carpeta = tempfile.mkdtemp()
+        ruta = lambda nombre: os.path.join(self.carpeta, nombre)
+        self.app = create_app(TESTING=True, SQLALCHEMY_DATABASE_URI='sqlite:///' + ruta('site.db'),
+                              SESIONES_ALMACEN='sqlite', SESIONES_ARCHIVO=ruta('sesiones.db'),
+                              HASH_PROCESOS=0, HASH_METODO='pbkdf2:sha256:1000', TAREAS_ARCHIVO=ruta('tareas.db'),
+                              TAREAS_DIRECTORIO=ruta('tareas'), CACHE_REFERENCIA_ARCHIVO=ruta('cache.db'))
+        with self.app.app_context():
+            db.create_all()
+            for nombre, rol in (('admin', 'admin'), ('profe', 'profesor')):
+                usuario = M.Usuario(nombre=nombre, email=f'{nombre}@test', rol=rol, fecha_registro=datetime.datetime.now())
+                usuario.set_password('pw')
+                db.session.add(usuario)
+            db.session.commit()
+            self.id_profe = M.Usuario.query.filter_by(nombre='profe').one().id_usuario
+
+    def tearDown(self):
+        with self.app.app_context():
+            db.engine.dispose()
+        shutil.rmtree(self.carpeta, ignore_errors=True)
+
+    def _entrar(self, nombre):
+        cliente = self.app.test_client()
+        respuesta = cliente.post('/login', data={'email': f'{nombre}@test', 'password': 'pw'})
+        self.assertEqual(respuesta.status_code, 302)
+        self.assertEqual(cliente.get('/lecciones_web').status_code, 200)
+        return cliente
+
+    def _comprobar_fuera(self, cookie):
+        """Una petición con la cookie de antes (aunque alguien la hubiera copiado) vuelve al login."""
+        cliente = self.app.test_client()
+        cliente.set_cookie(self.app.config['SESSION_COOKIE_NAME'], cookie)
+        respuesta = cliente.get('/lecciones_web')
+        self.assertEqual(respuesta.status_code, 302)
+        self.assertIn('/login', respuesta.headers['Location'])
+
+    def test_cerrar_sesion(self):
+        cliente = self._entrar('profe')
+        cookie = cliente.get_cookie(self.app.config['SESSION_COOKIE_NAME']).value
+        self.assertEqual(cliente.get('/logout').status_code, 302)
+        self._comprobar_fuera(cookie)
+        # No basta con vaciarla: el id anterior ya no está en el almacén
+        sid = sesiones.interfaz._firmador(self.app).unsign(cookie).decode().rsplit('.', 1)[0]
+        self.assertIsNone(sesiones.almacen.leer(sid))
+
+    def test_desactivar_usuario(self):
+        cliente = self._entrar('profe')
+        cookie = cliente.get_cookie(self.app.config['SESSION_COOKIE_NAME']).value
+        with self.app.app_context():
+            db.session.get(M.Usuario, self.id_profe).activo = False
+            db.session.commit()
+        self._comprobar_fuera(cookie)
+        respuesta = self.app.test_client().post('/login', data={'email': 'profe@test', 'password': 'pw'})
+        self.assertIn('Tu cuenta está desactivada', respuesta.get_data(as_text=True))
+
+    def test_cambiar_rol_desde_la_web(self):
+        cliente = self._entrar('profe')
+        cookie = cliente.get_cookie(self.app.config['SESSION_COOKIE_NAME']).value
+        admin = self._entrar('admin')
+        respuesta = admin.post(f'/editar_usuario_web/{self.id_profe}', data={
+            'nombre': 'profe', 'email': 'profe@test', 'rol': 'estudiante', 'password': ''})
+        self.assertEqual(respuesta.status_code, 302)
+        self._comprobar_fuera(cookie)
+        self.assertEqual(admin.get('/lecciones_web').status_code, 200)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,14 @@
+# vistas/__init__.py
+# Rutas web por blueprint: inicio y login, una por entidad, importación/exportación, tareas en
+# segundo plano y los recursos de la API JSON (que se publican en api_json, no en un blueprint)
+from vistas import principal, niveles, usuarios, estudiantes, profesores, lecciones, ejercicios, informes, tareas
+from vistas import recursos_api # Al importarse registra los recursos de /api/v1 en api_json
+
+BLUEPRINTS = (principal.bp, niveles.bp, usuarios.bp, estudiantes.bp, profesores.bp, lecciones.bp,
+              ejercicios.bp, informes.bp, tareas.bp)
+
+
+def init_app(app):
+    """Registra los blueprints en la aplicación."""
+    for blueprint in BLUEPRINTS:
+        app.register_blueprint(blueprint)
@@ -0,0 +1,220 @@
+# vistas/comun.py
+import hashlib
+import os
+import uuid
+from collections import namedtuple
+from functools import wraps
+
+from flask import abort, current_app, flash, make_response, redirect, render_template, request, session, url_for
+from markupsafe import Markup
+
+from database import db
+import borrados
+import clasificaciones
+from cache import cache_referencia, cache_fragmentos
+from modelos import Usuario, Nivel, Estudiante, Profesor, Leccion
+from permisos import permisos
+from tareas import tareas
+
+# --- Decoradores para proteger rutas ---
+
+def login_required(f):
+    """
+    Decorador para proteger rutas, asegurando que un usuario esté logueado.
+    Redirige a la página de login si no hay sesión activa.
+    """
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        if 'user_id' not in session:
+            flash('Necesitas iniciar sesión para acceder a esta página.', 'warning')
+            return redirect(url_for('principal.login'))
+        return f(*args, **kwargs)
+    return decorated_function
+
+def requires_permission(permiso):
+    """
+    Como login_required, y además exige que el rol de la sesión tenga 'permiso' en la matriz
+    de permisos (permisos.py); si no lo tiene, responde 403. Un permiso inexistente falla al
+    arrancar, no en la primera petición.
+    """
+    permisos.validar(permiso)
+    def decorador(f):
+        @wraps(f)
+        @login_required
+        def decorated_function(*args, **kwargs):
+            if not permisos.permite(session.get('user_rol'), permiso):
+                abort(403)
+            return f(*args, **kwargs)
+        return decorated_function
+    return decorador
+
+def pagina_de(modelo, load=None):
+    """Lee cursor, tamaño de página y filtros de la URL y devuelve la página pedida de 'modelo'."""
+    por_pagina = request.args.get('por_pagina', current_app.config['ELEMENTOS_POR_PAGINA'], type=int)
+    por_pagina = max(1, min(por_pagina, current_app.config['MAX_ELEMENTOS_POR_PAGINA']))
+    try:
+        return modelo.paginar(
+            despues=request.args.get('despues', type=int),
+            antes=request.args.get('antes', type=int),
+            por_pagina=por_pagina,
+            filtros={nombre: request.args.get(nombre) for nombre in modelo.__filtros__},
+            load=load
+        )
+    except ValueError:
+        abort(400) # Filtro con un valor que no corresponde al tipo de la columna
+
+# --- Páginas de detalle con caché HTTP (ETag) y de fragmentos ---
+# Sin versiones compartidas entre procesos, cada proceso usa su propio espacio de ETags para
+# que un contador de versión reiniciado nunca coincida con uno anterior. Se genera con el pid
+# y no al importar: los workers de gunicorn --preload heredan el mismo módulo ya importado.
+_espacio_etags = (None, None)
+
+def espacio_etags():
+    global _espacio_etags
+    if cache_referencia.compartida:
+        return ''
+    pid, espacio = _espacio_etags
+    if pid != os.getpid():
+        _espacio_etags = pid, espacio = os.getpid(), uuid.uuid4().hex
+    return espacio
+
+def detalle_con_cache(modelo, id_entidad, columna_titulo, plantilla, parcial, tablas):
+    """
+    Responde a ver_leccion_web/ver_ejercicio_web a partir de una sola consulta por clave
+    primaria (updated_at y título). La versión de la página combina updated_at con las
+    versiones de las tablas relacionadas (profesor, nivel...) de cache_referencia:
+      - si coincide con If-None-Match, responde 304 sin cargar relaciones ni renderizar;
+      - si no, reutiliza el fragmento HTML cacheado para (versión, rol) o lo renderiza.
+    """
+    pk = modelo.__mapper__.primary_key[0]
+    fila = db.session.execute(db.select(modelo.updated_at, columna_titulo).where(pk == id_entidad)).first()
+    if fila is None:
+        abort(404)
+    actualizado, titulo = fila
+    rol = session.get('user_rol')
+    version = (modelo.__tablename__, id_entidad, actualizado.isoformat() if actualizado else '',
+               cache_referencia.versiones(tablas), espacio_etags())
+    # La página completa incluye la barra de navegación del usuario: el ETag depende también de él
+    etag = hashlib.sha1(repr((version, rol, session.get('user_id'))).encode()).hexdigest()
+
+    # Con mensajes flash pendientes la página cambia aunque la entidad no: no se responde 304
+    # Comparación débil: con compresión el ETag llega al cliente como W/"..."
+    if request.if_none_match.contains_weak(etag) and not session.get('_flashes'):
+        respuesta = make_response('', 304)
+    else:
+        def renderizar():
+            entidad = db.session.get(modelo, id_entidad, options=modelo.opciones_carga('detalle'))
+            return Markup(render_template(parcial, **{modelo.__name__.lower(): entidad}))
+
+        if current_app.config['CACHE_FRAGMENTOS_ACTIVA']:
+            fragmento = cache_fragmentos.obtener((parcial, version, rol), renderizar, tablas)
+        else:
+            fragmento = renderizar()
+        respuesta = make_response(render_template(plantilla, titulo=titulo, fragmento=fragmento))
+
+    respuesta.set_etag(etag)
+    # Informativo: la validación se hace solo con el ETag, que también cubre las tablas relacionadas
+    if actualizado:
+        respuesta.last_modified = actualizado
+    # privada (lleva datos de la sesión) y siempre revalidada con If-None-Match
+    respuesta.headers['Cache-Control'] = 'private, no-cache'
+    return respuesta
+
+# --- Borrado en cascada con confirmación ---
+
+def eliminar_con_confirmacion(entidad, id_entidad, descripcion, mensaje, volver):
+    """
+    POST de los eliminar_*_web: sin 'confirmar' en el formulario muestra las filas que se
+    borrarían (simulación) y pide confirmación; con 'confirmar' borra por lotes (borrados.py).
+    Un borrado de más de BORRADO_MAX_FILAS_WEB filas se encola como tarea en segundo plano
+    (tareas.py), para no agotar el tiempo de la petición, y se redirige a su estado.
+    """
+    informe = borrados.borrar(entidad, id_entidad, simular=True)
+    if informe.impedimento:
+        flash(informe.impedimento, 'danger')
+        return redirect(volver)
+    en_segundo_plano = informe.total > current_app.config['BORRADO_MAX_FILAS_WEB']
+    if not request.form.get('confirmar'):
+        return render_template('confirmar_borrado.html', descripcion=descripcion, informe=informe, volver=volver,
+                               en_segundo_plano=en_segundo_plano)
+    if en_segundo_plano:
+        # Con la misma clave, un segundo 'Eliminar' mientras tanto devuelve la misma tarea
+        id_tarea, _ = tareas.encolar('borrar', {'entidad': entidad, 'id_entidad': id_entidad},
+                                     clave=f'borrar:{entidad}:{id_entidad}', id_usuario=session.get('user_id'))
+        flash(f'Eliminando {descripcion} en segundo plano ({informe.total} filas).', 'info')
+        return redirect(url_for('tareas.ver_tarea_web', id_tarea=id_tarea))
+    try:
+        borrados.borrar(entidad, id_entidad, tamano_lote=current_app.config['BORRADO_LOTE'])
+        flash(mensaje, 'success')
+    except Exception as e:
+        db.session.rollback()
+        flash(f'Error al eliminar {descripcion}: {e}', 'danger')
+    return redirect(volver)
+
+
+# --- Opciones de los formularios (datos de referencia cacheados) ---
+# Tuplas simples en lugar de objetos ORM, para poder compartirlas entre peticiones.
+
+OpcionNivel = namedtuple('OpcionNivel', 'id_nivel niveles')
+OpcionUsuario = namedtuple('OpcionUsuario', 'id_usuario nombre email')
+OpcionProfesor = namedtuple('OpcionProfesor', 'id_profesor nombre asignatura')
+OpcionLeccion = namedtuple('OpcionLeccion', 'id_leccion titulo nombre_profesor')
+
+def opciones_niveles():
+    """Niveles para los <select> de los formularios."""
+    return cache_referencia.obtener('opciones:niveles', lambda: [
+        OpcionNivel(*fila) for fila in
+        db.session.query(Nivel.id_nivel, Nivel.niveles).order_by(Nivel.id_nivel)
+    ], tablas=('niveles',))
+
+def opciones_usuarios(rol):
+    """Usuarios con un rol dado ('estudiante' o 'profesor') para los <select>."""
+    return cache_referencia.obtener(f'opciones:usuarios:{rol}', lambda: [
+        OpcionUsuario(*fila) for fila in
+        db.session.query(Usuario.id_usuario, Usuario.nombre, Usuario.email)
+        .filter(Usuario.rol == rol).order_by(Usuario.id_usuario)
+    ], tablas=('usuarios',))
+
+def opciones_profesores():
+    """Profesores (con el nombre de su usuario) para los <select>."""
+    return cache_referencia.obtener('opciones:profesores', lambda: [
+        OpcionProfesor(*fila) for fila in
+        db.session.query(Profesor.id_profesor, Usuario.nombre, Profesor.asignatura)
+        .outerjoin(Usuario, Profesor.id_usuario == Usuario.id_usuario).order_by(Profesor.id_profesor)
+    ], tablas=('profesores', 'usuarios'))
+
+def opciones_lecciones():
+    """Lecciones (con el nombre de su profesor) para los <select>."""
+    return cache_referencia.obtener('opciones:lecciones', lambda: [
+        OpcionLeccion(*fila) for fila in
+        db.session.query(Leccion.id_leccion, Leccion.titulo, Usuario.nombre)
+        .outerjoin(Profesor, Leccion.id_profesor == Profesor.id_profesor)
+        .outerjoin(Usuario, Profesor.id_usuario == Usuario.id_usuario).order_by(Leccion.id_leccion)
+    ], tablas=('lecciones', 'profesores', 'usuarios'))
+
+
+# --- Respuestas de los estudiantes ---
+
+def estudiante_que_responde(id_estudiante=None, permiso='ejercicios.responder_por_otro'):
+    """
+    El estudiante de la sesión; otro rol solo puede indicar uno con id_estudiante si tiene
+    'permiso' (por defecto el de registrar respuestas en su nombre, que cambian sus notas).
+    """
+    if session.get('user_rol') == 'estudiante':
+        return Estudiante.query.filter_by(id_usuario=session['user_id']).first()
+    if id_estudiante and permisos.permite(session.get('user_rol'), permiso):
+        return db.session.get(Estudiante, id_estudiante)
+    return None
+
+
+# --- Clasificaciones por nivel y por lección ---
+
+def mostrar_clasificacion(ambito, id_ambito, titulo, volver):
+    """Los primeros de la clasificación y, si hay estudiante (el de la sesión o ?id_estudiante=), su puesto con sus vecinos."""
+    estudiante = estudiante_que_responde(request.args.get('id_estudiante', type=int), permiso='progreso.ver')
+    cercanos = []
+    if estudiante is not None:
+        cercanos = clasificaciones.alrededor(ambito, id_ambito, estudiante.id_estudiante,
+                                             current_app.config['CLASIFICACION_VECINOS'])
+    return render_template('clasificacion.html', titulo=titulo, volver=volver, estudiante=estudiante, cercanos=cercanos,
+                           primeros=clasificaciones.primeros(ambito, id_ambito, current_app.config['CLASIFICACION_PRIMEROS']))
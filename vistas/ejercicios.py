@@ -0,0 +1,160 @@
+# vistas/ejercicios.py
+from flask import Blueprint, abort, current_app, flash, jsonify, redirect, render_template, request, url_for
+
+from database import db
+from modelos import Ejercicio
+import clasificaciones
+from progreso import cambiar_leccion_ejercicio, ejercicios_compilados, registrar_intentos
+from repasos import siguientes
+from vistas.comun import (detalle_con_cache, eliminar_con_confirmacion, estudiante_que_responde,
+                          opciones_lecciones, pagina_de, requires_permission)
+
+bp = Blueprint('ejercicios', __name__)
+
+# --- Rutas CRUD para Ejercicios ---
+
+def opciones_del_formulario():
+    """Opciones del formulario, una por línea (pueden llevar comas); solo en opción múltiple."""
+    if request.form.get('tipo') != 'multiple_choice':
+        return []
+    return [linea.strip() for linea in request.form.get('opciones', '').splitlines() if linea.strip()]
+
+@bp.route('/ejercicios_web')
+@requires_permission('ejercicios.ver')
+def ejercicios_web():
+    pagina = pagina_de(Ejercicio, load='lista')
+    return render_template('ejercicios.html', ejercicios=pagina.elementos, pagina=pagina)
+
+@bp.route('/nuevo_ejercicio_web', methods=['GET', 'POST'])
+@requires_permission('ejercicios.editar')
+def nuevo_ejercicio_web():
+    lecciones_disponibles = opciones_lecciones()
+    # Lógica para nuevo_ejercicio_web
+    if request.method == 'POST':
+        id_leccion = request.form['id_leccion']
+        pregunta = request.form['pregunta']
+        tipo = request.form['tipo']
+        opciones = opciones_del_formulario()
+        respuesta = request.form['respuesta']
+
+        if not all([id_leccion, pregunta, tipo, respuesta]):
+            flash('Lección, pregunta, tipo y respuesta son obligatorios.', 'danger')
+            return render_template('nuevo_ejercicio.html', lecciones_disponibles=lecciones_disponibles)
+        
+        try:
+            nuevo_ejercicio = Ejercicio(
+                id_leccion=id_leccion,
+                pregunta=pregunta,
+                tipo=tipo,
+                respuesta=respuesta
+            )
+            nuevo_ejercicio.asignar_opciones(opciones)
+            nuevo_ejercicio.save()
+            flash('Ejercicio creado exitosamente!', 'success')
+            return redirect(url_for('ejercicios.ejercicios_web'))
+        except Exception as e:
+            db.session.rollback()
+            flash(f'Error al crear el ejercicio: {e}', 'danger')
+            return render_template('nuevo_ejercicio.html', lecciones_disponibles=lecciones_disponibles)
+    return render_template('nuevo_ejercicio.html', lecciones_disponibles=lecciones_disponibles)
+
+@bp.route('/ver_ejercicio_web/<int:id_ejercicio>')
+@requires_permission('ejercicios.ver')
+def ver_ejercicio_web(id_ejercicio):
+    return detalle_con_cache(Ejercicio, id_ejercicio, Ejercicio.pregunta, 'ver_ejercicio.html', '_detalle_ejercicio.html',
+                             ('lecciones',))
+
+@bp.route('/editar_ejercicio_web/<int:id_ejercicio>', methods=['GET', 'POST'])
+@requires_permission('ejercicios.editar')
+def editar_ejercicio_web(id_ejercicio):
+    ejercicio = Ejercicio.query.get_or_404(id_ejercicio)
+    lecciones_disponibles = opciones_lecciones()
+    if request.method == 'POST':
+        id_leccion_anterior = ejercicio.id_leccion
+        ejercicio.id_leccion = request.form.get('id_leccion', type=int)
+        ejercicio.pregunta = request.form['pregunta']
+        ejercicio.tipo = request.form['tipo']
+        ejercicio.respuesta = request.form['respuesta']
+        ejercicio.asignar_opciones(opciones_del_formulario())
+        try:
+            if ejercicio.id_leccion != id_leccion_anterior:
+                # Sus intentos pasan a contar en el resumen y las clasificaciones de la nueva lección
+                cambiar_leccion_ejercicio(id_ejercicio, id_leccion_anterior, ejercicio.id_leccion)
+                clasificaciones.cambiar_leccion_ejercicio(id_ejercicio, id_leccion_anterior, ejercicio.id_leccion)
+            db.session.commit()
+            flash('Ejercicio actualizado exitosamente!', 'success')
+            return redirect(url_for('ejercicios.ejercicios_web'))
+        except Exception as e:
+            db.session.rollback()
+            flash(f'Error al actualizar el ejercicio: {e}', 'danger')
+    return render_template('editar_ejercicio.html', ejercicio=ejercicio, lecciones_disponibles=lecciones_disponibles)
+
+
+@bp.route('/eliminar_ejercicio_web/<int:id_ejercicio>', methods=['POST'])
+@requires_permission('ejercicios.editar')
+def eliminar_ejercicio_web(id_ejercicio):
+    Ejercicio.query.get_or_404(id_ejercicio)
+    return eliminar_con_confirmacion('ejercicio', id_ejercicio, f'el ejercicio {id_ejercicio}',
+                                     'Ejercicio eliminado exitosamente!', url_for('ejercicios.ejercicios_web'))
+
+# --- Respuestas de los estudiantes (calificación automática) ---
+
+@bp.route('/responder_ejercicio_web/<int:id_ejercicio>', methods=['POST'])
+@requires_permission('ejercicios.responder')
+def responder_ejercicio_web(id_ejercicio):
+    """Califica la respuesta de un estudiante a un ejercicio y la guarda en su progreso."""
+    estudiante = estudiante_que_responde(request.form.get('id_estudiante', type=int))
+    compilado = ejercicios_compilados([id_ejercicio]).get(id_ejercicio)
+    if compilado is None:
+        abort(404)
+    if estudiante is None:
+        flash('Solo un estudiante registrado puede responder ejercicios.', 'warning')
+        return redirect(url_for('ejercicios.ver_ejercicio_web', id_ejercicio=id_ejercicio))
+
+    try:
+        resultado = registrar_intentos(estudiante.id_estudiante, [(compilado, request.form.get('respuesta', ''))])[0]
+    except Exception as e:
+        db.session.rollback()
+        flash(f'Error al guardar la respuesta: {e}', 'danger')
+        return redirect(url_for('ejercicios.ver_ejercicio_web', id_ejercicio=id_ejercicio))
+
+    if resultado['correcta']:
+        flash('¡Respuesta correcta!', 'success')
+    else:
+        flash('Respuesta incorrecta. ¡Inténtalo de nuevo!', 'danger')
+    # Desde la práctica se vuelve a ella, con el siguiente ejercicio de la cola
+    if request.form.get('volver') == 'practicar':
+        return redirect(url_for('ejercicios.practicar_web', id_estudiante=request.form.get('id_estudiante', type=int)))
+    return redirect(url_for('ejercicios.ver_ejercicio_web', id_ejercicio=id_ejercicio))
+
+# --- Práctica con repetición espaciada (repasos.py) ---
+
+@bp.route('/practicar_web')
+@requires_permission('ejercicios.responder')
+def practicar_web():
+    """El siguiente ejercicio que toca al estudiante, para responderlo aquí, y los que vienen después."""
+    estudiante = estudiante_que_responde(request.args.get('id_estudiante', type=int))
+    if estudiante is None:
+        flash('Solo un estudiante registrado puede practicar (o indica id_estudiante).', 'warning')
+        return redirect(url_for('ejercicios.ejercicios_web'))
+    cola = siguientes(estudiante, current_app.config['PRACTICA_SIGUIENTES'])
+    return render_template('practicar.html', estudiante=estudiante, cola=cola)
+
+@bp.route('/siguientes_ejercicios_web')
+@requires_permission('ejercicios.responder')
+def siguientes_ejercicios_web():
+    """Los próximos ?cantidad= ejercicios del estudiante en JSON (para el cliente móvil)."""
+    estudiante = estudiante_que_responde(request.args.get('id_estudiante', type=int))
+    if estudiante is None:
+        return jsonify(error='Solo un estudiante registrado puede practicar.'), 403
+    cantidad = request.args.get('cantidad', current_app.config['PRACTICA_SIGUIENTES'], type=int)
+    cantidad = max(1, min(cantidad, current_app.config['PRACTICA_MAX_SIGUIENTES']))
+    return jsonify(siguientes=[{
+        'id_ejercicio': siguiente.ejercicio.id_ejercicio,
+        'id_leccion': siguiente.ejercicio.id_leccion,
+        'pregunta': siguiente.ejercicio.pregunta,
+        'tipo': siguiente.ejercicio.tipo,
+        'opciones': [opcion.texto for opcion in siguiente.ejercicio.opciones],
+        'motivo': siguiente.motivo,
+        'proximo': siguiente.proximo.isoformat() if siguiente.proximo else None,
+    } for siguiente in siguientes(estudiante, cantidad)])
@@ -0,0 +1,129 @@
+# vistas/estudiantes.py
+import datetime
+
+from flask import Blueprint, flash, redirect, render_template, request, url_for
+
+from database import db
+from modelos import Estudiante
+from progreso import totales_estudiante, progreso_por_leccion, cambiar_nivel_estudiante
+from vistas.comun import eliminar_con_confirmacion, opciones_niveles, opciones_usuarios, pagina_de, requires_permission
+
+bp = Blueprint('estudiantes', __name__)
+
+# --- Rutas CRUD para Estudiantes ---
+
+@bp.route('/estudiantes_web')
+@requires_permission('estudiantes.ver')
+def estudiantes_web():
+    """Muestra la lista de todos los estudiantes."""
+    pagina = pagina_de(Estudiante, load='lista')
+    return render_template('estudiantes.html', estudiantes=pagina.elementos, pagina=pagina)
+
+@bp.route('/nuevo_estudiante_web', methods=['GET', 'POST'])
+@requires_permission('estudiantes.editar')
+def nuevo_estudiante_web():
+    """Muestra el formulario para crear un nuevo estudiante y maneja su envío."""
+    usuarios_disponibles = opciones_usuarios('estudiante')
+    niveles_disponibles = opciones_niveles()
+
+    if request.method == 'POST':
+        id_usuario = request.form['id_usuario']
+        id_nivel = request.form['id_nivel']
+        fecha_nacimiento_str = request.form['fecha_nacimiento']
+
+        if not all([id_usuario, id_nivel, fecha_nacimiento_str]):
+            flash('Todos los campos son obligatorios.', 'danger')
+            return render_template('nuevo_estudiante.html', usuarios_disponibles=usuarios_disponibles, niveles_disponibles=niveles_disponibles)
+        
+        # Convertir la fecha de string a objeto date
+        try:
+            fecha_nacimiento = datetime.datetime.strptime(fecha_nacimiento_str, '%Y-%m-%d').date()
+        except ValueError:
+            flash('Formato de fecha de nacimiento inválido.', 'danger')
+            return render_template('nuevo_estudiante.html', usuarios_disponibles=usuarios_disponibles, niveles_disponibles=niveles_disponibles)
+
+        # Verificar si el usuario ya está asociado a un estudiante
+        if Estudiante.query.filter_by(id_usuario=id_usuario).first():
+            flash('Este usuario ya está registrado como estudiante.', 'warning')
+            return render_template('nuevo_estudiante.html', usuarios_disponibles=usuarios_disponibles, niveles_disponibles=niveles_disponibles)
+
+
+        try:
+            nuevo_estudiante = Estudiante(
+                id_usuario=id_usuario,
+                id_nivel=id_nivel,
+                fecha_nacimiento=fecha_nacimiento
+            )
+            nuevo_estudiante.save()
+            flash('Estudiante registrado exitosamente!', 'success')
+            return redirect(url_for('estudiantes.estudiantes_web'))
+        except Exception as e:
+            db.session.rollback()
+            flash(f'Error al registrar el estudiante: {e}', 'danger')
+            return render_template('nuevo_estudiante.html', usuarios_disponibles=usuarios_disponibles, niveles_disponibles=niveles_disponibles)
+    
+    return render_template('nuevo_estudiante.html', usuarios_disponibles=usuarios_disponibles, niveles_disponibles=niveles_disponibles)
+
+
+@bp.route('/ver_estudiante_web/<int:id_estudiante>')
+@requires_permission('estudiantes.ver')
+def ver_estudiante_web(id_estudiante):
+    """Muestra los detalles de un estudiante específico."""
+    estudiante = Estudiante.query.get_or_404(id_estudiante)
+    return render_template('ver_estudiante.html', estudiante=estudiante,
+                           totales=totales_estudiante(estudiante), lecciones=progreso_por_leccion(estudiante))
+
+@bp.route('/editar_estudiante_web/<int:id_estudiante>', methods=['GET', 'POST'])
+@requires_permission('estudiantes.editar')
+def editar_estudiante_web(id_estudiante):
+    """Muestra el formulario para editar un estudiante y maneja su envío."""
+    estudiante = Estudiante.query.get_or_404(id_estudiante)
+    usuarios_disponibles = opciones_usuarios('estudiante')
+    niveles_disponibles = opciones_niveles()
+
+    if request.method == 'POST':
+        nuevo_id_usuario = request.form['id_usuario']
+        nuevo_id_nivel = request.form.get('id_nivel', type=int)
+        nueva_fecha_nacimiento_str = request.form['fecha_nacimiento']
+
+        # Antes de tocar el estudiante: un nivel que no existe no es un error de fecha
+        if nuevo_id_nivel not in {nivel.id_nivel for nivel in niveles_disponibles}:
+            flash('Selecciona un nivel válido.', 'danger')
+            return render_template('editar_estudiante.html', estudiante=estudiante, usuarios_disponibles=usuarios_disponibles, niveles_disponibles=niveles_disponibles)
+
+        # Verificar si el usuario seleccionado ya está asignado a otro estudiante (si cambió)
+        if nuevo_id_usuario != str(estudiante.id_usuario): # Compara con string porque form data es string
+            if Estudiante.query.filter_by(id_usuario=nuevo_id_usuario).first():
+                flash('Este usuario ya está registrado como estudiante en otra entrada.', 'warning')
+                return render_template('editar_estudiante.html', estudiante=estudiante, usuarios_disponibles=usuarios_disponibles, niveles_disponibles=niveles_disponibles)
+
+        try:
+            id_nivel_anterior = estudiante.id_nivel
+            estudiante.id_usuario = nuevo_id_usuario
+            estudiante.id_nivel = nuevo_id_nivel
+            estudiante.fecha_nacimiento = datetime.datetime.strptime(nueva_fecha_nacimiento_str, '%Y-%m-%d').date()
+            # Sus intentos pasan al resumen del nivel nuevo en la misma transacción
+            if id_nivel_anterior != nuevo_id_nivel:
+                cambiar_nivel_estudiante(estudiante.id_estudiante, id_nivel_anterior, nuevo_id_nivel)
+
+            db.session.commit()
+            flash('Estudiante actualizado exitosamente!', 'success')
+            return redirect(url_for('estudiantes.estudiantes_web'))
+        except ValueError:
+            db.session.rollback() # Los cambios ya asignados al estudiante no se quedan pendientes
+            flash('Formato de fecha de nacimiento inválido.', 'danger')
+        except Exception as e:
+            db.session.rollback()
+            flash(f'Error al actualizar el estudiante: {e}', 'danger')
+    
+    return render_template('editar_estudiante.html', estudiante=estudiante, usuarios_disponibles=usuarios_disponibles, niveles_disponibles=niveles_disponibles)
+
+
+@bp.route('/eliminar_estudiante_web/<int:id_estudiante>', methods=['POST'])
+@requires_permission('estudiantes.editar')
+def eliminar_estudiante_web(id_estudiante):
+    """Elimina un estudiante de la base de datos."""
+    estudiante = Estudiante.query.get_or_404(id_estudiante)
+    # Con sus intentos, resúmenes y puestos en las clasificaciones, por lotes y tras confirmar
+    return eliminar_con_confirmacion('estudiante', id_estudiante, f'el estudiante {estudiante.usuario.nombre}',
+                                     'Estudiante eliminado exitosamente!', url_for('estudiantes.estudiantes_web'))
@@ -0,0 +1,185 @@
+# vistas/informes.py
+import os
+import uuid
+
+from flask import Blueprint, Response, flash, redirect, render_template, request, session, stream_with_context, url_for
+
+from database import db
+from modelos import Usuario, Nivel, Estudiante, Leccion, Ejercicio, ProgresoEstudiante
+from tareas import tareas, ErrorDefinitivo
+from vistas.comun import requires_permission
+import importador
+import reportes
+
+bp = Blueprint('informes', __name__)
+
+# --- Importación masiva (CSV/JSON) ---
+# El archivo subido se guarda en TAREAS_DIRECTORIO y se importa en la cola de tareas: validar
+# y hashear las contraseñas de miles de filas no cabe en el tiempo de una petición.
+
+@bp.route('/importar_web', methods=['GET', 'POST'])
+@requires_permission('importar')
+def importar_web():
+    """Encola la importación de usuarios, estudiantes o ejercicios desde un archivo CSV/JSON y redirige a su estado."""
+    if request.method == 'POST':
+        entidad = request.form.get('entidad')
+        archivo = request.files.get('archivo')
+
+        if entidad not in importador.ENTIDADES or not archivo or not archivo.filename:
+            flash('Selecciona qué importar y un archivo.', 'danger')
+            return render_template('importar.html', entidades=importador.ENTIDADES)
+        extension = os.path.splitext(archivo.filename)[1].lower()
+        if extension not in importador.LECTORES:
+            flash(f'Error al importar: formato no soportado ({extension or archivo.filename}); usa .csv, .json o .jsonl.', 'danger')
+            return render_template('importar.html', entidades=importador.ENTIDADES)
+
+        os.makedirs(tareas.directorio, exist_ok=True)
+        subido = f'{uuid.uuid4().hex}{extension}'
+        archivo.save(tareas.ruta_archivo(subido))
+        # Un solo intento: repetir una importación a medias duplicaría los ejercicios ya insertados
+        id_tarea, _ = tareas.encolar('importar', {'entidad': entidad, 'archivo': subido, 'nombre': archivo.filename},
+                                     prioridad=10, id_usuario=session['user_id'], max_intentos=1)
+        flash(f'Importando {archivo.filename} en segundo plano.', 'info')
+        return redirect(url_for('tareas.ver_tarea_web', id_tarea=id_tarea))
+
+    return render_template('importar.html', entidades=importador.ENTIDADES)
+
+@tareas.tarea('importar')
+def importar_en_segundo_plano(entidad, archivo, nombre):
+    """
+    Tarea de la cola: importa el archivo subido y lo borra. Devuelve las filas leídas, insertadas
+    y con errores y, si hay errores, el informe en CSV para descargarlo.
+    """
+    ruta = tareas.ruta_archivo(archivo)
+    try:
+        with open(ruta, 'rb') as binario:
+            informe = importador.importar(importador.leer_filas(binario, nombre), entidad)
+    except ValueError as e: # Formato o JSON inválido: no se arregla reintentando
+        raise ErrorDefinitivo(f'Error al importar: {e}')
+    finally:
+        if os.path.exists(ruta):
+            os.remove(ruta)
+    resultado = {'leidas': informe.leidas, 'insertadas': informe.insertadas, 'errores': len(informe.errores)}
+    if informe.errores:
+        resultado['archivo'] = f'{uuid.uuid4().hex}.csv'
+        resultado['nombre'] = f'errores_{os.path.splitext(os.path.basename(nombre))[0]}.csv'
+        with open(tareas.ruta_archivo(resultado['archivo']), 'w', newline='', encoding='utf-8') as salida:
+            informe.escribir_errores(salida)
+    return resultado
+
+
+# --- Exportación de informes (CSV y PDF en streaming) ---
+# Las filas se leen con yield_per (cursor en el servidor, por bloques) y se envían a medida
+# que se generan, así que la memoria del worker no crece con el tamaño del informe.
+
+FILAS_POR_BLOQUE = 1000
+
+CABECERA_PROGRESO = ('ID', 'Estudiante', 'Nivel', 'Lección', 'Pregunta', 'Respuesta del Estudiante', 'Puntuación', 'Fecha')
+ANCHOS_PROGRESO = (4, 14, 9, 16, 26, 16, 7, 10)
+CABECERA_ESTUDIANTES = ('ID', 'Nombre', 'Email', 'Nivel', 'Fecha de Nacimiento', 'Activo')
+
+def consulta_progreso(id_estudiante=None, id_nivel=None):
+    """Progreso de un estudiante o de todos los estudiantes de un nivel, con sus datos relacionados."""
+    consulta = (
+        db.select(ProgresoEstudiante.id_progreso, Usuario.nombre, Nivel.niveles, Leccion.titulo, Ejercicio.pregunta,
+                  ProgresoEstudiante.respuesta_estudiante, ProgresoEstudiante.puntuacion, ProgresoEstudiante.fecha_completado)
+        .join(Estudiante, ProgresoEstudiante.id_estudiante == Estudiante.id_estudiante)
+        .join(Usuario, Estudiante.id_usuario == Usuario.id_usuario)
+        .join(Nivel, Estudiante.id_nivel == Nivel.id_nivel)
+        .join(Ejercicio, ProgresoEstudiante.id_ejercicio == Ejercicio.id_ejercicio)
+        .join(Leccion, Ejercicio.id_leccion == Leccion.id_leccion)
+        .order_by(ProgresoEstudiante.id_progreso)
+    )
+    if id_estudiante is not None:
+        consulta = consulta.where(ProgresoEstudiante.id_estudiante == id_estudiante)
+    if id_nivel is not None:
+        consulta = consulta.where(Estudiante.id_nivel == id_nivel)
+    return consulta
+
+def filas_en_streaming(consulta):
+    """Ejecuta la consulta leyendo FILAS_POR_BLOQUE filas cada vez."""
+    return db.session.execute(consulta.execution_options(yield_per=FILAS_POR_BLOQUE))
+
+def nombre_informe(prefijo, extension):
+    """Nombre de archivo con los filtros de la URL, p. ej. progreso_nivel_2.csv."""
+    partes = [prefijo]
+    if request.args.get('id_estudiante'):
+        partes.append(f"estudiante_{request.args.get('id_estudiante', type=int)}")
+    if request.args.get('id_nivel'):
+        partes.append(f"nivel_{request.args.get('id_nivel', type=int)}")
+    return '_'.join(partes) + '.' + extension
+
+def respuesta_descarga(generador, mimetype, nombre):
+    return Response(stream_with_context(generador), mimetype=mimetype,
+                    headers={'Content-Disposition': f'attachment; filename={nombre}'})
+
+@bp.route('/exportar_progreso_csv')
+@requires_permission('informes.exportar')
+def exportar_progreso_csv():
+    """Descarga el progreso (?id_estudiante= o ?id_nivel=) como CSV."""
+    consulta = consulta_progreso(request.args.get('id_estudiante', type=int), request.args.get('id_nivel', type=int))
+    return respuesta_descarga(reportes.generar_csv(CABECERA_PROGRESO, filas_en_streaming(consulta), FILAS_POR_BLOQUE),
+                              'text/csv', nombre_informe('progreso', 'csv'))
+
+@bp.route('/exportar_progreso_pdf', methods=['GET', 'POST'])
+@requires_permission('informes.exportar')
+def exportar_progreso_pdf():
+    """
+    Progreso (?id_estudiante= o ?id_nivel=) como PDF: con GET se descarga en streaming; con POST
+    se genera en la cola de tareas (para los informes grandes, que ocuparían el worker web) y se
+    descarga desde la página de la tarea.
+    """
+    id_estudiante = request.args.get('id_estudiante', type=int)
+    id_nivel = request.args.get('id_nivel', type=int)
+    if id_estudiante is not None:
+        estudiante = Estudiante.query.get_or_404(id_estudiante)
+        titulo = f'Progreso de {estudiante.usuario.nombre}'
+    elif id_nivel is not None:
+        titulo = f'Progreso del nivel {Nivel.query.get_or_404(id_nivel).niveles}'
+    else:
+        titulo = 'Progreso de todos los estudiantes'
+    if request.method == 'POST':
+        # Prioridad alta: alguien espera el archivo. Un segundo clic devuelve la misma tarea
+        id_tarea, _ = tareas.encolar(
+            'informe_progreso_pdf', {'titulo': titulo, 'nombre': nombre_informe('progreso', 'pdf'),
+                                     'id_estudiante': id_estudiante, 'id_nivel': id_nivel},
+            prioridad=10, clave=f'informe_progreso_pdf:{session["user_id"]}:{id_estudiante}:{id_nivel}',
+            id_usuario=session['user_id'])
+        return redirect(url_for('tareas.ver_tarea_web', id_tarea=id_tarea))
+    filas = filas_en_streaming(consulta_progreso(id_estudiante, id_nivel))
+    return respuesta_descarga(reportes.generar_pdf(titulo, CABECERA_PROGRESO, ANCHOS_PROGRESO, filas),
+                              'application/pdf', nombre_informe('progreso', 'pdf'))
+
+@tareas.tarea('informe_progreso_pdf')
+def informe_progreso_pdf(titulo, nombre, id_estudiante=None, id_nivel=None):
+    """Tarea de la cola: escribe el PDF de progreso en TAREAS_DIRECTORIO y devuelve el archivo para descargarlo."""
+    os.makedirs(tareas.directorio, exist_ok=True)
+    archivo = f'{uuid.uuid4().hex}.pdf'
+    ruta = tareas.ruta_archivo(archivo)
+    filas = filas_en_streaming(consulta_progreso(id_estudiante, id_nivel))
+    # Se escribe aparte y se renombra: un intento interrumpido no deja un PDF a medias descargable
+    try:
+        with open(ruta + '.parcial', 'wb') as salida:
+            for bloque in reportes.generar_pdf(titulo, CABECERA_PROGRESO, ANCHOS_PROGRESO, filas):
+                salida.write(bloque)
+        os.replace(ruta + '.parcial', ruta)
+    finally:
+        if os.path.exists(ruta + '.parcial'):
+            os.remove(ruta + '.parcial')
+    return {'archivo': archivo, 'nombre': nombre, 'bytes': os.path.getsize(ruta)}
+
+@bp.route('/exportar_estudiantes_csv')
+@requires_permission('informes.exportar')
+def exportar_estudiantes_csv():
+    """Descarga la lista de estudiantes (opcionalmente de un nivel, ?id_nivel=) como CSV."""
+    consulta = (
+        db.select(Estudiante.id_estudiante, Usuario.nombre, Usuario.email, Nivel.niveles, Estudiante.fecha_nacimiento, Usuario.activo)
+        .join(Usuario, Estudiante.id_usuario == Usuario.id_usuario)
+        .join(Nivel, Estudiante.id_nivel == Nivel.id_nivel)
+        .order_by(Estudiante.id_estudiante)
+    )
+    id_nivel = request.args.get('id_nivel', type=int)
+    if id_nivel is not None:
+        consulta = consulta.where(Estudiante.id_nivel == id_nivel)
+    return respuesta_descarga(reportes.generar_csv(CABECERA_ESTUDIANTES, filas_en_streaming(consulta), FILAS_POR_BLOQUE),
+                              'text/csv', nombre_informe('estudiantes', 'csv'))
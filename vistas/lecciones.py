@@ -0,0 +1,141 @@
+# vistas/lecciones.py
+from flask import Blueprint, flash, jsonify, redirect, render_template, request, url_for
+
+from database import db
+from modelos import Leccion
+from clasificaciones import cambiar_nivel_leccion
+from progreso import ejercicios_compilados, registrar_intentos
+from vistas.comun import (detalle_con_cache, eliminar_con_confirmacion, estudiante_que_responde,
+                          mostrar_clasificacion, opciones_niveles, opciones_profesores, pagina_de, requires_permission)
+
+bp = Blueprint('lecciones', __name__)
+
+# --- Rutas CRUD para Lecciones ---
+
+@bp.route('/lecciones_web')
+@requires_permission('lecciones.ver')
+def lecciones_web():
+    pagina = pagina_de(Leccion, load='lista')
+    return render_template('lecciones.html', lecciones=pagina.elementos, pagina=pagina)
+
+@bp.route('/nuevo_leccion_web', methods=['GET', 'POST'])
+@requires_permission('lecciones.editar')
+def nuevo_leccion_web():
+    profesores_disponibles = opciones_profesores()
+    niveles_disponibles = opciones_niveles()
+    # Lógica para nuevo_leccion_web
+    if request.method == 'POST':
+        id_profesor = request.form['id_profesor']
+        titulo = request.form['titulo']
+        contenido = request.form['contenido']
+        video = request.form.get('video')
+        id_nivel = request.form.get('id_nivel')
+
+        if not all([id_profesor, titulo, contenido]):
+            flash('Profesor, título y contenido son obligatorios.', 'danger')
+            return render_template('nuevo_leccion.html', profesores_disponibles=profesores_disponibles, niveles_disponibles=niveles_disponibles)
+        
+        try:
+            nueva_leccion = Leccion(
+                id_profesor=id_profesor,
+                titulo=titulo,
+                contenido=contenido,
+                video=video,
+                id_nivel=id_nivel if id_nivel else None
+            )
+            nueva_leccion.save()
+            flash('Lección creada exitosamente!', 'success')
+            return redirect(url_for('lecciones.lecciones_web'))
+        except Exception as e:
+            db.session.rollback()
+            flash(f'Error al crear la lección: {e}', 'danger')
+            return render_template('nuevo_leccion.html', profesores_disponibles=profesores_disponibles, niveles_disponibles=niveles_disponibles)
+    return render_template('nuevo_leccion.html', profesores_disponibles=profesores_disponibles, niveles_disponibles=niveles_disponibles)
+
+
+@bp.route('/ver_leccion_web/<int:id_leccion>')
+@requires_permission('lecciones.ver')
+def ver_leccion_web(id_leccion):
+    return detalle_con_cache(Leccion, id_leccion, Leccion.titulo, 'ver_leccion.html', '_detalle_leccion.html',
+                             ('profesores', 'usuarios', 'niveles'))
+
+@bp.route('/editar_leccion_web/<int:id_leccion>', methods=['GET', 'POST'])
+@requires_permission('lecciones.editar')
+def editar_leccion_web(id_leccion):
+    leccion = Leccion.query.get_or_404(id_leccion)
+    profesores_disponibles = opciones_profesores()
+    niveles_disponibles = opciones_niveles()
+    if request.method == 'POST':
+        leccion.id_profesor = request.form['id_profesor']
+        leccion.titulo = request.form['titulo']
+        leccion.contenido = request.form['contenido']
+        leccion.video = request.form.get('video')
+        nivel_anterior, nivel_nuevo = leccion.id_nivel, request.form.get('id_nivel', type=int)
+        leccion.id_nivel = request.form.get('id_nivel')
+        try:
+            # Los puntos de la lección pasan a la clasificación del nuevo nivel, en la misma transacción
+            if nivel_nuevo != nivel_anterior:
+                cambiar_nivel_leccion(id_leccion, nivel_anterior, nivel_nuevo)
+            db.session.commit()
+            flash('Lección actualizada exitosamente!', 'success')
+            return redirect(url_for('lecciones.lecciones_web'))
+        except Exception as e:
+            db.session.rollback()
+            flash(f'Error al actualizar la lección: {e}', 'danger')
+    return render_template('editar_leccion.html', leccion=leccion, profesores_disponibles=profesores_disponibles, niveles_disponibles=niveles_disponibles)
+
+@bp.route('/clasificacion_leccion_web/<int:id_leccion>')
+@requires_permission('progreso.ver')
+def clasificacion_leccion_web(id_leccion):
+    """Clasificación de la lección por puntos acumulados en sus ejercicios."""
+    leccion = Leccion.query.get_or_404(id_leccion)
+    return mostrar_clasificacion('leccion', id_leccion, f'Lección "{leccion.titulo}"',
+                                 url_for('lecciones.ver_leccion_web', id_leccion=id_leccion))
+
+@bp.route('/eliminar_leccion_web/<int:id_leccion>', methods=['POST'])
+@requires_permission('lecciones.editar')
+def eliminar_leccion_web(id_leccion):
+    leccion = Leccion.query.get_or_404(id_leccion)
+    return eliminar_con_confirmacion('leccion', id_leccion, f'la lección "{leccion.titulo}"',
+                                     'Lección eliminada exitosamente!', url_for('lecciones.lecciones_web'))
+
+# --- Respuestas de los estudiantes (calificación automática) ---
+
+@bp.route('/responder_leccion_web/<int:id_leccion>', methods=['POST'])
+@requires_permission('ejercicios.responder')
+def responder_leccion_web(id_leccion):
+    """
+    Recibe en JSON las respuestas a varios ejercicios de una lección,
+    {"respuestas": [{"id_ejercicio": 1, "respuesta": "..."}, ...]}, y las guarda todas o ninguna.
+    """
+    datos = request.get_json(silent=True) or {}
+    respuestas = datos.get('respuestas')
+    if not isinstance(respuestas, list) or not respuestas:
+        return jsonify(error='Se esperaba una lista "respuestas" con al menos un elemento.'), 400
+    try:
+        ids = [int(respuesta['id_ejercicio']) for respuesta in respuestas]
+    except (KeyError, TypeError, ValueError):
+        return jsonify(error='Cada respuesta necesita un "id_ejercicio" numérico.'), 400
+    if len(set(ids)) != len(ids):
+        return jsonify(error='Hay ejercicios repetidos en el envío.'), 400
+
+    estudiante = estudiante_que_responde(datos.get('id_estudiante'))
+    if estudiante is None:
+        return jsonify(error='Solo un estudiante registrado puede responder ejercicios.'), 403
+
+    compilados = ejercicios_compilados(ids)
+    ajenos = [id_ejercicio for id_ejercicio in ids
+              if id_ejercicio not in compilados or compilados[id_ejercicio].id_leccion != id_leccion]
+    if ajenos:
+        return jsonify(error='Ejercicios que no pertenecen a esta lección.', ejercicios=ajenos), 400
+
+    try:
+        resultados = registrar_intentos(estudiante.id_estudiante, [
+            (compilados[id_ejercicio], respuesta.get('respuesta', '')) for id_ejercicio, respuesta in zip(ids, respuestas)])
+    except Exception as e:
+        db.session.rollback()
+        return jsonify(error=f'Error al guardar las respuestas: {e}'), 500
+
+    return jsonify(resultados=resultados,
+                   correctas=sum(resultado['correcta'] for resultado in resultados),
+                   puntuacion_total=sum(resultado['puntuacion'] for resultado in resultados))
@@ -0,0 +1,91 @@
+# vistas/niveles.py
+from flask import Blueprint, flash, redirect, render_template, request, url_for
+
+from database import db
+from modelos import Nivel
+from vistas.comun import eliminar_con_confirmacion, mostrar_clasificacion, pagina_de, requires_permission
+
+bp = Blueprint('niveles', __name__)
+
+# --- Rutas CRUD para Niveles ---
+
+@bp.route('/niveles_web')
+@requires_permission('niveles.ver')
+def niveles_web():
+    """Muestra la lista de todos los niveles."""
+    pagina = pagina_de(Nivel)
+    return render_template('niveles.html', niveles=pagina.elementos, pagina=pagina)
+
+@bp.route('/nuevo_nivel_web', methods=['GET', 'POST'])
+@requires_permission('niveles.editar')
+def nuevo_nivel_web():
+    """Muestra el formulario para crear un nuevo nivel y maneja su envío."""
+    if request.method == 'POST':
+        nombre_nivel = request.form['niveles']
+
+        if not nombre_nivel:
+            flash('El nombre del nivel es obligatorio.', 'danger')
+            return render_template('nuevo_nivel.html')
+
+        if Nivel.query.filter_by(niveles=nombre_nivel).first():
+            flash('Ya existe un nivel con ese nombre.', 'warning')
+            return render_template('nuevo_nivel.html')
+
+        try:
+            nuevo_nivel = Nivel(niveles=nombre_nivel)
+            nuevo_nivel.save()
+            flash('Nivel creado exitosamente!', 'success')
+            return redirect(url_for('niveles.niveles_web'))
+        except Exception as e:
+            db.session.rollback()
+            flash(f'Error al crear el nivel: {e}', 'danger')
+            return render_template('nuevo_nivel.html')
+    
+    return render_template('nuevo_nivel.html')
+
+@bp.route('/ver_nivel_web/<int:id_nivel>')
+@requires_permission('niveles.ver')
+def ver_nivel_web(id_nivel):
+    """Muestra los detalles de un nivel específico."""
+    nivel = Nivel.query.get_or_404(id_nivel)
+    return render_template('ver_nivel.html', nivel=nivel)
+
+@bp.route('/clasificacion_nivel_web/<int:id_nivel>')
+@requires_permission('progreso.ver')
+def clasificacion_nivel_web(id_nivel):
+    """Clasificación del nivel por puntos acumulados en sus lecciones."""
+    nivel = Nivel.query.get_or_404(id_nivel)
+    return mostrar_clasificacion('nivel', id_nivel, f'Nivel {nivel.niveles}', url_for('niveles.ver_nivel_web', id_nivel=id_nivel))
+
+@bp.route('/editar_nivel_web/<int:id_nivel>', methods=['GET', 'POST'])
+@requires_permission('niveles.editar')
+def editar_nivel_web(id_nivel):
+    """Muestra el formulario para editar un nivel y maneja su envío."""
+    nivel = Nivel.query.get_or_404(id_nivel)
+
+    if request.method == 'POST':
+        nuevo_nombre = request.form['niveles']
+        
+        if Nivel.query.filter_by(niveles=nuevo_nombre).first() and nuevo_nombre != nivel.niveles:
+            flash('Ya existe un nivel con ese nombre.', 'warning')
+            return render_template('editar_nivel.html', nivel=nivel)
+
+        try:
+            nivel.niveles = nuevo_nombre
+            db.session.commit()
+            flash('Nivel actualizado exitosamente!', 'success')
+            return redirect(url_for('niveles.niveles_web'))
+        except Exception as e:
+            db.session.rollback()
+            flash(f'Error al actualizar el nivel: {e}', 'danger')
+    
+    return render_template('editar_nivel.html', nivel=nivel)
+
+@bp.route('/eliminar_nivel_web/<int:id_nivel>', methods=['POST'])
+@requires_permission('niveles.editar')
+def eliminar_nivel_web(id_nivel):
+    """Elimina un nivel de la base de datos."""
+    nivel = Nivel.query.get_or_404(id_nivel)
+    # Sus lecciones y profesores se quedan sin nivel; si tiene estudiantes no se elimina
+    return eliminar_con_confirmacion('nivel', id_nivel, f'el nivel {nivel.niveles}',
+                                     'Nivel eliminado exitosamente!', url_for('niveles.niveles_web'))
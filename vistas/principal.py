@@ -0,0 +1,104 @@
+# vistas/principal.py
+from flask import Blueprint, current_app, flash, redirect, render_template, request, session, url_for
+
+from database import db
+from hashing import HashSaturado
+from limites import limites_login
+from modelos import Usuario, Estudiante
+from permisos import permisos
+from progreso import totales_estudiante, promedios_niveles
+from busqueda import busqueda
+from sesiones import sesiones
+from vistas.comun import login_required
+
+bp = Blueprint('principal', __name__)
+
+# --- Rutas de Autenticación (Login y Logout) ---
+
+@bp.route('/login', methods=['GET', 'POST'])
+def login():
+    """Maneja el inicio de sesión del usuario."""
+    if request.method == 'POST':
+        email = request.form['email']
+        password = request.form['password']
+
+        # Antes de tocar la base de datos o calcular un hash. Sin flash(): escribiría una sesión por rechazo
+        espera = limites_login.comprobar(request.remote_addr, email)
+        if espera:
+            aviso = 'Demasiados intentos de inicio de sesión. Espera un poco antes de volver a intentarlo.'
+            return render_template('login.html', aviso=aviso), 429, {'Retry-After': limites_login.reintentar_en(espera)}
+
+        user = Usuario.query.filter_by(email=email).first()
+
+        try:
+            credenciales_validas = user is not None and user.check_password(password) # Usa check_password
+            if credenciales_validas and user.rehash_si_necesario(password):
+                db.session.commit()
+        except HashSaturado:
+            flash('El servidor está ocupado. Inténtalo de nuevo en unos segundos.', 'warning')
+            return render_template('login.html'), 503, {'Retry-After': '1'}
+
+        if credenciales_validas:
+            limites_login.correcto(email)
+        else:
+            limites_login.fallido(email)
+
+        if credenciales_validas and user.activo is False:
+            flash('Tu cuenta está desactivada. Contacta con un administrador.', 'danger')
+        elif credenciales_validas:
+            sesiones.regenerar(session) # Id nuevo al iniciar sesión (evita la fijación de sesión)
+            session['user_id'] = user.id_usuario
+            session['user_email'] = user.email
+            session['user_rol'] = user.rol
+            flash('Inicio de sesión exitoso!', 'success')
+            
+            # Redirigir según el rol
+            if user.rol == 'admin':
+                return redirect(url_for('usuarios.usuarios_web')) # O un panel de admin específico
+            elif user.rol == 'profesor':
+                return redirect(url_for('lecciones.lecciones_web')) # O un panel de profesor
+            elif user.rol == 'estudiante':
+                return redirect(url_for('principal.index')) # O un panel de estudiante
+            else:
+                return redirect(url_for('principal.index')) # Redirección por defecto
+        else:
+            flash('Email o contraseña incorrectos.', 'danger')
+    return render_template('login.html')
+
+@bp.route('/logout')
+def logout():
+    """Cierra la sesión del usuario."""
+    session.pop('user_id', None)
+    session.pop('user_email', None)
+    session.pop('user_rol', None)
+    sesiones.regenerar(session) # El id anterior se borra del almacén y deja de servir
+    flash('Has cerrado sesión.', 'info')
+    return redirect(url_for('principal.login'))
+
+# --- Página de inicio ---
+
+@bp.route('/')
+@login_required # Protege la ruta para que solo usuarios logueados puedan acceder
+def index():
+    """Ruta principal que muestra la página de inicio."""
+    resumen_estudiante = resumen_niveles = None
+    if session.get('user_rol') == 'estudiante':
+        estudiante = Estudiante.query.filter_by(id_usuario=session['user_id']).first()
+        if estudiante:
+            resumen_estudiante = totales_estudiante(estudiante)
+    elif session.get('user_rol') in ('admin', 'profesor'):
+        resumen_niveles = promedios_niveles()
+    return render_template('index.html', resumen_estudiante=resumen_estudiante, resumen_niveles=resumen_niveles)
+
+
+# --- Búsqueda de texto completo en lecciones y ejercicios ---
+
+@bp.route('/buscar_web')
+@login_required
+def buscar_web():
+    """Busca en títulos y contenidos de lecciones y en preguntas y respuestas de ejercicios."""
+    texto = request.args.get('q', '').strip()
+    # Sin 'ejercicios.ver_respuesta' no se busca en ejercicios: el fragmento podría mostrar la respuesta
+    tipos = None if permisos.permite(session.get('user_rol'), 'ejercicios.ver_respuesta') else ('leccion',)
+    resultados = busqueda.buscar(texto, tipos=tipos, limite=current_app.config['BUSQUEDA_RESULTADOS']) if texto else {}
+    return render_template('buscar.html', q=texto, resultados=resultados)
@@ -0,0 +1,105 @@
+# vistas/profesores.py
+from flask import Blueprint, flash, redirect, render_template, request, url_for
+
+from database import db
+from modelos import Profesor
+from vistas.comun import eliminar_con_confirmacion, opciones_niveles, opciones_usuarios, pagina_de, requires_permission
+
+bp = Blueprint('profesores', __name__)
+
+# --- Rutas CRUD para Profesores ---
+
+@bp.route('/profesores_web')
+@requires_permission('profesores.ver')
+def profesores_web():
+    """Muestra la lista de todos los profesores."""
+    pagina = pagina_de(Profesor, load='lista')
+    return render_template('profesores.html', profesores=pagina.elementos, pagina=pagina)
+
+@bp.route('/nuevo_profesor_web', methods=['GET', 'POST'])
+@requires_permission('profesores.editar')
+def nuevo_profesor_web():
+    """Muestra el formulario para registrar un nuevo profesor y maneja su envío."""
+    usuarios_disponibles = opciones_usuarios('profesor')
+    niveles_disponibles = opciones_niveles()
+
+    if request.method == 'POST':
+        id_usuario = request.form['id_usuario']
+        asignatura = request.form['asignatura']
+        id_nivel = request.form.get('id_nivel') # Puede ser None si no se selecciona
+
+        if not all([id_usuario, asignatura]):
+            flash('El usuario y la asignatura son obligatorios.', 'danger')
+            return render_template('nuevo_profesor.html', usuarios_disponibles=usuarios_disponibles, niveles_disponibles=niveles_disponibles)
+
+        # Verificar si el usuario ya está asociado a un profesor
+        if Profesor.query.filter_by(id_usuario=id_usuario).first():
+            flash('Este usuario ya está registrado como profesor.', 'warning')
+            return render_template('nuevo_profesor.html', usuarios_disponibles=usuarios_disponibles, niveles_disponibles=niveles_disponibles)
+
+        try:
+            nuevo_profesor = Profesor(
+                id_usuario=id_usuario,
+                asignatura=asignatura,
+                id_nivel=id_nivel if id_nivel else None # Guardar como None si no se seleccionó
+            )
+            nuevo_profesor.save()
+            flash('Profesor registrado exitosamente!', 'success')
+            return redirect(url_for('profesores.profesores_web'))
+        except Exception as e:
+            db.session.rollback()
+            flash(f'Error al registrar el profesor: {e}', 'danger')
+            return render_template('nuevo_profesor.html', usuarios_disponibles=usuarios_disponibles, niveles_disponibles=niveles_disponibles)
+    
+    return render_template('nuevo_profesor.html', usuarios_disponibles=usuarios_disponibles, niveles_disponibles=niveles_disponibles)
+
+
+@bp.route('/ver_profesor_web/<int:id_profesor>')
+@requires_permission('profesores.ver')
+def ver_profesor_web(id_profesor):
+    """Muestra los detalles de un profesor específico."""
+    profesor = Profesor.query.get_or_404(id_profesor)
+    return render_template('ver_profesor.html', profesor=profesor)
+
+@bp.route('/editar_profesor_web/<int:id_profesor>', methods=['GET', 'POST'])
+@requires_permission('profesores.editar')
+def editar_profesor_web(id_profesor):
+    """Muestra el formulario para editar un profesor y maneja su envío."""
+    profesor = Profesor.query.get_or_404(id_profesor)
+    usuarios_disponibles = opciones_usuarios('profesor')
+    niveles_disponibles = opciones_niveles()
+
+    if request.method == 'POST':
+        nuevo_id_usuario = request.form['id_usuario']
+        nueva_asignatura = request.form['asignatura']
+        nuevo_id_nivel = request.form.get('id_nivel')
+
+        # Verificar si el usuario seleccionado ya está asignado a otro profesor (si cambió)
+        if nuevo_id_usuario != str(profesor.id_usuario):
+            if Profesor.query.filter_by(id_usuario=nuevo_id_usuario).first():
+                flash('Este usuario ya está registrado como profesor en otra entrada.', 'warning')
+                return render_template('editar_profesor.html', profesor=profesor, usuarios_disponibles=usuarios_disponibles, niveles_disponibles=niveles_disponibles)
+
+        try:
+            profesor.id_usuario = nuevo_id_usuario
+            profesor.asignatura = nueva_asignatura
+            profesor.id_nivel = nuevo_id_nivel if nuevo_id_nivel else None
+            
+            db.session.commit()
+            flash('Profesor actualizado exitosamente!', 'success')
+            return redirect(url_for('profesores.profesores_web'))
+        except Exception as e:
+            db.session.rollback()
+            flash(f'Error al actualizar el profesor: {e}', 'danger')
+    
+    return render_template('editar_profesor.html', profesor=profesor, usuarios_disponibles=usuarios_disponibles, niveles_disponibles=niveles_disponibles)
+
+
+@bp.route('/eliminar_profesor_web/<int:id_profesor>', methods=['POST'])
+@requires_permission('profesores.editar')
+def eliminar_profesor_web(id_profesor):
+    """Elimina un profesor de la base de datos."""
+    profesor = Profesor.query.get_or_404(id_profesor)
+    # Con sus lecciones, ejercicios e intentos, por lotes y tras confirmar
+    return eliminar_con_confirmacion('profesor', id_profesor, f'el profesor {profesor.usuario.nombre}',
+                                     'Profesor eliminado exitosamente!', url_for('profesores.profesores_web'))
@@ -0,0 +1,53 @@
+# vistas/recursos_api.py
+from flask import session
+
+from database import db
+from modelos import Usuario, Nivel, Estudiante, Profesor, Leccion, Ejercicio, OpcionEjercicio, ProgresoEstudiante
+from api import api_json, Relacion
+
+# --- API JSON (/api/v1, ver api.py) ---
+# Las mismas entidades que las páginas *_web, para el cliente móvil: una pantalla de lección
+# completa es GET /api/v1/lecciones/<id>?incluir=ejercicios.opciones,profesor.usuario,nivel
+
+def solo_progreso_propio(consulta):
+    """Un estudiante solo ve su propio progreso (subconsulta, sin una consulta más)."""
+    if session.get('user_rol') != 'estudiante':
+        return consulta
+    propio = db.select(Estudiante.id_estudiante).where(Estudiante.id_usuario == session['user_id']).scalar_subquery()
+    return consulta.where(ProgresoEstudiante.id_estudiante == propio)
+
+api_json.registrar('usuarios', Usuario, ('id_usuario', 'nombre', 'email', 'rol', 'fecha_registro', 'activo'),
+                   'usuarios.ver', protegidos={'email': 'usuarios.ver'})
+api_json.registrar('niveles', Nivel, ('id_nivel', 'niveles'), 'niveles.ver')
+api_json.registrar('estudiantes', Estudiante, ('id_estudiante', 'id_usuario', 'id_nivel', 'fecha_nacimiento'),
+                   'estudiantes.ver',
+                   relaciones={'usuario': Relacion('usuarios', 'id_usuario', 'id_usuario'),
+                               'nivel': Relacion('niveles', 'id_nivel', 'id_nivel')})
+api_json.registrar('profesores', Profesor, ('id_profesor', 'id_usuario', 'asignatura', 'id_nivel'), 'profesores.ver',
+                   relaciones={'usuario': Relacion('usuarios', 'id_usuario', 'id_usuario'),
+                               'nivel': Relacion('niveles', 'id_nivel', 'id_nivel')})
+api_json.registrar('lecciones', Leccion,
+                   ('id_leccion', 'id_profesor', 'titulo', 'contenido', 'video', 'id_nivel', 'updated_at'),
+                   'lecciones.ver',
+                   relaciones={'profesor': Relacion('profesores', 'id_profesor', 'id_profesor'),
+                               'nivel': Relacion('niveles', 'id_nivel', 'id_nivel'),
+                               'ejercicios': Relacion('ejercicios', 'id_leccion', 'id_leccion', muchos=True)})
+# Como en ver_ejercicio_web, la respuesta correcta solo con 'ejercicios.ver_respuesta'
+api_json.registrar('ejercicios', Ejercicio,
+                   ('id_ejercicio', 'id_leccion', 'pregunta', 'tipo', 'respuesta', 'updated_at'),
+                   'ejercicios.ver',
+                   relaciones={'leccion': Relacion('lecciones', 'id_leccion', 'id_leccion'),
+                               'opciones': Relacion('opciones', 'id_ejercicio', 'id_ejercicio', muchos=True)},
+                   protegidos={'respuesta': 'ejercicios.ver_respuesta'})
+# Las opciones de un ejercicio se muestran por 'orden'; cuál es la correcta, igual que la respuesta
+api_json.registrar('opciones', OpcionEjercicio, ('id_opcion', 'id_ejercicio', 'orden', 'texto', 'correcta'),
+                   'ejercicios.ver',
+                   relaciones={'ejercicio': Relacion('ejercicios', 'id_ejercicio', 'id_ejercicio')},
+                   protegidos={'correcta': 'ejercicios.ver_respuesta'})
+api_json.registrar('progreso', ProgresoEstudiante,
+                   ('id_progreso', 'id_estudiante', 'id_ejercicio', 'fecha_completado', 'puntuacion',
+                    'respuesta_estudiante'),
+                   'progreso.ver',
+                   relaciones={'estudiante': Relacion('estudiantes', 'id_estudiante', 'id_estudiante'),
+                               'ejercicio': Relacion('ejercicios', 'id_ejercicio', 'id_ejercicio')},
+                   alcance=solo_progreso_propio)
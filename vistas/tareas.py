@@ -0,0 +1,57 @@
+# vistas/tareas.py
+import os
+
+from flask import Blueprint, abort, jsonify, make_response, render_template, send_file, session
+
+from permisos import permisos
+from tareas import tareas, PENDIENTE, EN_CURSO, HECHA
+from vistas.comun import login_required, requires_permission
+
+bp = Blueprint('tareas', __name__)
+
+# --- Tareas en segundo plano (tareas.py) ---
+# Cada usuario ve las que encoló él; con 'tareas.ver', todas.
+
+def tarea_visible(id_tarea):
+    """La tarea como dict (ColaTareas.como_dict), o 404 si no existe o no es del usuario de la sesión."""
+    tarea = tareas.consultar(id_tarea)
+    if tarea is None or (tarea.id_usuario != session.get('user_id')
+                         and not permisos.permite(session.get('user_rol'), 'tareas.ver')):
+        abort(404)
+    return tareas.como_dict(tarea)
+
+@bp.route('/tareas_web')
+@requires_permission('tareas.ver')
+def tareas_web():
+    """Las últimas tareas de la cola, de todos los usuarios."""
+    return render_template('tareas.html', tareas=[tareas.como_dict(tarea) for tarea in tareas.ultimas()])
+
+@bp.route('/ver_tarea_web/<int:id_tarea>')
+@login_required
+def ver_tarea_web(id_tarea):
+    """Estado de una tarea; mientras sigue en la cola la página se recarga sola."""
+    tarea = tarea_visible(id_tarea)
+    respuesta = make_response(render_template('ver_tarea.html', tarea=tarea))
+    if tarea['estado'] in (PENDIENTE, EN_CURSO):
+        respuesta.headers['Refresh'] = '3'
+    return respuesta
+
+@bp.route('/estado_tarea_web/<int:id_tarea>')
+@login_required
+def estado_tarea_web(id_tarea):
+    """Estado de una tarea en JSON, para consultarlo periódicamente."""
+    return jsonify(tarea_visible(id_tarea))
+
+@bp.route('/descargar_tarea_web/<int:id_tarea>')
+@login_required
+def descargar_tarea_web(id_tarea):
+    """Descarga el archivo que generó la tarea (p. ej. un informe PDF)."""
+    tarea = tarea_visible(id_tarea)
+    resultado = tarea['resultado']
+    if tarea['estado'] != HECHA or not isinstance(resultado, dict) or 'archivo' not in resultado:
+        abort(404)
+    ruta = tareas.ruta_archivo(resultado['archivo'])
+    if not os.path.exists(ruta): # Ya borrado por 'flask limpiar-tareas'
+        abort(404)
+    return send_file(ruta, as_attachment=True,
+                     download_name=resultado.get('nombre') or resultado['archivo'])
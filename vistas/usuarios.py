@@ -0,0 +1,101 @@
+# vistas/usuarios.py
+from flask import Blueprint, flash, redirect, render_template, request, url_for
+
+from database import db
+from hashing import HashSaturado
+from modelos import Usuario
+from vistas.comun import eliminar_con_confirmacion, pagina_de, requires_permission
+
+bp = Blueprint('usuarios', __name__)
+
+# --- Rutas CRUD para Usuarios ---
+
+@bp.route('/usuarios_web')
+@requires_permission('usuarios.ver')
+def usuarios_web():
+    """Muestra la lista de todos los usuarios."""
+    pagina = pagina_de(Usuario)
+    return render_template('usuarios.html', usuarios=pagina.elementos, pagina=pagina)
+
+@bp.route('/nuevo_usuario_web', methods=['GET', 'POST'])
+@requires_permission('usuarios.editar')
+def nuevo_usuario_web():
+    """Muestra el formulario para crear un nuevo usuario y maneja su envío."""
+    if request.method == 'POST':
+        nombre = request.form['nombre']
+        email = request.form['email']
+        password = request.form['password'] # Obtienes la contraseña del formulario
+        rol = request.form['rol']
+
+        if not all([nombre, email, password, rol]):
+            flash('Todos los campos son obligatorios.', 'danger')
+            return render_template('nuevo_usuario.html')
+
+        if Usuario.query.filter_by(email=email).first():
+            flash('Ya existe un usuario con ese email.', 'warning')
+            return render_template('nuevo_usuario.html')
+
+        try:
+            # CAMBIO CLAVE AQUÍ: No pases 'password' al constructor
+            nuevo_usuario = Usuario(nombre=nombre, email=email, rol=rol)
+            # Luego, llama al método set_password para hashear y guardar la contraseña
+            nuevo_usuario.set_password(password) 
+            
+            nuevo_usuario.save() # Esto guardará el usuario con la contraseña hasheada
+            flash('Usuario creado exitosamente!', 'success')
+            return redirect(url_for('usuarios.usuarios_web'))
+        except HashSaturado:
+            flash('El servidor está ocupado. Inténtalo de nuevo en unos segundos.', 'warning')
+            return render_template('nuevo_usuario.html'), 503, {'Retry-After': '1'}
+        except Exception as e:
+            db.session.rollback()
+            flash(f'Error al crear el usuario: {e}', 'danger')
+            return render_template('nuevo_usuario.html')
+    
+    return render_template('nuevo_usuario.html')
+
+@bp.route('/ver_usuario_web/<int:id_usuario>')
+@requires_permission('usuarios.ver')
+def ver_usuario_web(id_usuario):
+    """Muestra los detalles de un usuario específico."""
+    usuario = Usuario.query.get_or_404(id_usuario)
+    return render_template('ver_usuario.html', usuario=usuario)
+
+@bp.route('/editar_usuario_web/<int:id_usuario>', methods=['GET', 'POST'])
+@requires_permission('usuarios.editar')
+def editar_usuario_web(id_usuario):
+    """Muestra el formulario para editar un usuario y maneja su envío."""
+    usuario = Usuario.query.get_or_404(id_usuario)
+
+    if request.method == 'POST':
+        usuario.nombre = request.form['nombre']
+        usuario.email = request.form['email']
+        usuario.rol = request.form['rol']
+
+        try:
+            # Solo actualiza la contraseña si se proporciona una nueva
+            if request.form['password']:
+                usuario.set_password(request.form['password'])
+            db.session.commit() # BaseModel.save() hace add y commit, aquí solo necesitamos commit
+            flash('Usuario actualizado exitosamente!', 'success')
+            return redirect(url_for('usuarios.usuarios_web'))
+        except HashSaturado:
+            db.session.rollback()
+            flash('El servidor está ocupado. Inténtalo de nuevo en unos segundos.', 'warning')
+            return render_template('editar_usuario.html', usuario=usuario), 503, {'Retry-After': '1'}
+        except Exception as e:
+            db.session.rollback()
+            flash(f'Error al actualizar el usuario: {e}', 'danger')
+            # Si hay un error, vuelve a renderizar el formulario con los datos actuales
+            return render_template('editar_usuario.html', usuario=usuario)
+    
+    return render_template('editar_usuario.html', usuario=usuario)
+
+@bp.route('/eliminar_usuario_web/<int:id_usuario>', methods=['POST'])
+@requires_permission('usuarios.editar')
+def eliminar_usuario_web(id_usuario):
+    """Elimina un usuario de la base de datos."""
+    usuario = Usuario.query.get_or_404(id_usuario)
+    # Con su perfil de profesor (lecciones, ejercicios...) o de estudiante (intentos...), por lotes y tras confirmar
+    return eliminar_con_confirmacion('usuario', id_usuario, f'el usuario {usuario.nombre}',
+                                     'Usuario eliminado exitosamente!', url_for('usuarios.usuarios_web'))
@@ -0,0 +1,7 @@
+# wsgi.py
+# Punto de entrada para gunicorn (gunicorn wsgi:app). Con --preload la aplicación se construye
+# una vez en el proceso maestro y los workers la heredan con fork(); database.py, cache.py,
+# sesiones.py y hashing.py abren de nuevo en cada worker sus conexiones y procesos.
+from app import create_app
+
+app = create_app()